@@ -2,11 +2,13 @@
 
 import os
 from datetime import datetime, timedelta
+from functools import partial
 
 from dotenv import load_dotenv
 from flask import Flask
 from flask_jwt_extended import JWTManager
 from mongoengine import connect
+from werkzeug.local import LocalProxy
 
 from routes.admin import admin_bp
 from routes.announcement import announcement_bp
@@ -40,8 +42,9 @@ from routes.base_salary_applications_api import base_salary_applications_api_bp
 from routes.settlements_api import settlements_api_bp
 from routes.base_salary_monthly import base_salary_monthly_bp
 from routes.base_salary_monthly_api import base_salary_monthly_api_bp
-from utils.bootstrap import (ensure_database_indexes, ensure_initial_roles_and_admin)
+from utils.bootstrap import (ensure_announcement_end_time, ensure_database_indexes, ensure_initial_roles_and_admin)
 from utils.logging_setup import init_logging
+from utils.mail_outbox import start_mail_outbox_worker
 from utils.scheduler import init_scheduled_jobs
 from utils.security import create_user_datastore, init_security
 from utils.timezone_helper import (format_local_date, format_local_datetime, format_local_time, get_local_date_for_input, get_local_datetime_for_input,
@@ -115,6 +118,21 @@ def create_app() -> Flask:
         flask_app.logger.error('MongoDB 连接失败：%s', exc)
         raise
 
+    from utils.report_cache_events import register_report_cache_handlers
+    register_report_cache_handlers()
+
+    from utils.bbs_search import register_bbs_search_handlers
+    register_bbs_search_handlers()
+
+    from utils.pilot_name_search import register_pilot_name_search_handlers
+    register_pilot_name_search_handlers()
+
+    from utils.identity_cache import register_identity_cache_handlers
+    register_identity_cache_handlers()
+
+    from utils.dashboard_snapshot import register_dashboard_snapshot_handlers
+    register_dashboard_snapshot_handlers()
+
     try:
         from utils.job_token import JobPlan
         JobPlan.objects.delete()  # type: ignore[attr-defined]  # pylint: disable=no-member
@@ -136,12 +154,15 @@ def create_app() -> Flask:
     @jwt.user_lookup_loader
     def user_lookup_callback(_jwt_header, jwt_data):
         """从 JWT payload 加载用户对象。"""
-        from models.user import User
+        from utils.identity_cache import get_identity, load_user
         identity = jwt_data["sub"]
         try:
-            return User.objects.get(fs_uniquifier=identity)  # pylint: disable=no-member
+            if get_identity(identity) is None:
+                return None
         except Exception:  # pylint: disable=broad-except
             return None
+        # 身份缓存命中时不读数据库；真正访问用户对象时才按请求内身份映射加载
+        return LocalProxy(partial(load_user, identity))
 
     flask_app.register_blueprint(main_bp)
     flask_app.register_blueprint(admin_bp, url_prefix='/admin')
@@ -320,8 +341,11 @@ def create_app() -> Flask:
 
     with flask_app.app_context():
         ensure_database_indexes()
+        ensure_announcement_end_time()
         ensure_initial_roles_and_admin(user_datastore)
 
+    start_mail_outbox_worker()
+
     # 说明：生产多进程/多实例部署时，应仅在“领导实例”启用该开关，避免重复触发任务
     enable_scheduler = os.getenv('ENABLE_SCHEDULER', 'false').lower() == 'true'
     is_dev = os.getenv('FLASK_ENV', '').lower() == 'development'
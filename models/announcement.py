@@ -3,6 +3,7 @@ import enum
 import json
 from datetime import datetime, timedelta
 
+from bson import DBRef, ObjectId
 from mongoengine import (DateTimeField, Document, EnumField, FloatField, ReferenceField, StringField)
 
 from utils.timezone_helper import get_current_utc_time
@@ -12,6 +13,20 @@ from .pilot import Pilot
 from .user import User
 
 
+MAX_DURATION_HOURS = 16.0  # 单个通告的最长时长，区间查询据此确定回看窗口
+
+
+def _reference_id(reference):
+    """读取引用字段的ObjectId（兼容 Document / DBRef / ObjectId），不触发解引用"""
+    if reference is None:
+        return None
+    if isinstance(reference, DBRef):
+        return reference.id
+    if isinstance(reference, ObjectId):
+        return reference
+    return getattr(reference, 'id', reference)
+
+
 class RecurrenceType(enum.Enum):
     """重复类型枚举"""
     NONE = "无重复"
@@ -35,7 +50,8 @@ class Announcement(Document):
     z_coord = StringField(required=True, max_length=50)  # 坐席
 
     start_time = DateTimeField(required=True)
-    duration_hours = FloatField(required=True, min_value=1.0, max_value=16.0)
+    duration_hours = FloatField(required=True, min_value=1.0, max_value=MAX_DURATION_HOURS)
+    end_time = DateTimeField()  # 结束时间（由开始时间+时长在保存时写入，供区间查询使用）
 
     recurrence_type = EnumField(RecurrenceType, default=RecurrenceType.NONE)
     recurrence_pattern = StringField()  # JSON格式存储重复规则
@@ -77,6 +93,12 @@ class Announcement(Document):
             {
                 'fields': ['battle_area', 'start_time', 'duration_hours']
             },
+            {
+                'fields': ['battle_area', 'start_time', 'end_time']
+            },
+            {
+                'fields': ['pilot', 'start_time', 'end_time']
+            },
         ],
     }
 
@@ -86,7 +108,7 @@ class Announcement(Document):
 
 
         if self.duration_hours:
-            if self.duration_hours < 1.0 or self.duration_hours > 16.0:
+            if self.duration_hours < 1.0 or self.duration_hours > MAX_DURATION_HOURS:
                 raise ValueError("时长必须在1-16小时之间")
             if (self.duration_hours * 2) % 1 != 0:
                 raise ValueError("时长必须是0.5小时的倍数")
@@ -111,6 +133,8 @@ class Announcement(Document):
             self.y_coord = self.battle_area.y_coord
             self.z_coord = self.battle_area.z_coord
 
+        self.end_time = self.calculate_end_time()
+
     def _validate_recurrence_pattern(self, pattern):
         """验证重复规则的内容"""
         if not isinstance(pattern, dict):
@@ -148,9 +172,8 @@ class Announcement(Document):
         self.updated_at = get_current_utc_time()
         return super().save(*args, **kwargs)
 
-    @property
-    def end_time(self):
-        """计算结束时间"""
+    def calculate_end_time(self):
+        """根据开始时间与时长计算结束时间（不依赖已存储的 end_time）"""
         if self.start_time and self.duration_hours:
             return self.start_time + timedelta(hours=self.duration_hours)
         return None
@@ -214,46 +237,125 @@ class Announcement(Document):
         Returns:
             dict: 冲突检查结果
         """
-        conflicts = {'area_conflicts': [], 'pilot_conflicts': []}
-
-        if not self.start_time or not self.duration_hours:
-            return conflicts
+        return Announcement.check_conflicts_batch([self], exclude_self=exclude_self, exclude_ids=exclude_ids)[0]
 
-        end_time = self.end_time
+    @classmethod
+    def check_conflicts_batch(cls, instances, exclude_self=True, exclude_ids=None, within_batch=False):
+        """批量检查多个通告实例的时间冲突（一次 $or 查询）
 
-        query = Announcement.objects
-        exclude_list = []
+        每个实例按开播地点、主播各生成一个区间条件（start_time < 本实例结束 且 end_time > 本实例开始），
+        命中复合索引 (battle_area|pilot, start_time, end_time)；比较引用时直接比较 ObjectId，不解引用。
 
-        if exclude_self and self.id:
-            exclude_list.append(self.id)
+        Args:
+            instances: 待检查的通告实例列表（可未保存）
+            exclude_self: 是否排除各实例自身（用于编辑时检查）
+            exclude_ids: 要排除的通告ID列表（用于编辑未来所有时排除多个通告）
+            within_batch: 是否同时检查批内实例之间的冲突（用于尚未写入的重复通告）
 
+        Returns:
+            list: 与 instances 一一对应的冲突检查结果，结构同 check_conflicts
+        """
+        results = [{'area_conflicts': [], 'pilot_conflicts': []} for _ in instances]
+
+        windows = []
+        clauses = []
+        for index, instance in enumerate(instances):
+            start_time = instance.start_time
+            end_time = instance.calculate_end_time()
+            if not start_time or not end_time:
+                continue
+            area_id = _reference_id(instance._data.get('battle_area'))  # pylint: disable=protected-access
+            pilot_id = _reference_id(instance._data.get('pilot'))  # pylint: disable=protected-access
+            self_id = ObjectId(str(instance.id)) if exclude_self and instance.id else None
+            windows.append((index, start_time, end_time, area_id, pilot_id, self_id))
+            for field_name, ref_id in (('battle_area', area_id), ('pilot', pilot_id)):
+                if ref_id is not None:
+                    clauses.append({field_name: ref_id, 'start_time': {'$lt': end_time}, 'end_time': {'$gt': start_time}})
+
+        if within_batch:
+            cls._collect_batch_overlaps(instances, windows, results)
+
+        if not clauses:
+            return results
+
+        raw_query = {'$or': clauses}
         if exclude_ids:
-            exclude_list.extend(exclude_ids)
-
-        if exclude_list:
-            query = query.filter(id__nin=exclude_list)
-
-        overlapping = query.filter(start_time__lt=end_time,
-                                   )
-
-        for other in overlapping:
-            other_end = other.end_time
-            if other_end and other.start_time < end_time and other_end > self.start_time:
-                if other.battle_area.id == self.battle_area.id:
-                    conflicts['area_conflicts'].append({
-                        'announcement': other,
-                        'conflict_start': max(self.start_time, other.start_time),
-                        'conflict_end': min(end_time, other_end)
-                    })
-
-                if other.pilot.id == self.pilot.id:
-                    conflicts['pilot_conflicts'].append({
-                        'announcement': other,
-                        'conflict_start': max(self.start_time, other.start_time),
-                        'conflict_end': min(end_time, other_end)
-                    })
-
-        return conflicts
+            raw_query['_id'] = {'$nin': [ObjectId(str(oid)) for oid in exclude_ids]}
+
+        candidates = list(cls.objects(__raw__=raw_query).no_dereference())
+
+        for index, start_time, end_time, area_id, pilot_id, self_id in windows:
+            for other in candidates:
+                if self_id is not None and other.id == self_id:
+                    continue
+                other_end = other.end_time
+                if not other_end or not (other.start_time < end_time and other_end > start_time):
+                    continue
+                overlap = {
+                    'announcement': other,
+                    'conflict_start': max(start_time, other.start_time),
+                    'conflict_end': min(end_time, other_end)
+                }
+                if area_id is not None and _reference_id(other._data.get('battle_area')) == area_id:  # pylint: disable=protected-access
+                    results[index]['area_conflicts'].append(dict(overlap))
+                if pilot_id is not None and _reference_id(other._data.get('pilot')) == pilot_id:  # pylint: disable=protected-access
+                    results[index]['pilot_conflicts'].append(dict(overlap))
+
+        return results
+
+    @staticmethod
+    def _collect_batch_overlaps(instances, windows, results):
+        """检查同一批实例之间的时间重叠，结果记入较晚的实例"""
+        for position, (index, start_time, end_time, area_id, pilot_id, _) in enumerate(windows):
+            for other_index, other_start, other_end, other_area_id, other_pilot_id, _ in windows[:position]:
+                if not (other_start < end_time and other_end > start_time):
+                    continue
+                overlap = {
+                    'announcement': instances[other_index],
+                    'conflict_start': max(start_time, other_start),
+                    'conflict_end': min(end_time, other_end)
+                }
+                if area_id is not None and other_area_id == area_id:
+                    results[index]['area_conflicts'].append(dict(overlap))
+                if pilot_id is not None and other_pilot_id == pilot_id:
+                    results[index]['pilot_conflicts'].append(dict(overlap))
+
+    @classmethod
+    def prepare_recurrence_instances(cls, base_announcement):
+        """生成并在内存中校验重复通告的全部实例（不写库）
+
+        除父通告引用与开始时间外，各实例字段均复制自基础通告，
+        因此基础通告做完整校验，其余实例仅执行 clean()（时长规则与 end_time 计算）。
+
+        Returns:
+            list: 实例列表，第一个为基础通告
+        """
+        instances = cls.generate_recurrence_instances(base_announcement)
+        base_announcement.validate()
+        for instance in instances[1:]:
+            instance.clean()
+        return instances
+
+    @classmethod
+    def insert_recurrence_instances(cls, instances):
+        """批量写入 prepare_recurrence_instances 生成的实例
+
+        基础通告先写入以获得ID（子实例的 parent_announcement 依赖该ID），其余实例一次 insert 写入，
+        共两次数据库往返。
+        """
+        cls.objects.insert(instances[:1], load_bulk=False)
+        if len(instances) > 1:
+            cls.objects.insert(instances[1:], load_bulk=False)
+        return instances
+
+    @classmethod
+    def backfill_end_time(cls):
+        """为缺少 end_time 的历史通告补写结束时间，返回更新条数"""
+        result = cls._get_collection().update_many(  # pylint: disable=protected-access
+            {'end_time': {'$exists': False}},
+            [{'$set': {'end_time': {'$add': ['$start_time', {'$multiply': ['$duration_hours', 3600 * 1000]}]}}}],
+        )
+        return result.modified_count
 
     @classmethod
     def generate_recurrence_instances(cls, base_announcement):
@@ -66,8 +66,8 @@ class BattleRecord(Document):
                 'fields': ['pilot', '-start_time']
             },
             {
-                'fields': ['-start_time', '-revenue_amount']
-            },
+                'fields': ['-start_time', '-revenue_amount', '-id']
+            },  # 开播记录列表排序（含游标分页兜底键）
             {
                 'fields': ['owner_snapshot']
             },
@@ -98,7 +98,10 @@ class BBSPost(Document):
         'bbs_posts',
         'indexes': [
             {
-                'fields': ['board', '-is_pinned', '-last_active_at']
+                'fields': ['board', '-is_pinned', '-last_active_at', '-id']
+            },
+            {
+                'fields': ['-is_pinned', '-last_active_at', '-id']
             },
             {
                 'fields': ['status']
@@ -215,3 +218,37 @@ class BBSPostPilotRef(Document):
     def save(self, *args, **kwargs):
         self.updated_at = get_current_utc_time()
         return super().save(*args, **kwargs)
+
+
+class BBSSearchEntry(Document):
+    """BBS全文检索倒排条目（每个主贴、每条回复各一条，由 utils/bbs_search.py 维护）"""
+
+    post = ReferenceField(BBSPost, required=True, reverse_delete_rule=CASCADE)
+    reply = ReferenceField(BBSReply, required=False, reverse_delete_rule=CASCADE)  # 为空表示主贴本身
+    board = ReferenceField(BBSBoard)
+    post_status = EnumField(BBSPostStatus, default=BBSPostStatus.PUBLISHED)
+    reply_status = EnumField(BBSReplyStatus, required=False)
+    post_author = ReferenceField(User)
+    author = ReferenceField(User)
+    title = StringField()
+    text = StringField()  # 原文（主贴为标题+正文），用于摘要与短语加权
+    terms = ListField(StringField())  # 去重后的检索词（汉字单字与二元组、拉丁字母/数字整词）
+    title_terms = ListField(StringField())
+    last_active_at = DateTimeField()
+    updated_at = DateTimeField(default=get_current_utc_time)
+
+    meta = {
+        'collection': 'bbs_search_entries',
+        'indexes': [
+            {
+                'fields': ['terms']
+            },
+            {
+                'fields': ['post', 'reply'],
+                'unique': True,
+            },
+            {
+                'fields': ['reply']
+            },
+        ],
+    }
@@ -0,0 +1,26 @@
+from mongoengine import DateTimeField, DictField, Document, StringField
+
+
+class DashboardSnapshot(Document):
+    """仪表盘快照
+
+    首页仪表盘各卡片的预计算结果（单个文档），由 utils/dashboard_snapshot.py 维护：
+    调度器每分钟刷新，数据写入后写入 dirty_at 标记待刷新（由下一次调度器刷新处理），仪表盘加载时只读取该文档。
+    """
+
+    key = StringField(required=True)  # 快照标识，目前只有首页仪表盘（home）
+    data = DictField()  # 各卡片数据，键为卡片名称（recruit/announcement/battle/...）
+    daily_key = StringField()  # 转化率与昨日排名对应的自然日（GMT+8，YYYY-MM-DD）
+    computed_at = DateTimeField()  # 本次计算开始时间（UTC）
+    dirty_at = DateTimeField()  # 最近一次数据写入标记时间（UTC），晚于 computed_at 表示待刷新
+    daily_dirty_at = DateTimeField()  # 最近一次涉及昨日及以前数据的写入标记时间（UTC），晚于 computed_at 时重算转化率与昨日排名
+
+    meta = {
+        'collection': 'dashboard_snapshots',
+        'indexes': [
+            {
+                'fields': ['key'],
+                'unique': True
+            },
+        ],
+    }
@@ -0,0 +1,53 @@
+import enum
+
+from mongoengine import (DateTimeField, Document, EnumField, IntField, ListField, StringField)
+
+from utils.timezone_helper import get_current_utc_time
+
+
+class MailOutboxStatus(enum.Enum):
+    """邮件发件箱状态枚举"""
+    PENDING = "待发送"
+    SENDING = "发送中"
+    SENT = "已发送"
+    DEAD = "已放弃"
+
+
+class MailOutbox(Document):
+    """邮件发件箱模型
+
+    请求处理只负责写入待发送邮件，由后台发送线程复用同一个已认证的SMTP会话批量投递；
+    投递失败按指数退避重试，超过最大次数后标记为已放弃（死信），保留原始内容便于排查与重发。
+    """
+
+    recipients = ListField(StringField(max_length=200), required=True)
+    subject = StringField(required=True)
+    content = StringField()  # 纯文本正文（发送时套用邮件模板）
+    html_content = StringField()  # HTML正文（发送时套用邮件模板）
+    source = StringField(max_length=50)  # 来源标识，如 bbs、james_alert
+
+    status = EnumField(MailOutboxStatus, default=MailOutboxStatus.PENDING)
+    attempts = IntField(default=0)
+    next_attempt_at = DateTimeField(default=get_current_utc_time)
+    locked_until = DateTimeField()  # 发送中租约到期时间，发送进程异常退出后可被重新领取
+    last_error = StringField()
+
+    created_at = DateTimeField(default=get_current_utc_time)
+    sent_at = DateTimeField()
+
+    meta = {
+        'collection':
+        'mail_outbox',
+        'indexes': [
+            {
+                'fields': ['status', 'next_attempt_at']
+            },
+            {
+                'fields': ['-created_at']
+            },
+            {
+                'fields': ['sent_at'],
+                'expireAfterSeconds': 30 * 24 * 3600
+            },  # 已发送邮件保留30天，未发送/已放弃的不受影响
+        ],
+    }
@@ -74,6 +74,11 @@ class Pilot(Document):
     rank = EnumField(Rank, default=Rank.CANDIDATE)
     status = EnumField(Status, default=Status.NOT_RECRUITED)
 
+    # 长时开播计数器（由 utils/long_session_counters.py 维护，勿直接修改）
+    long_session_count = IntField(default=0)  # 播时≥6小时的开播记录数
+    full_7_days_at = DateTimeField()  # 第7条长时开播的开始时间（UTC），未满7条为空
+    long_session_counted_at = DateTimeField()  # 计数器最近重算时间，为空表示尚未回填
+
     created_at = DateTimeField(default=get_current_utc_time)
     updated_at = DateTimeField(default=get_current_utc_time)
 
@@ -98,7 +103,7 @@ class Pilot(Document):
                 'fields': ['platform']
             },
             {
-                'fields': ['-created_at']
+                'fields': ['-created_at', '-id']
             },
         ],
     }
@@ -272,7 +277,7 @@ class PilotChangeLog(Document):
         'collection': 'pilot_change_logs',
         'indexes': [
             {
-                'fields': ['pilot_id', '-change_time']
+                'fields': ['pilot_id', '-change_time', '-id']
             },
             {
                 'fields': ['user_id']
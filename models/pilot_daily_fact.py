@@ -0,0 +1,66 @@
+from decimal import Decimal
+
+from mongoengine import (BooleanField, DateTimeField, DecimalField, Document, EnumField, FloatField, IntField, ReferenceField, StringField)
+
+from utils.timezone_helper import get_current_utc_time
+
+from .pilot import Pilot, WorkMode
+
+
+class PilotDailyFact(Document):
+    """主播日级事实表模型
+
+    以（主播，GMT+8自然日，开播方式）为键，物化当日开播记录的汇总结果，
+    供月报/周报等报表直接读取，避免重复扫描原始开播记录。
+    按开播方式拆分存储，保证报表的开播方式筛选结果与原始记录一致。
+    """
+
+    pilot = ReferenceField(Pilot, required=True)
+    local_date = StringField(required=True, max_length=10)  # GMT+8 自然日，格式 YYYY-MM-DD
+    work_mode = EnumField(WorkMode, required=True)
+
+    record_count = IntField(default=0)
+    duration_hours = FloatField(default=0.0)  # 单条记录播时（保留1位小数）之和
+    revenue_amount = DecimalField(min_value=0, precision=2, default=Decimal('0.00'))
+    base_salary_amount = DecimalField(min_value=0, precision=2, default=Decimal('0.00'))  # 已发放底薪
+    commission_rate = FloatField(default=20.0)  # 当日生效的主播分成比例
+    pilot_share = DecimalField(precision=6, default=Decimal('0'))
+    company_share = DecimalField(precision=6, default=Decimal('0'))
+    is_valid_day = BooleanField(default=False)  # 当日（该开播方式下）播时是否≥1小时
+
+    updated_at = DateTimeField(default=get_current_utc_time)
+
+    meta = {
+        'collection':
+        'pilot_daily_facts',
+        'indexes': [
+            {
+                'fields': ['pilot', 'local_date', 'work_mode'],
+                'unique': True
+            },
+            {
+                'fields': ['local_date', 'pilot']
+            },
+        ],
+    }
+
+
+class PilotDailyFactRebuild(Document):
+    """主播日级事实表重建记录
+
+    存在一条已完成的重建记录，即表示事实表已完成全量回填，报表可以放心读取。
+    """
+
+    started_at = DateTimeField(default=get_current_utc_time)
+    finished_at = DateTimeField()
+    record_count = IntField(default=0)
+    fact_count = IntField(default=0)
+
+    meta = {
+        'collection': 'pilot_daily_fact_rebuilds',
+        'indexes': [
+            {
+                'fields': ['-finished_at']
+            },
+        ],
+    }
@@ -0,0 +1,39 @@
+from mongoengine import (CASCADE, DateTimeField, Document, EnumField, ListField, ReferenceField, StringField)
+
+from utils.timezone_helper import get_current_utc_time
+
+from .pilot import Pilot, Status
+from .recruit import Recruit
+
+
+class PilotNameIndexEntry(Document):
+    """主播/招募名称检索条目
+
+    每个主播一条（recruit 为空），每条招募记录一条（名称取其主播），由 utils/pilot_name_search.py 维护。
+    `grams` 多键索引即 n-gram 倒排表，名称检索与输入联想按索引定位候选，不再对主播集合做正则扫描。
+    """
+
+    pilot = ReferenceField(Pilot, required=True, reverse_delete_rule=CASCADE)
+    recruit = ReferenceField(Recruit, required=False, reverse_delete_rule=CASCADE)  # 为空表示主播条目
+    search_key = StringField()  # 规范化后的昵称与姓名（换行分隔），用于校验子串命中
+    grams = ListField(StringField())  # 规范化名称的单字与相邻二元组（去重）
+    nickname = StringField()
+    pilot_status = EnumField(Status)
+    updated_at = DateTimeField(default=get_current_utc_time)
+
+    meta = {
+        'collection':
+        'pilot_name_index',
+        'indexes': [
+            {
+                'fields': ['grams', 'recruit']
+            },
+            {
+                'fields': ['pilot', 'recruit'],
+                'unique': True
+            },
+            {
+                'fields': ['recruit']
+            },
+        ],
+    }
@@ -131,10 +131,10 @@ class Recruit(Document):
                 'fields': ['status']
             },
             {
-                'fields': ['-appointment_time']
+                'fields': ['-appointment_time', '-id']
             },
             {
-                'fields': ['-created_at']
+                'fields': ['-created_at', '-id']
             },
             {
                 'fields': ['interview_decision']
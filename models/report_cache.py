@@ -0,0 +1,63 @@
+from mongoengine import (BinaryField, BooleanField, DateTimeField, DictField, Document, ListField, StringField)
+
+from utils.timezone_helper import get_current_utc_time
+
+
+class ReportCacheEntry(Document):
+    """共享报表缓存条目
+
+    报表缓存 mongo 后端的存储（utils/cache_backends.py 的 MongoCacheBackend），多 worker 共享；
+    范围字段用于按失效事件批量删除，expires_at 由 TTL 索引自动清理。
+    """
+
+    namespace = StringField(required=True)
+    key = StringField(required=True)
+    payload = BinaryField(required=True)
+    scope_known = BooleanField(default=False)
+    scope_start = StringField()  # 本地日期 YYYY-MM-DD（含），空表示不限
+    scope_end = StringField()  # 本地日期 YYYY-MM-DD（不含），空表示不限
+    owner_id = StringField()
+    pilot_known = BooleanField(default=False)
+    pilot_ids = ListField(StringField())
+    pilot_filtered = BooleanField(default=False)
+    expires_at = DateTimeField(required=True)
+
+    meta = {
+        'collection': 'report_cache_entries',
+        'indexes': [
+            {
+                'fields': ['namespace', 'key'],
+                'unique': True
+            },
+            {
+                'fields': ['namespace', 'scope_start', 'scope_end']
+            },
+            {
+                'fields': ['expires_at'],
+                'expireAfterSeconds': 0
+            },
+        ],
+    }
+
+
+class ReportCacheEvent(Document):
+    """报表缓存失效广播事件
+
+    进程内缓存后端在多 worker 部署时，通过该集合广播失效事件（utils/cache_backends.py 的 MongoInvalidationBus）。
+    """
+
+    origin = StringField(required=True)  # 发布进程标识
+    action = StringField(required=True)  # evict / clear
+    namespace = StringField()  # clear 时指定命名空间，空表示全部
+    event = DictField()
+    created_at = DateTimeField(default=get_current_utc_time)
+
+    meta = {
+        'collection': 'report_cache_events',
+        'indexes': [
+            {
+                'fields': ['created_at'],
+                'expireAfterSeconds': 24 * 3600
+            },  # 一天自动清理
+        ],
+    }
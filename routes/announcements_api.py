@@ -24,6 +24,7 @@ from utils.filter_state import persist_and_restore_filters
 from utils.jwt_roles import jwt_roles_accepted
 from utils.logging_setup import get_logger
 from utils.pilot_activity import sort_pilots_with_active_priority
+from utils.reference_prefetch import prefetch_references
 from utils.timezone_helper import (format_local_datetime, get_current_local_time, local_to_utc, parse_local_date_to_end_datetime, parse_local_datetime,
                                    utc_to_local)
 
@@ -167,6 +168,7 @@ def list_announcements_api():
         query = _apply_time_filter(query, time_scope)
 
         announcements = list(query.limit(500))
+        prefetch_references(announcements, 'pilot', 'pilot.owner', 'parent_announcement')
         announcements.sort(key=lambda a: (
             utc_to_local(a.start_time).date() if a.start_time else datetime.min.date(),
             (a.pilot.nickname or '') if a.pilot else '',
@@ -251,32 +253,36 @@ def _create_planned_instances(instances: List[Announcement]) -> List[Dict[str, s
     return planned
 
 
-def _aggregate_conflicts(instances: List[Announcement], exclude_ids: Optional[List[str]] = None) -> List[Dict[str, str]]:
+def _aggregate_conflicts(instances: List[Announcement], exclude_ids: Optional[List[str]] = None, within_batch: bool = False) -> List[Dict[str, str]]:
+    results = Announcement.check_conflicts_batch(instances, exclude_ids=exclude_ids, within_batch=within_batch)
+
+    pilot_ids = set()
+    for conflicts in results:
+        for conflict in conflicts['area_conflicts'] + conflicts['pilot_conflicts']:
+            pilot_ref = conflict['announcement']._data.get('pilot')  # pylint: disable=protected-access
+            pilot_ids.add(getattr(pilot_ref, 'id', pilot_ref))
+    pilot_names = {}
+    if pilot_ids:
+        pilot_names = {pilot.id: pilot.nickname for pilot in Pilot.objects(id__in=list(pilot_ids)).only('nickname')}
+
+    def _conflict_item(conflict_type: str, instance: Announcement, announcement: Announcement) -> Dict[str, str]:
+        pilot_ref = announcement._data.get('pilot')  # pylint: disable=protected-access
+        return {
+            'type': conflict_type,
+            'instance_time': format_local_datetime(instance.start_time, '%Y-%m-%d %H:%M') if instance.start_time else '',
+            'announcement_id': str(announcement.id) if announcement.id else '',
+            'pilot_name': pilot_names.get(getattr(pilot_ref, 'id', pilot_ref), ''),
+            'start_time': format_local_datetime(announcement.start_time, '%Y-%m-%d %H:%M') if announcement.start_time else '',
+            'duration': announcement.duration_display,
+            'coords': f"{announcement.x_coord} - {announcement.y_coord} - {announcement.z_coord}",
+        }
+
     conflicts_payload: List[Dict[str, str]] = []
-    for instance in instances:
-        conflicts = instance.check_conflicts(exclude_self=bool(instance.id), exclude_ids=exclude_ids)
+    for instance, conflicts in zip(instances, results):
         for conflict in conflicts['area_conflicts']:
-            announcement = conflict['announcement']
-            conflicts_payload.append({
-                'type': '开播地点冲突',
-                'instance_time': format_local_datetime(instance.start_time, '%Y-%m-%d %H:%M') if instance.start_time else '',
-                'announcement_id': str(announcement.id),
-                'pilot_name': announcement.pilot.nickname if announcement.pilot else '',
-                'start_time': format_local_datetime(announcement.start_time, '%Y-%m-%d %H:%M') if announcement.start_time else '',
-                'duration': announcement.duration_display,
-                'coords': f"{announcement.x_coord} - {announcement.y_coord} - {announcement.z_coord}",
-            })
+            conflicts_payload.append(_conflict_item('开播地点冲突', instance, conflict['announcement']))
         for conflict in conflicts['pilot_conflicts']:
-            announcement = conflict['announcement']
-            conflicts_payload.append({
-                'type': '主播冲突',
-                'instance_time': format_local_datetime(instance.start_time, '%Y-%m-%d %H:%M') if instance.start_time else '',
-                'announcement_id': str(announcement.id),
-                'pilot_name': announcement.pilot.nickname if announcement.pilot else '',
-                'start_time': format_local_datetime(announcement.start_time, '%Y-%m-%d %H:%M') if announcement.start_time else '',
-                'duration': announcement.duration_display,
-                'coords': f"{announcement.x_coord} - {announcement.y_coord} - {announcement.z_coord}",
-            })
+            conflicts_payload.append(_conflict_item('主播冲突', instance, conflict['announcement']))
     return conflicts_payload
 
 
@@ -386,7 +392,7 @@ def check_conflicts_api():
             except DoesNotExist:
                 exclude_ids = []
 
-        conflicts_payload = _aggregate_conflicts(instances, exclude_ids)
+        conflicts_payload = _aggregate_conflicts(instances, exclude_ids, within_batch=not exclude_ids)
         planned_payload = _create_planned_instances(planned_instances)
 
         data = {
@@ -448,22 +454,13 @@ def create_announcement_api():
             created_by=current_user,
         )
 
-        announcement.save()
-
-        instances = Announcement.generate_recurrence_instances(announcement)
-        conflicts_payload = _aggregate_conflicts(instances)
+        instances = Announcement.prepare_recurrence_instances(announcement)
+        conflicts_payload = _aggregate_conflicts(instances, within_batch=True)
 
         if conflicts_payload:
-            announcement.delete()
-            for instance in instances[1:]:
-                try:
-                    instance.delete()
-                except Exception:  # pylint: disable=broad-except
-                    pass
             return jsonify(create_error_response('ANNOUNCEMENT_CONFLICT', '存在时间冲突，无法创建通告', meta={'conflicts': conflicts_payload})), 409
 
-        for instance in instances[1:]:
-            instance.save()
+        Announcement.insert_recurrence_instances(instances)
 
         logger.info('用户%s创建通告：主播%s，时间%s', current_user.username, pilot.nickname, start_time)
 
@@ -884,7 +881,7 @@ def cleanup_delete_future_api(pilot_id: str):
 
 def _get_pilot_choices_for_export():
     """获取机师选择列表（用于导出页面）"""
-    pilots = Pilot.objects(status__in=['已招募', '已签约']).order_by('owner', 'rank', 'nickname')
+    pilots = prefetch_references(Pilot.objects(status__in=['已招募', '已签约']).order_by('owner', 'rank', 'nickname'), 'owner')
 
     owner_groups = {}
     no_owner_pilots = []
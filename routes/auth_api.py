@@ -9,6 +9,7 @@ from flask_jwt_extended import (create_access_token, create_refresh_token, get_j
 from mongoengine import DoesNotExist
 
 from models.user import User
+from utils.identity_cache import load_user, user_role_names
 from utils.logging_setup import get_logger
 from utils.request_helper import get_client_ip
 
@@ -185,9 +186,8 @@ def get_current_user():
     """
     identity = get_jwt_identity()
 
-    try:
-        user = User.objects.get(fs_uniquifier=identity)  # pylint: disable=no-member
-    except DoesNotExist:
+    user = load_user(identity)
+    if user is None:
         logger.warning('获取当前用户信息失败：用户不存在，identity=%s', identity)
         return jsonify(create_error_response('USER_NOT_FOUND', '用户不存在')), 404
 
@@ -195,7 +195,7 @@ def get_current_user():
         'id': str(user.id),
         'username': user.username,
         'nickname': user.nickname or user.username,
-        'roles': [role.name for role in user.roles],
+        'roles': user_role_names(user),
         'email': user.email,
         'active': user.active,
     }
@@ -22,8 +22,12 @@ from utils.announcement_serializers import (create_error_response, create_succes
 from utils.csrf_helper import CSRFError, validate_csrf_header
 from utils.filter_state import persist_and_restore_filters
 from utils.jwt_roles import jwt_roles_accepted
+from utils.keyset_pagination import (CursorError, count_queryset, paginate_keyset, parse_count_mode)
 from utils.logging_setup import get_logger
 from utils.pilot_activity import sort_pilots_with_active_priority
+from utils.long_session_counters import refresh_counters_for_battle_record
+from utils.pilot_daily_facts import safe_refresh
+from utils.reference_prefetch import prefetch_references
 from utils.request_helper import get_client_ip
 from utils.timezone_helper import (get_current_utc_time, local_to_utc, utc_to_local)
 
@@ -31,6 +35,9 @@ logger = get_logger('battle_records_api')
 
 battle_records_api_bp = Blueprint('battle_records_api', __name__)
 
+# 游标分页排序键，与 -start_time + -revenue_amount + -_id 复合索引对齐
+BATTLE_RECORD_SORT = (('start_time', -1), ('revenue_amount', -1), ('id', -1))
+
 
 def _persist_filters_from_request() -> Dict[str, str]:
     filters = persist_and_restore_filters(
@@ -201,7 +208,7 @@ def _build_base_salary_summary(records: List[BattleRecord]) -> Dict[str, Dict[st
     if not record_ids:
         return {}
 
-    applications = BaseSalaryApplication.objects.filter(battle_record_id__in=record_ids).order_by('-updated_at')
+    applications = BaseSalaryApplication.objects.filter(battle_record_id__in=record_ids).no_dereference().order_by('-updated_at')
     summary_map: Dict[str, Dict[str, object]] = {}
 
     for application in applications:
@@ -209,7 +216,7 @@ def _build_base_salary_summary(records: List[BattleRecord]) -> Dict[str, Dict[st
         if not battle_record:
             continue
 
-        record_key = str(battle_record.id)
+        record_key = str(getattr(battle_record, 'id', battle_record))
         latest_entry = summary_map.get(record_key)
         latest_updated_at = latest_entry.get('_updated_at') if latest_entry else None
         application_updated_at = application.updated_at or application.created_at
@@ -381,19 +388,29 @@ def list_records():
         status_filter = filters.get('status', 'all')
         date_filter = filters.get('date', _get_today_date_string())
 
-        page = max(int(request.args.get('page', 1) or 1), 1)
         per_page = 500
-        skip = (page - 1) * per_page
+        cursor_mode = 'cursor' in request.args
+        count_mode = parse_count_mode(request.args.get('count'), 'estimated' if cursor_mode else 'exact')
 
-        base_query = BattleRecord.objects.order_by('-start_time', '-revenue_amount')
+        base_query = BattleRecord.objects.order_by('-start_time', '-revenue_amount', '-id')
         filtered_query = _apply_owner_filter(base_query, owner_filter)
         filtered_query = _apply_x_filter(filtered_query, x_filter)
         filtered_query = _apply_status_filter(filtered_query, status_filter)
         filtered_query = _apply_date_filter(filtered_query, date_filter)
 
-        total_count = filtered_query.count()
-        records = list(filtered_query.skip(skip).limit(per_page))
+        count_info = count_queryset(filtered_query, count_mode)
+        if cursor_mode:
+            page = None
+            records, next_cursor = paginate_keyset(filtered_query, BATTLE_RECORD_SORT, request.args.get('cursor'), per_page)
+            has_more = next_cursor is not None
+        else:
+            page = max(int(request.args.get('page', 1) or 1), 1)
+            records = list(filtered_query.skip((page - 1) * per_page).limit(per_page + 1))
+            has_more = len(records) > per_page
+            records = records[:per_page]
+            next_cursor = None
 
+        prefetch_references(records, 'pilot', 'pilot.owner')
         base_salary_summaries = _build_base_salary_summary(records)
         items = [_serialize_battle_record_summary(record, base_salary_summaries.get(str(record.id))) for record in records]
 
@@ -405,13 +422,17 @@ def list_records():
                 'date': date_filter,
             },
             'options': _build_filter_options(),
-            'total': total_count,
+            'total': count_info['total'],
+            'total_is_estimate': count_info['total_is_estimate'],
             'page': page,
             'per_page': per_page,
-            'has_more': page * per_page < total_count,
+            'has_more': has_more,
+            'next_cursor': next_cursor,
         }
 
         return jsonify(create_success_response({'items': items}, meta))
+    except CursorError as exc:
+        return jsonify(create_error_response('INVALID_CURSOR', str(exc))), 400
     except Exception as exc:  # pylint: disable=broad-except
         logger.error('获取开播记录列表失败：%s', exc, exc_info=True)
         return jsonify(create_error_response('INTERNAL_ERROR', '服务器内部错误')), 500
@@ -519,6 +540,7 @@ def create_record():
             notes=notes,
         )
         record.save()
+        safe_refresh(refresh_counters_for_battle_record, record)
 
         logger.debug(
             '创建开播记录后准备自动BBS发帖：record=%s status=%s revenue=%s notes_len=%d base=%s announcement=%s work_mode=%s',
@@ -622,6 +644,7 @@ def update_record(record_id: str):
             return jsonify(create_error_response('VALIDATION_FAILED', validation_error)), 400
 
         record.save()
+        safe_refresh(refresh_counters_for_battle_record, record, old_values['pilot'])
 
         logger.debug(
             '更新开播记录后准备自动BBS发帖：record=%s status=%s revenue=%s notes_len=%d base=%s announcement=%s work_mode=%s',
@@ -665,6 +688,7 @@ def delete_record(record_id: str):
         record = BattleRecord.objects.get(id=record_id)
         BattleRecordChangeLog.objects.filter(battle_record_id=record).delete()
         record.delete()
+        safe_refresh(refresh_counters_for_battle_record, record)
         meta = {'message': '开播记录删除成功'}
         return jsonify(create_success_response({}, meta))
     except DoesNotExist:
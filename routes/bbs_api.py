@@ -13,15 +13,22 @@ from bson import ObjectId
 from models.bbs import (BBSBoard, BBSPost, BBSPostStatus, BBSReply, BBSReplyStatus, BBSPostPilotRef)
 from models.battle_record import BattleRecord
 from models.pilot import Pilot
+from utils.bbs_search import safe_index, search_posts, sync_reply_statuses
 from utils.bbs_serializers import (create_error_response, create_success_response, serialize_board_list, serialize_post_detail, serialize_post_summary)
-from utils.bbs_service import (build_author_snapshot, ensure_base_boards_from_battle_areas, ensure_manual_pilot_refs, fetch_recent_posts_for_pilot,
-                               filter_posts_for_user, filter_replies_for_user, get_last_reply_info, logger, user_can_view_post)
+from utils.bbs_service import (build_author_snapshot, ensure_base_boards_from_battle_areas, ensure_manual_pilot_refs, fetch_post_reply_summary,
+                               fetch_recent_posts_for_pilot, filter_posts_for_user, filter_replies_for_user, get_last_reply_info, logger, user_can_view_post)
 from utils.bbs_notifications import notify_parent_reply_author, notify_post_author_new_reply
 from utils.csrf_helper import CSRFError, validate_csrf_header
+from utils.job_executor import submit_side_effect
 from utils.jwt_roles import get_jwt_user, jwt_roles_accepted, jwt_roles_required
+from utils.keyset_pagination import (CursorError, count_queryset, order_by_args, paginate_keyset, parse_count_mode)
+from utils.reference_prefetch import prefetch_references
 
 bbs_api_bp = Blueprint('bbs_api', __name__, url_prefix='/api/bbs')
 
+# 帖子列表游标分页排序键（置顶优先、最近活跃优先），与 -is_pinned + -last_active_at + -_id 复合索引对齐
+POST_LIST_SORT = (('is_pinned', -1), ('last_active_at', -1), ('id', -1))
+
 
 def _get_current_user():
     user = get_jwt_user()
@@ -125,9 +132,9 @@ def list_posts():
     current_user_id = _get_current_user_id(current_user)
     page = max(int(request.args.get('page', 1) or 1), 1)
     per_page = max(min(int(request.args.get('per_page', 20) or 20), 100), 1)
-    skip = (page - 1) * per_page
+    cursor_mode = 'cursor' in request.args
 
-    query = filter_posts_for_user(BBSPost.objects.order_by('-is_pinned', '-last_active_at'), current_user)  # type: ignore[attr-defined]
+    query = filter_posts_for_user(BBSPost.objects.order_by(*order_by_args(POST_LIST_SORT)), current_user)  # type: ignore[attr-defined]
 
     board_id = request.args.get('board_id')
     if board_id:
@@ -158,25 +165,93 @@ def list_posts():
         post_ids = BBSPostPilotRef.objects(pilot=pilot_id).distinct('post')  # type: ignore[attr-defined]
         query = query.filter(id__in=post_ids)
 
-    total = query.count()
-    posts = list(query.skip(skip).limit(per_page))
-
+    count_info = count_queryset(query, parse_count_mode(request.args.get('count'), 'estimated' if cursor_mode else 'exact'))
+    if cursor_mode:
+        try:
+            posts, next_cursor = paginate_keyset(query, POST_LIST_SORT, request.args.get('cursor'), per_page)
+        except CursorError as exc:
+            return jsonify(create_error_response('INVALID_CURSOR', str(exc))), 400
+        has_more = next_cursor is not None
+    else:
+        posts = list(query.skip((page - 1) * per_page).limit(per_page + 1))
+        has_more = len(posts) > per_page
+        posts = posts[:per_page]
+        next_cursor = None
+    prefetch_references(posts, 'board', 'author', 'related_battle_record')
+
+    reply_summary = fetch_post_reply_summary(posts, current_user)
     items: List[Dict[str, object]] = []
     for post in posts:
-        include_hidden = current_user and (_is_admin(current_user) or str(post.author.id) == str(current_user.id))
-        replies_query = BBSReply.objects(post=post).order_by('created_at')  # type: ignore[attr-defined]
-        replies_query = filter_replies_for_user(replies_query, current_user if include_hidden else None)
-        replies = list(replies_query)
-        reply_count = len(replies)
-        last_reply_time = replies[-1].created_at if replies else None
-        last_reply_author = replies[-1].author_snapshot if replies else None
-        items.append(serialize_post_summary(post, reply_count, last_reply_author, last_reply_time, current_user_id))
+        summary = reply_summary.get(str(post.id), {})
+        items.append(serialize_post_summary(post, summary.get('count', 0), summary.get('latest_author'), summary.get('latest_time'), current_user_id))
+
+    meta = {
+        'page': None if cursor_mode else page,
+        'per_page': per_page,
+        'total': count_info['total'],
+        'total_is_estimate': count_info['total_is_estimate'],
+        'has_more': has_more,
+        'next_cursor': next_cursor,
+    }
+    return jsonify(create_success_response({'items': items}, meta))
+
+
+@bbs_api_bp.route('/search', methods=['GET'])
+@jwt_roles_accepted('gicho', 'kancho', 'gunsou')
+def search_bbs():
+    """全文检索主贴与回复（按相关度排序，按帖子归并）。"""
+    current_user = get_jwt_user()
+    current_user_id = _get_current_user_id(current_user)
+    query_text = (request.args.get('q') or '').strip()
+    page = max(int(request.args.get('page', 1) or 1), 1)
+    per_page = max(min(int(request.args.get('per_page', 20) or 20), 100), 1)
+    if not query_text:
+        return jsonify(create_error_response('QUERY_REQUIRED', '请输入检索关键词')), 400
+
+    board_id = request.args.get('board_id')
+    if board_id:
+        try:
+            board_id = str(BBSBoard.objects.get(id=board_id).id)  # type: ignore[attr-defined]
+        except (DoesNotExist, ValidationError):
+            return jsonify(create_error_response('BOARD_NOT_FOUND', '板块不存在')), 404
+
+    status_filter = (request.args.get('status') or '').strip()
+    if status_filter not in {status.value for status in BBSPostStatus}:
+        status_filter = None
+
+    post_ids = None
+    pilot_id = (request.args.get('pilot_id') or '').strip()
+    if pilot_id:
+        post_refs = BBSPostPilotRef.objects(pilot=pilot_id).no_dereference().distinct('post')  # type: ignore[attr-defined]
+        post_ids = [getattr(post_ref, 'id', post_ref) for post_ref in post_refs]
+
+    result = search_posts(query_text, current_user, board_id=board_id, status=status_filter, post_ids=post_ids, page=page, per_page=per_page)
+    hits = result['hits']
+    posts = {str(post.id): post for post in BBSPost.objects(id__in=[hit['post_id'] for hit in hits])}  # type: ignore[attr-defined]
+    prefetch_references(posts.values(), 'board', 'related_battle_record')
+    reply_summary = fetch_post_reply_summary(posts.values(), current_user)
+
+    items: List[Dict[str, object]] = []
+    for hit in hits:
+        post = posts.get(hit['post_id'])
+        if post is None:
+            continue
+        summary = reply_summary.get(hit['post_id'], {})
+        item = serialize_post_summary(post, summary.get('count', 0), summary.get('latest_author'), summary.get('latest_time'), current_user_id)
+        item['search'] = {
+            'score': hit['score'],
+            'match_count': hit['match_count'],
+            'matched_reply_id': hit['reply_id'],
+            'snippet_html': hit['snippet_html'],
+        }
+        items.append(item)
 
     meta = {
         'page': page,
         'per_page': per_page,
-        'total': total,
-        'has_more': page * per_page < total,
+        'total': result['total'],
+        'has_more': page * per_page < result['total'],
+        'terms': result['terms'],
     }
     return jsonify(create_success_response({'items': items}, meta))
 
@@ -359,6 +434,7 @@ def hide_post(post_id: str):
     post.status = BBSPostStatus.HIDDEN
     post.save()
     BBSReply.objects(post=post).update(status=BBSReplyStatus.HIDDEN)  # type: ignore[attr-defined]
+    safe_index(sync_reply_statuses, post.id)
     logger.info('帖子隐藏：post=%s operator=%s', post.id, current_user.username)
     return jsonify(create_success_response({'post_id': post_id, 'status': post.status.value}))
 
@@ -456,9 +532,9 @@ def add_reply(post_id: str):
 
     _apply_unread_targets(post, reply)
     post.touch()
-    notify_post_author_new_reply(post, reply)
+    submit_side_effect(f'BBS主贴回复提醒:{reply.id}', notify_post_author_new_reply, post, reply)
     if parent_reply:
-        notify_parent_reply_author(post, parent_reply, reply)
+        submit_side_effect(f'BBS楼层回复提醒:{reply.id}', notify_parent_reply_author, post, parent_reply, reply)
 
     replies_query = filter_replies_for_user(BBSReply.objects(post=post).order_by('created_at'), current_user)  # type: ignore[attr-defined]
     pilot_refs = list(BBSPostPilotRef.objects(post=post))  # type: ignore[attr-defined]
@@ -549,6 +625,7 @@ def hide_reply(reply_id: str):
 
     if not reply.parent_reply:
         BBSReply.objects(parent_reply=reply).update(status=BBSReplyStatus.HIDDEN)  # type: ignore[attr-defined]
+        safe_index(sync_reply_statuses, reply._data.get('post'))  # pylint: disable=protected-access
 
     logger.info('回复隐藏：reply=%s operator=%s', reply.id, current_user.username)
     return jsonify(create_success_response({'reply_id': reply_id, 'status': reply.status.value}))
@@ -590,7 +667,7 @@ def recent_posts_for_pilot(pilot_id: str):
     except DoesNotExist:
         return jsonify(create_error_response('PILOT_NOT_FOUND', '主播不存在')), 404
 
-    recent_candidates = fetch_recent_posts_for_pilot(pilot, limit=10)
+    recent_candidates = prefetch_references(fetch_recent_posts_for_pilot(pilot, limit=10), 'board', 'author', 'related_battle_record')
     posts: List[BBSPost] = []
     for post in recent_candidates:
         if user_can_view_post(current_user, post):
@@ -598,15 +675,10 @@ def recent_posts_for_pilot(pilot_id: str):
         if len(posts) >= 3:
             break
 
+    reply_summary = fetch_post_reply_summary(posts, current_user)
     items: List[Dict[str, object]] = []
     for post in posts:
-        include_hidden = current_user and (_is_admin(current_user) or str(post.author.id) == str(current_user.id))
-        replies_query = BBSReply.objects(post=post).order_by('created_at')  # type: ignore[attr-defined]
-        replies_query = filter_replies_for_user(replies_query, current_user if include_hidden else None)
-        replies = list(replies_query)
-        reply_count = len(replies)
-        last_reply_time = replies[-1].created_at if replies else None
-        last_reply_author = replies[-1].author_snapshot if replies else None
-        items.append(serialize_post_summary(post, reply_count, last_reply_author, last_reply_time, current_user_id))
+        summary = reply_summary.get(str(post.id), {})
+        items.append(serialize_post_summary(post, summary.get('count', 0), summary.get('latest_author'), summary.get('latest_time'), current_user_id))
 
     return jsonify(create_success_response({'items': items}))
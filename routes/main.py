@@ -1,20 +1,20 @@
 # pylint: disable=no-member
 
-from datetime import datetime
-from typing import Dict, Optional, Tuple
-
 from flask import (Blueprint, flash, jsonify, redirect, render_template, request, url_for)
+from flask_jwt_extended import get_jwt_identity
 from flask_login import login_required
 from flask_security import current_user
 from flask_security.utils import hash_password
 
 from routes.report import (build_dashboard_feature_banner, calculate_dashboard_announcement_metrics, calculate_dashboard_battle_metrics,
                            calculate_dashboard_conversion_rate_metrics, calculate_dashboard_pilot_ranking_metrics, calculate_dashboard_recruit_metrics)
-from utils.dashboard_serializers import create_success_response
+from utils.dashboard_serializers import create_error_response, create_success_response
+from utils.dashboard_snapshot import build_bbs_latest_data, get_dashboard_snapshot
+from utils.identity_cache import get_identity
 from utils.jwt_roles import jwt_roles_accepted
 from utils.logging_setup import get_logger
 from utils.timezone_helper import format_local_datetime
-from models.bbs import BBSPost, BBSPostStatus, BBSReply, BBSReplyStatus
+from models.bbs import BBSPost, BBSPostStatus
 
 logger = get_logger('main')
 
@@ -81,65 +81,21 @@ def _dashboard_user_can_view_post(user, post: BBSPost) -> bool:
     return False
 
 
-def _resolve_last_activity(post: BBSPost) -> Tuple[str, Optional[datetime]]:
-    """获取帖子最后一次活跃的作者昵称与时间。"""
-    reply = (BBSReply.objects(post=post, status=BBSReplyStatus.PUBLISHED).only('author_snapshot',
-                                                                               'created_at').order_by('-created_at').first())  # type: ignore[attr-defined]
-    if reply:
-        snapshot = reply.author_snapshot or {}
-        display_name = snapshot.get('nickname') or snapshot.get('display_name') or snapshot.get('username') or '--'
-        return display_name, reply.created_at
-
-    snapshot = post.author_snapshot or {}
-    display_name = snapshot.get('nickname') or snapshot.get('display_name') or snapshot.get('username') or '--'
-    return display_name, post.created_at or post.last_active_at
-
-
-def _build_last_activity_meta(post: BBSPost) -> Dict[str, Optional[str]]:
-    """构建最后更新展示信息。"""
-    operator_name, timestamp = _resolve_last_activity(post)
-    operator_display = operator_name if operator_name and operator_name != '--' else ''
-    display_time = format_local_datetime(timestamp, '%Y-%m-%d %H:%M') if timestamp else ''
-    time_iso = timestamp.isoformat() if timestamp else None
-    if operator_display and display_time:
-        display_text = f"{operator_display}（{display_time}）"
-    elif operator_display:
-        display_text = operator_display
-    elif display_time:
-        display_text = display_time
-    else:
-        display_text = '--'
-    return {
-        'operator': operator_name,
-        'time': time_iso,
-        'time_display': display_time,
-        'display': display_text,
-    }
-
-
 @main_bp.route('/api/dashboard/bbs-latest', methods=['GET'])
 @jwt_roles_accepted("gicho", "kancho", "gunsou")
 def dashboard_bbs_latest_data():
     """仪表盘内部BBS最新主贴。"""
     query = (BBSPost.objects.only('title', 'board', 'status', 'author', 'author_snapshot', 'created_at',
                                   'last_active_at').order_by('-last_active_at'))  # type: ignore[attr-defined]
-    items = []
+    posts = []
     for post in query[:50]:
         if not _dashboard_user_can_view_post(current_user, post):
             continue
-        board_name = post.board.name if getattr(post, 'board', None) else ''
-        item = {
-            'id': str(post.id),
-            'title': post.title or '',
-            'board': board_name,
-        }
-        last_activity = _build_last_activity_meta(post)
-        item['last_activity'] = last_activity
-        items.append(item)
-        if len(items) >= 5:
+        posts.append(post)
+        if len(posts) >= 5:
             break
 
-    data = {'items': items, 'generated_at': datetime.utcnow().isoformat()}
+    data = build_bbs_latest_data(posts)
     meta = {'segment': 'bbs_latest', 'link': url_for('bbs.bbs_index')}
     return jsonify(create_success_response(data, meta))
 
@@ -162,6 +118,40 @@ def dashboard_pilot_ranking_data():
     return jsonify(create_success_response(data, meta))
 
 
+@main_bp.route('/api/dashboard/snapshot', methods=['GET'])
+@jwt_roles_accepted("gicho", "kancho", "gunsou")
+def dashboard_snapshot_data():
+    """仪表盘快照接口：一次返回全部卡片（预计算结果，详见 utils/dashboard_snapshot.py）。
+
+    BBS最新主贴只包含已发布主贴；转化率与横幅仅议长、舰长可见。
+    """
+    try:
+        snapshot = get_dashboard_snapshot()
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('读取仪表盘快照失败：%s', exc, exc_info=True)
+        return jsonify(create_error_response('INTERNAL_ERROR', '仪表盘数据加载失败')), 500
+
+    sections = snapshot['data']
+    segments = {
+        'bbs_latest': {'data': sections['bbs_latest'], 'meta': {'segment': 'bbs_latest', 'link': url_for('bbs.bbs_index')}},
+        'recruit': {'data': sections['recruit'], 'meta': {'segment': 'recruit', 'link': url_for('report.recruit_daily_report')}},
+        'pilot_ranking': {'data': sections['pilot_ranking'], 'meta': {'segment': 'pilot_ranking'}},
+        'announcement': {'data': sections['announcement'], 'meta': {'segment': 'announcement', 'link': url_for('calendar.day_view')}},
+        'battle': {'data': sections['battle'], 'meta': {'segment': 'battle', 'link': url_for('report.daily_report')}},
+    }
+
+    identity = get_identity(get_jwt_identity())
+    if identity is not None and identity.role_names & {'gicho', 'kancho'}:
+        segments['conversion_rate'] = {
+            'data': sections['conversion_rate'],
+            'meta': {'segment': 'conversion_rate', 'link': url_for('new_report_fast.monthly_report_fast', mode='offline')},
+        }
+        segments['feature'] = {'data': build_dashboard_feature_banner(), 'meta': {'segment': 'feature'}}
+
+    meta = {'computed_at': format_local_datetime(snapshot['computed_at'], '%Y-%m-%d %H:%M:%S')}
+    return jsonify(create_success_response(segments, meta))
+
+
 @main_bp.route('/change-password', methods=['GET', 'POST'])
 @login_required
 def change_password():
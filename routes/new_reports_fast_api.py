@@ -1,5 +1,5 @@
 # pylint: disable=duplicate-code
-"""开播新月报（加速版）REST API。"""
+"""开播新日报/月报（加速版）REST API。"""
 
 from datetime import timedelta
 
@@ -7,10 +7,11 @@ from flask import Blueprint, jsonify, request
 
 from utils.jwt_roles import jwt_roles_accepted
 from utils.logging_setup import get_logger
-from utils.new_report_fast_calculations import calculate_monthly_report_fast
-from utils.new_report_serializers import (create_error_response, create_success_response, serialize_monthly_daily_series, serialize_monthly_details,
-                                          serialize_monthly_summary)
-from utils.new_report_calculations import get_local_month_from_string
+from utils.new_report_fast_calculations import MONTHLY_ENGINES, calculate_monthly_report_fast
+from utils.new_report_fast_daily_calculations import calculate_daily_report_fast
+from utils.new_report_serializers import (create_error_response, create_success_response, serialize_daily_details, serialize_daily_summary,
+                                          serialize_monthly_daily_series, serialize_monthly_details, serialize_monthly_summary)
+from utils.new_report_calculations import get_local_date_from_string, get_local_month_from_string
 from utils.timezone_helper import get_current_utc_time, utc_to_local
 
 logger = get_logger('new_reports_fast_api')
@@ -42,6 +43,60 @@ def _parse_status_param() -> str:
     return status
 
 
+def _parse_engine_param() -> str:
+    engine = request.args.get('engine', 'default') or 'default'
+    if engine not in MONTHLY_ENGINES:
+        logger.warning('非法计算引擎参数：%s，已回退到 default', engine)
+        return 'default'
+    return engine
+
+
+@new_reports_fast_api_bp.route('/daily', methods=['GET'])
+@jwt_roles_accepted('gicho', 'kancho', 'gunsou')
+def daily_report_data_fast():
+    """返回开播新日报（加速版）数据。"""
+    date_str = request.args.get('date')
+    if not date_str:
+        now_utc = get_current_utc_time()
+        today_local = utc_to_local(now_utc)
+        report_date = today_local.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        report_date = get_local_date_from_string(date_str)
+        if not report_date:
+            logger.error('无效的新日报日期参数：%s', date_str)
+            return jsonify(create_error_response('INVALID_DATE', '无效的日期格式')), 400
+        report_date = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    owner_id = _parse_owner_param()
+    mode = _parse_mode_param()
+
+    logger.info('获取开播新日报（加速版）数据，日期：%s，直属运营：%s，开播方式：%s', report_date.strftime('%Y-%m-%d'), owner_id, mode)
+
+    summary_raw, details_raw = calculate_daily_report_fast(report_date, owner_id, mode)
+
+    pagination = {
+        'date': report_date.strftime('%Y-%m-%d'),
+        'prev_date': (report_date - timedelta(days=1)).strftime('%Y-%m-%d'),
+        'next_date': (report_date + timedelta(days=1)).strftime('%Y-%m-%d'),
+    }
+
+    data = {
+        'date': pagination['date'],
+        'summary': serialize_daily_summary(summary_raw),
+        'details': serialize_daily_details(details_raw),
+        'pagination': pagination,
+    }
+
+    meta = {
+        'filters': {
+            'owner': owner_id,
+            'mode': mode,
+        }
+    }
+
+    return jsonify(create_success_response(data, meta))
+
+
 @new_reports_fast_api_bp.route('/monthly', methods=['GET'])
 @jwt_roles_accepted('gicho', 'kancho')
 def monthly_report_data_fast():
@@ -61,10 +116,11 @@ def monthly_report_data_fast():
     owner_id = _parse_owner_param()
     mode = _parse_mode_param()
     status = _parse_status_param()
+    engine = _parse_engine_param()
 
-    logger.info('获取开播新月报（加速版）数据，月份：%s，直属运营：%s，开播方式：%s，主播状态：%s', report_month.strftime('%Y-%m'), owner_id, mode, status)
+    logger.info('获取开播新月报（加速版）数据，月份：%s，直属运营：%s，开播方式：%s，主播状态：%s，引擎：%s', report_month.strftime('%Y-%m'), owner_id, mode, status, engine)
 
-    summary_raw, details_raw, daily_series_raw = calculate_monthly_report_fast(report_month.year, report_month.month, owner_id, mode, status)
+    summary_raw, details_raw, daily_series_raw = calculate_monthly_report_fast(report_month.year, report_month.month, owner_id, mode, status, engine)
 
     prev_month_ref = (report_month.replace(day=1) - timedelta(days=1)).replace(day=1)
     next_month_ref = (report_month.replace(day=28) + timedelta(days=4)).replace(day=1)
@@ -88,6 +144,7 @@ def monthly_report_data_fast():
             'owner': owner_id,
             'mode': mode,
             'status': status,
+            'engine': engine,
         }
     }
 
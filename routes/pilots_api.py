@@ -8,22 +8,30 @@
 import csv
 import io
 from datetime import datetime
-from decimal import Decimal
+from typing import Any, Dict
 
 from flask import Blueprint, Response, jsonify, request
-from mongoengine import DoesNotExist, Q, ValidationError
+from mongoengine import DoesNotExist, ValidationError
 
 from models.pilot import (Gender, Pilot, PilotChangeLog, Platform, Rank, Status, WorkMode)
 from models.user import User
 from utils.filter_state import persist_and_restore_filters
 from utils.jwt_roles import get_jwt_user, jwt_roles_accepted
+from utils.keyset_pagination import (CursorError, apply_keyset_cursor, count_queryset, order_by_args, paginate_keyset, parse_count_mode, split_page)
 from utils.logging_setup import get_logger
+from utils.pilot_name_search import (TYPEAHEAD_DEFAULT_LIMIT, TYPEAHEAD_MAX_LIMIT, lookup_pilot_ids, typeahead_pilots)
 from utils.pilot_serializers import (create_error_response, create_success_response, serialize_change_log_list, serialize_pilot)
-from utils.timezone_helper import get_current_utc_time, utc_to_local
+from utils.timezone_helper import get_current_local_time, get_current_utc_time, utc_to_local
 
 logger = get_logger('pilot')
 pilots_api_bp = Blueprint('pilots_api', __name__)
 
+# 主播列表 $facet 统计维度：统计键 -> 字段
+PILOT_FACET_FIELDS = {'rank_stats': 'rank', 'status_stats': 'status', 'platform_stats': 'platform'}
+
+# 变更记录游标分页排序键，与 pilot_id + -change_time + -_id 复合索引对齐
+CHANGE_LOG_SORT = (('change_time', -1), ('id', -1))
+
 
 def validate_pilot_id(pilot_id):
     """验证pilot_id参数的有效性"""
@@ -103,6 +111,42 @@ def try_enum(enum_class, value, default=None):
         return default
 
 
+def _aggregate_pilot_page(query, items_query, sort_spec, skip: int, limit: int) -> Dict[str, Any]:
+    """单次 $facet 聚合主播列表：本页主播、筛选结果总数与主播分类/状态/平台/直属运营统计。
+
+    items_query 为附加了游标条件的查询（页码分页时与 query 相同）；直属运营昵称通过一次批量查询加载。
+    """
+    sort_stage = {('_id' if field == 'id' else field): direction for field, direction in sort_spec}
+    items_pipeline = [] if items_query is query else [{'$match': items_query._query}]  # pylint: disable=protected-access
+    facet = {
+        'items': items_pipeline + [{'$sort': sort_stage}, {'$skip': skip}, {'$limit': limit}],
+        'total': [{'$count': 'count'}],
+        'owner_stats': [{'$group': {'_id': '$owner', 'count': {'$sum': 1}}}],
+    }
+    for stats_key, field in PILOT_FACET_FIELDS.items():
+        facet[stats_key] = [{'$group': {'_id': f'${field}', 'count': {'$sum': 1}}}]
+
+    pipeline = [{'$match': query._query}, {'$facet': facet}]  # pylint: disable=protected-access
+    result = next(Pilot._get_collection().aggregate(pipeline, allowDiskUse=True), {})  # type: ignore[attr-defined]  # pylint: disable=protected-access
+
+    owner_ids = [group['_id'] for group in result.get('owner_stats', []) if group['_id']]
+    owners = {str(user.id): user for user in User.objects(id__in=owner_ids).only('nickname')} if owner_ids else {}
+
+    total = result['total'][0]['count'] if result.get('total') else 0
+    stats: Dict[str, Any] = {'total': total}
+    for stats_key in PILOT_FACET_FIELDS:
+        stats[stats_key] = {str(group['_id']) if group['_id'] is not None else 'None': group['count'] for group in result.get(stats_key, [])}
+    owner_stats: Dict[str, int] = {}
+    for group in result.get('owner_stats', []):
+        owner = owners.get(str(group['_id'])) if group['_id'] else None
+        owner_nickname = owner.nickname if owner else '无'
+        owner_stats[owner_nickname] = owner_stats.get(owner_nickname, 0) + group['count']
+    stats['owner_stats'] = owner_stats
+
+    pilots = [Pilot._from_son(raw, _auto_dereference=False) for raw in result.get('items', [])]  # pylint: disable=protected-access
+    return {'pilots': pilots, 'total': total, 'stats': stats, 'owners': owners}
+
+
 @pilots_api_bp.route('/api/pilots', methods=['GET'])
 @jwt_roles_accepted('gicho', 'kancho', 'gunsou')
 def get_pilots():
@@ -208,59 +252,50 @@ def get_pilots():
             except ValueError:
                 logger.warning('无效的创建结束时间: %s', created_to)
 
-        # 搜索功能（昵称和真实姓名的模糊搜索）
-        if q:
-            query = query.filter(Q(nickname__icontains=q) | Q(real_name__icontains=q))
-
-        # 排序处理
-        if sort_param.startswith('-'):
-            sort_field = sort_param[1:]
-            if sort_field in ['created_at', 'updated_at', 'nickname']:
-                query = query.order_by('-created_at')
-            else:
-                query = query.order_by('-created_at')
+        # 搜索功能（昵称和真实姓名的模糊搜索，经名称 n-gram 索引定位）
+        matched_ids = lookup_pilot_ids(q) if q else None
+        if matched_ids is not None:
+            query = query.filter(id__in=matched_ids)
+
+        # 排序处理（目前均按创建时间排序，仅区分升降序；以 id 兜底保证顺序稳定）
+        sort_field = sort_param.lstrip('-')
+        direction = 1 if not sort_param.startswith('-') and sort_field in ['created_at', 'updated_at', 'nickname'] else -1
+        sort_spec = (('created_at', direction), ('id', direction))
+        query = query.order_by(*order_by_args(sort_spec))
+
+        # 分页查询（传入 cursor 参数时使用游标分页）：本页数据、总数与全部筛选结果的各维度统计由一次 $facet 聚合返回
+        cursor_mode = 'cursor' in request.args
+        if cursor_mode:
+            items_query = apply_keyset_cursor(query, sort_spec, request.args.get('cursor'))
+            page_result = _aggregate_pilot_page(query, items_query, sort_spec, 0, page_size + 1)
+            pilots, next_cursor = split_page(page_result['pilots'], sort_spec, page_size)
         else:
-            sort_field = sort_param
-            if sort_field in ['created_at', 'updated_at', 'nickname']:
-                # MongoEngine 升序使用字段名本身
-                query = query.order_by('created_at')
-            else:
-                query = query.order_by('-created_at')
-
-        # 分页查询
-        total_items = query.count()
-        pilots = query.skip((page - 1) * page_size).limit(page_size).all()
+            page_result = _aggregate_pilot_page(query, query, sort_spec, (page - 1) * page_size, page_size)
+            pilots = page_result['pilots']
+            next_cursor = None
+        total_items = page_result['total']
         total_pages = (total_items + page_size - 1) // page_size
 
-        # 统计信息
-        stats = {'total': total_items, 'rank_stats': {}, 'status_stats': {}, 'platform_stats': {}, 'owner_stats': {}}
-
-        # 计算各维度的统计
-        for pilot in pilots:
-            # 主播分类统计
-            rank_value = pilot.rank.value if pilot.rank else 'None'
-            stats['rank_stats'][rank_value] = stats['rank_stats'].get(rank_value, 0) + 1
-
-            # 状态统计
-            status_value = pilot.status.value if pilot.status else 'None'
-            stats['status_stats'][status_value] = stats['status_stats'].get(status_value, 0) + 1
-
-            # 平台统计
-            platform_value = pilot.platform.value if pilot.platform else 'None'
-            stats['platform_stats'][platform_value] = stats['platform_stats'].get(platform_value, 0) + 1
-
-            # 直属运营统计
-            owner_nickname = pilot.owner.nickname if pilot.owner else '无'
-            stats['owner_stats'][owner_nickname] = stats['owner_stats'].get(owner_nickname, 0) + 1
-
-        # 序列化数据
-        data = {'items': [serialize_pilot(pilot) for pilot in pilots], 'aggregations': stats}
-
-        meta = {'pagination': {'page': page, 'page_size': page_size, 'total_items': total_items, 'total_pages': total_pages}}
+        # 序列化数据（直属运营已批量加载，不再逐条解引用）
+        data = {'items': [serialize_pilot(pilot, page_result['owners']) for pilot in pilots], 'aggregations': page_result['stats']}
+
+        meta = {
+            'pagination': {
+                'page': None if cursor_mode else page,
+                'page_size': page_size,
+                'total_items': total_items,
+                'total_pages': total_pages,
+                'total_is_estimate': False,
+                'has_more': next_cursor is not None if cursor_mode else page * page_size < total_items,
+                'next_cursor': next_cursor,
+            }
+        }
 
-        logger.info('获取主播列表成功：第%d页，共%d条记录', page, len(pilots))
+        logger.info('获取主播列表成功：%s，共%d条记录', '游标分页' if cursor_mode else f'第{page}页', len(pilots))
         return jsonify(create_success_response(data, meta))
 
+    except CursorError as e:
+        return jsonify(create_error_response('INVALID_CURSOR', str(e))), 400
     except Exception as e:
         logger.error('获取主播列表失败: %s', str(e), exc_info=True)
         return jsonify(create_error_response('INTERNAL_ERROR', '获取主播列表失败')), 500
@@ -527,26 +562,43 @@ def get_pilot_changes(pilot_id):
 
         pilot = Pilot.objects.get(id=pilot_id)
 
-        # 分页参数
+        # 分页参数（传入 cursor 参数时使用游标分页）
         page = int(request.args.get('page', 1))
         page_size = int(request.args.get('page_size', 500))
+        cursor_mode = 'cursor' in request.args
 
         # 获取变更记录
-        changes_query = PilotChangeLog.objects(pilot_id=pilot).order_by('-change_time')
-        total_changes = changes_query.count()
-        changes = changes_query.skip((page - 1) * page_size).limit(page_size).all()
+        changes_query = PilotChangeLog.objects(pilot_id=pilot).order_by(*order_by_args(CHANGE_LOG_SORT))
+        count_info = count_queryset(changes_query, parse_count_mode(request.args.get('count'), 'estimated' if cursor_mode else 'exact'))
+        total_changes = count_info['total']
+        if cursor_mode:
+            changes, next_cursor = paginate_keyset(changes_query, CHANGE_LOG_SORT, request.args.get('cursor'), page_size)
+        else:
+            changes = changes_query.skip((page - 1) * page_size).limit(page_size).all()
+            next_cursor = None
 
-        total_pages = (total_changes + page_size - 1) // page_size
+        total_pages = (total_changes + page_size - 1) // page_size if total_changes is not None else None
 
         # 返回变更信息
         changes_data = serialize_change_log_list(changes)
 
-        meta = {'pagination': {'page': page, 'page_size': page_size, 'total_items': total_changes, 'total_pages': total_pages}}
+        meta = {
+            'pagination': {
+                'page': None if cursor_mode else page,
+                'page_size': page_size,
+                'total_items': total_changes,
+                'total_pages': total_pages,
+                'total_is_estimate': count_info['total_is_estimate'],
+                'next_cursor': next_cursor,
+            }
+        }
 
         return jsonify(create_success_response(changes_data, meta))
 
     except DoesNotExist:
         return jsonify(create_error_response('PILOT_NOT_FOUND', '主播不存在')), 404
+    except CursorError as e:
+        return jsonify(create_error_response('INVALID_CURSOR', str(e))), 400
     except Exception as e:
         logger.error('获取主播变更记录失败: %s', str(e), exc_info=True)
         return jsonify(create_error_response('INTERNAL_ERROR', '获取主播变更记录失败')), 500
@@ -614,6 +666,37 @@ def get_pilot_options():
         return jsonify(create_error_response('INTERNAL_ERROR', '获取选项数据失败')), 500
 
 
+@pilots_api_bp.route('/api/pilots/typeahead', methods=['GET'])
+@jwt_roles_accepted('gicho', 'kancho', 'gunsou')
+def get_pilot_typeahead():
+    """主播名称联想：返回昵称或姓名包含查询串的前N个主播，活跃主播优先"""
+    try:
+        q = request.args.get('q', '').strip()
+        try:
+            limit = int(request.args.get('limit', TYPEAHEAD_DEFAULT_LIMIT))
+        except ValueError:
+            limit = TYPEAHEAD_DEFAULT_LIMIT
+        limit = max(1, min(limit, TYPEAHEAD_MAX_LIMIT))
+        status_filters = [x for x in request.args.getlist('status') if x]
+        statuses = [Status(v) for v in status_filters if _has_enum_value(Status, v)] if status_filters else None
+
+        pilots = typeahead_pilots(q, limit, statuses)
+        items = [{
+            'id': str(pilot.id),
+            'nickname': pilot.nickname,
+            'real_name': pilot.real_name,
+            'status': pilot.status.value if pilot.status else None,
+            'rank': pilot.rank.value if pilot.rank else None,
+        } for pilot in pilots]
+
+        logger.debug('主播名称联想：%s，返回%d条', q, len(items))
+        return jsonify(create_success_response({'items': items}))
+
+    except Exception as e:
+        logger.error('主播名称联想失败: %s', str(e), exc_info=True)
+        return jsonify(create_error_response('INTERNAL_ERROR', '主播名称联想失败')), 500
+
+
 @pilots_api_bp.route('/api/pilots/<pilot_id>/performance', methods=['GET'])
 @jwt_roles_accepted('gicho', 'kancho', 'gunsou')
 def get_pilot_performance(pilot_id):
@@ -626,9 +709,10 @@ def get_pilot_performance(pilot_id):
 
         pilot = Pilot.objects.get(id=pilot_id)
 
-        # 计算主播业绩数据
-        from utils.pilot_performance import calculate_pilot_performance_stats
-        performance_data = calculate_pilot_performance_stats(pilot)
+        # 计算主播业绩数据（按主播与本地日期缓存，相关数据写入时按范围失效）
+        from utils.pilot_performance import get_pilot_performance_payload
+        owner_id = str(pilot.owner.id) if pilot.owner else None
+        performance_data = get_pilot_performance_payload(str(pilot.id), owner_id, get_current_local_time().date().isoformat())
 
         # 序列化主播基本信息
         if pilot.gender == Gender.MALE:
@@ -661,54 +745,13 @@ def get_pilot_performance(pilot_id):
             'recruit_manager': recruit_manager
         }
 
-        # 序列化最近开播记录
-        recent_records = []
-        for record in performance_data['recent_records']:
-            approved_base_salary = getattr(record, '_approved_base_salary', Decimal('0')) or Decimal('0')
-            application = getattr(record, '_latest_base_salary_application', None)
-            if application:
-                application_amount = application.base_salary_amount or Decimal('0')
-                application_data = {
-                    'id': str(application.id),
-                    'amount': float(application_amount),
-                    'status': application.status.value if application.status else None,
-                    'status_display': application.status_display
-                }
-            else:
-                application_data = None
-
-            recent_records.append({
-                'id': str(record.id),
-                'start_time': utc_to_local(record.start_time).isoformat() if record.start_time else None,
-                'duration_hours': float(record.duration_hours) if record.duration_hours else 0,
-                'revenue_amount': float(record.revenue_amount),
-                'base_salary': float(approved_base_salary),
-                'status': record.current_status.value if record.current_status else 'ended',
-                'base_salary_application': application_data
-            })
-
-        # 转换Decimal为float
-        def convert_decimal_to_float(data):
-            if isinstance(data, dict):
-                return {k: convert_decimal_to_float(v) for k, v in data.items()}
-            if isinstance(data, list):
-                return [convert_decimal_to_float(item) for item in data]
-            if isinstance(data, Decimal):
-                return float(data)
-            return data
-
-        month_stats = convert_decimal_to_float(performance_data['month_stats'])
-        week_stats = convert_decimal_to_float(performance_data['week_stats'])
-        three_day_stats = convert_decimal_to_float(performance_data['three_day_stats'])
-        month_daily_series = convert_decimal_to_float(performance_data.get('month_daily_series', []))
-
         response_data = {
             'pilot_info': pilot_info,
-            'month_stats': month_stats,
-            'week_stats': week_stats,
-            'three_day_stats': three_day_stats,
-            'recent_records': recent_records,
-            'daily_series': month_daily_series
+            'month_stats': performance_data['month_stats'],
+            'week_stats': performance_data['week_stats'],
+            'three_day_stats': performance_data['three_day_stats'],
+            'recent_records': performance_data['recent_records'],
+            'daily_series': performance_data['daily_series']
         }
 
         logger.info('获取主播业绩数据成功：%s', pilot.nickname)
@@ -18,11 +18,14 @@ from models.recruit import (BroadcastDecision, InterviewDecision, Recruit, Recru
 from models.user import Role, User
 from utils.filter_state import persist_and_restore_filters
 from utils.jwt_roles import jwt_roles_accepted
+from utils.keyset_pagination import (CursorError, count_queryset, order_by_args, paginate_keyset, parse_count_mode)
 from utils.logging_setup import get_logger
+from utils.pilot_name_search import lookup_recruit_ids
 from utils.recruit_serializers import (create_error_response, create_success_response, serialize_change_log_list, serialize_recruit, serialize_recruit_grouped,
                                        serialize_recruit_list)
 from utils.recruit_event_stream import recruit_operation_event_stream
 from utils.recruit_operation_logger import record_recruit_operation
+from utils.reference_prefetch import prefetch_references
 from utils.timezone_helper import (get_current_utc_time, get_current_local_time, local_to_utc, utc_to_local)
 
 logger = get_logger('recruit')
@@ -181,6 +184,7 @@ def get_recruits():
         recruiter_ids = [x for x in request.args.getlist('recruiter_id') if x]
         channel_filters = [x for x in request.args.getlist('channel') if x]
         time_filter = safe_strip(filters.get('time')) or 'two_days'
+        q = request.args.get('q', '').strip()
 
         # 分页参数
         page = int(request.args.get('page', 1))
@@ -225,24 +229,29 @@ def get_recruits():
             if valid_channels:
                 query = query.filter(channel__in=valid_channels)
 
-        # 排序处理
-        if sort_param.startswith('-'):
-            sort_field = sort_param[1:]
-            if sort_field in ['created_at', 'updated_at', 'appointment_time']:
-                query = query.order_by(f'-{sort_field}')
-            else:
-                query = query.order_by('-created_at')
+        # 主播名称搜索（昵称和真实姓名的模糊搜索，经名称 n-gram 索引定位）
+        matched_ids = lookup_recruit_ids(q) if q else None
+        if matched_ids is not None:
+            query = query.filter(id__in=matched_ids)
+
+        # 排序处理（以 id 兜底保证顺序稳定）
+        sort_field = sort_param.lstrip('-')
+        direction = -1 if sort_param.startswith('-') else 1
+        if sort_field not in ['created_at', 'updated_at', 'appointment_time']:
+            sort_field, direction = 'created_at', -1
+        sort_spec = ((sort_field, direction), ('id', direction))
+        query = query.order_by(*order_by_args(sort_spec))
+
+        # 分页查询（传入 cursor 参数时使用游标分页）
+        cursor_mode = 'cursor' in request.args
+        count_info = count_queryset(query, parse_count_mode(request.args.get('count'), 'estimated' if cursor_mode else 'exact'))
+        total_items = count_info['total']
+        if cursor_mode:
+            recruits, next_cursor = paginate_keyset(query, sort_spec, request.args.get('cursor'), page_size)
         else:
-            sort_field = sort_param
-            if sort_field in ['created_at', 'updated_at', 'appointment_time']:
-                query = query.order_by(sort_field)
-            else:
-                query = query.order_by('-created_at')
-
-        # 分页查询
-        total_items = query.count()
-        recruits = query.skip((page - 1) * page_size).limit(page_size).all()
-        total_pages = (total_items + page_size - 1) // page_size
+            recruits = query.skip((page - 1) * page_size).limit(page_size).all()
+            next_cursor = None
+        total_pages = (total_items + page_size - 1) // page_size if total_items is not None else None
 
         # 统计信息
         stats = {'total': total_items, 'status_stats': {}, 'channel_stats': {}, 'recruiter_stats': {}}
@@ -266,10 +275,13 @@ def get_recruits():
 
         meta = {
             'pagination': {
-                'page': page,
+                'page': None if cursor_mode else page,
                 'page_size': page_size,
                 'total_items': total_items,
-                'total_pages': total_pages
+                'total_pages': total_pages,
+                'total_is_estimate': count_info['total_is_estimate'],
+                'has_more': next_cursor is not None if cursor_mode else page * page_size < (total_items or 0),
+                'next_cursor': next_cursor,
             },
             'filters': {
                 'status': status_filter or '进行中',
@@ -277,9 +289,11 @@ def get_recruits():
             }
         }
 
-        logger.info('获取招募列表成功：第%d页，共%d条记录', page, len(recruits))
+        logger.info('获取招募列表成功：%s，共%d条记录', '游标分页' if cursor_mode else f'第{page}页', len(recruits))
         return jsonify(create_success_response(data, meta))
 
+    except CursorError as e:
+        return jsonify(create_error_response('INVALID_CURSOR', str(e))), 400
     except Exception as e:
         logger.error('获取招募列表失败: %s', str(e), exc_info=True)
         return jsonify(create_error_response('INTERNAL_ERROR', '获取招募列表失败')), 500
@@ -518,7 +532,7 @@ def export_recruits():
             if valid_channels:
                 query = query.filter(channel__in=valid_channels)
 
-        recruits = query.order_by('-created_at').all()
+        recruits = prefetch_references(query.order_by('-created_at'), 'pilot', 'recruiter')
 
         # 创建CSV文件
         output = io.StringIO()
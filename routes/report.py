@@ -6,19 +6,22 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 from urllib.parse import quote
 
+from bson import Decimal128
 from flask import Blueprint, Response, render_template, request, url_for
 from flask_security import roles_accepted
 
 from models.announcement import Announcement
 from models.battle_record import BattleRecord
 from models.pilot import Pilot, Rank, Status, WorkMode
-from utils.cache_helper import cached_monthly_report
-from utils.commission_helper import (calculate_commission_amounts, get_pilot_commission_rate_for_date)
+from utils.cache_helper import build_cache_scope, cached_monthly_report
+from utils.commission_helper import CommissionTimeline, calculate_commission_amounts
 from utils.logging_setup import get_logger
-from utils.new_report_calculations import (calculate_daily_summary, calculate_weekly_summary)
+from utils.new_report_calculations import calculate_daily_summary, calculate_weekly_summary
+from utils.new_report_calculations import calculate_pilot_three_day_avg_revenue as _calculate_three_day_avg_revenue
 from utils.new_report_fast_calculations import calculate_monthly_summary_fast
 from utils.recruit_stats import calculate_recruit_today_stats
 from utils.rebate_calculator import get_rebate_stage_info
+from utils.reference_prefetch import prefetch_references
 from utils.timezone_helper import (get_current_utc_time, local_to_utc, utc_to_local)
 
 logger = get_logger('report')
@@ -26,7 +29,7 @@ logger = get_logger('report')
 report_bp = Blueprint('report', __name__)
 
 
-def _get_dashboard_time_frames():
+def get_dashboard_time_frames():
     """生成仪表盘相关的本地/UTC时间窗口。"""
     now_utc = get_current_utc_time()
     now_local = utc_to_local(now_utc)
@@ -52,7 +55,7 @@ def _get_dashboard_time_frames():
 
 def build_dashboard_feature_banner():
     """构建仪表盘顶部横幅配置。"""
-    frames = _get_dashboard_time_frames()
+    frames = get_dashboard_time_frames()
     now_local = frames['now_local']
     start_local = now_local.replace(year=2025, month=10, day=1, hour=0, minute=0, second=0, microsecond=0)
     end_local = now_local.replace(year=2025, month=10, day=5, hour=23, minute=59, second=59, microsecond=0)
@@ -75,9 +78,9 @@ def build_dashboard_feature_banner():
     return banner
 
 
-def calculate_dashboard_recruit_metrics():
+def calculate_dashboard_recruit_metrics(frames=None):
     """计算仪表盘招募统计。"""
-    frames = _get_dashboard_time_frames()
+    frames = frames or get_dashboard_time_frames()
     today_stats = calculate_recruit_today_stats()
 
     return {
@@ -88,66 +91,76 @@ def calculate_dashboard_recruit_metrics():
     }
 
 
-def calculate_dashboard_announcement_metrics():
-    """计算仪表盘通告统计。"""
-    frames = _get_dashboard_time_frames()
-    today_start = frames['today_start_utc']
-    today_end = frames['today_end_utc']
-    yesterday_start = frames['yesterday_start_utc']
-    yesterday_end = frames['yesterday_end_utc']
-    week_start = frames['week_start_utc']
+# 流水按 DecimalField 口径（保留2位小数）转为 Decimal128 后求和
+_REVENUE_DECIMAL = {'$round': [{'$toDecimal': {'$ifNull': ['$revenue_amount', 0]}}, 2]}
 
-    today_count = Announcement.objects(start_time__gte=today_start, start_time__lt=today_end).count()
-    yesterday_count = Announcement.objects(start_time__gte=yesterday_start, start_time__lt=yesterday_end).count()
+
+def _start_time_in(start_utc, end_utc):
+    return {'$and': [{'$gte': ['$start_time', start_utc]}, {'$lt': ['$start_time', end_utc]}]}
+
+
+def _aggregate_dashboard_week(model, frames, value_expression):
+    """按开始时间对近一周（含今日）的数据做一次 $group，分别汇总今日、昨日与整周的取值。"""
+    pipeline = [
+        {'$match': {'start_time': {'$gte': frames['week_start_utc'], '$lt': frames['today_end_utc']}}},
+        {'$project': {'start_time': 1, 'value': value_expression}},
+        {'$group': {
+            '_id': None,
+            'today': {'$sum': {'$cond': [_start_time_in(frames['today_start_utc'], frames['today_end_utc']), '$value', 0]}},
+            'yesterday': {'$sum': {'$cond': [_start_time_in(frames['yesterday_start_utc'], frames['yesterday_end_utc']), '$value', 0]}},
+            'week': {'$sum': '$value'},
+        }},
+    ]
+    result = next(model._get_collection().aggregate(pipeline, allowDiskUse=True), None)  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    return result or {'today': 0, 'yesterday': 0, 'week': 0}
+
+
+def _to_decimal(value) -> Decimal:
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    return Decimal(str(value or 0))
+
+
+def calculate_dashboard_announcement_metrics(frames=None):
+    """计算仪表盘通告统计（今日、昨日与近一周计数由一次聚合返回）。"""
+    frames = frames or get_dashboard_time_frames()
+    totals = _aggregate_dashboard_week(Announcement, frames, {'$literal': 1})
+    today_count = int(totals['today'])
+    yesterday_count = int(totals['yesterday'])
 
     if yesterday_count > 0:
         change_rate = round(((today_count - yesterday_count) / yesterday_count) * 100, 1)
     else:
         change_rate = 100.0 if today_count > 0 else 0.0
 
-    week_count = Announcement.objects(start_time__gte=week_start, start_time__lt=today_end).count()
-    week_avg = round(week_count / 7, 1)
+    week_avg = round(int(totals['week']) / 7, 1)
 
     return {
         'generated_at': frames['now_local'].strftime('%Y-%m-%d %H:%M:%S'),
-        'today_count': int(today_count),
+        'today_count': today_count,
         'change_rate': float(change_rate),
         'week_avg': float(week_avg),
     }
 
 
-def calculate_dashboard_battle_metrics():
-    """计算仪表盘开播记录统计。"""
-    frames = _get_dashboard_time_frames()
-    today_start = frames['today_start_utc']
-    today_end = frames['today_end_utc']
-    yesterday_start = frames['yesterday_start_utc']
-    yesterday_end = frames['yesterday_end_utc']
-    week_start = frames['week_start_utc']
-
-    today_records = BattleRecord.objects(start_time__gte=today_start, start_time__lt=today_end)
-    yesterday_records = BattleRecord.objects(start_time__gte=yesterday_start, start_time__lt=yesterday_end)
-    week_records = BattleRecord.objects(start_time__gte=week_start, start_time__lt=today_end)
-
-    today_revenue = sum(record.revenue_amount or Decimal('0') for record in today_records)
-    yesterday_revenue = sum(record.revenue_amount or Decimal('0') for record in yesterday_records)
-    week_revenue = sum(record.revenue_amount or Decimal('0') for record in week_records)
+def calculate_dashboard_battle_metrics(frames=None):
+    """计算仪表盘开播记录统计（今日、昨日与近一周流水由一次聚合在数据库侧求和）。"""
+    frames = frames or get_dashboard_time_frames()
+    totals = _aggregate_dashboard_week(BattleRecord, frames, _REVENUE_DECIMAL)
 
-    battle_today = float(today_revenue)
-    battle_yesterday = float(yesterday_revenue)
-    battle_week_avg = float(week_revenue) / 7 if week_revenue else 0.0
+    week_revenue = _to_decimal(totals['week'])
 
     return {
         'generated_at': frames['now_local'].strftime('%Y-%m-%d %H:%M:%S'),
-        'battle_today_revenue': battle_today,
-        'battle_yesterday_revenue': battle_yesterday,
-        'battle_week_avg_revenue': battle_week_avg,
+        'battle_today_revenue': float(_to_decimal(totals['today'])),
+        'battle_yesterday_revenue': float(_to_decimal(totals['yesterday'])),
+        'battle_week_avg_revenue': float(week_revenue) / 7 if week_revenue else 0.0,
     }
 
 
 def calculate_dashboard_pilot_metrics():
     """计算仪表盘主播统计。"""
-    frames = _get_dashboard_time_frames()
+    frames = get_dashboard_time_frames()
     serving_status = [Status.RECRUITED, Status.CONTRACTED]
 
     pilot_serving = Pilot.objects(status__in=serving_status).count()
@@ -164,7 +177,7 @@ def calculate_dashboard_pilot_metrics():
 
 def calculate_dashboard_candidate_metrics():
     """计算仪表盘候选人统计。"""
-    frames = _get_dashboard_time_frames()
+    frames = get_dashboard_time_frames()
     serving_status = [Status.RECRUITED, Status.CONTRACTED]
 
     candidate_not_recruited = Pilot.objects(rank=Rank.CANDIDATE, status=Status.NOT_RECRUITED).count()
@@ -177,9 +190,9 @@ def calculate_dashboard_candidate_metrics():
     }
 
 
-def calculate_dashboard_conversion_rate_metrics():
+def calculate_dashboard_conversion_rate_metrics(frames=None):
     """计算仪表盘底薪流水转化率统计。"""
-    frames = _get_dashboard_time_frames()
+    frames = frames or get_dashboard_time_frames()
     now_local = frames['now_local']
 
     yesterday_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
@@ -228,31 +241,25 @@ def _calculate_conversion_rate(total_revenue, total_base_salary):
     return int((revenue / base_salary) * 100)
 
 
-def calculate_dashboard_pilot_ranking_metrics():
-    """计算仪表盘昨日主播排名统计。"""
-    frames = _get_dashboard_time_frames()
-    now_local = frames['now_local']
-
-    yesterday_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
-    day_start = yesterday_local.replace(hour=0, minute=0, second=0, microsecond=0)
-    day_end = yesterday_local.replace(hour=23, minute=59, second=59, microsecond=999999)
-
-    day_records = get_battle_records_for_date_range(day_start, day_end + timedelta(microseconds=1), owner_id=None, mode='all')
-
-    pilot_revenue = {}
-
-    for record in day_records:
-        pilot_id = str(record.pilot.id)
-        if pilot_id not in pilot_revenue:
-            pilot_revenue[pilot_id] = {'pilot': record.pilot, 'total_revenue': Decimal('0')}
-        pilot_revenue[pilot_id]['total_revenue'] += record.revenue_amount or Decimal('0')
-
-    sorted_pilots = sorted(pilot_revenue.values(), key=lambda x: x['total_revenue'], reverse=True)
-
-    def format_pilot_info(pilot_data):
-        if not pilot_data:
+def calculate_dashboard_pilot_ranking_metrics(frames=None):
+    """计算仪表盘昨日主播排名统计（按主播 $group 求和后只加载前三名）。"""
+    frames = frames or get_dashboard_time_frames()
+    day_start = frames['yesterday_start_utc']
+    day_end = frames['yesterday_end_utc']
+
+    pipeline = [
+        {'$match': {'start_time': {'$gte': day_start, '$lt': day_end}, 'pilot': {'$ne': None}}},
+        {'$group': {'_id': '$pilot', 'total_revenue': {'$sum': _REVENUE_DECIMAL}, 'first_start': {'$min': '$start_time'}}},
+        {'$sort': {'total_revenue': -1, 'first_start': 1, '_id': 1}},
+        {'$limit': 3},
+    ]
+    top_ids = [row['_id'] for row in BattleRecord._get_collection().aggregate(pipeline, allowDiskUse=True)]  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    pilots = {pilot.id: pilot for pilot in prefetch_references(Pilot.objects(id__in=top_ids), 'owner')}
+    sorted_pilots = [pilots[pilot_id] for pilot_id in top_ids if pilot_id in pilots]
+
+    def format_pilot_info(pilot):
+        if not pilot:
             return '--'
-        pilot = pilot_data['pilot']
         nickname = pilot.nickname or ''
         real_name = pilot.real_name or ''
         owner_name = pilot.owner.nickname if pilot.owner and pilot.owner.nickname else (pilot.owner.username if pilot.owner else '无')
@@ -345,23 +352,8 @@ def get_battle_records_for_date_range(start_local_date, end_local_date, owner_id
 
 
 def calculate_pilot_three_day_avg_revenue(pilot, report_date, owner_id=None, mode: str = 'all'):
-    """计算主播近3个有记录自然日的平均流水。"""
-    days_with_records = []
-    for i in range(7):
-        check_date = report_date - timedelta(days=i)
-        check_date_start = check_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        check_date_end = check_date_start + timedelta(days=1)
-        daily_records = get_battle_records_for_date_range(check_date_start, check_date_end, owner_id, mode)
-        pilot_daily_records = [record for record in daily_records if record.pilot.id == pilot.id]
-        if len(pilot_daily_records) > 0:
-            daily_revenue = sum(record.revenue_amount for record in pilot_daily_records)
-            days_with_records.append(daily_revenue)
-            if len(days_with_records) >= 3:
-                break
-    if len(days_with_records) < 3:
-        return None
-    total_revenue = sum(days_with_records[:3])
-    return total_revenue / 3
+    """计算主播近3个有记录自然日的平均流水（单次查询近7日记录）。"""
+    return _calculate_three_day_avg_revenue(pilot, report_date, owner_id, mode)
 
 
 def calculate_pilot_rebate(pilot, report_date, owner_id=None, mode: str = 'all'):
@@ -413,7 +405,14 @@ def calculate_pilot_monthly_stats(pilot, report_date, owner_id=None, mode: str =
     }
 
 
-@cached_monthly_report()
+def _month_summary_cache_scope(result, report_date, owner_id=None, mode: str = 'all'):  # pylint: disable=unused-argument
+    """月度汇总缓存依赖范围：月初至报表日、直属运营；结果不含主播明细，任意主播写入均视为相关。"""
+    return build_cache_scope(start=report_date.replace(day=1).date(),
+                             end=(report_date + timedelta(days=1)).date(),
+                             owner_id=None if owner_id in (None, '', 'all') else owner_id)
+
+
+@cached_monthly_report(scope_builder=_month_summary_cache_scope)
 def _calculate_month_summary(report_date, owner_id=None, mode: str = 'all'):
     """计算月度汇总（截至报表日）。"""
     month_start = report_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
@@ -430,6 +429,7 @@ def _calculate_month_summary(report_date, owner_id=None, mode: str = 'all'):
     total_pilot_share = Decimal('0')
     total_company_share = Decimal('0')
     total_rebate = Decimal('0')
+    timeline = CommissionTimeline.prefetch(record.pilot.id for record in month_records)
 
     for record in month_records:
         pilot_id = str(record.pilot.id)
@@ -444,7 +444,7 @@ def _calculate_month_summary(report_date, owner_id=None, mode: str = 'all'):
         total_base_salary += record.base_salary
 
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(record.pilot.id, record_date)
+        commission_rate = timeline.rate_for(record.pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
 
         total_pilot_share += commission_amounts['pilot_amount']
@@ -561,6 +561,7 @@ def calculate_pilot_monthly_commission_stats(pilot, year, month, owner_id=None):
     """计算主播月度分成统计（按日累加）。"""
     month_records = get_battle_records_for_month(year, month, owner_id)
     pilot_month_records = [record for record in month_records if record.pilot.id == pilot.id]
+    timeline = CommissionTimeline.prefetch([pilot.id])
 
     total_pilot_share = Decimal('0')
     total_company_share = Decimal('0')
@@ -568,7 +569,7 @@ def calculate_pilot_monthly_commission_stats(pilot, year, month, owner_id=None):
 
     for record in pilot_month_records:
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(pilot.id, record_date)
+        commission_rate = timeline.rate_for(pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
 
         total_pilot_share += commission_amounts['pilot_amount']
@@ -11,7 +11,6 @@ from typing import Dict, List
 from flask import (Blueprint, jsonify, redirect, render_template, request, url_for)
 from flask_security import current_user, roles_required
 
-from models.announcement import Announcement
 from models.battle_record import BattleRecord, BattleRecordStatus, BaseSalaryApplication, BaseSalaryApplicationStatus
 from models.user import User
 from utils.job_token import JobPlan
@@ -21,6 +20,7 @@ from utils.new_report_calculations import (calculate_daily_details, calculate_da
 from utils.new_report_fast_calculations import calculate_monthly_summary_fast, calculate_monthly_details_fast
 from utils.new_report_serializers import (serialize_daily_details, serialize_daily_summary, serialize_monthly_summary, serialize_monthly_details)
 from utils.timezone_helper import (get_current_utc_time, local_to_utc, utc_to_local)
+from utils.unstarted_detector import (find_unstarted_announcements, find_unstarted_online_pilots)
 
 logger = get_logger('report_mail')
 
@@ -635,66 +635,9 @@ def run_unstarted_report_job(triggered_by: str = 'scheduler') -> dict:
     logger.info('触发未开播提醒报表，来源：%s', triggered_by or '未知')
 
     now_utc = get_current_utc_time()
-    window_start_utc = now_utc - timedelta(hours=48)
-
-    candidate_plans = Announcement.objects.filter(start_time__gte=window_start_utc).order_by('-start_time')
-
-    logger.debug('候选计划数量（48小时内）：%d', candidate_plans.count())
-
-    unstarted_items: List[dict] = []
-    sample_logged = 0
-    for ann in candidate_plans:
-        start_utc = ann.start_time
-        deadline_utc = start_utc + timedelta(hours=6)
-
-        if now_utc < deadline_utc:
-            continue
-
-        start_local = utc_to_local(start_utc)
-        day_start_local = start_local.replace(hour=0, minute=0, second=0, microsecond=0)
-
-        day_start_utc = local_to_utc(day_start_local)
-        day_end_utc = local_to_utc(day_start_local + timedelta(days=1))
-
-        pilot = ann.pilot
-        same_day_record = BattleRecord.objects.filter(pilot=pilot, start_time__gte=day_start_utc, start_time__lt=day_end_utc).first()
-
-        if same_day_record is not None:
-            continue
-
-        overdue_delta = now_utc - deadline_utc
-        overdue_hours = floor(max(0, overdue_delta.total_seconds()) / 3600)
-
-        owner_display = ''
-        try:
-            if getattr(pilot, 'owner', None):
-                owner_display = getattr(pilot.owner, 'nickname', None) or getattr(pilot.owner, 'username', '')
-        except Exception:
-            owner_display = ''
-
-        rank_display = ''
-        try:
-            rank_display = pilot.rank.value if getattr(pilot, 'rank', None) else ''
-        except Exception:
-            rank_display = ''
-
-        region = f"{getattr(ann, 'x_coord', '')}-{getattr(ann, 'y_coord', '')}-{getattr(ann, 'z_coord', '')}"
-
-        item = {
-            'pilot_name': getattr(pilot, 'nickname', ''),
-            'owner_rank': f"{owner_display}-{rank_display}".strip('-'),
-            'region': region,
-            'start_local': start_local.strftime('%Y-%m-%d %H:%M'),
-            'plan_duration_hours': f"{getattr(ann, 'duration_hours', 0):.1f}",
-            'overdue_hours': overdue_hours,
-            'note': '请确认是否漏填开播记录'
-        }
-
-        if sample_logged < 5:
-            logger.debug('未开播样例：%s', item)
-            sample_logged += 1
-
-        unstarted_items.append(item)
+    unstarted_items = find_unstarted_announcements(now_utc)
+    for item in unstarted_items[:5]:
+        logger.debug('未开播样例：%s', item)
 
     recipients = User.get_emails_by_role(role_name=None, only_active=True)
     subject_ts = utc_to_local(now_utc).strftime('%Y-%m-%d %H:%M')
@@ -756,67 +699,11 @@ def run_online_pilot_unstarted_report_job(triggered_by: str = 'scheduler') -> di
     logger.debug('检查窗口：%s 至 %s（本地）', check_start_local.strftime('%Y-%m-%d'), check_end_local.strftime('%Y-%m-%d'))
     logger.debug('检查日：%s（本地）', check_day_local.strftime('%Y-%m-%d'))
 
-    # 查询在检查窗口内有过线上开播记录的主播
-    from models.pilot import WorkMode
-    online_records_in_window = BattleRecord.objects.filter(start_time__gte=check_start_utc, start_time__lt=check_end_utc,
-                                                           work_mode=WorkMode.ONLINE).distinct('pilot')
-
-    logger.debug('检查窗口内有线上开播记录的主播数量：%d', len(online_records_in_window))
-
-    unstarted_online_pilots: List[dict] = []
-    sample_logged = 0
-
-    for pilot in online_records_in_window:
-        # 检查该主播在检查日是否有开播记录（不限线上/线下）
-        records_on_check_day = BattleRecord.objects.filter(pilot=pilot, start_time__gte=check_day_start_utc, start_time__lt=check_day_end_utc).first()
-
-        if records_on_check_day is not None:
-            # 检查日有开播记录，跳过
-            continue
-
-        # 检查日无开播记录，需要提醒
-        # 查询该主播最近的一次开播记录
-        latest_record = BattleRecord.objects.filter(pilot=pilot).order_by('-start_time').first()
-
-        if latest_record:
-            latest_date_local = utc_to_local(latest_record.start_time)
-            latest_date_str = latest_date_local.strftime('%Y-%m-%d')
-        else:
-            latest_date_str = '无记录'
-
-        # 获取主播信息
-        owner_display = ''
-        try:
-            if getattr(pilot, 'owner', None):
-                owner_display = getattr(pilot.owner, 'nickname', None) or getattr(pilot.owner, 'username', '')
-        except Exception:
-            owner_display = ''
-
-        rank_display = ''
-        try:
-            rank_display = pilot.rank.value if getattr(pilot, 'rank', None) else ''
-        except Exception:
-            rank_display = ''
-
-        # 统计最近3天线上开播次数
-        recent_online_count = BattleRecord.objects.filter(pilot=pilot, start_time__gte=check_start_utc, start_time__lt=check_end_utc,
-                                                          work_mode=WorkMode.ONLINE).count()
-
-        item = {
-            'pilot_name': getattr(pilot, 'nickname', ''),
-            'real_name': getattr(pilot, 'real_name', ''),
-            'owner_rank': f"{owner_display}-{rank_display}".strip('-'),
-            'latest_date': latest_date_str,
-            'recent_online_count': recent_online_count,
-            'check_day': check_day_local.strftime('%Y-%m-%d'),
-            'note': f'{check_day_local.strftime("%m月%d日")}未登记开播记录，请确认是否漏记'
-        }
-
-        if sample_logged < 5:
-            logger.debug('线上主播未开播样例：%s', item)
-            sample_logged += 1
-
-        unstarted_online_pilots.append(item)
+    # 检查窗口内有过线上开播记录、且检查日（不限线上/线下）无开播记录的主播
+    unstarted_online_pilots = find_unstarted_online_pilots(check_start_utc, check_end_utc, check_day_start_utc, check_day_end_utc,
+                                                           check_day_local.strftime('%Y-%m-%d'))
+    for item in unstarted_online_pilots[:5]:
+        logger.debug('线上主播未开播样例：%s', item)
 
     recipients = []
     recipients.extend(User.get_emails_by_role(role_name='gicho', only_active=True))  # 管理员
@@ -16,6 +16,7 @@ from flask import Flask
 
 from app import create_app
 from models.battle_record import BattleRecord
+from utils.reference_prefetch import prefetch_references
 from utils.timezone_helper import local_to_utc, utc_to_local
 
 
@@ -48,7 +49,8 @@ def export_battle_records():
     print(f"UTC时间范围：{start_utc} - {end_utc}")
 
     # 查询开播记录
-    records = BattleRecord.objects(start_time__gte=start_utc, start_time__lte=end_utc).order_by('-start_time')
+    records = list(BattleRecord.objects(start_time__gte=start_utc, start_time__lte=end_utc).order_by('-start_time'))
+    prefetch_references(records, 'pilot', 'owner_snapshot', 'registered_by')
 
     print(f"找到 {len(records)} 条开播记录")
 
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""重建BBS全文检索索引脚本
+
+根据全部主贴与回复重建 bbs_search_entries 检索条目，并清理已失效的条目。
+首次部署检索功能或怀疑增量维护出现偏差时执行；未建立条目的历史帖子在此之前无法被检索到。
+
+运行：
+  PYTHONPATH=. venv/bin/python scripts/rebuild_bbs_search_index.py
+"""
+
+from dotenv import load_dotenv
+
+from app import create_app
+from utils.bbs_search import rebuild_bbs_search_index
+
+
+def main():
+    """主函数"""
+    load_dotenv()
+    app = create_app()
+
+    with app.app_context():
+        try:
+            result = rebuild_bbs_search_index()
+        except Exception as e:
+            print(f"\n❌ 重建失败：{e}")
+            raise
+
+    print(f"✅ 重建完成！主贴 {result['post_count']} 个，回复 {result['reply_count']} 条，清理失效条目 {result['removed_count']} 条")
+
+
+if __name__ == '__main__':
+    main()
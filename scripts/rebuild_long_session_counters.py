@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""回填主播长时开播计数器脚本
+
+根据全部开播记录，重算每个主播的 long_session_count（播时≥6小时的开播记录数）与 full_7_days_at。
+首次部署计数器或怀疑增量维护出现偏差时执行；未回填的主播会在招募月报首次读取时即时补算。
+
+运行：
+  PYTHONPATH=. venv/bin/python scripts/rebuild_long_session_counters.py
+"""
+
+from dotenv import load_dotenv
+
+from app import create_app
+from utils.long_session_counters import rebuild_long_session_counters
+
+
+def main():
+    """主函数"""
+    load_dotenv()
+    app = create_app()
+
+    with app.app_context():
+        try:
+            result = rebuild_long_session_counters()
+        except Exception as e:
+            print(f"\n❌ 回填失败：{e}")
+            raise
+
+    print(f"✅ 回填完成！主播 {result['pilot_count']} 个，开播记录 {result['record_count']} 条，满7天 {result['full_7_days_count']} 个")
+
+
+if __name__ == '__main__':
+    main()
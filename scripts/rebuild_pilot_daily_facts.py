@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""重建主播日级事实表脚本
+
+根据全部开播记录、已发放底薪申请与分成调整记录，全量重建 pilot_daily_facts 集合。
+首次部署事实表或怀疑增量维护出现偏差时执行；重建完成前报表自动回退为扫描原始开播记录。
+
+运行：
+  PYTHONPATH=. venv/bin/python scripts/rebuild_pilot_daily_facts.py
+"""
+
+from dotenv import load_dotenv
+
+from app import create_app
+from utils.pilot_daily_facts import rebuild_pilot_daily_facts
+
+
+def main():
+    """主函数"""
+    load_dotenv()
+    app = create_app()
+
+    with app.app_context():
+        try:
+            result = rebuild_pilot_daily_facts()
+        except Exception as e:
+            print(f"\n❌ 重建失败：{e}")
+            raise
+
+    print(f"✅ 重建完成！开播记录 {result['record_count']} 条，事实行 {result['fact_count']} 行，"
+          f"跳过 {result['skipped_count']} 行（以增量刷新为准），清理过期行 {result['removed_count']} 行")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""重建主播名称检索索引脚本
+
+根据全部主播与招募记录重建 pilot_name_index 名称条目，并清理已失效的条目。
+首次部署名称索引或怀疑增量维护出现偏差时执行；未建立条目的主播在此之前无法被名称搜索与联想命中。
+
+运行：
+  PYTHONPATH=. venv/bin/python scripts/rebuild_pilot_name_index.py
+"""
+
+from dotenv import load_dotenv
+
+from app import create_app
+from utils.pilot_name_search import rebuild_pilot_name_index
+
+
+def main():
+    """主函数"""
+    load_dotenv()
+    app = create_app()
+
+    with app.app_context():
+        try:
+            result = rebuild_pilot_name_index()
+        except Exception as e:
+            print(f"\n❌ 重建失败：{e}")
+            raise
+
+    print(f"✅ 重建完成！主播 {result['pilot_count']} 个，招募 {result['recruit_count']} 条，清理失效条目 {result['removed_count']} 条")
+
+
+if __name__ == '__main__':
+    main()
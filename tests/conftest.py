@@ -8,6 +8,8 @@ import pytest
 from dotenv import load_dotenv
 from pymongo import MongoClient
 
+from tests.fixtures.query_counter import install as install_query_counter
+
 # 加载环境变量
 load_dotenv()
 
@@ -15,6 +17,9 @@ load_dotenv()
 os.environ['FLASK_ENV'] = 'testing'
 os.environ['TESTING'] = 'True'
 
+# 在应用创建 MongoClient 之前注册查询计数监听器
+install_query_counter()
+
 
 @pytest.fixture(scope='session')
 def test_db_name():
@@ -90,6 +95,14 @@ def base_url():
     return os.getenv('TEST_BASE_URL', 'http://localhost:5080')
 
 
+@pytest.fixture(scope='function')
+def query_counter():
+    """数据库读命令计数器（按线程统计，Flask test_client 在当前线程内处理请求）"""
+    from tests.fixtures.query_counter import query_counter as counter
+    counter.reset()
+    return counter
+
+
 @pytest.fixture(scope='function')
 def client(app):
     """Flask测试客户端"""
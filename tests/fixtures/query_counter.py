@@ -0,0 +1,61 @@
+"""
+数据库查询计数器
+
+通过 pymongo 命令监听统计当前线程发出的读命令数量，用于断言接口的查询次数有上限、
+不随返回行数增长（防止 N+1 解引用回归）。
+
+注意：监听器需在创建 MongoClient 之前注册，因此在 conftest 导入时即调用 install()。
+"""
+import threading
+from contextlib import contextmanager
+
+from pymongo import monitoring
+
+READ_COMMANDS = {'find', 'aggregate', 'count', 'distinct', 'getMore'}
+
+
+class QueryCounter(monitoring.CommandListener):
+    """按线程统计读命令次数"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    @property
+    def count(self) -> int:
+        return getattr(self._local, 'count', 0)
+
+    def reset(self):
+        self._local.count = 0
+
+    def started(self, event):
+        if event.command_name in READ_COMMANDS:
+            self._local.count = self.count + 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    @contextmanager
+    def measure(self):
+        """统计代码块内的读命令次数：with counter.measure() as result: ...; result['count']"""
+        result = {'count': 0}
+        start = self.count
+        try:
+            yield result
+        finally:
+            result['count'] = self.count - start
+
+
+query_counter = QueryCounter()
+_installed = False
+
+
+def install():
+    """全局注册查询计数器（重复调用无副作用）"""
+    global _installed  # pylint: disable=global-statement
+    if not _installed:
+        monitoring.register(query_counter)
+        _installed = True
+    return query_counter
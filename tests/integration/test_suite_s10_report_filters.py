@@ -13,6 +13,36 @@
 import pytest
 from datetime import datetime
 
+from tests.fixtures.factories import pilot_factory
+
+
+def _create_battle_record(admin_client, pilot_id, start, end, work_mode, revenue, notes):
+    """通过 REST API 创建开播记录（start/end 为 GMT+8 本地时间），返回记录ID。"""
+    response = admin_client.post('/battle-records/api/battle-records', json={
+        'pilot': pilot_id,
+        'start_time': start,
+        'end_time': end,
+        'work_mode': work_mode,
+        'x_coord': 'A',
+        'y_coord': 'B',
+        'z_coord': '1',
+        'revenue_amount': revenue,
+        'base_salary': '0',
+        'notes': notes
+    })
+    assert response.get('success'), f"创建开播记录失败: {response.get('error')}"
+    return response['data']['id']
+
+
+def _approve_base_salary(admin_client, pilot_id, record_id, amount):
+    """为开播记录创建并审批通过底薪申请。"""
+    application = admin_client.post('/api/base-salary-applications', json={
+        'pilot_id': pilot_id, 'battle_record_id': record_id, 'settlement_type': 'daily_base', 'base_salary_amount': amount
+    })
+    assert application.get('success'), '创建底薪申请失败'
+    approval = admin_client.patch(f"/api/base-salary-applications/{application['data']['id']}/status", json={'status': 'approved'})
+    assert approval.get('success'), '底薪申请审批失败'
+
 
 @pytest.mark.suite("S10")
 @pytest.mark.report_filters
@@ -514,4 +544,494 @@ class TestS10ReportFilters:
         if 'success' in response_error:
             assert isinstance(response_error['success'], bool)
         if 'error' in response_error:
-            assert isinstance(response_error['error'], (str, dict))
\ No newline at end of file
+            assert isinstance(response_error['error'], (str, dict))
+
+    def test_s10_tc13_fast_daily_report_parity(self, admin_client):
+        """
+        S10-TC13 加速版日报与原日报一致性测试
+
+        步骤：创建两名主播，在报表日及前几日（跨月）写入线上/线下开播记录、已发放底薪与报表日前的分成调整
+        → 分别请求 /new-reports/api/daily 与 /new-reports-fast/api/daily → 对比各筛选条件下的汇总与明细
+        """
+        pilot_ids = []
+        for _ in range(2):
+            pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+            assert pilot_response.get('success'), '创建主播失败'
+            pilot_ids.append(pilot_response['data']['id'])
+        first_pilot, second_pilot = pilot_ids
+        record_ids = []
+
+        try:
+            for pilot_id, start, end, work_mode, revenue in (
+                (first_pilot, '2025-09-28T20:00:00', '2025-09-29T01:00:00', '线上', '90.00'),
+                (first_pilot, '2025-09-30T14:00:00', '2025-09-30T18:00:00', '线下', '150.00'),
+                (first_pilot, '2025-10-01T10:00:00', '2025-10-01T16:00:00', '线上', '320.50'),
+                (first_pilot, '2025-10-01T18:00:00', '2025-10-01T21:00:00', '线下', '75.00'),
+                (second_pilot, '2025-09-29T12:00:00', '2025-09-29T20:00:00', '线下', '260.00'),
+                (second_pilot, '2025-10-01T09:00:00', '2025-10-01T17:30:00', '线下', '480.00'),
+            ):
+                record_ids.append(_create_battle_record(admin_client, pilot_id, start, end, work_mode, revenue, 'S10-TC13'))
+            _approve_base_salary(admin_client, second_pilot, record_ids[-1], '150.00')
+            commission = admin_client.post(f'/api/pilots/{second_pilot}/commission/records', json={'adjustment_date': '2025-09-30', 'commission_rate': 30, 'remark': 'S10-TC13'})
+            assert commission.get('success'), '创建分成调整失败'
+
+            for mode in ('all', 'online', 'offline'):
+                params = {'date': '2025-10-01', 'mode': mode}
+                response_base = admin_client.get('/new-reports/api/daily', params=params)
+                response_fast = admin_client.get('/new-reports-fast/api/daily', params=params)
+
+                assert response_base['success'] is True
+                assert response_fast['success'] is True
+                seeded = [item for item in response_base['data']['details'] if item.get('pilot_id') in pilot_ids]
+                assert seeded, f"mode={mode} 基线日报未包含测试主播"
+                assert response_fast['data']['summary'] == response_base['data']['summary'], f"mode={mode} 汇总不一致"
+                assert response_fast['data']['details'] == response_base['data']['details'], f"mode={mode} 明细不一致"
+                assert response_fast['data']['pagination'] == response_base['data']['pagination']
+        finally:
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+
+    def test_s10_tc14_report_cache_invalidated_by_battle_record_writes(self, admin_client):
+        """
+        S10-TC14 报表缓存按写入事件失效测试
+
+        步骤：创建主播与开播记录 → 请求周报/加速版月报（写入缓存）→ 新增/删除开播记录 → 再次请求，验证结果随写入更新
+        """
+        pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+        assert pilot_response.get('success'), '创建主播失败'
+        pilot_id = pilot_response['data']['id']
+        record_ids = []
+
+        def create_record(day, revenue):
+            response = admin_client.post('/battle-records/api/battle-records', json={
+                'pilot': pilot_id,
+                'start_time': f'{day}T10:00:00',
+                'end_time': f'{day}T16:00:00',
+                'work_mode': '线上',
+                'x_coord': 'A',
+                'y_coord': 'B',
+                'z_coord': '1',
+                'revenue_amount': revenue,
+                'base_salary': '0',
+                'notes': 'S10-TC14'
+            })
+            assert response.get('success'), '创建开播记录失败'
+            record_ids.append(response['data']['id'])
+
+        def pilot_revenue():
+            weekly = admin_client.get('/new-reports/api/weekly', params={'week_start': '2025-09-09'})
+            monthly = admin_client.get('/new-reports-fast/api/monthly', params={'month': '2025-09'})
+            assert weekly['success'] is True
+            assert monthly['success'] is True
+            weekly_item = next((item for item in weekly['data']['details'] if item['pilot_id'] == pilot_id), None)
+            monthly_item = next((item for item in monthly['data']['details'] if item['pilot_id'] == pilot_id), None)
+            return (weekly_item['total_revenue'] if weekly_item else 0.0, monthly_item['total_revenue'] if monthly_item else 0.0)
+
+        try:
+            create_record('2025-09-10', '100.00')
+            assert pilot_revenue() == (100.0, 100.0)
+
+            create_record('2025-09-11', '200.00')
+            assert pilot_revenue() == (300.0, 300.0)
+
+            admin_client.delete(f'/battle-records/api/battle-records/{record_ids.pop()}')
+            assert pilot_revenue() == (100.0, 100.0)
+        finally:
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+
+    def test_s10_tc15_fast_monthly_aggregate_engine_parity(self, admin_client):
+        """
+        S10-TC15 加速版月报 aggregate 引擎与默认引擎一致性测试
+
+        步骤：创建已签约与未招募主播，写入跨 GMT+8 日界与 UTC/本地日期不一致的线上/线下开播记录（含月初、月末边界）、
+        已发放底薪与月中分成调整 → 分别以 engine=default 与 engine=aggregate 请求 /new-reports-fast/api/monthly
+        → 对比各筛选条件下的汇总、明细与日级序列
+        """
+        contracted_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data(rank='签约主播', status='已签约'))
+        assert contracted_response.get('success'), '创建主播失败'
+        other_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+        assert other_response.get('success'), '创建主播失败'
+        contracted_pilot = contracted_response['data']['id']
+        other_pilot = other_response['data']['id']
+        record_ids = []
+
+        try:
+            for pilot_id, start, end, work_mode, revenue in (
+                (contracted_pilot, '2025-09-01T06:00:00', '2025-09-01T09:00:00', '线上', '88.88'),  # UTC 仍为 8月31日
+                (contracted_pilot, '2025-09-10T23:00:00', '2025-09-11T02:00:00', '线上', '120.35'),  # 跨 GMT+8 日界，归属开始日
+                (contracted_pilot, '2025-09-11T07:30:00', '2025-09-11T10:00:00', '线下', '66.60'),  # UTC 为 9月10日
+                (contracted_pilot, '2025-09-14T14:00:00', '2025-09-14T20:00:00', '线下', '300.10'),  # 分成调整前
+                (contracted_pilot, '2025-09-16T14:00:00', '2025-09-16T20:00:00', '线下', '310.20'),  # 分成调整后
+                (contracted_pilot, '2025-09-30T23:00:00', '2025-10-01T01:00:00', '线上', '45.00'),  # 月末跨日，归属9月
+                (contracted_pilot, '2025-10-01T07:00:00', '2025-10-01T09:00:00', '线上', '999.00'),  # UTC 为 9月30日，不属于9月
+                (other_pilot, '2025-09-15T00:30:00', '2025-09-15T08:30:00', '线下', '250.05'),  # UTC 为 9月14日
+                (other_pilot, '2025-09-20T10:00:00', '2025-09-20T10:40:00', '线上', '12.34'),  # 不足1小时
+            ):
+                record_ids.append(_create_battle_record(admin_client, pilot_id, start, end, work_mode, revenue, 'S10-TC15'))
+            _approve_base_salary(admin_client, contracted_pilot, record_ids[4], '150.00')
+            _approve_base_salary(admin_client, other_pilot, record_ids[7], '120.00')
+            commission = admin_client.post(f'/api/pilots/{contracted_pilot}/commission/records', json={'adjustment_date': '2025-09-15', 'commission_rate': 30, 'remark': 'S10-TC15'})
+            assert commission.get('success'), '创建分成调整失败'
+
+            for mode in ('all', 'online', 'offline'):
+                for status in ('all', 'contracted'):
+                    params = {'month': '2025-09', 'mode': mode, 'status': status}
+                    response_default = admin_client.get('/new-reports-fast/api/monthly', params={**params, 'engine': 'default'})
+                    response_aggregate = admin_client.get('/new-reports-fast/api/monthly', params={**params, 'engine': 'aggregate'})
+
+                    assert response_default['success'] is True
+                    assert response_aggregate['success'] is True
+                    assert response_aggregate['meta']['filters']['engine'] == 'aggregate'
+                    seeded = {item['pilot_id'] for item in response_default['data']['details']} & {contracted_pilot, other_pilot}
+                    assert seeded == ({contracted_pilot} if status == 'contracted' else {contracted_pilot, other_pilot}), f"mode={mode} status={status} 测试主播缺失"
+                    for key in ('summary', 'details', 'daily_series'):
+                        assert response_aggregate['data'][key] == response_default['data'][key], f"mode={mode} status={status} {key} 不一致"
+        finally:
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+
+    def test_s10_tc16_pilot_daily_facts_rebuild_parity(self, app, admin_client):
+        """
+        S10-TC16 日级事实表增量维护、全量重建与原始记录口径一致性测试
+
+        步骤：创建主播、线上/线下及跨 GMT+8 日界的开播记录、已发放底薪与月中分成调整（写入时增量维护事实行）
+        → 按原始记录逐条汇总（基线）对比事实行 → 全量重建后再次对比 → 核对加速版月报明细读取事实表的结果
+        """
+        from decimal import Decimal
+
+        from bson import ObjectId
+
+        from models.battle_record import BaseSalaryApplication, BaseSalaryApplicationStatus, BattleRecord
+        from utils.commission_helper import calculate_commission_amounts, get_pilot_commission_rate_for_date
+        from utils.pilot_daily_facts import load_pilot_daily_fact_rows, rebuild_pilot_daily_facts
+        from utils.timezone_helper import utc_to_local
+
+        pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+        assert pilot_response.get('success'), '创建主播失败'
+        pilot_id = pilot_response['data']['id']
+        record_ids = []
+
+        def create_record(start, end, work_mode, revenue):
+            record_ids.append(_create_battle_record(admin_client, pilot_id, start, end, work_mode, revenue, 'S10-TC16'))
+            return record_ids[-1]
+
+        def quantize(value):
+            return Decimal(str(value)).quantize(Decimal('0.01'))
+
+        def normalize(rows):
+            return {(row['local_date'], row['work_mode'].value): (row['record_count'], round(row['duration_hours'], 1), quantize(row['revenue']),
+                                                                  quantize(row['base_salary']), float(row['commission_rate']), quantize(row['pilot_share']),
+                                                                  quantize(row['company_share']))
+                    for row in rows}
+
+        def baseline_rows():
+            records = list(BattleRecord.objects(pilot=ObjectId(pilot_id)))
+            approved = BaseSalaryApplication.objects(status=BaseSalaryApplicationStatus.APPROVED, battle_record_id__in=[record.id for record in records])
+            base_salary = {str(application.battle_record_id.id): Decimal(application.base_salary_amount) for application in approved}
+            rows = {}
+            for record in records:
+                local_day = utc_to_local(record.start_time).date()
+                rate = get_pilot_commission_rate_for_date(pilot_id, local_day)[0]
+                amounts = calculate_commission_amounts(record.revenue_amount, rate)
+                row = rows.setdefault((local_day, record.work_mode), {
+                    'local_date': local_day, 'work_mode': record.work_mode, 'record_count': 0, 'duration_hours': 0.0, 'revenue': Decimal('0'),
+                    'base_salary': Decimal('0'), 'commission_rate': rate, 'pilot_share': Decimal('0'), 'company_share': Decimal('0')
+                })
+                row['record_count'] += 1
+                row['duration_hours'] += float(record.duration_hours or 0.0)
+                row['revenue'] += Decimal(record.revenue_amount)
+                row['base_salary'] += base_salary.get(str(record.id), Decimal('0'))
+                row['pilot_share'] += amounts['pilot_amount']
+                row['company_share'] += amounts['company_amount']
+            return normalize(rows.values())
+
+        def fact_rows():
+            return normalize(load_pilot_daily_fact_rows(datetime(2025, 8, 1).date(), datetime(2025, 8, 31).date(), [ObjectId(pilot_id)]))
+
+        try:
+            create_record('2025-08-05T10:00:00', '2025-08-05T16:00:00', '线上', '100.50')
+            create_record('2025-08-05T18:00:00', '2025-08-05T20:30:00', '线下', '80.00')
+            create_record('2025-08-20T23:30:00', '2025-08-21T01:30:00', '线上', '60.00')  # 跨 GMT+8 日界，归属开始日
+            salary_record_id = create_record('2025-08-25T09:00:00', '2025-08-25T15:00:00', '线下', '200.00')
+
+            _approve_base_salary(admin_client, pilot_id, salary_record_id, '120.00')
+
+            commission = admin_client.post(f'/api/pilots/{pilot_id}/commission/records', json={'adjustment_date': '2025-08-15', 'commission_rate': 30, 'remark': 'S10-TC16'})
+            assert commission.get('success'), '创建分成调整失败'
+
+            with app.app_context():
+                expected = baseline_rows()
+                assert len(expected) == 4
+                assert fact_rows() == expected, '增量维护的事实行与原始记录口径不一致'
+
+                rebuild_pilot_daily_facts()
+                assert fact_rows() == expected, '全量重建的事实行与原始记录口径不一致'
+
+            monthly = admin_client.get('/new-reports-fast/api/monthly', params={'month': '2025-08'})
+            assert monthly['success'] is True
+            item = next(item for item in monthly['data']['details'] if item['pilot_id'] == pilot_id)
+            assert item['records_count'] == 4
+            assert item['total_revenue'] == pytest.approx(float(sum(values[2] for values in expected.values())))
+            assert item['total_base_salary'] == pytest.approx(120.0)
+            assert item['total_pilot_share'] == pytest.approx(float(sum(values[5] for values in expected.values())), abs=0.01)
+            assert item['total_company_share'] == pytest.approx(float(sum(values[6] for values in expected.values())), abs=0.01)
+        finally:
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+
+    def test_s10_tc17_report_cache_value_codec_round_trip(self):
+        """
+        S10-TC17 报表缓存值序列化往返测试
+
+        步骤：构造包含 Decimal、日期、时间、tuple（含嵌套）、frozenset 的报表结果 → 编码后解码 → 类型与取值保持一致
+        """
+        from datetime import date
+        from decimal import Decimal
+
+        from utils.cache_backends import decode_cache_value, encode_cache_value
+
+        value = (1700000000.5, {
+            'summary': {'revenue': Decimal('1234.56'), 'share': Decimal('0.000001'), 'count': 3, 'ratio': 0.25, 'note': '线上'},
+            'date': date(2025, 10, 1),
+            'computed_at': datetime(2025, 10, 1, 16, 30, 15, 123000),
+            'pairs': [('2025-10-01', Decimal('1.10')), ('2025-10-02', (1, 2))],
+            'pilot_ids': frozenset({'a', 'b'}),
+            'empty': None,
+        })
+
+        decoded = decode_cache_value(encode_cache_value(value))
+
+        assert decoded == value
+        assert isinstance(decoded, tuple)
+        assert isinstance(decoded[1]['summary']['revenue'], Decimal)
+        assert type(decoded[1]['date']) is date  # pylint: disable=unidiomatic-typecheck
+        assert isinstance(decoded[1]['computed_at'], datetime)
+        assert isinstance(decoded[1]['pairs'], list)
+        assert all(isinstance(pair, tuple) for pair in decoded[1]['pairs'])
+        assert isinstance(decoded[1]['pairs'][1][1], tuple)
+        assert isinstance(decoded[1]['pilot_ids'], frozenset)
+
+    def test_s10_tc18_report_cache_file_backend(self, tmp_path):
+        """
+        S10-TC18 报表缓存文件后端读写、淘汰与容量测试
+
+        步骤：在临时目录创建文件后端 → 写入带范围的条目并读回 → 按失效事件淘汰受影响条目
+        → 超出容量时删除最早写入的条目 → 过期条目读取时丢弃
+        """
+        import os
+        import time
+        from datetime import date
+        from decimal import Decimal
+
+        from utils.cache_backends import FileCacheBackend
+        from utils.cache_helper import _scope_affected, build_cache_scope, build_invalidation_event
+
+        backend = FileCacheBackend('monthly_report', 3, 60, str(tmp_path))
+        september = build_cache_scope(date(2025, 9, 1), date(2025, 10, 1), pilot_ids=['p1'])
+        october = build_cache_scope(date(2025, 10, 1), date(2025, 11, 1), pilot_ids=['p2'])
+
+        backend.set('september', september, {'total': Decimal('10.50')})
+        backend.set('october', october, {'total': Decimal('20.00')})
+        scope, value = backend.get('september')
+        assert value == {'total': Decimal('10.50')}
+        assert scope == september
+        assert backend.get('missing') is None
+        assert backend.info()['cache_size'] == 2
+
+        evicted = backend.evict(build_invalidation_event('record', 'p1', date(2025, 9, 15), date(2025, 9, 16)), _scope_affected)
+        assert evicted == 1
+        assert backend.get('september') is None
+        assert backend.get('october') is not None
+
+        now = time.time()
+        os.utime(backend._path('october'), (now - 10, now - 10))  # pylint: disable=protected-access
+        for index, key in enumerate(('first', 'second', 'third')):
+            backend.set(key, None, index)
+            os.utime(backend._path(key), (now + index, now + index))  # pylint: disable=protected-access
+        assert backend.info()['cache_size'] == 3
+        assert backend.get('october') is None, '超出容量时应删除最早写入的条目'
+        assert [backend.get(key)[1] for key in ('first', 'second', 'third')] == [0, 1, 2]
+
+        expired = FileCacheBackend('monthly_report', 3, 0, str(tmp_path))
+        expired.set('stale', None, 'value')
+        assert expired.get('stale') is None
+        assert not os.path.exists(expired._path('stale'))  # pylint: disable=protected-access
+
+        backend.clear()
+        assert backend.info()['cache_size'] == 0
+
+    def test_s10_tc19_report_cache_mongo_event_query_parity(self, app):
+        """
+        S10-TC19 报表缓存 mongo 后端失效查询与范围判定一致性测试
+
+        步骤：以各种依赖范围（不限/日期区间/运营筛选/主播集合/主播属性筛选）写入 mongo 后端条目
+        → 对各类失效事件分别用 _event_query 查询集合 → 命中条目与 _scope_affected 逐条判定结果一致
+        """
+        import uuid
+        from datetime import date
+        from itertools import product
+
+        from utils.cache_backends import MongoCacheBackend
+        from utils.cache_helper import _scope_affected, build_cache_scope, build_invalidation_event
+
+        ranges = [(None, None), (date(2025, 9, 1), date(2025, 10, 1)), (date(2025, 10, 1), None), (None, date(2025, 9, 1))]
+        owners = [None, 'owner-a', 'owner-b']
+        pilot_sets = [None, [], ['p1'], ['p2', 'p3']]
+        scopes = {'unknown': None}
+        for index, ((start, end), owner_id, pilot_ids, pilot_filtered) in enumerate(product(ranges, owners, pilot_sets, (False, True))):
+            scopes[f'scope-{index}'] = build_cache_scope(start, end, owner_id, pilot_ids, pilot_filtered)
+
+        event_ranges = [(None, None), (date(2025, 9, 30), date(2025, 10, 1)), (date(2025, 10, 1), date(2025, 10, 2)), (date(2025, 8, 31), date(2025, 9, 1)),
+                        (date(2025, 9, 15), None), (None, date(2025, 9, 1))]
+        events = [
+            build_invalidation_event(kind, pilot_id, start, end, owner_ids)
+            for kind, pilot_id, (start, end), owner_ids in product(('record', 'data', 'pilot'), (None, 'p1', 'p4'), event_ranges, ((), ('owner-a',)))
+        ]
+
+        with app.app_context():
+            backend = MongoCacheBackend(f'test_{uuid.uuid4().hex[:8]}', 1000, 600)
+            try:
+                for key, scope in scopes.items():
+                    backend.set(key, scope, key)
+                collection = backend._collection()  # pylint: disable=protected-access
+                for event in events:
+                    matched = {doc['key'] for doc in collection.find(backend._event_query(event), {'key': 1})}  # pylint: disable=protected-access
+                    expected = {key for key, scope in scopes.items() if _scope_affected(scope, event)}
+                    assert matched == expected, f"事件 {event} 的查询结果与范围判定不一致"
+            finally:
+                backend.clear()
+
+    def test_s10_tc20_report_cache_single_flight(self, app):
+        """
+        S10-TC20 报表缓存同键单次计算测试
+
+        步骤：多个线程并发请求同一未缓存的报表 → 只计算一次，其余线程等待并返回同一结果 → 不同参数各自计算
+        """
+        import threading
+        import uuid
+
+        from utils.cache_helper import cached_daily_report
+
+        token = uuid.uuid4().hex
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        @cached_daily_report()
+        def s10_tc20_report(key, value):
+            calls.append(value)
+            started.set()
+            assert release.wait(10)
+            return {'key': key, 'value': value}
+
+        with app.app_context():
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(s10_tc20_report(token, 1))) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            assert started.wait(10)
+            release.set()
+            for thread in threads:
+                thread.join(10)
+
+            assert calls == [1], '同一缓存键并发请求应只计算一次'
+            assert results == [{'key': token, 'value': 1}] * 8
+            assert s10_tc20_report(token, 2) == {'key': token, 'value': 2}
+            assert calls == [1, 2]
+
+    def test_s10_tc21_report_cache_stale_while_revalidate(self, app, monkeypatch):
+        """
+        S10-TC21 报表缓存过新鲜期后先返回旧结果并后台刷新测试
+
+        步骤：新鲜期设为0后写入条目 → 再次读取立即返回旧结果并只安排一次后台刷新（刷新期间的并发读取不重复安排）
+        → 刷新完成后读取到新结果
+        """
+        import threading
+        import uuid
+
+        from utils import cache_helper
+        from utils.cache_helper import cached_daily_report
+
+        maxsize, _, stale_ttl = cache_helper.REPORT_CACHE_SPECS['daily_report']
+        monkeypatch.setitem(cache_helper.REPORT_CACHE_SPECS, 'daily_report', (maxsize, 0, stale_ttl))
+
+        token = uuid.uuid4().hex
+        refreshing = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        @cached_daily_report()
+        def s10_tc21_report(key):
+            calls.append(key)
+            if len(calls) > 1:
+                refreshing.set()
+                assert release.wait(10)
+            return len(calls)
+
+        with app.app_context():
+            assert s10_tc21_report(token) == 1
+
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(s10_tc21_report(token))) for _ in range(5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join(10)
+            assert results == [1] * 5, '过新鲜期的条目应立即返回旧结果'
+            assert refreshing.wait(10), '应在后台刷新过新鲜期的条目'
+            assert len(calls) == 2, '同一缓存键只安排一次后台刷新'
+
+            release.set()
+            lock = cache_helper._flight_lock(cache_helper.generate_cache_key('s10_tc21_report', token))  # pylint: disable=protected-access
+            assert lock.acquire(timeout=10)
+            lock.release()
+            assert s10_tc21_report(token) == 2
+
+    def test_s10_tc22_report_computed_before_fact_refresh_not_cached(self, app, admin_client, monkeypatch):
+        """
+        S10-TC22 开播记录保存后、事实行刷新前计算的报表不写回缓存测试
+
+        步骤：全量重建事实表（报表读取事实行）→ 写入第一条开播记录 → 写入第二条开播记录，
+        在其保存之后、事实行刷新之前请求加速版月报（读到旧事实行）→ 写入完成后再次请求，验证结果包含第二条记录
+        """
+        import threading
+
+        from utils import report_cache_events
+        from utils.pilot_daily_facts import rebuild_pilot_daily_facts
+
+        pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+        assert pilot_response.get('success'), '创建主播失败'
+        pilot_id = pilot_response['data']['id']
+        record_ids = []
+
+        def pilot_revenue():
+            monthly = admin_client.get('/new-reports-fast/api/monthly', params={'month': '2025-06'})
+            assert monthly['success'] is True
+            item = next((item for item in monthly['data']['details'] if item['pilot_id'] == pilot_id), None)
+            return item['total_revenue'] if item else 0.0
+
+        refresh_facts = report_cache_events.refresh_facts_for_battle_record
+        revenue_before_refresh = []
+
+        def refresh_after_report(record, *args, **kwargs):
+            if str(record.id) not in record_ids and not revenue_before_refresh:
+                # 另一个请求（独立线程，不共用当前请求上下文）在事实行刷新前完成月报计算
+                reader = threading.Thread(target=lambda: revenue_before_refresh.append(pilot_revenue()))
+                reader.start()
+                reader.join(30)
+            refresh_facts(record, *args, **kwargs)
+
+        try:
+            with app.app_context():
+                rebuild_pilot_daily_facts()
+            record_ids.append(_create_battle_record(admin_client, pilot_id, '2025-06-10T10:00:00', '2025-06-10T16:00:00', '线上', '100.00', 'S10-TC22'))
+
+            monkeypatch.setattr(report_cache_events, 'refresh_facts_for_battle_record', refresh_after_report)
+            record_ids.append(_create_battle_record(admin_client, pilot_id, '2025-06-11T10:00:00', '2025-06-11T16:00:00', '线上', '200.00', 'S10-TC22'))
+            assert revenue_before_refresh == [100.0], '事实行刷新前计算的月报应只包含第一条记录'
+            assert pilot_revenue() == 300.0, '事实行刷新前计算的月报被写回缓存'
+        finally:
+            monkeypatch.undo()
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
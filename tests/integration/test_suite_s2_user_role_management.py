@@ -580,3 +580,34 @@ class TestS2UserRoleManagement:
                     admin_client.delete(f'/api/users/{test_user_id}')
                 except Exception:  # pylint: disable=broad-except
                     pass
+
+    def test_s2_tc10_identity_cache_invalidated_by_user_writes(self, admin_client, kancho_client, query_counter):
+        """
+        S2-TC10 JWT 身份缓存
+
+        步骤：运营访问接口（预热身份缓存）→ 再次访问统计读命令 → 管理员停用该运营 → 运营再次访问 → 重新激活后访问。
+
+        断言：缓存命中时鉴权最多读一次用户；停用/激活立即生效，不等缓存过期。
+        """
+        user_id = kancho_client.get('/api/auth/me')['data']['user']['id']
+
+        warm_response = kancho_client.get('/api/pilots/options')
+        assert warm_response['success'] is True
+
+        with query_counter.measure() as result:
+            cached_response = kancho_client.get('/api/pilots/options')
+        assert cached_response['success'] is True
+        assert result['count'] <= 1, f'身份缓存命中时读命令过多：{result["count"]}'
+
+        deactivate_response = admin_client.patch(f'/api/users/{user_id}/activation', json={'active': False})
+        assert deactivate_response['success'] is True
+
+        disabled_response = kancho_client.get('/api/pilots/options')
+        assert disabled_response.get('success') is not True
+        assert disabled_response['error']['code'] == 'ACCOUNT_DISABLED'
+
+        activate_response = admin_client.patch(f'/api/users/{user_id}/activation', json={'active': True})
+        assert activate_response['success'] is True
+
+        restored_response = kancho_client.get('/api/pilots/options')
+        assert restored_response['success'] is True
@@ -537,3 +537,116 @@ class TestS3RecruitmentPipeline:
             expected_total = ((summary.get('last_14_days') or {}).get(key))
             if expected_total is not None:
                 assert prev == expected_total, f"{key} 累计末值应等于近14日统计"
+
+    def test_s3_tc9_recruit_daily_summary_matches_detail_counts(self, admin_client):
+        """
+        S3-TC9 招募日报汇总与详情口径一致
+
+        汇总由按日分桶的单次聚合推导；约面/到面/试播在报表日、近7日、近14日的数量应与详情列表条数一致。
+        """
+        summary_response = admin_client.get('/api/recruit-reports/daily', params={'view': 'summary'})
+        assert summary_response.get('success') is True, f"接口返回失败: {summary_response}"
+        summary = summary_response['data'].get('summary') or {}
+
+        for range_param in ['report_day', 'last_7_days', 'last_14_days']:
+            for metric in ['appointments', 'interviews', 'trials']:
+                detail_response = admin_client.get('/api/recruit-reports/daily', params={'view': 'detail', 'range': range_param, 'metric': metric})
+                assert detail_response.get('success') is True, f"详情接口返回失败: {detail_response}"
+                assert detail_response['data']['count'] == summary[range_param][metric], f"{range_param}/{metric} 汇总与详情数量不一致"
+
+    def test_s3_tc10_long_session_counters_follow_battle_record_writes(self, app, admin_client, kancho_client):  # pylint: disable=too-many-locals
+        """
+        S3-TC10 长时开播计数器随开播记录写入更新，满7天数与逐条扫描口径一致
+
+        步骤：两名主播各建招募 → 主播A写入7条≥6小时（含恰好6小时）与1条5.9小时的开播记录
+              → 改挂一条长时记录到主播B → 延长短记录 → 删除记录；
+              每一步核对主播文档的 long_session_count / full_7_days_at，
+              并将 calculate_full_7_days_recruits 与原实现（逐个主播扫描开播记录）的结果对比。
+        """
+        from mongoengine import Q
+
+        from models.battle_record import BattleRecord
+        from models.pilot import Pilot
+        from models.recruit import Recruit
+        from utils.recruit_stats import calculate_full_7_days_recruits
+        from utils.timezone_helper import get_current_utc_time, local_to_utc
+
+        def baseline_full_7_days(start_utc, end_utc, recruiter_id=None):
+            """原实现：逐个招募主播扫描全部开播记录。"""
+            query = Q(created_at__gte=start_utc, created_at__lt=end_utc)
+            if recruiter_id:
+                query &= Q(recruiter=recruiter_id)
+            count = 0
+            processed = set()
+            for recruit in Recruit.objects.filter(query):
+                if recruit.pilot and recruit.pilot.id not in processed:
+                    processed.add(recruit.pilot.id)
+                    long_sessions = sum(1 for record in BattleRecord.objects.filter(pilot=recruit.pilot) if record.duration_hours and record.duration_hours >= 6)
+                    if long_sessions >= 7:
+                        count += 1
+            return count
+
+        def create_record(pilot_id, start, end):
+            response = admin_client.post('/battle-records/api/battle-records', json={
+                'pilot': pilot_id,
+                'start_time': start,
+                'end_time': end,
+                'work_mode': '线下',
+                'x_coord': 'A',
+                'y_coord': 'B',
+                'z_coord': '1',
+                'revenue_amount': '100.00',
+                'base_salary': '0',
+                'notes': 'S3-TC10'
+            })
+            assert response.get('success'), f"创建开播记录失败: {response.get('error')}"
+            record_ids.append(response['data']['id'])
+            return response['data']['id']
+
+        pilot_ids = []
+        record_ids = []
+        kancho_id = kancho_client.get('/api/auth/me')['data']['user']['id']
+        window_start = get_current_utc_time() - timedelta(days=1)
+
+        try:
+            for _ in range(2):
+                pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+                assert pilot_response.get('success'), '创建主播失败'
+                pilot_ids.append(pilot_response['data']['id'])
+                recruit_response = admin_client.post('/api/recruits', json=recruit_factory.create_recruit_data(pilot_id=pilot_ids[-1], kancho_id=kancho_id))
+                assert recruit_response.get('success'), '创建招募失败'
+            pilot_a, pilot_b = pilot_ids
+
+            long_ids = [create_record(pilot_a, f'2025-07-0{day}T10:00:00', f'2025-07-0{day}T16:00:00') for day in range(1, 8)]
+            short_id = create_record(pilot_a, '2025-07-08T10:00:00', '2025-07-08T15:54:00')
+
+            def assert_state(expected_a, expected_b):
+                with app.app_context():
+                    raw = {str(doc['_id']): doc for doc in Pilot.objects(id__in=pilot_ids).only('long_session_count', 'full_7_days_at').as_pymongo()}
+                    for pilot_id, (count, full_local) in ((pilot_a, expected_a), (pilot_b, expected_b)):
+                        assert raw[pilot_id].get('long_session_count') == count
+                        assert raw[pilot_id].get('full_7_days_at') == (local_to_utc(full_local) if full_local else None)
+                    window_end = get_current_utc_time() + timedelta(days=1)
+                    for recruiter_id in (kancho_id, None):
+                        assert calculate_full_7_days_recruits(window_start, window_end, recruiter_id) == baseline_full_7_days(window_start, window_end, recruiter_id)
+                    assert calculate_full_7_days_recruits(window_start, window_end, kancho_id) == (1 if expected_a[0] >= 7 else 0) + (1 if expected_b[0] >= 7 else 0)
+
+            assert_state((7, datetime(2025, 7, 7, 10)), (0, None))
+
+            reassign = admin_client.put(f'/battle-records/api/battle-records/{long_ids[2]}', json={'pilot': pilot_b})
+            assert reassign.get('success'), f"改挂开播记录失败: {reassign.get('error')}"
+            assert_state((6, None), (1, None))
+
+            extend = admin_client.put(f'/battle-records/api/battle-records/{short_id}', json={'start_time': '2025-07-08T10:00:00', 'end_time': '2025-07-08T16:30:00'})
+            assert extend.get('success'), f"更新开播记录失败: {extend.get('error')}"
+            assert_state((7, datetime(2025, 7, 8, 10)), (1, None))
+
+            delete = admin_client.delete(f'/battle-records/api/battle-records/{long_ids[0]}')
+            assert delete.get('success'), '删除开播记录失败'
+            record_ids.remove(long_ids[0])
+            assert_state((6, None), (1, None))
+        finally:
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+            for pilot_id in pilot_ids:
+                admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
@@ -74,6 +74,47 @@ class TestS4PilotBroadcastSalary:
                 except Exception:  # pylint: disable=broad-except
                     pass
 
+    def test_s4_tc1b_pilot_list_cursor_pagination(self, admin_client):
+        """S4-TC1B 主播列表游标分页：逐页读取不重不漏，统计覆盖全部结果，无效游标返回400"""
+        token = uuid4().hex[:6]
+        created_ids = []
+        try:
+            for index in range(3):
+                pilot_data = pilot_factory.create_pilot_data(nickname=f'游标{token}{index}')
+                create_response = admin_client.post('/api/pilots', json=pilot_data)
+                assert create_response['success'] is True
+                created_ids.append(create_response['data']['id'])
+
+            first_page = admin_client.get('/api/pilots', params={'q': f'游标{token}', 'page_size': 2, 'cursor': '', 'count': 'exact'})
+            assert first_page['success'] is True
+            first_pagination = first_page['meta']['pagination']
+            assert len(first_page['data']['items']) == 2
+            assert first_pagination['total_items'] == 3
+            assert first_pagination['next_cursor']
+            # 统计覆盖全部筛选结果，而不只是当前页
+            aggregations = first_page['data']['aggregations']
+            assert aggregations['total'] == 3
+            assert sum(aggregations['rank_stats'].values()) == 3
+            assert sum(aggregations['owner_stats'].values()) == 3
+
+            second_page = admin_client.get('/api/pilots', params={'q': f'游标{token}', 'page_size': 2, 'cursor': first_pagination['next_cursor']})
+            assert second_page['success'] is True
+            assert len(second_page['data']['items']) == 1
+            assert second_page['meta']['pagination']['next_cursor'] is None
+
+            listed_ids = [item['id'] for item in first_page['data']['items'] + second_page['data']['items']]
+            assert listed_ids == list(reversed(created_ids))
+
+            invalid_response = admin_client.get('/api/pilots', params={'cursor': 'not-a-cursor'})
+            assert invalid_response['success'] is False
+            assert invalid_response['error']['code'] == 'INVALID_CURSOR'
+        finally:
+            for pilot_id in created_ids:
+                try:
+                    admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
+                except Exception:  # pylint: disable=broad-except
+                    pass
+
     def test_s4_tc2_create_broadcast_record_and_trigger_bbs(self, admin_client):
         """
         S4-TC2 创建开播记录并触发 BBS
@@ -340,6 +381,109 @@ class TestS4PilotBroadcastSalary:
             except Exception:  # pylint: disable=broad-except
                 pass
 
+    def test_s4_tc4b_pilot_performance_cache_invalidated_by_new_record(self, admin_client):
+        """S4-TC4B 主播业绩缓存在新增开播记录后失效"""
+        created_ids = {}
+        try:
+            pilot_data = pilot_factory.create_pilot_data()
+            pilot_response = admin_client.post('/api/pilots', json=pilot_data)
+            assert pilot_response.get('success'), '创建主播失败'
+            pilot_id = pilot_response['data']['id']
+            created_ids['pilot_id'] = pilot_id
+
+            first_response = admin_client.get(f'/api/pilots/{pilot_id}/performance')
+            assert first_response.get('success'), '获取主播业绩失败'
+            assert first_response['data']['week_stats']['record_count'] == 0
+            assert first_response['data']['recent_records'] == []
+
+            now = datetime.now()
+            record_body = {
+                'pilot': pilot_id,
+                'start_time': (now - timedelta(hours=3)).replace(second=0, microsecond=0).isoformat(),
+                'end_time': (now - timedelta(hours=1)).replace(second=0, microsecond=0).isoformat(),
+                'work_mode': '线上',
+                'x_coord': 'A',
+                'y_coord': 'B',
+                'z_coord': '1',
+                'revenue_amount': '200.00',
+                'base_salary': '0',
+                'notes': 'TDD-auto'
+            }
+            battle_response = admin_client.post('/battle-records/api/battle-records', json=record_body)
+            assert battle_response.get('success'), '创建开播记录失败'
+            created_ids['battle_record_id'] = battle_response['data']['id']
+
+            second_response = admin_client.get(f'/api/pilots/{pilot_id}/performance')
+            assert second_response.get('success'), '获取主播业绩失败'
+            second_data = second_response['data']
+            assert second_data['week_stats']['record_count'] == 1, '新增开播记录后业绩缓存未失效'
+            assert pytest.approx(second_data['week_stats']['total_revenue'], rel=1e-3) == 200.0
+            assert [record['id'] for record in second_data['recent_records']] == [created_ids['battle_record_id']]
+
+        finally:
+            try:
+                if created_ids.get('battle_record_id'):
+                    admin_client.delete(f"/battle-records/api/battle-records/{created_ids['battle_record_id']}")
+                if created_ids.get('pilot_id'):
+                    admin_client.put(f"/api/pilots/{created_ids['pilot_id']}", json={'status': '未招募'})
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def test_s4_tc4c_battle_record_list_query_count_bounded(self, admin_client, query_counter):
+        """S4-TC4C 开播记录列表的查询次数不随记录行数增长（引用批量预加载）"""
+        x_coord = f'QC{uuid4().hex[:6]}'
+        start_time = (datetime.now() - timedelta(hours=3)).replace(second=0, microsecond=0)
+        list_params = {'x': x_coord, 'date': start_time.strftime('%Y-%m-%d'), 'owner': 'all', 'status': 'all'}
+        created_ids = {'pilots': [], 'records': []}
+
+        def create_record():
+            pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+            assert pilot_response.get('success'), '创建主播失败'
+            created_ids['pilots'].append(pilot_response['data']['id'])
+            record_response = admin_client.post('/battle-records/api/battle-records', json={
+                'pilot': pilot_response['data']['id'],
+                'start_time': start_time.isoformat(),
+                'end_time': (start_time + timedelta(hours=2)).isoformat(),
+                'work_mode': '线上',
+                'x_coord': x_coord,
+                'y_coord': 'B',
+                'z_coord': '1',
+                'revenue_amount': '100.00',
+                'base_salary': '0',
+                'notes': 'TDD-auto'
+            })
+            assert record_response.get('success'), '创建开播记录失败'
+            created_ids['records'].append(record_response['data']['id'])
+
+        def measure_list(expected_count):
+            with query_counter.measure() as result:
+                response = admin_client.get('/battle-records/api/battle-records', params=list_params)
+            assert response.get('success'), '获取开播记录列表失败'
+            assert len(response['data']['items']) == expected_count
+            return result['count']
+
+        try:
+            create_record()
+            measure_list(1)  # 预热：首次访问的一次性查询不计入比较
+            single_row_queries = measure_list(1)
+
+            for _ in range(3):
+                create_record()
+            multi_row_queries = measure_list(4)
+
+            assert multi_row_queries == single_row_queries, f'查询次数随行数增长：1行 {single_row_queries} 次，4行 {multi_row_queries} 次'
+        finally:
+            for record_id in created_ids['records']:
+                try:
+                    admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+                except Exception:  # pylint: disable=broad-except
+                    pass
+            for pilot_id in created_ids['pilots']:
+                try:
+                    admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
+                except Exception:  # pylint: disable=broad-except
+                    pass
+
     def test_s4_tc4_broadcast_record_edit_conflict(self, admin_client):
         """
         S4-TC4 开播记录编辑冲突
@@ -891,6 +1035,72 @@ class TestS4PilotBroadcastSalary:
                     pass
                 admin_client.delete(f'/api/pilots/{pilot_id}')
 
+    def test_s4_tc11b_pilot_name_typeahead(self, admin_client):
+        """
+        S4-TC11B 主播名称联想与搜索经名称索引命中
+
+        步骤：创建两个名称含相同片段的主播，仅其中一个在48小时内有开播记录，
+              验证 /api/pilots/typeahead 不区分大小写命中且活跃主播在前，/api/pilots 的 q 搜索结果一致。
+        """
+        suffix = uuid4().hex[:6]
+        inactive_data = pilot_factory.create_pilot_data(nickname=f'AlphaInactive_{suffix}', status='已招募')
+        active_data = pilot_factory.create_pilot_data(nickname=f'ZuluActive_{suffix}', status='已招募')
+        created_pilots = []
+        battle_record_id = None
+
+        try:
+            inactive_resp = admin_client.post('/api/pilots', json=inactive_data)
+            assert inactive_resp.get('success'), f'创建非活跃主播失败: {inactive_resp.get("error")}'
+            inactive_pilot_id = inactive_resp['data']['id']
+            created_pilots.append(inactive_pilot_id)
+
+            active_resp = admin_client.post('/api/pilots', json=active_data)
+            assert active_resp.get('success'), f'创建活跃主播失败: {active_resp.get("error")}'
+            active_pilot_id = active_resp['data']['id']
+            created_pilots.append(active_pilot_id)
+
+            start_time = datetime.now(timezone.utc) - timedelta(hours=3)
+            battle_response = admin_client.post('/battle-records/api/battle-records', json={
+                'pilot': active_pilot_id,
+                'start_time': start_time.isoformat(),
+                'end_time': (start_time + timedelta(hours=2)).isoformat(),
+                'work_mode': '线上',
+                'x_coord': 'A基地',
+                'y_coord': '1号场',
+                'z_coord': '01',
+                'revenue_amount': '100.00',
+                'base_salary': '0',
+                'notes': '用于验证名称联想排序的测试记录'
+            })
+            assert battle_response.get('success'), f'创建开播记录失败: {battle_response.get("error")}'
+            battle_record_id = battle_response['data']['id']
+
+            query = f'ACTIVE_{suffix.upper()}'
+            typeahead_response = admin_client.get('/api/pilots/typeahead', params={'q': query, 'limit': 5})
+            assert typeahead_response['success'] is True
+            assert [item['id'] for item in typeahead_response['data']['items']] == [active_pilot_id, inactive_pilot_id]
+
+            limited_response = admin_client.get('/api/pilots/typeahead', params={'q': query, 'limit': 1})
+            assert [item['id'] for item in limited_response['data']['items']] == [active_pilot_id]
+
+            list_response = admin_client.get('/api/pilots', params={'q': query.lower()})
+            assert list_response['success'] is True
+            assert {item['id'] for item in list_response['data']['items']} == set(created_pilots)
+
+            renamed = admin_client.put(f'/api/pilots/{inactive_pilot_id}', json={**inactive_data, 'nickname': f'Renamed_{suffix}'})
+            assert renamed.get('success'), f'修改昵称失败: {renamed.get("error")}'
+            renamed_response = admin_client.get('/api/pilots/typeahead', params={'q': query})
+            assert [item['id'] for item in renamed_response['data']['items']] == [active_pilot_id]
+
+        finally:
+            if battle_record_id:
+                admin_client.delete(f'/battle-records/api/battle-records/{battle_record_id}')
+            for pilot_id in created_pilots:
+                try:
+                    admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
+                except Exception:  # pylint: disable=broad-except
+                    pass
+
     def test_s4_tc9_base_salary_monthly_report(self, admin_client):
         """
         S4-TC9 底薪月报API测试
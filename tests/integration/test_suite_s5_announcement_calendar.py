@@ -443,3 +443,227 @@ class TestS5AnnouncementCalendar:
                     admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
                 except Exception:  # pylint: disable=broad-except
                     pass
+
+    def test_s5_tc9_recurring_conflict_rejected_before_write(self, admin_client):
+        """
+        S5-TC9 循环通告冲突在写库前拦截
+
+        步骤：创建每日循环通告后，以相同主播与开播地点再次提交重叠的循环通告，
+              验证返回409及冲突列表，且原循环组通告数量不变（不再先写入后删除）。
+        """
+        created_ids = {}
+        try:
+            pilot_resp = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+            if not pilot_resp.get('success'):
+                pytest.skip("创建主播接口不可用")
+            pilot_id = pilot_resp['data']['id']
+            created_ids['pilot_id'] = pilot_id
+
+            area_resp = admin_client.post('/api/battle-areas', json=battle_area_factory.create_battle_area_data())
+            if not area_resp.get('success'):
+                pytest.skip("创建开播地点接口不可用")
+            area_id = area_resp['data']['id']
+            created_ids['area_id'] = area_id
+
+            start_time = datetime.now() + timedelta(days=1, hours=10)
+            daily_data = announcement_factory.create_daily_recurrence_data(pilot_id=pilot_id,
+                                                                           battle_area_id=area_id,
+                                                                           start_time_str=start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                                                                           end_date_str=(datetime.now() + timedelta(days=5)).strftime('%Y-%m-%d'),
+                                                                           interval=1,
+                                                                           duration_hours=4)
+
+            ann_resp = admin_client.post('/announcements/api/announcements', json=daily_data)
+            if not ann_resp.get('success'):
+                pytest.skip("创建循环通告接口不可用")
+            created_ids['ann_id'] = ann_resp['data']['id']
+
+            detail_before = admin_client.get(f'/announcements/api/announcements/{created_ids["ann_id"]}')
+            related_before = len(detail_before['data'].get('related_announcements') or [])
+            assert related_before > 0, '循环实例未随基础通告批量写入'
+
+            overlap_data = dict(daily_data, start_time=(start_time + timedelta(hours=1)).strftime('%Y-%m-%d %H:%M:%S'))
+            conflict_resp = admin_client.post('/announcements/api/announcements', json=overlap_data)
+            assert conflict_resp.get('_status_code') == 409
+            assert conflict_resp['error']['code'] == 'ANNOUNCEMENT_CONFLICT'
+            conflicts = conflict_resp['meta']['conflicts']
+            assert any(item['type'] == '主播冲突' for item in conflicts)
+            assert any(item['type'] == '开播地点冲突' for item in conflicts)
+
+            detail_after = admin_client.get(f'/announcements/api/announcements/{created_ids["ann_id"]}')
+            assert len(detail_after['data'].get('related_announcements') or []) == related_before
+        finally:
+            try:
+                if 'ann_id' in created_ids:
+                    admin_client.client.delete(f'/announcements/api/announcements/{created_ids["ann_id"]}',
+                                               json={'delete_scope': 'future_all'},
+                                               headers=admin_client._get_headers())
+                if 'area_id' in created_ids:
+                    admin_client.delete(f'/api/battle-areas/{created_ids["area_id"]}')
+                if 'pilot_id' in created_ids:
+                    admin_client.put(f'/api/pilots/{created_ids["pilot_id"]}', json={'status': '未招募'})
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def test_s5_tc10_end_time_persisted(self, app, admin_client):
+        """
+        S5-TC10 通告结束时间写库
+
+        步骤：创建每日循环通告（时长2.5小时，实例批量写入）→ 只修改当前实例的开始时间与时长
+              → 循环组全部通告存储的 end_time 均等于 start_time + duration_hours。
+        """
+        from models.announcement import Announcement
+
+        created_ids = {}
+        try:
+            pilot_resp = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+            assert pilot_resp.get('success'), '创建主播失败'
+            created_ids['pilot_id'] = pilot_resp['data']['id']
+            area_resp = admin_client.post('/api/battle-areas', json=battle_area_factory.create_battle_area_data())
+            assert area_resp.get('success'), '创建开播地点失败'
+            area_id = area_resp['data']['id']
+            created_ids['area_id'] = area_id
+
+            start_time = datetime.now() + timedelta(days=1, hours=10)
+            daily_data = announcement_factory.create_daily_recurrence_data(pilot_id=created_ids['pilot_id'],
+                                                                           battle_area_id=area_id,
+                                                                           start_time_str=start_time.strftime('%Y-%m-%d %H:%M:%S'),
+                                                                           end_date_str=(datetime.now() + timedelta(days=4)).strftime('%Y-%m-%d'),
+                                                                           interval=1,
+                                                                           duration_hours=2.5)
+            ann_resp = admin_client.post('/announcements/api/announcements', json=daily_data)
+            assert ann_resp.get('success'), '创建循环通告失败'
+            ann_id = ann_resp['data']['id']
+            created_ids['ann_id'] = ann_id
+
+            update_resp = admin_client.patch(f'/announcements/api/announcements/{ann_id}',
+                                             json={
+                                                 'battle_area_id': area_id,
+                                                 'start_time': (start_time + timedelta(hours=3)).strftime('%Y-%m-%d %H:%M:%S'),
+                                                 'duration_hours': 6,
+                                                 'edit_scope': 'this_only'
+                                             })
+            assert update_resp.get('success'), '编辑通告失败'
+
+            with app.app_context():
+                base = Announcement.objects(id=ann_id).as_pymongo().first()
+                group = [base] + list(Announcement.objects(parent_announcement=ann_id).as_pymongo())
+                assert len(group) > 1, '循环实例未写入'
+                assert base['duration_hours'] == 6
+                for doc in group:
+                    assert doc['end_time'] == doc['start_time'] + timedelta(hours=doc['duration_hours'])
+        finally:
+            try:
+                if 'ann_id' in created_ids:
+                    admin_client.client.delete(f'/announcements/api/announcements/{created_ids["ann_id"]}',
+                                               json={'delete_scope': 'future_all'},
+                                               headers=admin_client._get_headers())
+                if 'area_id' in created_ids:
+                    admin_client.delete(f'/api/battle-areas/{created_ids["area_id"]}')
+                if 'pilot_id' in created_ids:
+                    admin_client.put(f'/api/pilots/{created_ids["pilot_id"]}', json={'status': '未招募'})
+            except Exception:  # pylint: disable=broad-except
+                pass
+
+    def test_s5_tc11_batch_conflict_check_matches_per_instance(self, app, admin_client):  # pylint: disable=too-many-locals
+        """
+        S5-TC11 批量冲突检查与逐条检查一致
+
+        步骤：两名主播、两个开播地点下创建三条已有通告 → 构造重叠、包含、覆盖、首尾相接（不算冲突）及排除自身/排除ID的候选实例
+              → check_conflicts_batch 一次查询的结果与逐条扫描（原实现口径）的结果逐条一致。
+        """
+        from models.announcement import Announcement
+        from models.battle_area import BattleArea
+        from models.pilot import Pilot
+
+        created = {'pilots': [], 'areas': [], 'announcements': []}
+
+        def baseline(instance, exclude_self=True, exclude_ids=None):
+            """原实现：按开始时间逐条扫描，比较结束时间与引用（限定为本用例的主播与开播地点）。"""
+            conflicts = {'area_conflicts': [], 'pilot_conflicts': []}
+            end_time = instance.start_time + timedelta(hours=instance.duration_hours)
+            exclude_list = list(exclude_ids or [])
+            if exclude_self and instance.id:
+                exclude_list.append(instance.id)
+            query = Announcement.objects(id__nin=exclude_list, start_time__lt=end_time)
+            for other in query.filter(__raw__={'$or': [{'pilot': {'$in': pilot_refs}}, {'battle_area': {'$in': area_refs}}]}):
+                other_end = other.start_time + timedelta(hours=other.duration_hours)
+                if other.start_time < end_time and other_end > instance.start_time:
+                    overlap = {'announcement': other, 'conflict_start': max(instance.start_time, other.start_time), 'conflict_end': min(end_time, other_end)}
+                    if other.battle_area.id == instance.battle_area.id:
+                        conflicts['area_conflicts'].append(dict(overlap))
+                    if other.pilot.id == instance.pilot.id:
+                        conflicts['pilot_conflicts'].append(dict(overlap))
+            return conflicts
+
+        def normalize(result):
+            return {
+                kind: sorted((str(item['announcement'].id), item['conflict_start'], item['conflict_end']) for item in result[kind])
+                for kind in ('area_conflicts', 'pilot_conflicts')
+            }
+
+        try:
+            for _ in range(2):
+                pilot_resp = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+                assert pilot_resp.get('success'), '创建主播失败'
+                created['pilots'].append(pilot_resp['data']['id'])
+                area_resp = admin_client.post('/api/battle-areas', json=battle_area_factory.create_battle_area_data())
+                assert area_resp.get('success'), '创建开播地点失败'
+                created['areas'].append(area_resp['data']['id'])
+            (pilot_a, pilot_b), (area_a, area_b) = created['pilots'], created['areas']
+
+            day = (datetime.now() + timedelta(days=30)).replace(hour=0, minute=0, second=0, microsecond=0)
+            for pilot_id, area_id, hour, duration in ((pilot_a, area_a, 10, 4), (pilot_b, area_a, 16, 2), (pilot_a, area_b, 20, 2)):
+                ann_resp = admin_client.post('/announcements/api/announcements',
+                                             json=announcement_factory.create_announcement_data(pilot_id,
+                                                                                                area_id,
+                                                                                                (day + timedelta(hours=hour)).strftime('%Y-%m-%d %H:%M:%S'),
+                                                                                                duration_hours=duration))
+                assert ann_resp.get('success'), f"创建通告失败: {ann_resp.get('error')}"
+                created['announcements'].append(ann_resp['data']['id'])
+
+            with app.app_context():
+                existing = [Announcement.objects.get(id=ann_id) for ann_id in created['announcements']]
+                pilots = {pilot_id: Pilot.objects.get(id=pilot_id) for pilot_id in created['pilots']}
+                areas = {area_id: BattleArea.objects.get(id=area_id) for area_id in created['areas']}
+                pilot_refs = [pilot.id for pilot in pilots.values()]
+                area_refs = [area.id for area in areas.values()]
+                base = existing[0].start_time  # 已有通告1：主播A/地点A 10:00-14:00；通告2：主播B/地点A 16:00-18:00；通告3：主播A/地点B 20:00-22:00
+
+                def candidate(pilot_id, area_id, offset_hours, duration):
+                    return Announcement(pilot=pilots[pilot_id], battle_area=areas[area_id], start_time=base + timedelta(hours=offset_hours), duration_hours=duration)
+
+                candidates = [
+                    candidate(pilot_a, area_a, -1, 1),  # 09:00-10:00，与通告1首尾相接
+                    candidate(pilot_a, area_a, 4, 2),  # 14:00-16:00，与通告1、通告2首尾相接
+                    candidate(pilot_a, area_a, 3, 4),  # 13:00-17:00，与通告1（地点+主播）、通告2（地点）重叠
+                    candidate(pilot_a, area_a, 1, 1),  # 11:00-12:00，被通告1包含
+                    candidate(pilot_a, area_a, -2, 16),  # 08:00-24:00，覆盖全部
+                    candidate(pilot_a, area_b, 11.5, 1.5),  # 21:30-23:00，与通告3重叠
+                    candidate(pilot_b, area_b, 7, 2),  # 17:00-19:00，与通告2（主播）重叠
+                    candidate(pilot_b, area_b, 12, 1),  # 22:00-23:00，与通告3首尾相接
+                ]
+                batch = Announcement.check_conflicts_batch(candidates)
+                assert [normalize(result) for result in batch] == [normalize(baseline(item)) for item in candidates]
+                assert normalize(batch[0]) == {'area_conflicts': [], 'pilot_conflicts': []}, '首尾相接不应视为冲突'
+                assert normalize(batch[1]) == {'area_conflicts': [], 'pilot_conflicts': []}, '首尾相接不应视为冲突'
+                assert len(batch[4]['area_conflicts']) == 2 and len(batch[4]['pilot_conflicts']) == 2
+
+                # 编辑已有通告：排除自身；编辑未来所有：额外排除指定ID
+                moved = existing[0]
+                moved.start_time = base + timedelta(hours=5)
+                moved.duration_hours = 3
+                for exclude_ids in (None, [existing[1].id]):
+                    assert normalize(moved.check_conflicts(exclude_ids=exclude_ids)) == normalize(baseline(moved, exclude_ids=exclude_ids))
+                assert normalize(moved.check_conflicts())['area_conflicts'], '移动后的通告应与通告2地点冲突'
+                assert normalize(moved.check_conflicts(exclude_ids=[existing[1].id])) == {'area_conflicts': [], 'pilot_conflicts': []}
+        finally:
+            try:
+                for ann_id in created['announcements']:
+                    admin_client.client.delete(f'/announcements/api/announcements/{ann_id}', json={'delete_scope': 'this_only'}, headers=admin_client._get_headers())
+                for area_id in created['areas']:
+                    admin_client.delete(f'/api/battle-areas/{area_id}')
+                for pilot_id in created['pilots']:
+                    admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
+            except Exception:  # pylint: disable=broad-except
+                pass
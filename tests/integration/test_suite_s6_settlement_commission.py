@@ -1047,6 +1047,61 @@ class TestS6SettlementCommission:
 
     # ==================== 错误处理测试 ====================
 
+    def test_s6_consistency_tc4_commission_timeline_matches_per_date_lookup(self, app, admin_client):
+        """
+        S6-Consistency-TC4 分成时间线与逐日查询一致性
+
+        步骤：创建多条分成调整（含停用记录）→ 逐日对比 CommissionTimeline 与原逐日查询口径 → 修改调整后立即再次对比
+        """
+        from datetime import date
+
+        from models.pilot import PilotCommission
+        from utils.commission_helper import CommissionTimeline, get_pilot_commission_rate_for_date
+        from utils.timezone_helper import local_to_utc
+
+        def per_date_rate(pilot_id, target_date):
+            """原实现：逐日查询有效调整记录，取调整日不晚于目标日零点（GMT+8）的最新一条。"""
+            target_utc = local_to_utc(datetime.combine(target_date, datetime.min.time()))
+            for commission in reversed(list(PilotCommission.objects(pilot_id=pilot_id, is_active=True).order_by('adjustment_date'))):
+                if commission.adjustment_date <= target_utc:
+                    return commission.commission_rate
+            return 20.0
+
+        def assert_parity(pilot_id):
+            days = [date(2025, 7, 1) + timedelta(days=offset) for offset in range(40)]
+            with app.app_context():
+                timeline = CommissionTimeline.prefetch([pilot_id])
+                for day in days:
+                    expected = per_date_rate(pilot_id, day)
+                    assert timeline.rate_for(pilot_id, day) == expected, f"{day} 时间线分成比例不一致"
+                    assert get_pilot_commission_rate_for_date(pilot_id, day)[0] == expected, f"{day} 单日查询分成比例不一致"
+
+        pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+        assert pilot_response.get('success'), '创建主播失败'
+        pilot_id = pilot_response['data']['id']
+
+        try:
+            record_ids = {}
+            for adjustment_date, rate in (('2025-07-10', 25), ('2025-07-15', 35), ('2025-07-20', 30)):
+                response = admin_client.post(f'/api/pilots/{pilot_id}/commission/records', json={'adjustment_date': adjustment_date, 'commission_rate': rate, 'remark': 'S6-C-TC4'})
+                assert response.get('success'), '创建分成调整失败'
+                record_ids[adjustment_date] = response['data']['id']
+
+            deactivate = admin_client.post(f"/api/pilots/{pilot_id}/commission/records/{record_ids['2025-07-15']}/deactivate")
+            assert deactivate.get('success'), '停用分成调整失败'
+            assert_parity(pilot_id)
+
+            # 修改后无需等待任何缓存过期即可读到新比例
+            update = admin_client.put(f"/api/pilots/{pilot_id}/commission/records/{record_ids['2025-07-20']}",
+                                      json={'adjustment_date': '2025-07-31', 'commission_rate': 40, 'remark': 'S6-C-TC4'})
+            assert update.get('success'), '修改分成调整失败'
+            assert_parity(pilot_id)
+            with app.app_context():
+                assert get_pilot_commission_rate_for_date(pilot_id, date(2025, 7, 31))[0] == 40
+                assert get_pilot_commission_rate_for_date(pilot_id, date(2025, 7, 30))[0] == 25
+        finally:
+            admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
+
     def test_s6_error_tc1_invalid_http_methods(self, admin_client):
         """
         S6-Error-TC1 无效HTTP方法测试
@@ -9,8 +9,11 @@
 3. 测试BBS完整功能
 4. 验证权限控制和关联关系
 """
-import pytest
+import re
 from datetime import datetime, timedelta
+from uuid import uuid4
+
+import pytest
 from tests.fixtures.factories import (pilot_factory, bbs_post_factory, bbs_post_factory as bbs_factory)
 
 
@@ -645,3 +648,144 @@ class TestS7BBSOperations:
                     admin_client.post(f'/api/bbs/posts/{created_post_id}/hide', json={})
                 except:
                     pass
+
+    def test_s7_tc7_post_list_reply_summary_visibility(self, admin_client, kancho_client):
+        """
+        S7-TC7 帖子列表回复汇总
+
+        步骤：管理员建贴 → 管理员与运营各回复一条 → 管理员隐藏运营回复 → 双方分别查看列表。
+
+        断言：列表回复数与最后回复遵循回复可见性（管理员计入隐藏回复，运营只计已发布回复）。
+        """
+        created_post_id = None
+        token = uuid4().hex[:8]
+
+        def ensure_csrf(client):
+            """获取并缓存CSRF token。"""
+            page = client.client.get('/bbs/')
+            html = page.get_data(as_text=True)
+            match = re.search(r'data-csrf="([^"]+)"', html) or re.search(r'csrfToken:\s*["\']([^"\']+)["\']', html)
+            if match:
+                client.csrf_token = match.group(1)
+
+        def find_post(client):
+            response = client.get('/api/bbs/posts', params={'keyword': token})
+            assert response.get('success') is True
+            items = [item for item in response['data']['items'] if item['id'] == created_post_id]
+            assert len(items) == 1
+            return items[0]
+
+        try:
+            ensure_csrf(admin_client)
+            ensure_csrf(kancho_client)
+
+            boards_response = admin_client.get('/api/bbs/boards')
+            if not boards_response.get('success') or not boards_response['data']['items']:
+                pytest.skip("没有可用的BBS板块")
+
+            board_id = boards_response['data']['items'][0]['id']
+            post_response = admin_client.post('/api/bbs/posts', json={'board_id': board_id, 'title': f'回复汇总{token}', 'content': '用于验证列表回复汇总'})
+            if not post_response.get('success'):
+                pytest.skip("创建测试主贴失败")
+            created_post_id = post_response['data']['post']['id']
+
+            assert find_post(admin_client)['reply_count'] == 0
+
+            admin_reply = admin_client.post(f'/api/bbs/posts/{created_post_id}/replies', json={'content': f'管理员回复{token}'})
+            assert admin_reply.get('success') is True
+            kancho_reply = kancho_client.post(f'/api/bbs/posts/{created_post_id}/replies', json={'content': f'运营回复{token}'})
+            assert kancho_reply.get('success') is True
+
+            replies = kancho_reply['data']['replies']
+            admin_author_id = next(reply['author']['id'] for reply in replies if reply['content'] == f'管理员回复{token}')
+            kancho_reply_item = next(reply for reply in replies if reply['content'] == f'运营回复{token}')
+
+            hide_response = admin_client.post(f"/api/bbs/replies/{kancho_reply_item['id']}/hide", json={})
+            assert hide_response.get('success') is True
+
+            admin_view = find_post(admin_client)
+            assert admin_view['reply_count'] == 2
+            assert admin_view['last_reply']['author']['id'] == kancho_reply_item['author']['id']
+
+            kancho_view = find_post(kancho_client)
+            assert kancho_view['reply_count'] == 1
+            assert kancho_view['last_reply']['author']['id'] == admin_author_id
+
+        finally:
+            if created_post_id:
+                try:
+                    admin_client.post(f'/api/bbs/posts/{created_post_id}/hide', json={})
+                except:
+                    pass
+
+    def test_s7_tc8_full_text_search_posts_and_replies(self, admin_client, kancho_client):
+        """
+        S7-TC8 BBS全文检索
+
+        步骤：管理员建贴并回复 → 按标题词、回复中的中文短语检索 → 管理员隐藏回复后双方再次检索。
+
+        断言：主贴与回复内容均可检索，命中回复时返回回复ID与高亮摘要；隐藏回复仅管理员可检索。
+        """
+        created_post_id = None
+        token = f'srch{uuid4().hex[:8]}'
+
+        def ensure_csrf(client):
+            """获取并缓存CSRF token。"""
+            page = client.client.get('/bbs/')
+            html = page.get_data(as_text=True)
+            match = re.search(r'data-csrf="([^"]+)"', html) or re.search(r'csrfToken:\s*["\']([^"\']+)["\']', html)
+            if match:
+                client.csrf_token = match.group(1)
+
+        try:
+            ensure_csrf(admin_client)
+            ensure_csrf(kancho_client)
+
+            boards_response = admin_client.get('/api/bbs/boards')
+            if not boards_response.get('success') or not boards_response['data']['items']:
+                pytest.skip("没有可用的BBS板块")
+
+            board_id = boards_response['data']['items'][0]['id']
+            post_response = admin_client.post('/api/bbs/posts', json={'board_id': board_id, 'title': f'检索测试 {token}', 'content': '用于验证全文检索'})
+            if not post_response.get('success'):
+                pytest.skip("创建测试主贴失败")
+            created_post_id = post_response['data']['post']['id']
+
+            title_search = admin_client.get('/api/bbs/search', params={'q': token.upper()})
+            assert title_search.get('success') is True
+            title_hits = [item for item in title_search['data']['items'] if item['id'] == created_post_id]
+            assert len(title_hits) == 1
+            assert title_hits[0]['search']['matched_reply_id'] is None
+
+            reply_response = admin_client.post(f'/api/bbs/posts/{created_post_id}/replies', json={'content': f'{token} 今晚直播间的灯光偏暗需要调整'})
+            assert reply_response.get('success') is True
+            reply_id = next(reply['id'] for reply in reply_response['data']['replies'] if token in reply['content'])
+
+            phrase_search = kancho_client.get('/api/bbs/search', params={'q': f'{token} 灯光偏暗', 'board_id': board_id})
+            assert phrase_search.get('success') is True
+            phrase_hits = [item for item in phrase_search['data']['items'] if item['id'] == created_post_id]
+            assert len(phrase_hits) == 1
+            assert phrase_hits[0]['search']['matched_reply_id'] == reply_id
+            assert '<mark>' in phrase_hits[0]['search']['snippet_html']
+
+            hide_response = admin_client.post(f'/api/bbs/replies/{reply_id}/hide', json={})
+            assert hide_response.get('success') is True
+
+            hidden_search = admin_client.get('/api/bbs/search', params={'q': f'{token} 灯光偏暗'})
+            assert [item['id'] for item in hidden_search['data']['items']] == [created_post_id]
+            assert hidden_search['meta']['total'] == 1
+
+            kancho_hidden_search = kancho_client.get('/api/bbs/search', params={'q': f'{token} 灯光偏暗'})
+            assert kancho_hidden_search.get('success') is True
+            assert kancho_hidden_search['data']['items'] == []
+
+            empty_query = admin_client.get('/api/bbs/search', params={'q': '  '})
+            assert empty_query.get('success') is False
+            assert empty_query['error']['code'] == 'QUERY_REQUIRED'
+
+        finally:
+            if created_post_id:
+                try:
+                    admin_client.post(f'/api/bbs/posts/{created_post_id}/hide', json={})
+                except:
+                    pass
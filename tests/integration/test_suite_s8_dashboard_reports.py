@@ -1,7 +1,7 @@
 """
 套件S8：数据报表与仪表盘测试（修复版本）
 
-覆盖 API：/api/dashboard/*, /new-reports/api/*, /new-reports-fast/api/*, /reports/mail/*
+覆盖 API：/api/dashboard/*（含 /api/dashboard/snapshot）, /new-reports/api/*, /new-reports-fast/api/*, /reports/mail/*
 
 测试原则：
 1. 不直接操作数据库
@@ -59,6 +59,53 @@ class TestS8DashboardReportsFixed:
         success_rate = success_count / total_count
         assert success_rate >= 0.5, f"仪表盘API可用性太低: {success_count}/{total_count} ({success_rate:.1%})"
 
+    def test_s8_tc1b_dashboard_snapshot_reflects_writes(self, app, admin_client):
+        """
+        S8-TC1b 仪表盘快照
+
+        验证快照一次返回全部卡片；新发布的主贴写入后只标记待刷新（不涉及昨日数据），
+        待刷新期间加载仍返回现有快照，调度器刷新后主贴出现在快照中
+        """
+        from models.dashboard_snapshot import DashboardSnapshot
+        from utils.dashboard_snapshot import SNAPSHOT_KEY, refresh_dashboard_snapshot
+
+        response = admin_client.get('/api/dashboard/snapshot')
+        assert response.get('success'), f"仪表盘快照失败: {response.get('error')}"
+        segments = response['data']
+        for name in ('bbs_latest', 'recruit', 'conversion_rate', 'pilot_ranking', 'announcement', 'battle', 'feature'):
+            assert name in segments, f"快照缺少卡片: {name}"
+            assert segments[name]['meta'].get('segment') == name
+        assert 'battle_today_revenue' in segments['battle']['data']
+
+        boards = admin_client.get('/api/bbs/boards').get('data', {}).get('items') or []
+        if not boards:
+            pytest.skip("无可用板块，跳过快照刷新验证")
+
+        with app.app_context():
+            before = DashboardSnapshot.objects(key=SNAPSHOT_KEY).as_pymongo().first()
+
+        post_response = admin_client.post('/api/bbs/posts', json={'board_id': boards[0]['id'], 'title': 'S8快照刷新主贴', 'content': '用于验证仪表盘快照刷新'})
+        assert post_response.get('success'), f"主贴创建失败: {post_response.get('error')}"
+        post_id = post_response['data']['post']['id']
+        try:
+            with app.app_context():
+                marked = DashboardSnapshot.objects(key=SNAPSHOT_KEY).as_pymongo().first()
+            assert marked['dirty_at'] >= marked['computed_at'], "主贴写入后未标记待刷新"
+            assert marked.get('daily_dirty_at') == before.get('daily_dirty_at'), "主贴写入不应标记昨日数据待刷新"
+
+            pending = admin_client.get('/api/dashboard/snapshot')
+            assert pending.get('success')
+            assert pending['data']['bbs_latest']['data'] == segments['bbs_latest']['data'], "待刷新期间应返回现有快照"
+
+            with app.app_context():
+                assert refresh_dashboard_snapshot(), "调度器刷新未处理待刷新标记"
+            snapshot = admin_client.get('/api/dashboard/snapshot')
+            assert snapshot.get('success')
+            latest_ids = [item['id'] for item in snapshot['data']['bbs_latest']['data']['items']]
+            assert post_id in latest_ids, "新主贴未出现在仪表盘快照中"
+        finally:
+            admin_client.delete(f"/api/bbs/posts/{post_id}")
+
     def test_s8_tc2_report_apis_availability(self, admin_client):
         """
         S8-TC2-修复 报表API可用性测试
@@ -373,3 +373,234 @@ class TestS9AlertsNotifications:
 
         except Exception:
             pytest.skip("通知偏好设置接口不可用")
+
+    def test_s9_tc6_job_executor_rejects_when_queue_full(self):
+        """
+        S9-TC6 副作用执行器队列已满时拒绝提交
+
+        步骤：1个工作线程、排队上限1 → 阻塞中的作业 + 1个排队作业后，再提交被拒绝并计数 → 放行后全部完成 → 关闭后提交被拒绝
+        """
+        import threading
+
+        from utils.job_executor import BoundedJobExecutor
+
+        executor = BoundedJobExecutor('s9-tc6', 1, 1, 60)
+        started = threading.Event()
+        release = threading.Event()
+        done = []
+
+        def blocking_job():
+            started.set()
+            assert release.wait(10)
+            done.append('blocking')
+
+        assert executor.submit('blocking', blocking_job) is True
+        assert started.wait(10)
+        assert executor.submit('queued', done.append, 'queued') is True
+        assert executor.submit('overflow', done.append, 'overflow') is False
+
+        metrics = executor.metrics()
+        assert metrics['rejected'] == 1
+        assert metrics['submitted'] == 2
+        assert metrics['running'] == 1
+        assert metrics['queued'] == 1
+
+        release.set()
+        assert executor.shutdown(timeout=10) is True
+        assert done == ['blocking', 'queued']
+        assert executor.submit('after-close', done.append, 'after-close') is False
+        assert executor.metrics()['rejected'] == 2
+
+    def test_s9_tc7_job_executor_counts_timeouts_and_failures(self):
+        """
+        S9-TC7 副作用执行器超时与失败计数
+
+        步骤：超时阈值50毫秒 → 提交执行200毫秒的作业、立即完成的作业与抛出异常的作业 → 排空后核对完成/失败/超时计数
+        """
+        import time
+
+        from utils.job_executor import BoundedJobExecutor
+
+        executor = BoundedJobExecutor('s9-tc7', 2, 10, 0.05)
+
+        def failing_job():
+            raise RuntimeError('S9-TC7')
+
+        assert executor.submit('slow', time.sleep, 0.2) is True
+        assert executor.submit('fast', lambda: None) is True
+        assert executor.submit('failing', failing_job) is True
+        assert executor.shutdown(timeout=10) is True
+
+        metrics = executor.metrics()
+        assert metrics['completed'] == 2
+        assert metrics['failed'] == 1
+        assert metrics['timed_out'] == 1
+        assert metrics['running'] == 0 and metrics['queued'] == 0
+        assert metrics['max_duration_seconds'] >= 0.2
+
+    def test_s9_tc8_job_executor_drain_is_bounded(self):
+        """
+        S9-TC8 副作用执行器退出排空有时限
+
+        步骤：关闭时等待排队作业全部完成 → 有作业卡住时在超时后返回 False
+              → 子进程中提交卡住的作业后退出，进程在排空时限内结束（工作线程不阻塞解释器退出）
+        """
+        import os
+        import subprocess
+        import sys
+        import threading
+        import time
+
+        from utils.job_executor import BoundedJobExecutor
+
+        executor = BoundedJobExecutor('s9-tc8', 2, 10, 60)
+        done = []
+        for index in range(6):
+            assert executor.submit(f'job-{index}', lambda i=index: (time.sleep(0.05), done.append(i))) is True
+        assert executor.shutdown(timeout=10) is True
+        assert sorted(done) == list(range(6))
+
+        stuck = BoundedJobExecutor('s9-tc8-stuck', 1, 10, 60)
+        release = threading.Event()
+        assert stuck.submit('stuck', release.wait, 30) is True
+        started_at = time.monotonic()
+        assert stuck.shutdown(timeout=0.2) is False
+        assert time.monotonic() - started_at < 5
+        release.set()
+
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        script = ("import time\n"
+                  "from utils.job_executor import submit_side_effect\n"
+                  "assert submit_side_effect('stuck', time.sleep, 60)\n")
+        started_at = time.monotonic()
+        completed = subprocess.run([sys.executable, '-c', script],
+                                   cwd=project_root,
+                                   env={**os.environ, 'JOB_EXECUTOR_DRAIN_SECONDS': '0.5'},
+                                   timeout=30,
+                                   check=False)
+        assert completed.returncode == 0
+        assert time.monotonic() - started_at < 20, '进程退出应在排空时限后结束，不等待卡住的作业'
+
+    def test_s9_tc9_james_alert_batcher_dedupes_pilots(self, monkeypatch):
+        """
+        S9-TC9 詹姆斯关注批量评估队列去重
+
+        步骤：同一主播在一个窗口内多次入队 → 到期后整批只评估一次且保持入队顺序
+              → 执行器拒绝提交时（进程退出阶段）同步处理仍在当前线程完成评估
+        """
+        import threading
+
+        from utils import james_alert
+        from utils.james_alert import JamesAlertBatcher
+
+        calls = []
+        evaluated = threading.Event()
+
+        def evaluate(pilot_ids):
+            calls.append(list(pilot_ids))
+            evaluated.set()
+            return len(pilot_ids)
+
+        batcher = JamesAlertBatcher(evaluate, delay_seconds=0.05, max_delay_seconds=1)
+        for pilot_id in ('p1', 'p1', 'p2', 'p1', 'p2'):
+            batcher.enqueue(pilot_id)
+        assert evaluated.wait(10)
+        assert calls == [['p1', 'p2']], '同一主播在一批中只评估一次'
+        assert batcher.flush() is False, '批次提交后队列应清空'
+
+        monkeypatch.setattr(james_alert, 'submit_side_effect', lambda *args, **kwargs: False)
+        batcher = JamesAlertBatcher(evaluate, delay_seconds=60, max_delay_seconds=60)
+        for pilot_id in ('p3', 'p3', 'p3'):
+            batcher.enqueue(pilot_id)
+        assert batcher.flush(synchronous=True) is True
+        assert calls == [['p1', 'p2'], ['p3']]
+
+    def test_s9_tc10_james_alert_batch_sends_single_digest(self, app, admin_client, monkeypatch):
+        """
+        S9-TC10 詹姆斯关注批量评估合并邮件
+
+        步骤：两名主播多次入队并均命中运算条件 → 同步处理批次只发送一封汇总邮件（主题含命中人数，内容含两名主播）
+              → 只有一名主播命中时发送单封邮件
+        """
+        from utils import james_alert, pilot_performance
+        from utils.james_alert import JamesAlertBatcher, evaluate_james_alert_batch
+
+        pilot_ids = []
+        for _ in range(2):
+            pilot_response = admin_client.post('/api/pilots', json=pilot_factory.create_pilot_data())
+            assert pilot_response.get('success'), '创建主播失败'
+            pilot_ids.append(pilot_response['data']['id'])
+
+        sent = []
+        evaluated = []
+        empty_stats = {'month_stats': {}, 'week_stats': {}, 'three_day_stats': {}, 'recent_records': []}
+
+        def fake_stats(pilots, _now):
+            evaluated.append([str(pilot.id) for pilot in pilots])
+            return {str(pilot.id): dict(empty_stats) for pilot in pilots}
+
+        monkeypatch.setattr(pilot_performance, 'calculate_pilots_performance_stats', fake_stats)
+        monkeypatch.setattr(james_alert, 'check_james_alert_calculation_conditions', lambda _stats: (True, ''))
+        monkeypatch.setattr(james_alert, 'get_pilot_basic_info', lambda pilot: {'nickname': str(pilot.id)})
+        monkeypatch.setattr(james_alert, 'build_james_alert_email_content', lambda pilot_info, _stats: f"主播 {pilot_info['nickname']}")
+        monkeypatch.setattr(james_alert, 'get_alert_recipients', lambda: ['ops@example.com'])
+        monkeypatch.setattr(james_alert, 'enqueue_email_md', lambda recipients, subject, content, source=None: sent.append((subject, content)) or True)
+
+        try:
+            with app.app_context():
+                batcher = JamesAlertBatcher(evaluate_james_alert_batch, delay_seconds=60, max_delay_seconds=60)
+                for pilot_id in (pilot_ids[0], pilot_ids[1], pilot_ids[0], pilot_ids[0]):
+                    batcher.enqueue(pilot_id)
+                assert batcher.flush(synchronous=True) is True
+
+                assert evaluated == [pilot_ids], '整批主播共享一次业绩数据加载'
+                assert len(sent) == 1, '同一批命中多个主播时只发送一封汇总邮件'
+                subject, content = sent[0]
+                assert subject == '拉科斯警告 詹姆斯正在关注2个主播'
+                assert pilot_ids[0] in content and pilot_ids[1] in content
+                assert '---' in content
+
+                batcher.enqueue(pilot_ids[1])
+                batcher.enqueue(pilot_ids[1])
+                assert batcher.flush(synchronous=True) is True
+                assert len(sent) == 2
+                assert sent[1] == ('拉科斯警告 詹姆斯正在关注这个主播', f'主播 {pilot_ids[1]}')
+        finally:
+            for pilot_id in pilot_ids:
+                admin_client.put(f'/api/pilots/{pilot_id}', json={'status': '未招募'})
+
+    def test_s9_tc11_james_alert_batcher_uses_single_worker_thread(self):
+        """
+        S9-TC11 詹姆斯关注批量评估队列线程数有界
+
+        步骤：连续入队50个主播（模拟批量确认底薪）→ 只新增一个等待线程，到期后整批评估一次
+              → 再次入队复用同一线程完成下一批
+        """
+        import threading
+
+        from utils.james_alert import JamesAlertBatcher
+
+        def batch_threads():
+            return {thread for thread in threading.enumerate() if thread.name == 'james-alert-batch'}
+
+        calls = []
+        evaluated = threading.Semaphore(0)
+
+        def evaluate(pilot_ids):
+            calls.append(list(pilot_ids))
+            evaluated.release()
+            return len(pilot_ids)
+
+        existing = batch_threads()
+        batcher = JamesAlertBatcher(evaluate, delay_seconds=0.2, max_delay_seconds=5)
+        for index in range(50):
+            batcher.enqueue(f'storm-{index}')
+        started = batch_threads() - existing
+        assert len(started) == 1, '连续入队只应启动一个等待线程'
+        assert evaluated.acquire(timeout=10)
+        assert calls == [[f'storm-{index}' for index in range(50)]]
+
+        batcher.enqueue('storm-next')
+        assert evaluated.acquire(timeout=10)
+        assert calls[-1] == ['storm-next']
+        assert batch_threads() - existing == started, '后续批次应复用同一等待线程'
@@ -10,7 +10,7 @@ import pytest
 import os
 import time
 from datetime import datetime, timedelta
-from tests.fixtures.factories import (pilot_factory, battle_record_factory, recruit_factory, announcement_factory)
+from tests.fixtures.factories import (pilot_factory, battle_record_factory, recruit_factory, announcement_factory, battle_area_factory)
 from utils.timezone_helper import get_current_local_time, local_to_utc
 
 
@@ -509,6 +509,83 @@ class TestS9MailGeneration:
 
             print("✅ S9-TC5底薪发放提醒邮件测试完成")
 
+    def test_s9_tc6_mail_outbox_pooled_delivery(self, app, monkeypatch):
+        """
+        S9-TC6：发件箱批量投递
+
+        以本地 aiosmtpd 作为SMTP替身：入队3封邮件后由发送线程复用同一连接全部送达；
+        SMTP不可用时邮件重新排队，达到最大次数后标记为已放弃。
+        """
+        controller_module = pytest.importorskip('aiosmtpd.controller')
+        import smtplib
+        import socket
+
+        from models.mail_outbox import MailOutbox, MailOutboxStatus
+        from utils import mail_outbox, mail_utils
+
+        class _Handler:
+
+            def __init__(self):
+                self.envelopes = []
+
+            async def handle_DATA(self, server, session, envelope):  # pylint: disable=unused-argument
+                self.envelopes.append(envelope)
+                return '250 OK'
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+
+        handler = _Handler()
+        controller = controller_module.Controller(handler, hostname='127.0.0.1', port=port)
+        controller.start()
+
+        monkeypatch.setattr(mail_utils, 'MAIL_DEBUG', False)
+        monkeypatch.setattr(mail_utils, 'SMTP_USER', 'stand-in')
+        monkeypatch.setattr(mail_utils, 'SMTP_PASSWORD', 'stand-in')
+        monkeypatch.setattr(mail_utils, 'SENDER_EMAIL', 'lacus@example.com')
+
+        global_sender = mail_outbox.get_mail_outbox_sender()
+        global_sender.stop()
+        session = mail_outbox.PooledSmtpSession(connection_factory=lambda: smtplib.SMTP('127.0.0.1', port, timeout=10))
+        sender = mail_outbox.MailOutboxSender(session=session, batch_size=10, max_attempts=2, poll_seconds=1)
+        monkeypatch.setattr(mail_outbox, '_sender', sender)
+
+        subject_prefix = f"S9-TC6-{int(time.time())}"
+        try:
+            for index in range(3):
+                assert mail_outbox.enqueue_email_md(['ops@example.com'], f'{subject_prefix}-{index}', f'# 第{index}封\n\n正文')
+
+            deadline = time.time() + 10
+            while time.time() < deadline and len(handler.envelopes) < 3:
+                time.sleep(0.2)
+
+            assert len(handler.envelopes) == 3
+            assert session.connect_count == 1, '同一批邮件应复用同一个SMTP连接'
+            sent = MailOutbox.objects(subject__startswith=subject_prefix)
+            assert all(item.status == MailOutboxStatus.SENT for item in sent)
+
+            sender.stop()
+            controller.stop()
+            controller = None
+
+            failing = MailOutbox(recipients=['ops@example.com'], subject=f'{subject_prefix}-dead', content='不可达')
+            failing.save()
+            assert sender.process_batch()['retried'] == 1
+            failing.reload()
+            assert failing.status == MailOutboxStatus.PENDING and failing.attempts == 1
+
+            failing.update(set__next_attempt_at=failing.created_at)
+            assert sender.process_batch()['dead'] == 1
+            failing.reload()
+            assert failing.status == MailOutboxStatus.DEAD and failing.last_error
+        finally:
+            sender.stop()
+            if controller is not None:
+                controller.stop()
+            MailOutbox.objects(subject__startswith=subject_prefix).delete()
+            global_sender.start()
+
     def _validate_base_salary_reminder_mail_content(self, file_path, expected_pilot_id):
         """验证底薪提醒邮件内容"""
         try:
@@ -660,3 +737,98 @@ class TestS9MailGeneration:
 
         except Exception as e:
             print(f"⚠️ 测试数据清理异常: {str(e)}")
+
+    def test_s9_tc7_unstarted_detection_rows_and_query_count(self, app, admin_client, kancho_client, query_counter):
+        """
+        S9-TC7：未开播检测（未开播提醒 / 线上主播未开播提醒）
+
+        每名主播在检查日有一条通告、前一日有一条线上开播记录，其中一半主播检查日另有开播记录：
+        - 未开播提醒只返回检查日无开播记录的通告（前一日的记录不算），按计划开始时间倒序；
+        - 线上主播未开播提醒返回同一批主播，按“直属运营-主播分类”、昵称排序；
+        - 主播与通告数量翻倍后两项检测的查询次数不变。
+        """
+        from utils.unstarted_detector import find_unstarted_announcements, find_unstarted_online_pilots
+
+        check_day = datetime(2024, 3, 12)
+        now_utc = local_to_utc(check_day.replace(hour=23))
+        check_day_start = local_to_utc(check_day)
+        check_window = (local_to_utc(check_day - timedelta(days=7)), check_day_start, check_day_start, check_day_start + timedelta(days=1))
+
+        owner = kancho_client.get('/api/auth/me')['data']['user']
+        owner_rank = f"{owner['nickname']}-候选人"
+        pilots = []
+        record_ids = []
+        announcement_ids = []
+
+        area_response = admin_client.post('/api/battle-areas', json=battle_area_factory.create_battle_area_data())
+        assert area_response.get('success'), '创建开播地点失败'
+        area_id = area_response['data']['id']
+
+        def create_record(pilot_id, day, work_mode):
+            response = admin_client.post('/battle-records/api/battle-records', json={
+                'pilot': pilot_id,
+                'start_time': f"{day.strftime('%Y-%m-%d')}T20:00:00",
+                'end_time': f"{day.strftime('%Y-%m-%d')}T22:00:00",
+                'work_mode': work_mode,
+                'x_coord': 'A',
+                'y_coord': 'B',
+                'z_coord': '1',
+                'revenue_amount': '100.00',
+                'base_salary': '0',
+                'notes': 'S9-TC7'
+            })
+            assert response.get('success'), f"创建开播记录失败: {response.get('error')}"
+            record_ids.append(response['data']['id'])
+
+        def seed(count):
+            for index in range(count):
+                pilot_data = pilot_factory.create_pilot_data(owner_id=owner['id'])
+                pilot_response = admin_client.post('/api/pilots', json=pilot_data)
+                assert pilot_response.get('success'), '创建主播失败'
+                pilot = {'id': pilot_response['data']['id'], 'nickname': pilot_data['nickname'], 'hour': len(pilots), 'started': index % 2 == 0}
+                pilots.append(pilot)
+
+                start = check_day.replace(hour=pilot['hour'])
+                announcement_response = admin_client.post('/announcements/api/announcements', json=announcement_factory.create_announcement_data(
+                    pilot['id'], area_id, start.strftime('%Y-%m-%d %H:%M:%S'), duration_hours=1))
+                assert announcement_response.get('success'), f"创建通告失败: {announcement_response.get('error')}"
+                announcement_ids.append(announcement_response['data']['id'])
+
+                create_record(pilot['id'], check_day - timedelta(days=1), '线上')
+                if pilot['started']:
+                    create_record(pilot['id'], check_day, '线下')
+
+        def detect():
+            seeded_names = {pilot['nickname'] for pilot in pilots}
+            with app.app_context():
+                with query_counter.measure() as announcement_queries:
+                    announcement_rows = find_unstarted_announcements(now_utc)
+                with query_counter.measure() as online_queries:
+                    online_rows = find_unstarted_online_pilots(*check_window, check_day.strftime('%Y-%m-%d'))
+            announcement_rows = [row for row in announcement_rows if row['pilot_name'] in seeded_names]
+            online_rows = [row for row in online_rows if row['pilot_name'] in seeded_names]
+
+            unstarted = [pilot for pilot in pilots if not pilot['started']]
+            assert [(row['pilot_name'], row['owner_rank'], row['start_local']) for row in announcement_rows] == [
+                (pilot['nickname'], owner_rank, check_day.replace(hour=pilot['hour']).strftime('%Y-%m-%d %H:%M'))
+                for pilot in sorted(unstarted, key=lambda pilot: pilot['hour'], reverse=True)
+            ]
+            assert [row['pilot_name'] for row in online_rows] == sorted(pilot['nickname'] for pilot in unstarted)
+            for row in online_rows:
+                assert (row['owner_rank'], row['recent_online_count'], row['check_day']) == (owner_rank, 1, '2024-03-12')
+                assert row['latest_date'] == '2024-03-11'
+            return announcement_queries['count'], online_queries['count']
+
+        try:
+            seed(4)
+            baseline_queries = detect()
+            seed(4)
+            assert detect() == baseline_queries, '主播与通告数量翻倍后查询次数发生变化'
+        finally:
+            for record_id in record_ids:
+                admin_client.delete(f'/battle-records/api/battle-records/{record_id}')
+            for announcement_id in announcement_ids:
+                admin_client.delete(f'/announcements/api/announcements/{announcement_id}')
+            admin_client.delete(f'/api/battle-areas/{area_id}')
+            for pilot in pilots:
+                admin_client.put(f"/api/pilots/{pilot['id']}", json={'status': '未招募'})
@@ -106,7 +106,7 @@ def serialize_related_announcements(announcements: Iterable[Announcement], curre
 def serialize_announcement_detail(announcement: Announcement, related: Optional[Iterable[Announcement]] = None) -> Dict[str, Any]:
     """序列化通告详情。"""
     local_start = _format_datetime(announcement.start_time)
-    local_end = _format_datetime(announcement.end_time)
+    local_end = _format_datetime(announcement.calculate_end_time())
     local_created = _format_datetime(announcement.created_at, '%Y-%m-%d %H:%M:%S')
     local_updated = _format_datetime(announcement.updated_at, '%Y-%m-%d %H:%M:%S')
     recurrence_end = _format_datetime(announcement.recurrence_end)
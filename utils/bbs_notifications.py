@@ -8,7 +8,7 @@ from typing import Optional, Sequence
 from models.battle_record import BattleRecord
 from models.bbs import BBSPost, BBSReply
 from models.user import User
-from utils.mail_utils import send_email_md
+from utils.mail_outbox import enqueue_email_md
 from utils.logging_setup import get_logger
 from utils.timezone_helper import GMT_PLUS_8, utc_to_local
 
@@ -96,8 +96,8 @@ def _send_notification(recipients: Sequence[str], subject: str, md_content: str)
     unique_recipients = sorted({email for email in recipients if email})
     if not unique_recipients:
         return
-    if not send_email_md(unique_recipients, subject, md_content):
-        logger.warning('BBS邮件提醒发送失败：subject=%s recipients=%s', subject, unique_recipients)
+    if not enqueue_email_md(unique_recipients, subject, md_content, source='bbs'):
+        logger.warning('BBS邮件提醒入队失败：subject=%s recipients=%s', subject, unique_recipients)
 
 
 def notify_post_author_new_reply(post: BBSPost, reply: BBSReply) -> None:
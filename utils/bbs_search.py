@@ -0,0 +1,320 @@
+# pylint: disable=no-member,protected-access
+"""BBS 全文检索
+
+主贴与回复各对应一条 bbs_search_entries 倒排条目，`terms` 多键索引即倒排表：
+- 分词：文本先做 NFKC 规范化并转小写；连续汉字（含日文假名、韩文）切为单字与相邻二元组，拉丁字母/数字按整词；
+- 查询：查询串同样分词，连续汉字只取二元组（单字查询取单字），要求条目包含全部检索词（`$all` 走 terms 索引），
+  因此耗时取决于命中词的倒排长度，不随帖子总量线性增长；
+- 排序：标题命中全部检索词、原文包含完整查询短语分别加权，同帖多条命中按最高分归并，再按命中条数与最近活跃时间排序；
+- 维护：监听主贴/回复保存信号增量更新条目；隐藏主贴/回复时的批量状态更新由调用方显式同步；
+  `scripts/rebuild_bbs_search_index.py` 全量重建。
+"""
+
+import re
+import unicodedata
+from html import escape
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from mongoengine import Q, signals
+from pymongo import UpdateOne
+
+from models.bbs import BBSPost, BBSPostStatus, BBSReply, BBSReplyStatus, BBSSearchEntry
+from models.user import User
+from utils.logging_setup import get_logger
+from utils.timezone_helper import get_current_utc_time
+
+logger = get_logger('bbs_search')
+
+MAX_QUERY_TERMS = 32  # 查询串最多取前32个检索词
+SNIPPET_LENGTH = 80  # 摘要长度（字符）
+TITLE_MATCH_WEIGHT = 3  # 标题包含全部检索词
+PHRASE_MATCH_WEIGHT = 2  # 原文包含完整查询短语
+
+_CJK_CLASS = '\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af'  # 日文假名、汉字（含扩展A、兼容汉字）、韩文
+_TOKEN_RE = re.compile(f'[{_CJK_CLASS}]+|[a-z0-9]+')
+_CJK_RE = re.compile(f'[{_CJK_CLASS}]')
+
+_registered = False
+
+
+def normalize_text(text: Optional[str]) -> str:
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def _tokens(text: Optional[str], include_unigrams: bool) -> List[str]:
+    terms: List[str] = []
+    for run in _TOKEN_RE.findall(normalize_text(text)):
+        if not _CJK_RE.match(run):
+            terms.append(run)
+            continue
+        if len(run) == 1 or include_unigrams:
+            terms.extend(run)
+        terms.extend(run[index:index + 2] for index in range(len(run) - 1))
+    return terms
+
+
+def index_terms(text: Optional[str]) -> List[str]:
+    """文本的索引词（去重、排序）。"""
+    return sorted(set(_tokens(text, include_unigrams=True)))
+
+
+def query_terms(query: Optional[str]) -> List[str]:
+    """查询串的检索词（保持出现顺序去重）。"""
+    terms = list(dict.fromkeys(_tokens(query, include_unigrams=False)))
+    return terms[:MAX_QUERY_TERMS]
+
+
+def _ref_id(reference) -> Optional[ObjectId]:
+    if reference is None:
+        return None
+    ref_id = getattr(reference, 'id', reference)
+    return ref_id if isinstance(ref_id, ObjectId) else ObjectId(str(ref_id))
+
+
+def _post_entry_update(raw_post: Dict[str, Any], now) -> UpdateOne:
+    text = f"{raw_post.get('title') or ''}\n{raw_post.get('content') or ''}"
+    return UpdateOne({'post': raw_post['_id'], 'reply': None},
+                     {'$set': {
+                         'board': raw_post.get('board'),
+                         'post_status': raw_post.get('status'),
+                         'reply_status': None,
+                         'post_author': raw_post.get('author'),
+                         'author': raw_post.get('author'),
+                         'title': raw_post.get('title') or '',
+                         'text': text,
+                         'terms': index_terms(text),
+                         'title_terms': index_terms(raw_post.get('title')),
+                         'last_active_at': raw_post.get('last_active_at'),
+                         'updated_at': now,
+                     }},
+                     upsert=True)
+
+
+def _reply_entry_update(raw_reply: Dict[str, Any], raw_post: Dict[str, Any], now) -> UpdateOne:
+    return UpdateOne({'post': raw_post['_id'], 'reply': raw_reply['_id']},
+                     {'$set': {
+                         'board': raw_post.get('board'),
+                         'post_status': raw_post.get('status'),
+                         'reply_status': raw_reply.get('status'),
+                         'post_author': raw_post.get('author'),
+                         'author': raw_reply.get('author'),
+                         'title': raw_post.get('title') or '',
+                         'text': raw_reply.get('content') or '',
+                         'terms': index_terms(raw_reply.get('content')),
+                         'title_terms': [],
+                         'last_active_at': raw_post.get('last_active_at'),
+                         'updated_at': now,
+                     }},
+                     upsert=True)
+
+
+_POST_FIELDS = ('title', 'content', 'board', 'status', 'author', 'last_active_at')
+
+
+def index_post(post_id) -> None:
+    """重建主贴条目，并把主贴状态、板块与活跃时间同步到其回复条目。"""
+    raw_post = BBSPost.objects(id=_ref_id(post_id)).only(*_POST_FIELDS).as_pymongo().first()
+    if not raw_post:
+        return
+    collection = BBSSearchEntry._get_collection()  # type: ignore[attr-defined]
+    collection.bulk_write([_post_entry_update(raw_post, get_current_utc_time())])
+    collection.update_many({'post': raw_post['_id'], 'reply': {'$ne': None}}, {
+        '$set': {
+            'board': raw_post.get('board'),
+            'post_status': raw_post.get('status'),
+            'post_author': raw_post.get('author'),
+            'title': raw_post.get('title') or '',
+            'last_active_at': raw_post.get('last_active_at'),
+        }
+    })
+
+
+def index_reply(reply_id) -> None:
+    """重建单条回复的条目。"""
+    raw_reply = BBSReply.objects(id=_ref_id(reply_id)).only('post', 'content', 'status', 'author').as_pymongo().first()
+    if not raw_reply:
+        return
+    raw_post = BBSPost.objects(id=raw_reply['post']).only(*_POST_FIELDS).as_pymongo().first()
+    if not raw_post:
+        return
+    BBSSearchEntry._get_collection().bulk_write([_reply_entry_update(raw_reply, raw_post, get_current_utc_time())])  # type: ignore[attr-defined]
+
+
+def sync_reply_statuses(post_id) -> None:
+    """批量更新回复状态（如隐藏主贴、隐藏楼层连带楼中楼）后，同步该帖回复条目的状态。"""
+    operations = [
+        UpdateOne({'post': raw['post'], 'reply': raw['_id']}, {'$set': {'reply_status': raw.get('status')}})
+        for raw in BBSReply.objects(post=_ref_id(post_id)).only('post', 'status').as_pymongo()
+    ]
+    if operations:
+        BBSSearchEntry._get_collection().bulk_write(operations, ordered=False)  # type: ignore[attr-defined]
+
+
+def safe_index(index_func, *args) -> None:
+    """执行检索条目更新，失败仅记录日志，不影响帖子/回复写入。"""
+    try:
+        index_func(*args)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('BBS检索条目更新失败：%s %s', getattr(index_func, '__name__', index_func), exc, exc_info=True)
+
+
+def _on_post_saved(sender, document, **kwargs):  # pylint: disable=unused-argument
+    safe_index(index_post, document.pk)
+
+
+def _on_reply_saved(sender, document, **kwargs):  # pylint: disable=unused-argument
+    safe_index(index_reply, document.pk)
+
+
+def register_bbs_search_handlers():
+    """注册主贴/回复保存后的检索条目更新（重复调用安全）。"""
+    global _registered  # pylint: disable=global-statement
+    if _registered:
+        return
+    signals.post_save.connect(_on_post_saved, sender=BBSPost)
+    signals.post_save.connect(_on_reply_saved, sender=BBSReply)
+    _registered = True
+    logger.info('BBS检索条目维护监听已注册')
+
+
+def rebuild_bbs_search_index(batch_size: int = 500) -> Dict[str, int]:
+    """按全部主贴与回复重建检索条目，并删除失效条目，返回统计信息。"""
+    logger.info('开始重建BBS检索索引')
+    now = get_current_utc_time()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)  # 与 MongoDB 毫秒精度对齐，避免误删本次写入的条目
+    collection = BBSSearchEntry._get_collection()  # type: ignore[attr-defined]
+
+    posts = {raw['_id']: raw for raw in BBSPost.objects.only(*_POST_FIELDS).as_pymongo()}
+    operations = []
+    reply_count = 0
+
+    def flush():
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            operations.clear()
+
+    for raw_post in posts.values():
+        operations.append(_post_entry_update(raw_post, now))
+        if len(operations) >= batch_size:
+            flush()
+    for raw_reply in BBSReply.objects.only('post', 'content', 'status', 'author').as_pymongo():
+        raw_post = posts.get(raw_reply.get('post'))
+        if raw_post is None:
+            continue
+        operations.append(_reply_entry_update(raw_reply, raw_post, now))
+        reply_count += 1
+        if len(operations) >= batch_size:
+            flush()
+    flush()
+
+    removed = collection.delete_many({'updated_at': {'$lt': now}}).deleted_count
+    logger.info('BBS检索索引重建完成：主贴 %d 个，回复 %d 条，清理失效条目 %d 条', len(posts), reply_count, removed)
+    return {'post_count': len(posts), 'reply_count': reply_count, 'removed_count': removed}
+
+
+def _visible_entries(user: Optional[User]):
+    """按帖子与回复可见性规则过滤检索条目（与 filter_posts_for_user / filter_replies_for_user 一致）。"""
+    queryset = BBSSearchEntry.objects
+    if user is None:
+        return queryset.filter(post_status=BBSPostStatus.PUBLISHED).filter(Q(reply=None) | Q(reply_status=BBSReplyStatus.PUBLISHED))
+    if 'gicho' in {role.name for role in getattr(user, 'roles', [])}:
+        return queryset
+    return queryset.filter(Q(post_status=BBSPostStatus.PUBLISHED) | Q(post_author=user)).filter(
+        Q(reply=None) | Q(reply_status=BBSReplyStatus.PUBLISHED) | Q(author=user))
+
+
+def search_posts(query: str,
+                 user: Optional[User],
+                 board_id: Optional[str] = None,
+                 status: Optional[str] = None,
+                 post_ids: Optional[Sequence[ObjectId]] = None,
+                 page: int = 1,
+                 per_page: int = 20) -> Dict[str, Any]:
+    """检索帖子（一次聚合返回本页命中与总数）。
+
+    Returns:
+        dict: {'terms': 检索词, 'total': 命中帖子数, 'hits': [{'post_id', 'score', 'match_count', 'reply_id', 'snippet_html'}]}
+    """
+    terms = query_terms(query)
+    if not terms:
+        return {'terms': [], 'total': 0, 'hits': []}
+
+    entries = _visible_entries(user).filter(terms__all=terms)
+    if board_id:
+        entries = entries.filter(board=ObjectId(board_id))
+    if status:
+        entries = entries.filter(post_status=status)
+    if post_ids is not None:
+        entries = entries.filter(post__in=list(post_ids))
+
+    score_expression = {
+        '$add': [
+            1,
+            {'$cond': [{'$setIsSubset': [terms, '$title_terms']}, TITLE_MATCH_WEIGHT, 0]},
+            {'$cond': [{'$regexMatch': {'input': '$text', 'regex': re.escape(query.strip()), 'options': 'i'}}, PHRASE_MATCH_WEIGHT, 0]},
+        ]
+    }
+    pipeline = [
+        {'$match': entries._query},
+        {'$project': {'post': 1, 'reply': 1, 'text': 1, 'last_active_at': 1, 'score': score_expression}},
+        {'$sort': {'score': -1}},
+        {'$group': {
+            '_id': '$post',
+            'score': {'$first': '$score'},
+            'reply': {'$first': '$reply'},
+            'text': {'$first': '$text'},
+            'match_count': {'$sum': 1},
+            'last_active_at': {'$max': '$last_active_at'},
+        }},
+        {'$sort': {'score': -1, 'match_count': -1, 'last_active_at': -1, '_id': -1}},
+        {'$facet': {
+            'hits': [{'$skip': (page - 1) * per_page}, {'$limit': per_page}],
+            'total': [{'$count': 'count'}],
+        }},
+    ]
+    result = next(BBSSearchEntry._get_collection().aggregate(pipeline, allowDiskUse=True), {})  # type: ignore[attr-defined]
+    total_rows = result.get('total') or []
+    hits = [{
+        'post_id': str(hit['_id']),
+        'score': hit['score'],
+        'match_count': hit['match_count'],
+        'reply_id': str(hit['reply']) if hit.get('reply') else None,
+        'snippet_html': build_snippet_html(hit.get('text') or '', query, terms),
+    } for hit in result.get('hits', [])]
+    return {'terms': terms, 'total': total_rows[0]['count'] if total_rows else 0, 'hits': hits}
+
+
+def _match_spans(text: str, query: str, terms: Iterable[str]) -> List[Tuple[int, int]]:
+    lowered = text.lower()
+    needles = [query.strip().lower()] if query.strip() and query.strip().lower() in lowered else list(terms)
+    spans = []
+    for needle in needles:
+        for match in re.finditer(re.escape(needle), lowered):
+            spans.append((match.start(), match.end()))
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def build_snippet_html(text: str, query: str, terms: Iterable[str], length: int = SNIPPET_LENGTH) -> str:
+    """截取命中位置附近的摘要，转义后用 <mark> 标出命中片段。"""
+    spans = _match_spans(text, query, terms)
+    start = max(0, spans[0][0] - length // 4) if spans else 0
+    end = min(len(text), start + length)
+    pieces = ['…' if start > 0 else '']
+    cursor = start
+    for span_start, span_end in spans:
+        if span_end <= start or span_start >= end:
+            continue
+        span_start, span_end = max(span_start, start), min(span_end, end)
+        pieces.append(escape(text[cursor:span_start]))
+        pieces.append(f'<mark>{escape(text[span_start:span_end])}</mark>')
+        cursor = span_end
+    pieces.append(escape(text[cursor:end]))
+    pieces.append('…' if end < len(text) else '')
+    return ''.join(pieces).replace('\n', ' ')
@@ -15,6 +15,7 @@ from models.bbs import (BBSBoard, BBSBoardType, BBSPost, BBSPostStatus, BBSReply
 from models.pilot import Pilot
 from models.user import User
 from utils.bbs_notifications import notify_direct_operator_auto_post
+from utils.job_executor import submit_side_effect
 from utils.logging_setup import get_logger
 from utils.timezone_helper import format_local_datetime, get_current_utc_time
 
@@ -248,7 +249,7 @@ def create_post_for_battle_record(record: BattleRecord) -> Optional[BBSPost]:
         ref = BBSPostPilotRef(post=post, pilot=record.pilot, relevance=PilotRelevance.AUTO)
         ref.save()
         logger.debug('自动关联帖子与主播：post=%s pilot=%s', post.id, record.pilot.id)
-    notify_direct_operator_auto_post(record, post)
+    submit_side_effect(f'BBS自动发帖提醒:{post.id}', notify_direct_operator_auto_post, record, post)
     return post
 
 
@@ -320,36 +321,50 @@ def get_last_reply_info(post: BBSPost) -> Tuple[Optional[BBSReply], Optional[Dic
     return latest, latest.author_snapshot or {}
 
 
-def fetch_post_reply_summary(posts: Iterable[BBSPost], include_hidden: bool = False, _current_user: Optional[User] = None) -> Dict[str, Dict[str, object]]:
-    """批量获取帖子回复计数与最新回复信息。"""
-    post_ids = [post.id for post in posts]
-    if not post_ids:
-        return {}
+def _reply_visibility_query(post_ids: List[ObjectId], user: Optional[User]) -> Dict[str, object]:
+    """给定帖子范围内、按 filter_replies_for_user 规则可见回复的原始查询条件。"""
+    return filter_replies_for_user(BBSReply.objects(post__in=post_ids), user)._query  # type: ignore[attr-defined]  # pylint: disable=protected-access
 
-    query = BBSReply.objects(post__in=post_ids)  # type: ignore[attr-defined]
-    if not include_hidden:
-        query = query.filter(status=BBSReplyStatus.PUBLISHED)
-    replies = list(query.order_by('created_at'))
 
-    summary: Dict[str, Dict[str, object]] = {}
-    for reply in replies:
-        pid = str(reply.post.id)
-        info = summary.setdefault(pid, {'count': 0, 'latest': None})
-        if not include_hidden and reply.status == BBSReplyStatus.HIDDEN:
-            continue
-        info['count'] += 1
-        info['latest'] = reply
+def fetch_post_reply_summary(posts: Iterable[BBSPost], current_user: Optional[User] = None) -> Dict[str, Dict[str, object]]:
+    """批量获取帖子回复计数与最新回复信息（单次聚合）。
+
+    可见性与帖子详情一致：管理员与帖子作者按 filter_replies_for_user(current_user) 计入隐藏回复，其他情况仅计已发布回复。
 
+    Returns:
+        dict: {帖子ID: {'count': int, 'latest_time': datetime, 'latest_author': dict}}，没有可见回复的帖子不在结果中
+    """
+    viewer_id = str(current_user.id) if current_user is not None else None
+    is_admin = current_user is not None and 'gicho' in {role.name for role in getattr(current_user, 'roles', [])}
+    own_post_ids: List[ObjectId] = []
+    other_post_ids: List[ObjectId] = []
     for post in posts:
-        pid = str(post.id)
-        info = summary.get(pid)
-        if not info:
-            continue
-        latest = info.get('latest')
-        if isinstance(latest, BBSReply):
-            info['latest_author'] = latest.author_snapshot
-            info['latest_time'] = latest.created_at
-    return summary
+        author_ref = post._data.get('author')  # pylint: disable=protected-access
+        include_hidden = viewer_id is not None and (is_admin or str(getattr(author_ref, 'id', author_ref)) == viewer_id)
+        (own_post_ids if include_hidden else other_post_ids).append(post.id)
+
+    clauses = []
+    if own_post_ids:
+        clauses.append(_reply_visibility_query(own_post_ids, current_user))
+    if other_post_ids:
+        clauses.append(_reply_visibility_query(other_post_ids, None))
+    if not clauses:
+        return {}
+
+    pipeline = [
+        {'$match': clauses[0] if len(clauses) == 1 else {'$or': clauses}},
+        {'$sort': {'post': 1, 'created_at': -1}},
+        {'$group': {'_id': '$post', 'count': {'$sum': 1}, 'latest_time': {'$first': '$created_at'}, 'latest_author': {'$first': '$author_snapshot'}}},
+    ]
+    groups = BBSReply._get_collection().aggregate(pipeline, allowDiskUse=True)  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    return {
+        str(group['_id']): {
+            'count': group['count'],
+            'latest_time': group.get('latest_time'),
+            'latest_author': group.get('latest_author') or {}
+        }
+        for group in groups
+    }
 
 
 def fetch_recent_posts_for_pilot(pilot: Pilot, accessible_post_ids: Optional[Iterable[str]] = None, limit: int = 3) -> List[BBSPost]:
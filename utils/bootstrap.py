@@ -21,8 +21,12 @@ def ensure_database_indexes() -> None:
         from models.announcement import Announcement
         from models.battle_area import BattleArea
         from models.battle_record import BattleRecord
+        from models.dashboard_snapshot import DashboardSnapshot
+        from models.mail_outbox import MailOutbox
         from models.pilot import Pilot
+        from models.pilot_daily_fact import PilotDailyFact, PilotDailyFactRebuild
         from models.recruit import Recruit
+        from models.report_cache import ReportCacheEntry, ReportCacheEvent
 
         models_to_index = [
             (Role, 'Role'),
@@ -31,7 +35,13 @@ def ensure_database_indexes() -> None:
             (BattleArea, 'BattleArea'),
             (Announcement, 'Announcement'),
             (BattleRecord, 'BattleRecord'),
+            (PilotDailyFact, 'PilotDailyFact'),
+            (PilotDailyFactRebuild, 'PilotDailyFactRebuild'),
             (Recruit, 'Recruit'),
+            (MailOutbox, 'MailOutbox'),
+            (ReportCacheEntry, 'ReportCacheEntry'),
+            (ReportCacheEvent, 'ReportCacheEvent'),
+            (DashboardSnapshot, 'DashboardSnapshot'),
         ]
 
         for model_class, model_name in models_to_index:
@@ -47,6 +57,18 @@ def ensure_database_indexes() -> None:
         logger.error('确保数据库索引失败：%s', exc)
 
 
+def ensure_announcement_end_time() -> None:
+    """为历史通告补写 end_time 字段（幂等，已写入的通告不受影响）。"""
+    try:
+        from models.announcement import Announcement
+
+        updated = Announcement.backfill_end_time()
+        if updated:
+            logger.info('已为 %d 条历史通告补写结束时间', updated)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('补写通告结束时间失败：%s', exc)
+
+
 def ensure_initial_roles_and_admin(user_datastore) -> None:
     """确保系统初始角色与默认议长存在。
 
@@ -0,0 +1,437 @@
+# -*- coding: utf-8 -*-
+"""
+报表缓存存储后端
+
+cache_helper 的报表缓存通过本模块的后端读写，可按部署方式选择：
+- memory：进程内 TTLCache（默认，单进程/本地开发的替身实现）
+- mongo：MongoDB 集合 report_cache_entries（TTL 索引自动清理），多 worker 共享
+- file：本地目录文件存储，同机多 worker 共享，无需外部服务
+
+进程内后端在多 worker 部署时，通过 report_cache_events 集合广播失效事件，
+其他 worker 读取缓存前拉取并在本地重放。
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+from models.report_cache import ReportCacheEntry, ReportCacheEvent
+from utils.logging_setup import get_logger
+from utils.timezone_helper import get_current_utc_time
+
+logger = get_logger('cache_backends')
+
+ScopeMatcher = Callable[[Optional[Dict[str, Any]], Dict[str, Any]], bool]
+
+# —— 紧凑序列化：报表结果以 Decimal/日期为主，JSON 标记类型后 zlib 压缩 ——
+
+
+def _encode_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return {'__d': str(value)}
+    if isinstance(value, datetime):
+        return {'__dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'__date': value.isoformat()}
+    if isinstance(value, (set, frozenset)):
+        return {'__s': [_tag_tuples(item) for item in value]}
+    raise TypeError(f'不支持缓存序列化的类型：{type(value).__name__}')
+
+
+def _tag_tuples(value: Any) -> Any:
+    """JSON 不区分 tuple/list，这里显式标记 tuple，保证反序列化后结构一致。"""
+    if isinstance(value, tuple):
+        return {'__t': [_tag_tuples(item) for item in value]}
+    if isinstance(value, list):
+        return [_tag_tuples(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _tag_tuples(item) for key, item in value.items()}
+    return value
+
+
+def _decode_hook(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1:
+        if '__d' in obj:
+            return Decimal(obj['__d'])
+        if '__dt' in obj:
+            return datetime.fromisoformat(obj['__dt'])
+        if '__date' in obj:
+            return date.fromisoformat(obj['__date'])
+        if '__t' in obj:
+            return tuple(obj['__t'])
+        if '__s' in obj:
+            return frozenset(obj['__s'])
+    return obj
+
+
+def encode_cache_value(value: Any) -> bytes:
+    """序列化缓存值为压缩字节串。"""
+    raw = json.dumps(_tag_tuples(value), default=_encode_default, ensure_ascii=False, separators=(',', ':'))
+    return zlib.compress(raw.encode('utf-8'))
+
+
+def decode_cache_value(payload: bytes) -> Any:
+    """反序列化 encode_cache_value 的结果。"""
+    return json.loads(zlib.decompress(payload).decode('utf-8'), object_hook=_decode_hook)
+
+
+def _date_str(value: Optional[date]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def _scope_to_doc(scope: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    if scope is None:
+        return {'scope_known': False, 'scope_start': None, 'scope_end': None, 'owner_id': None, 'pilot_known': False, 'pilot_ids': [], 'pilot_filtered': False}
+    return {
+        'scope_known': True,
+        'scope_start': _date_str(scope['start']),
+        'scope_end': _date_str(scope['end']),
+        'owner_id': scope['owner_id'],
+        'pilot_known': scope['pilot_ids'] is not None,
+        'pilot_ids': sorted(scope['pilot_ids'] or []),
+        'pilot_filtered': scope['pilot_filtered'],
+    }
+
+
+def _scope_from_doc(doc: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if not doc.get('scope_known'):
+        return None
+    return {
+        'start': date.fromisoformat(doc['scope_start']) if doc.get('scope_start') else None,
+        'end': date.fromisoformat(doc['scope_end']) if doc.get('scope_end') else None,
+        'owner_id': doc.get('owner_id'),
+        'pilot_ids': frozenset(doc.get('pilot_ids') or []) if doc.get('pilot_known') else None,
+        'pilot_filtered': bool(doc.get('pilot_filtered')),
+        'expires_at': None,
+    }
+
+
+def event_to_doc(event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'kind': event['kind'],
+        'pilot_id': event['pilot_id'],
+        'start': _date_str(event['start']),
+        'end': _date_str(event['end']),
+        'owner_ids': sorted(event['owner_ids']),
+    }
+
+
+def event_from_doc(doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'kind': doc.get('kind'),
+        'pilot_id': doc.get('pilot_id'),
+        'start': date.fromisoformat(doc['start']) if doc.get('start') else None,
+        'end': date.fromisoformat(doc['end']) if doc.get('end') else None,
+        'owner_ids': frozenset(doc.get('owner_ids') or []),
+    }
+
+
+def _entry_expires_at(ttl: int, scope: Optional[Dict[str, Any]]) -> datetime:
+    expires_at = get_current_utc_time() + timedelta(seconds=ttl)
+    if scope and scope.get('expires_at') is not None:
+        expires_at = min(expires_at, scope['expires_at'])
+    return expires_at
+
+
+# —— 后端实现 ——
+
+
+class MemoryCacheBackend:
+    """进程内 TTLCache 后端（不序列化，直接保存对象）。"""
+
+    backend_name = 'memory'
+
+    def __init__(self, namespace: str, maxsize: int, ttl: int):
+        self.namespace = namespace
+        self.ttl = ttl
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.RLock()
+
+    def get(self, key: str) -> Optional[Tuple[Optional[Dict[str, Any]], Any]]:
+        with self._lock:
+            entry = self._cache.get(key)
+        if entry is None:
+            return None
+        scope, value, expires_at = entry
+        if get_current_utc_time() >= expires_at:
+            self.delete(key)
+            return None
+        return scope, value
+
+    def set(self, key: str, scope: Optional[Dict[str, Any]], value: Any) -> None:
+        with self._lock:
+            self._cache[key] = (scope, value, _entry_expires_at(self.ttl, scope))
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._cache.pop(key, None)
+
+    def evict(self, event: Dict[str, Any], matcher: ScopeMatcher) -> int:
+        with self._lock:
+            affected_keys = [key for key, entry in list(self._cache.items()) if matcher(entry[0], event)]
+            for key in affected_keys:
+                self._cache.pop(key, None)
+        return len(affected_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+
+    def info(self) -> Dict[str, Any]:
+        return {'backend': self.backend_name, 'cache_size': len(self._cache), 'max_size': self._cache.maxsize, 'ttl': self.ttl}
+
+
+class MongoCacheBackend:
+    """MongoDB 共享后端：所有 worker 读写同一集合，失效即全局生效。"""
+
+    backend_name = 'mongo'
+
+    def __init__(self, namespace: str, maxsize: int, ttl: int):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+    @staticmethod
+    def _collection():
+        return ReportCacheEntry._get_collection()  # type: ignore[attr-defined]  # pylint: disable=protected-access
+
+    def get(self, key: str) -> Optional[Tuple[Optional[Dict[str, Any]], Any]]:
+        doc = self._collection().find_one({'namespace': self.namespace, 'key': key, 'expires_at': {'$gt': get_current_utc_time()}})
+        if not doc:
+            return None
+        return _scope_from_doc(doc), decode_cache_value(doc['payload'])
+
+    def set(self, key: str, scope: Optional[Dict[str, Any]], value: Any) -> None:
+        document = _scope_to_doc(scope)
+        document.update({'payload': encode_cache_value(value), 'expires_at': _entry_expires_at(self.ttl, scope)})
+        self._collection().update_one({'namespace': self.namespace, 'key': key}, {'$set': document}, upsert=True)
+
+    def delete(self, key: str) -> None:
+        self._collection().delete_one({'namespace': self.namespace, 'key': key})
+
+    def _event_query(self, event: Dict[str, Any]) -> Dict[str, Any]:
+        """将失效事件转换为与 cache_helper 中范围判定等价的查询条件。"""
+        affected: List[Dict[str, Any]] = [{'scope_known': False}]
+        scoped: List[Dict[str, Any]] = [{'scope_known': True}]
+        if event['start'] is not None:
+            scoped.append({'$or': [{'scope_end': None}, {'scope_end': {'$gt': _date_str(event['start'])}}]})
+        if event['end'] is not None:
+            scoped.append({'$or': [{'scope_start': None}, {'scope_start': {'$lt': _date_str(event['end'])}}]})
+
+        if event['pilot_id'] is not None:
+            pilot_conditions: List[Dict[str, Any]] = [{'pilot_known': False}, {'pilot_ids': event['pilot_id']}]
+            owner_ids = sorted(event['owner_ids'])
+            if event['kind'] == 'record':
+                pilot_conditions.extend([{'owner_id': None}, {'owner_id': {'$in': owner_ids}}])
+            elif event['kind'] == 'pilot':
+                pilot_conditions.extend([{'owner_id': {'$in': owner_ids}}, {'pilot_filtered': True}])
+            scoped.append({'$or': pilot_conditions})
+
+        affected.append({'$and': scoped})
+        return {'namespace': self.namespace, '$or': affected}
+
+    def evict(self, event: Dict[str, Any], matcher: ScopeMatcher) -> int:  # pylint: disable=unused-argument
+        return self._collection().delete_many(self._event_query(event)).deleted_count
+
+    def clear(self) -> None:
+        self._collection().delete_many({'namespace': self.namespace})
+
+    def info(self) -> Dict[str, Any]:
+        size = self._collection().count_documents({'namespace': self.namespace, 'expires_at': {'$gt': get_current_utc_time()}})
+        return {'backend': self.backend_name, 'cache_size': size, 'max_size': self.maxsize, 'ttl': self.ttl}
+
+
+class FileCacheBackend:
+    """本地目录文件后端：每个条目一个文件，首行为范围元数据，其后为压缩负载；写入采用临时文件+原子替换。"""
+
+    backend_name = 'file'
+
+    def __init__(self, namespace: str, maxsize: int, ttl: int, directory: str):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.directory = os.path.join(directory, namespace)
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f'{key}.bin')
+
+    def _entry_paths(self) -> List[str]:
+        try:
+            return [os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.bin')]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _read_header(handle) -> Dict[str, Any]:
+        return json.loads(handle.readline().decode('utf-8'))
+
+    def _is_stale(self, header: Dict[str, Any]) -> bool:
+        return time.time() >= header.get('expires_at', 0)
+
+    def get(self, key: str) -> Optional[Tuple[Optional[Dict[str, Any]], Any]]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as handle:
+                header = self._read_header(handle)
+                if self._is_stale(header):
+                    self.delete(key)
+                    return None
+                return _scope_from_doc(header), decode_cache_value(handle.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error) as exc:
+            logger.warning('读取文件缓存失败，已丢弃：%s（%s）', path, exc)
+            self.delete(key)
+            return None
+
+    def set(self, key: str, scope: Optional[Dict[str, Any]], value: Any) -> None:
+        header = _scope_to_doc(scope)
+        header['expires_at'] = _entry_expires_at(self.ttl, scope).replace(tzinfo=timezone.utc).timestamp()
+        payload = encode_cache_value(value)
+        temp_path = f'{self._path(key)}.{uuid.uuid4().hex}.tmp'
+        with open(temp_path, 'wb') as handle:
+            handle.write(json.dumps(header, separators=(',', ':')).encode('utf-8') + b'\n')
+            handle.write(payload)
+        os.replace(temp_path, self._path(key))
+        self._enforce_maxsize()
+
+    def _enforce_maxsize(self) -> None:
+        paths = self._entry_paths()
+        if len(paths) <= self.maxsize:
+            return
+        paths.sort(key=lambda item: os.path.getmtime(item) if os.path.exists(item) else 0)
+        for path in paths[:len(paths) - self.maxsize]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key: str) -> None:
+        self._remove(self._path(key))
+
+    def evict(self, event: Dict[str, Any], matcher: ScopeMatcher) -> int:
+        evicted = 0
+        for path in self._entry_paths():
+            try:
+                with open(path, 'rb') as handle:
+                    header = self._read_header(handle)
+            except (OSError, ValueError):
+                continue
+            if self._is_stale(header) or matcher(_scope_from_doc(header), event):
+                self._remove(path)
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        for path in self._entry_paths():
+            self._remove(path)
+
+    def info(self) -> Dict[str, Any]:
+        return {'backend': self.backend_name, 'cache_size': len(self._entry_paths()), 'max_size': self.maxsize, 'ttl': self.ttl}
+
+
+def create_cache_backend(namespace: str, maxsize: int, ttl: int, backend: Optional[str] = None):
+    """按名称创建缓存后端；未指定时读取环境变量 REPORT_CACHE_BACKEND（默认 memory）。"""
+    backend = (backend or os.getenv('REPORT_CACHE_BACKEND', 'memory')).strip().lower()
+    if backend == 'mongo':
+        return MongoCacheBackend(namespace, maxsize, ttl)
+    if backend == 'file':
+        directory = os.getenv('REPORT_CACHE_DIR', os.path.join('cache', 'report_cache'))
+        return FileCacheBackend(namespace, maxsize, ttl, directory)
+    if backend != 'memory':
+        logger.warning('未知的报表缓存后端：%s，已回退为 memory', backend)
+    return MemoryCacheBackend(namespace, maxsize, ttl)
+
+
+# —— 跨 worker 失效广播（进程内后端使用） ——
+
+
+class MongoInvalidationBus:
+    """基于 MongoDB 集合的失效广播：发布时写入事件，读取缓存前拉取其他进程的新事件。
+
+    各进程生成的 ObjectId 不保证全局有序，因此按发布时间回看一小段重叠窗口，并以已处理ID去重。
+    """
+
+    OVERLAP_SECONDS = 5
+
+    def __init__(self, poll_interval: float = 1.0):
+        self.origin = uuid.uuid4().hex
+        self.poll_interval = poll_interval
+        self._since = get_current_utc_time()
+        self._seen: Dict[Any, datetime] = {}
+        self._last_poll = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _collection():
+        return ReportCacheEvent._get_collection()  # type: ignore[attr-defined]  # pylint: disable=protected-access
+
+    def publish(self, action: str, event: Optional[Dict[str, Any]] = None, namespace: Optional[str] = None) -> None:
+        try:
+            self._collection().insert_one({
+                'origin': self.origin,
+                'action': action,
+                'namespace': namespace,
+                'event': event_to_doc(event) if event else {},
+                'created_at': get_current_utc_time(),
+            })
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.warning('报表缓存失效广播失败：%s', exc)
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """拉取其他进程发布的新事件；未到拉取间隔时返回空列表。"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_poll < self.poll_interval:
+                return []
+            self._last_poll = now
+
+            window_start = self._since - timedelta(seconds=self.OVERLAP_SECONDS)
+            polled_at = get_current_utc_time()
+            try:
+                docs = list(self._collection().find({'created_at': {'$gte': window_start}}).sort('created_at', 1))
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.warning('拉取报表缓存失效广播失败：%s', exc)
+                return []
+
+            fresh = [doc for doc in docs if doc['_id'] not in self._seen]
+            for doc in fresh:
+                self._seen[doc['_id']] = doc.get('created_at') or polled_at
+            self._seen = {doc_id: created_at for doc_id, created_at in self._seen.items() if created_at >= window_start}
+            self._since = polled_at
+
+        return [doc for doc in fresh if doc.get('origin') != self.origin]
+
+
+class LocalInvalidationBus:
+    """单进程替身：不广播，也不拉取。"""
+
+    origin = 'local'
+
+    def publish(self, action: str, event: Optional[Dict[str, Any]] = None, namespace: Optional[str] = None) -> None:  # pylint: disable=unused-argument
+        return None
+
+    def poll(self) -> List[Dict[str, Any]]:
+        return []
+
+
+def create_invalidation_bus(backend_name: str):
+    """进程内后端默认通过 MongoDB 广播失效；共享后端或 REPORT_CACHE_BROADCAST=none 时不广播。"""
+    if backend_name != 'memory':
+        return LocalInvalidationBus()
+    if os.getenv('REPORT_CACHE_BROADCAST', 'mongo').strip().lower() == 'none':
+        return LocalInvalidationBus()
+    return MongoInvalidationBus()
@@ -2,27 +2,134 @@
 """
 缓存工具模块
 
-为开播月报等计算密集型功能提供缓存支持
+为开播月报等计算密集型功能提供缓存支持。
+
+报表缓存条目记录其依赖范围（覆盖的本地日期区间、直属运营、涉及的主播），
+数据写入时发布失效事件，只淘汰受影响的条目，因此报表缓存可以使用较长的TTL。
+
+报表缓存的存储后端由环境变量 REPORT_CACHE_BACKEND 选择（memory/mongo/file，见 utils.cache_backends），
+多 worker 部署时各进程共享缓存条目或广播失效事件，避免某个 worker 返回已失效的报表。
+
+同一缓存键在进程内只计算一次（single-flight），并发请求等待同一次计算；
+条目超过新鲜期后在宽限期内先返回旧结果，同时在后台刷新（stale-while-revalidate）。
 """
 
 import functools
 import hashlib
 import json
 import logging
-from typing import Any, Callable, Dict
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, Optional
 
 from cachetools import TTLCache
 
+from utils.cache_backends import create_cache_backend, create_invalidation_bus, event_from_doc
+from utils.timezone_helper import get_current_utc_time
+
 logger = logging.getLogger(__name__)
 
-monthly_report_cache = TTLCache(maxsize=1000, ttl=900)  # 900秒 = 15分钟
+# 命名空间 -> (最大条目数, 新鲜期秒, 过期后可先返回旧结果的宽限期秒)
+REPORT_CACHE_SPECS = {
+    'daily_report': (1000, 14400, 3600),  # 新鲜期4小时，依赖数据写入时按范围失效
+    'monthly_report': (1000, 14400, 3600),  # 新鲜期4小时，依赖数据写入时按范围失效
+    'weekly_report': (1000, 14400, 3600),  # 新鲜期4小时，依赖数据写入时按范围失效
+    'pilot_performance': (500, 300, 0),  # 300秒 = 5分钟
+}
 
-weekly_report_cache = TTLCache(maxsize=1000, ttl=900)  # 900秒 = 15分钟
+# 参与范围失效的报表命名空间
+SCOPED_REPORT_NAMESPACES = ('daily_report', 'monthly_report', 'weekly_report', 'pilot_performance')
 
-pilot_performance_cache = TTLCache(maxsize=500, ttl=300)  # 300秒 = 5分钟
+# 多 worker 共享的缓存后端（进程内后端的预计算只惠及当前进程）
+SHARED_REPORT_CACHE_BACKENDS = ('mongo', 'file')
 
 active_pilot_cache = TTLCache(maxsize=10, ttl=3600)  # 3600秒 = 60分钟
 
+_backend_lock = threading.Lock()
+_backend_name: Optional[str] = None
+_backends: Dict[str, Any] = {}
+_invalidation_bus: Any = None
+
+# 失效代数：计算期间发生失效时，计算结果不写入缓存，避免写回已失效的数据
+_invalidation_generation = 0
+
+_flight_guard = threading.Lock()
+_flight_locks: Dict[str, threading.Lock] = {}  # 缓存键数量受报表参数组合限制，不做回收
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure_report_cache_backend(backend: Optional[str] = None) -> str:
+    """（重新）创建报表缓存后端，返回实际使用的后端名称。
+
+    Args:
+        backend: memory/mongo/file，None 时读取环境变量 REPORT_CACHE_BACKEND
+    """
+    global _backend_name, _invalidation_bus  # pylint: disable=global-statement
+    with _backend_lock:
+        backends = {
+            namespace: create_cache_backend(namespace, maxsize, fresh_ttl + stale_ttl, backend)
+            for namespace, (maxsize, fresh_ttl, stale_ttl) in REPORT_CACHE_SPECS.items()
+        }
+        _backend_name = next(iter(backends.values())).backend_name
+        _backends.clear()
+        _backends.update(backends)
+        _invalidation_bus = create_invalidation_bus(_backend_name)
+    logger.info('报表缓存后端：%s', _backend_name)
+    return _backend_name
+
+
+def _get_backend(namespace: str):
+    # 延迟创建：环境变量在 create_app 中加载，模块导入时尚不可用
+    if not _backends:
+        configure_report_cache_backend()
+    return _backends[namespace]
+
+
+def is_report_cache_shared() -> bool:
+    """报表缓存后端是否由多个 worker 共享。"""
+    _get_backend(SCOPED_REPORT_NAMESPACES[0])
+    return _backend_name in SHARED_REPORT_CACHE_BACKENDS
+
+
+def _sync_remote_invalidations() -> None:
+    """拉取其他 worker 广播的失效事件并在本进程重放（仅进程内后端）。"""
+    if _invalidation_bus is None:
+        return
+    docs = _invalidation_bus.poll()
+    if docs:
+        _bump_invalidation_generation()
+    for doc in docs:
+        if doc.get('action') == 'clear':
+            namespaces = [doc['namespace']] if doc.get('namespace') in _backends else list(_backends)
+            for namespace in namespaces:
+                _backends[namespace].clear()
+        elif doc.get('action') == 'evict':
+            event = event_from_doc(doc.get('event') or {})
+            for namespace in SCOPED_REPORT_NAMESPACES:
+                _backends[namespace].evict(event, _scope_affected)
+
+
+def _bump_invalidation_generation() -> None:
+    global _invalidation_generation  # pylint: disable=global-statement
+    with _flight_guard:
+        _invalidation_generation += 1
+
+
+def _flight_lock(cache_key: str) -> threading.Lock:
+    with _flight_guard:
+        return _flight_locks.setdefault(cache_key, threading.Lock())
+
+
+def _get_refresh_executor() -> ThreadPoolExecutor:
+    global _refresh_executor  # pylint: disable=global-statement
+    with _flight_guard:
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='report-cache-refresh')
+        return _refresh_executor
+
 
 def generate_cache_key(func_name: str, *args, **kwargs) -> str:
     """生成缓存键
@@ -41,42 +148,141 @@ def generate_cache_key(func_name: str, *args, **kwargs) -> str:
     return hashlib.md5(key_str.encode('utf-8')).hexdigest()
 
 
-def cached_monthly_report(ttl: int = 900):  # pylint: disable=unused-argument
-    """开播月报缓存装饰器
+def build_cache_scope(start: Optional[date] = None,
+                      end: Optional[date] = None,
+                      owner_id: Optional[str] = None,
+                      pilot_ids: Optional[Iterable[str]] = None,
+                      pilot_filtered: bool = False,
+                      expires_at: Optional[datetime] = None) -> Dict[str, Any]:
+    """构建报表缓存条目的依赖范围
 
     Args:
-        ttl: 缓存过期时间（秒），默认15分钟
+        start: 覆盖的本地起始日期（含），None 表示不限
+        end: 覆盖的本地结束日期（不含），None 表示不限
+        owner_id: 按直属运营筛选时的运营ID，None 表示全部
+        pilot_ids: 结果涉及的主播ID集合，None 表示未知（任意主播的写入均视为相关）
+        pilot_filtered: 结果范围是否依赖主播属性（如主播状态筛选）
+        expires_at: 条目强制过期的UTC时间（如当月报表在本地零点后统计范围变化）
     """
+    return {
+        'start': start,
+        'end': end,
+        'owner_id': owner_id,
+        'pilot_ids': frozenset(str(pid) for pid in pilot_ids) if pilot_ids is not None else None,
+        'pilot_filtered': pilot_filtered,
+        'expires_at': expires_at,
+    }
 
-    def decorator(func: Callable) -> Callable:
 
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            cache_key = generate_cache_key(func.__name__, *args, **kwargs)
+def build_invalidation_event(kind: str,
+                             pilot_id: Optional[str],
+                             start: Optional[date] = None,
+                             end: Optional[date] = None,
+                             owner_ids: Iterable[str] = ()) -> Dict[str, Any]:
+    """构建缓存失效事件
 
-            if cache_key in monthly_report_cache:
-                logger.debug('缓存命中：%s', func.__name__)
-                return monthly_report_cache[cache_key]
+    Args:
+        kind: 事件类型：record（开播记录，可能使主播进入报表范围）、
+              data（底薪申请/分成调整，仅影响已在报表中的主播）、pilot（主播资料）
+        pilot_id: 相关主播ID，None 表示无法确定（按全部主播处理）
+        start: 受影响的本地起始日期（含），None 表示不限
+        end: 受影响的本地结束日期（不含），None 表示不限
+        owner_ids: 相关直属运营ID（主播当前运营、记录运营快照及变更前的运营）
+    """
+    return {
+        'kind': kind,
+        'pilot_id': str(pilot_id) if pilot_id else None,
+        'start': start,
+        'end': end,
+        'owner_ids': frozenset(str(oid) for oid in owner_ids if oid),
+    }
 
-            logger.debug('缓存未命中，开始计算：%s', func.__name__)
-            result = func(*args, **kwargs)
 
-            monthly_report_cache[cache_key] = result
-            logger.debug('计算结果已缓存：%s', func.__name__)
+def _ranges_overlap(scope: Dict[str, Any], event: Dict[str, Any]) -> bool:
+    if scope['end'] is not None and event['start'] is not None and event['start'] >= scope['end']:
+        return False
+    if event['end'] is not None and scope['start'] is not None and scope['start'] >= event['end']:
+        return False
+    return True
+
+
+def _scope_affected(scope: Optional[Dict[str, Any]], event: Dict[str, Any]) -> bool:
+    """判断缓存条目是否受失效事件影响。"""
+    if scope is None:
+        return True
+    if not _ranges_overlap(scope, event):
+        return False
+
+    pilot_ids = scope['pilot_ids']
+    if pilot_ids is None or event['pilot_id'] is None or event['pilot_id'] in pilot_ids:
+        return True
+
+    if event['kind'] == 'record':
+        return scope['owner_id'] is None or scope['owner_id'] in event['owner_ids']
+    if event['kind'] == 'pilot':
+        return scope['owner_id'] in event['owner_ids'] or scope['pilot_filtered']
+    return False
+
+
+def _is_expired(scope: Optional[Dict[str, Any]]) -> bool:
+    return bool(scope and scope['expires_at'] is not None and get_current_utc_time() >= scope['expires_at'])
+
+
+def _read_entry(namespace: str, label: str, cache_key: str):
+    """读取缓存条目，返回 (结果, 是否新鲜)；未命中或已强制过期时返回 None。"""
+    try:
+        _sync_remote_invalidations()
+        entry = _get_backend(namespace).get(cache_key)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning('%s缓存读取失败，直接计算：%s', label, exc)
+        return None
+    if entry is None or _is_expired(entry[0]):
+        return None
+    fresh_until, result = entry[1]
+    return result, time.time() < fresh_until
+
+
+def _compute_and_store(namespace: str, label: str, cache_key: str, func: Callable, scope_builder: Optional[Callable[..., Dict[str, Any]]], args, kwargs):
+    generation = _invalidation_generation
+    result = func(*args, **kwargs)
+
+    if generation != _invalidation_generation:
+        logger.debug('%s计算期间发生缓存失效，结果不写入缓存：%s', label, func.__name__)
+        return result
+
+    scope = scope_builder(result, *args, **kwargs) if scope_builder else None
+    try:
+        _get_backend(namespace).set(cache_key, scope, (time.time() + REPORT_CACHE_SPECS[namespace][1], result))
+        logger.debug('%s计算结果已缓存：%s', label, func.__name__)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning('%s缓存写入失败：%s', label, exc)
+    return result
 
-            return result
 
-        return wrapper
+def _schedule_refresh(namespace: str, label: str, cache_key: str, func: Callable, scope_builder: Optional[Callable[..., Dict[str, Any]]], args, kwargs) -> None:
+    """后台刷新旧条目；同一缓存键已在计算时直接跳过。"""
+    lock = _flight_lock(cache_key)
+    if not lock.acquire(blocking=False):
+        return
 
-    return decorator
+    def refresh():
+        try:
+            _compute_and_store(namespace, label, cache_key, func, scope_builder, args, kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error('%s缓存后台刷新失败：%s', label, exc, exc_info=True)
+        finally:
+            lock.release()
 
+    try:
+        _get_refresh_executor().submit(refresh)
+        logger.debug('%s缓存已过新鲜期，返回旧结果并后台刷新：%s', label, func.__name__)
+    except RuntimeError as exc:
+        lock.release()
+        logger.warning('%s缓存后台刷新提交失败：%s', label, exc)
 
-def cached_weekly_report(ttl: int = 900):  # pylint: disable=unused-argument
-    """开播周报缓存装饰器
 
-    Args:
-        ttl: 缓存过期时间（秒），默认15分钟
-    """
+def _scoped_cache(namespace: str, label: str, scope_builder: Optional[Callable[..., Dict[str, Any]]]) -> Callable:
+    """带依赖范围的缓存装饰器工厂；scope_builder(result, *args, **kwargs) 返回条目依赖范围。"""
 
     def decorator(func: Callable) -> Callable:
 
@@ -84,78 +290,106 @@ def cached_weekly_report(ttl: int = 900):  # pylint: disable=unused-argument
         def wrapper(*args, **kwargs):
             cache_key = generate_cache_key(func.__name__, *args, **kwargs)
 
-            if cache_key in weekly_report_cache:
-                logger.debug('缓存命中：%s', func.__name__)
-                return weekly_report_cache[cache_key]
+            cached = _read_entry(namespace, label, cache_key)
+            if cached is not None:
+                result, fresh = cached
+                if not fresh:
+                    _schedule_refresh(namespace, label, cache_key, func, scope_builder, args, kwargs)
+                logger.debug('%s缓存命中：%s', label, func.__name__)
+                return result
 
-            logger.debug('缓存未命中，开始计算：%s', func.__name__)
-            result = func(*args, **kwargs)
+            with _flight_lock(cache_key):
+                # 等待期间其他线程可能已完成同一计算
+                cached = _read_entry(namespace, label, cache_key)
+                if cached is not None:
+                    logger.debug('%s缓存命中（等待同键计算完成）：%s', label, func.__name__)
+                    return cached[0]
 
-            weekly_report_cache[cache_key] = result
-            logger.debug('计算结果已缓存：%s', func.__name__)
-
-            return result
+                logger.debug('%s缓存未命中，开始计算：%s', label, func.__name__)
+                return _compute_and_store(namespace, label, cache_key, func, scope_builder, args, kwargs)
 
         return wrapper
 
     return decorator
 
 
-def _clear_report_cache(log_message: str):
-    """统一清空报告缓存并记录日志"""
-    monthly_report_cache.clear()
-    logger.info(log_message)
-
+def cached_daily_report(scope_builder: Optional[Callable[..., Dict[str, Any]]] = None):
+    """开播日报缓存装饰器（新鲜期与宽限期见 REPORT_CACHE_SPECS）
 
-def clear_monthly_report_cache():
-    """清空开播月报缓存"""
-    _clear_report_cache('开播月报缓存已清空')
+    Args:
+        scope_builder: 依赖范围构建函数，未提供时任何失效事件都会淘汰该条目
+    """
+    return _scoped_cache('daily_report', '日报', scope_builder)
 
 
-def clear_daily_report_cache():
-    """清空开播日报缓存"""
-    _clear_report_cache('开播日报缓存已清空')
+def cached_monthly_report(scope_builder: Optional[Callable[..., Dict[str, Any]]] = None):
+    """开播月报缓存装饰器（新鲜期与宽限期见 REPORT_CACHE_SPECS）
 
+    Args:
+        scope_builder: 依赖范围构建函数，未提供时任何失效事件都会淘汰该条目
+    """
+    return _scoped_cache('monthly_report', '月报', scope_builder)
 
-def clear_weekly_report_cache():
-    """清空开播周报缓存"""
-    _clear_report_cache('开播周报缓存已清空')
 
+def cached_weekly_report(scope_builder: Optional[Callable[..., Dict[str, Any]]] = None):
+    """开播周报缓存装饰器（新鲜期与宽限期见 REPORT_CACHE_SPECS）
 
-def cached_pilot_performance(ttl: int = 300):  # pylint: disable=unused-argument
-    """主播业绩缓存装饰器
-    
     Args:
-        ttl: 缓存过期时间（秒），默认5分钟
+        scope_builder: 依赖范围构建函数，未提供时任何失效事件都会淘汰该条目
     """
+    return _scoped_cache('weekly_report', '周报', scope_builder)
+
+
+def invalidate_report_caches(event: Dict[str, Any]) -> int:
+    """按失效事件淘汰受影响的报表与主播业绩缓存条目，并广播给其他 worker，返回本地淘汰数量。"""
+    _bump_invalidation_generation()
+    evicted = 0
+    for namespace in SCOPED_REPORT_NAMESPACES:
+        evicted += _get_backend(namespace).evict(event, _scope_affected)
+    if _invalidation_bus is not None:
+        _invalidation_bus.publish('evict', event)
+    if evicted:
+        logger.debug('报表缓存失效：事件=%s 主播=%s，淘汰 %d 条', event['kind'], event['pilot_id'], evicted)
+    return evicted
+
+
+def _clear_report_cache(namespace: str, log_message: str):
+    """统一清空报告缓存（含其他 worker）并记录日志"""
+    _bump_invalidation_generation()
+    _get_backend(namespace).clear()
+    if _invalidation_bus is not None:
+        _invalidation_bus.publish('clear', namespace=namespace)
+    logger.info(log_message)
 
-    def decorator(func: Callable) -> Callable:
 
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            cache_key = generate_cache_key(func.__name__, *args, **kwargs)
+def clear_monthly_report_cache():
+    """清空开播月报缓存"""
+    _clear_report_cache('monthly_report', '开播月报缓存已清空')
 
-            if cache_key in pilot_performance_cache:
-                logger.debug('主播业绩缓存命中：%s', func.__name__)
-                return pilot_performance_cache[cache_key]
 
-            logger.debug('主播业绩缓存未命中，开始计算：%s', func.__name__)
-            result = func(*args, **kwargs)
+def clear_daily_report_cache():
+    """清空开播日报缓存（日报的月度汇总复用月报缓存，一并清空）"""
+    _clear_report_cache('daily_report', '开播日报缓存已清空')
+    _clear_report_cache('monthly_report', '开播日报关联的月度汇总缓存已清空')
 
-            pilot_performance_cache[cache_key] = result
-            logger.debug('主播业绩计算结果已缓存：%s', func.__name__)
 
-            return result
+def clear_weekly_report_cache():
+    """清空开播周报缓存"""
+    _clear_report_cache('weekly_report', '开播周报缓存已清空')
 
-        return wrapper
 
-    return decorator
+def cached_pilot_performance(scope_builder: Optional[Callable[..., Dict[str, Any]]] = None):
+    """主播业绩缓存装饰器（过期时间见 REPORT_CACHE_SPECS）
+    
+    Args:
+        scope_builder: 依赖范围构建函数，未提供时任何失效事件都会淘汰该条目
+    """
+    return _scoped_cache('pilot_performance', '主播业绩', scope_builder)
 
 
 def clear_pilot_performance_cache():
     """清空主播业绩缓存"""
-    pilot_performance_cache.clear()
-    logger.info('主播业绩缓存已清空')
+    _clear_report_cache('pilot_performance', '主播业绩缓存已清空')
 
 
 def get_cached_active_pilots(cache_key: str, builder: Callable[[], Any]) -> Any:
@@ -183,15 +417,4 @@ def get_cache_info() -> Dict[str, Any]:
     Returns:
         dict: 缓存统计信息
     """
-    return {
-        'monthly_report_cache': {
-            'cache_size': len(monthly_report_cache),
-            'max_size': monthly_report_cache.maxsize,
-            'ttl': monthly_report_cache.ttl
-        },
-        'pilot_performance_cache': {
-            'cache_size': len(pilot_performance_cache),
-            'max_size': pilot_performance_cache.maxsize,
-            'ttl': pilot_performance_cache.ttl
-        }
-    }
+    return {f'{namespace}_cache': _get_backend(namespace).info() for namespace in REPORT_CACHE_SPECS}
@@ -7,8 +7,10 @@
 from calendar import monthrange
 from datetime import datetime, timedelta
 
-from models.announcement import Announcement
+from models.announcement import MAX_DURATION_HOURS, Announcement
 from models.battle_area import BattleArea
+from models.pilot import Pilot
+from models.user import User
 from utils.logging_setup import get_logger
 from utils.timezone_helper import local_to_utc, utc_to_local
 
@@ -100,13 +102,17 @@ def aggregate_daily_data(date):
     day_start_utc = local_to_utc(day_start)
     day_end_utc = local_to_utc(day_end)
 
-    announcements = Announcement.objects(start_time__lte=day_end_utc)
+    # 通告时长不超过 MAX_DURATION_HOURS，开始时间早于该回看窗口的通告不可能与当日重叠
+    announcements = Announcement.objects(start_time__gt=day_start_utc - timedelta(hours=MAX_DURATION_HOURS),
+                                         start_time__lte=day_end_utc).no_dereference().only('id', 'pilot', 'start_time', 'duration_hours', 'x_coord',
+                                                                                              'y_coord', 'z_coord')
 
     relevant_announcements = _filter_relevant_announcements(announcements, day_start_utc, day_end_utc)
 
     relevant_announcements.sort(key=_get_area_sort_key)
 
-    area_timelines, used_areas_count = _build_daily_timelines(relevant_announcements, date)
+    pilot_displays = _load_pilot_displays(relevant_announcements)
+    area_timelines, used_areas_count = _build_daily_timelines(relevant_announcements, date, pilot_displays)
 
     logger.debug('日视图数据聚合完成：%s，通告数=%d', date.strftime('%Y-%m-%d'), len(relevant_announcements))
     return {'date': date.strftime('%Y-%m-%d'), 'area_timelines': area_timelines, 'used_areas_count': used_areas_count}
@@ -138,6 +144,35 @@ def _filter_relevant_announcements(announcements, day_start_utc, day_end_utc):
     return relevant_announcements
 
 
+def _ref_id(reference):
+    """读取引用字段的ID（兼容 Document / DBRef / ObjectId），不触发解引用。"""
+    if reference is None:
+        return None
+    return getattr(reference, 'id', reference)
+
+
+def _load_pilot_displays(announcements):
+    """批量加载通告涉及的主播与直属运营，返回 主播ID -> 展示信息。"""
+    pilot_ids = {_ref_id(announcement.pilot) for announcement in announcements} - {None}
+    if not pilot_ids:
+        return {}
+
+    pilots = list(Pilot.objects(id__in=list(pilot_ids)).no_dereference().only('id', 'nickname', 'owner', 'rank'))
+    owner_ids = {_ref_id(pilot.owner) for pilot in pilots} - {None}
+    owner_nicknames = {owner.id: owner.nickname for owner in User.objects(id__in=list(owner_ids)).only('id', 'nickname')} if owner_ids else {}
+
+    displays = {}
+    for pilot in pilots:
+        owner_id = _ref_id(pilot.owner)
+        displays[pilot.id] = {
+            'nickname': pilot.nickname,
+            'owner_id': owner_id if owner_id in owner_nicknames else None,
+            'owner_nickname': owner_nicknames.get(owner_id),
+            'rank': pilot.rank.value if pilot.rank else '',
+        }
+    return displays
+
+
 def _get_area_sort_key(announcement):
     """获取区域排序键"""
     x = announcement.x_coord
@@ -153,12 +188,13 @@ def _get_area_sort_key(announcement):
     return (x, y, z_sort)
 
 
-def _build_daily_timelines(relevant_announcements, date):
+def _build_daily_timelines(relevant_announcements, date, pilot_displays):
     """构建日视图时间轴数据"""
     from flask_security import current_user
 
     time_slots = []
     used_areas = set()
+    current_user_id = str(current_user.id) if current_user.is_authenticated else None
 
     for announcement in relevant_announcements:
         local_start = utc_to_local(announcement.start_time)
@@ -169,15 +205,16 @@ def _build_daily_timelines(relevant_announcements, date):
         area_key = f"{announcement.x_coord}-{announcement.y_coord}-{announcement.z_coord}"
         used_areas.add(area_key)
 
+        pilot = pilot_displays.get(_ref_id(announcement.pilot)) or {'nickname': None, 'owner_id': None, 'owner_nickname': None, 'rank': ''}
+
         time_slots.append({
             'id': str(announcement.id),
             'area_display': f"{announcement.x_coord}-{announcement.y_coord}-{announcement.z_coord}",
-            'pilot_display':
-            f"{announcement.pilot.nickname}[{announcement.pilot.owner.nickname if announcement.pilot.owner else '无'}]-{announcement.pilot.rank.value}",
+            'pilot_display': f"{pilot['nickname']}[{pilot['owner_nickname'] if pilot['owner_id'] else '无'}]-{pilot['rank']}",
             'start_hour': day_start_hour,
             'end_hour': day_end_hour,
             'duration': day_end_hour - day_start_hour + 1,
-            'is_own': str(announcement.pilot.owner.id) == str(current_user.id) if announcement.pilot.owner and current_user.is_authenticated else False,
+            'is_own': str(pilot['owner_id']) == current_user_id if pilot['owner_id'] and current_user_id else False,
             'start_time': local_start.strftime('%H:%M'),
             'end_time': local_end.strftime('%H:%M'),
             'area_key': area_key
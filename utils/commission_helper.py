@@ -4,8 +4,13 @@
 注意：mongoengine 的动态属性在pylint中会触发 no-member 误报，这里统一抑制。
 """
 # pylint: disable=no-member
+from bisect import bisect_right
+from collections import defaultdict
 from datetime import date, datetime
 from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
 
 from models.pilot import PilotCommission
 from utils.logging_setup import get_logger
@@ -13,55 +18,91 @@ from utils.timezone_helper import local_to_utc
 
 logger = get_logger('commission_helper')
 
+DEFAULT_COMMISSION_RATE = 20.0
+
+CommissionEntry = Tuple[datetime, float, str]
 
-def get_pilot_commission_rate_for_date(pilot_id, target_date):
-    """获取机师在特定日期的有效分成比例
-    
-    Args:
-        pilot_id: 机师ID
-        target_date: 目标日期（本地时间）
-        
-    Returns:
-        tuple: (commission_rate, effective_date, remark)
-            - commission_rate: 分成比例（0-50，表示0%-50%）
-            - effective_date: 生效日期（UTC时间）
-            - remark: 备注说明
-    """
-    logger.debug(f"获取机师 {pilot_id} 在日期 {target_date} 的分成比例")
 
+def _to_local_day_start_utc(target_date) -> datetime:
+    """将本地日期/时间转换为当日零点对应的UTC时间。"""
     if isinstance(target_date, date) and not isinstance(target_date, datetime):
         target_datetime = datetime.combine(target_date, datetime.min.time())
     else:
         target_datetime = target_date
+    return local_to_utc(target_datetime.replace(hour=0, minute=0, second=0, microsecond=0))
 
-    target_utc = local_to_utc(target_datetime.replace(hour=0, minute=0, second=0, microsecond=0))
 
-    logger.debug(f"目标日期UTC时间: {target_utc}")
+def _pilot_key(pilot_id) -> str:
+    """统一主播ID表示（兼容 ObjectId / 字符串 / 引用对象）。"""
+    return str(getattr(pilot_id, 'id', pilot_id))
 
-    commissions = PilotCommission.objects(pilot_id=pilot_id, is_active=True).order_by('adjustment_date')
-    commission_list = list(commissions)
 
-    logger.debug(f"机师 {pilot_id} 的有效调整记录数量: {len(commission_list)}")
+class CommissionTimeline:
+    """主播分成比例时间线
 
-    if not commission_list:
-        logger.debug(f"机师 {pilot_id} 无调整记录，使用默认分成比例20%")
-        return 20.0, None, "默认分成比例"
-
-    effective_commission = None
-    for commission in reversed(commission_list):  # 从最新记录开始查找
-        logger.debug(f"检查调整记录: 调整日={commission.adjustment_date}, 分成比例={commission.commission_rate}%")
-        if commission.adjustment_date <= target_utc:
-            effective_commission = commission
-            logger.debug(f"找到生效记录: 调整日={commission.adjustment_date}, 分成比例={commission.commission_rate}%")
-            break
+    一次性批量预取一组主播的有效分成调整记录，按调整日排序后以二分查找定位生效记录，
+    替代逐条开播记录查询数据库。时间线只在单次计算内复用。
+    """
 
-    if effective_commission is None:
-        logger.debug(f"机师 {pilot_id} 所有调整记录都是未来日期，使用默认分成比例20%")
-        return 20.0, None, "默认分成比例"
+    def __init__(self, entries: Dict[str, List[CommissionEntry]]):
+        self._entries = entries
+        self._dates = {pilot_id: [entry[0] for entry in items] for pilot_id, items in entries.items()}
+
+    @classmethod
+    def prefetch(cls, pilot_ids: Optional[Iterable] = None) -> 'CommissionTimeline':
+        """批量预取主播分成时间线（一次查询）；pilot_ids 为 None 时加载全部主播。
+
+        不做跨请求缓存：分成调整可能由其他 worker 写入，每次计算都读取最新的调整记录。
+        """
+        if pilot_ids is None:
+            return cls(cls._load_entries(None))
+        keys = sorted({_pilot_key(pilot_id) for pilot_id in pilot_ids if pilot_id})
+        if not keys:
+            return cls({})
+        return cls(cls._load_entries(keys))
+
+    @staticmethod
+    def _load_entries(pilot_keys: Optional[List[str]]) -> Dict[str, List[CommissionEntry]]:
+        query = PilotCommission.objects(is_active=True)
+        if pilot_keys is not None:
+            query = query.filter(pilot_id__in=[ObjectId(key) for key in pilot_keys])
+        entries: Dict[str, List[CommissionEntry]] = defaultdict(list)
+        for commission in query.no_dereference().only('pilot_id', 'adjustment_date', 'commission_rate', 'remark').order_by('pilot_id', 'adjustment_date'):
+            entries[_pilot_key(commission.pilot_id)].append((commission.adjustment_date, float(commission.commission_rate), commission.remark))
+        return dict(entries)
+
+    def entry_for(self, pilot_id, target_date) -> Tuple[float, Optional[datetime], str]:
+        """获取主播在指定本地日期生效的（分成比例，生效日期，备注）。"""
+        key = _pilot_key(pilot_id)
+        dates = self._dates.get(key)
+        if dates:
+            index = bisect_right(dates, _to_local_day_start_utc(target_date)) - 1
+            if index >= 0:
+                adjustment_date, rate, remark = self._entries[key][index]
+                return rate, adjustment_date, remark
+        return DEFAULT_COMMISSION_RATE, None, "默认分成比例"
+
+    def rate_for(self, pilot_id, target_date) -> float:
+        """获取主播在指定本地日期生效的分成比例。"""
+        return self.entry_for(pilot_id, target_date)[0]
 
-    logger.debug(f"机师 {pilot_id} 在日期 {target_date} 的生效分成比例: {effective_commission.commission_rate}%")
 
-    return effective_commission.commission_rate, effective_commission.adjustment_date, effective_commission.remark
+def get_pilot_commission_rate_for_date(pilot_id, target_date):
+    """获取机师在特定日期的有效分成比例
+    
+    Args:
+        pilot_id: 机师ID
+        target_date: 目标日期（本地时间）
+        
+    Returns:
+        tuple: (commission_rate, effective_date, remark)
+            - commission_rate: 分成比例（0-50，表示0%-50%）
+            - effective_date: 生效日期（UTC时间）
+            - remark: 备注说明
+    """
+    commission_rate, effective_date, remark = CommissionTimeline.prefetch([pilot_id]).entry_for(pilot_id, target_date)
+    logger.debug(f"机师 {pilot_id} 在日期 {target_date} 的生效分成比例: {commission_rate}%")
+    return commission_rate, effective_date, remark
 
 
 def calculate_commission_distribution(commission_rate):
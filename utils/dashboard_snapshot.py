@@ -0,0 +1,265 @@
+# pylint: disable=no-member,protected-access
+"""仪表盘快照
+
+首页仪表盘原先由七个接口分别计算（每次加载各自查询、各自计算时间窗口），现合并为 GET /api/dashboard/snapshot：
+- 计算：各卡片共用同一组时间窗口；通告计数与开播流水各由一次 $group 聚合返回今日/昨日/近一周，
+  昨日排名按主播聚合后只加载前三名；结果写入 dashboard_snapshots 集合的单个文档；
+- 转化率与昨日排名只依赖昨日及以前的数据，同一自然日内沿用上次结果，
+  仅在写入涉及昨日及以前的数据（daily_dirty_at）或跨日时才重算；
+- 刷新：调度器每分钟刷新一次；开播记录、底薪申请、通告（含重复通告批量插入）、招募、主播与 BBS 写入后写入 dirty_at 标记待刷新，
+  由下一次调度器刷新重算；开播记录开始时间（或变更前的开始时间）、底薪申请对应开播记录早于今日，以及主播资料写入时，
+  同时写入 daily_dirty_at；
+- 读取：仪表盘加载只读取一次该文档，待刷新期间继续返回现有快照；快照缺失或超过最大时效
+  （环境变量 DASHBOARD_SNAPSHOT_MAX_AGE，默认120秒，如调度器未启用）时即时重算，同一进程内并发读取只计算一次。
+"""
+
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from mongoengine import signals
+
+from models.announcement import Announcement
+from models.battle_record import BaseSalaryApplication, BattleRecord
+from models.bbs import BBSPost, BBSPostStatus, BBSReply
+from models.dashboard_snapshot import DashboardSnapshot
+from models.pilot import Pilot
+from models.recruit import Recruit
+from utils.bbs_service import fetch_post_reply_summary
+from utils.logging_setup import get_logger
+from utils.reference_prefetch import prefetch_references
+from utils.timezone_helper import format_local_datetime, get_current_utc_time, local_to_utc, utc_to_local
+
+logger = get_logger('dashboard_snapshot')
+
+SNAPSHOT_KEY = 'home'
+DEFAULT_SNAPSHOT_MAX_AGE = 120  # 秒
+SNAPSHOT_REFRESH_INTERVAL_SECONDS = 50  # 调度器刷新时，距上次计算不足该时长且无待刷新标记则跳过（多进程同时运行任务时只算一次）
+BBS_LATEST_LIMIT = 5
+
+_DAILY_SECTIONS = ('conversion_rate', 'pilot_ranking')
+_LIVE_DIRTY_SENDERS = (Announcement, Recruit, BBSPost, BBSReply)  # 只影响今日/近一周卡片与 BBS 最新主贴
+
+_refresh_lock = threading.Lock()
+_registered = False
+
+
+def _max_age() -> timedelta:
+    return timedelta(seconds=max(int(os.getenv('DASHBOARD_SNAPSHOT_MAX_AGE', str(DEFAULT_SNAPSHOT_MAX_AGE))), 1))
+
+
+def _resolve_last_activity(post: BBSPost, reply_summary: Optional[Dict[str, object]]) -> Tuple[str, Optional[datetime]]:
+    """获取帖子最后一次活跃的作者昵称与时间（reply_summary 为该帖已发布回复的汇总）。"""
+    if reply_summary:
+        snapshot = reply_summary.get('latest_author') or {}
+        display_name = snapshot.get('nickname') or snapshot.get('display_name') or snapshot.get('username') or '--'
+        return display_name, reply_summary.get('latest_time')
+
+    snapshot = post.author_snapshot or {}
+    display_name = snapshot.get('nickname') or snapshot.get('display_name') or snapshot.get('username') or '--'
+    return display_name, post.created_at or post.last_active_at
+
+
+def _build_last_activity_meta(post: BBSPost, reply_summary: Optional[Dict[str, object]]) -> Dict[str, Optional[str]]:
+    """构建最后更新展示信息。"""
+    operator_name, timestamp = _resolve_last_activity(post, reply_summary)
+    operator_display = operator_name if operator_name and operator_name != '--' else ''
+    display_time = format_local_datetime(timestamp, '%Y-%m-%d %H:%M') if timestamp else ''
+    time_iso = timestamp.isoformat() if timestamp else None
+    if operator_display and display_time:
+        display_text = f"{operator_display}（{display_time}）"
+    elif operator_display:
+        display_text = operator_display
+    elif display_time:
+        display_text = display_time
+    else:
+        display_text = '--'
+    return {
+        'operator': operator_name,
+        'time': time_iso,
+        'time_display': display_time,
+        'display': display_text,
+    }
+
+
+def build_bbs_latest_data(posts: List[BBSPost]) -> Dict[str, Any]:
+    """构建仪表盘BBS最新主贴数据（最后活跃信息只看已发布回复，整批帖子一次聚合）。"""
+    prefetch_references(posts, 'board')
+    reply_summary = fetch_post_reply_summary(posts)
+    items = []
+    for post in posts:
+        board_name = post.board.name if getattr(post, 'board', None) else ''
+        items.append({
+            'id': str(post.id),
+            'title': post.title or '',
+            'board': board_name,
+            'last_activity': _build_last_activity_meta(post, reply_summary.get(str(post.id))),
+        })
+    return {'items': items, 'generated_at': get_current_utc_time().isoformat()}
+
+
+def _latest_published_posts() -> List[BBSPost]:
+    query = BBSPost.objects(status=BBSPostStatus.PUBLISHED).only('title', 'board', 'status', 'author_snapshot', 'created_at', 'last_active_at')
+    return list(query.order_by('-last_active_at')[:BBS_LATEST_LIMIT])
+
+
+def compute_dashboard_snapshot(previous: Optional[Dict[str, Any]] = None) -> Tuple[str, Dict[str, Any]]:
+    """计算仪表盘全部卡片，返回 (daily_key, data)。
+
+    previous 为可沿用的上次快照（原始文档）：其 daily_key 与当前一致时沿用转化率与昨日排名。
+    """
+    from routes.report import (calculate_dashboard_announcement_metrics, calculate_dashboard_battle_metrics, calculate_dashboard_conversion_rate_metrics,
+                               calculate_dashboard_pilot_ranking_metrics, calculate_dashboard_recruit_metrics, get_dashboard_time_frames)
+
+    frames = get_dashboard_time_frames()
+    daily_key = (frames['today_start_local'] - timedelta(days=1)).strftime('%Y-%m-%d')
+    data = {
+        'recruit': calculate_dashboard_recruit_metrics(frames),
+        'announcement': calculate_dashboard_announcement_metrics(frames),
+        'battle': calculate_dashboard_battle_metrics(frames),
+        'bbs_latest': build_bbs_latest_data(_latest_published_posts()),
+    }
+
+    previous_data = (previous or {}).get('data') or {}
+    if previous and previous.get('daily_key') == daily_key and all(name in previous_data for name in _DAILY_SECTIONS):
+        data.update({name: previous_data[name] for name in _DAILY_SECTIONS})
+    else:
+        data['conversion_rate'] = calculate_dashboard_conversion_rate_metrics(frames)
+        data['pilot_ranking'] = calculate_dashboard_pilot_ranking_metrics(frames)
+    return daily_key, data
+
+
+def _load_snapshot() -> Optional[Dict[str, Any]]:
+    return DashboardSnapshot.objects(key=SNAPSHOT_KEY).as_pymongo().first()
+
+
+def _is_dirty(raw: Dict[str, Any]) -> bool:
+    computed_at = raw.get('computed_at')
+    dirty_at = raw.get('dirty_at')
+    return computed_at is None or (dirty_at is not None and dirty_at >= computed_at)
+
+
+def _is_daily_dirty(raw: Dict[str, Any]) -> bool:
+    computed_at = raw.get('computed_at')
+    daily_dirty_at = raw.get('daily_dirty_at')
+    return computed_at is None or (daily_dirty_at is not None and daily_dirty_at >= computed_at)
+
+
+def _is_fresh(raw: Optional[Dict[str, Any]], now: datetime) -> bool:
+    """快照存在且未超过最大时效（待刷新标记由调度器处理，不影响读取）。"""
+    return raw is not None and raw.get('computed_at') is not None and now - raw['computed_at'] < _max_age()
+
+
+def _refresh(previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    computed_at = get_current_utc_time()
+    computed_at = computed_at.replace(microsecond=computed_at.microsecond // 1000 * 1000)  # 与 MongoDB 毫秒精度对齐
+    # 写入涉及昨日及以前的数据时重算转化率与昨日排名，否则同一自然日内沿用
+    reusable = previous if previous is not None and not _is_daily_dirty(previous) else None
+    daily_key, data = compute_dashboard_snapshot(reusable)
+    DashboardSnapshot._get_collection().update_one(  # type: ignore[attr-defined]
+        {'key': SNAPSHOT_KEY},
+        {'$set': {'data': data, 'daily_key': daily_key, 'computed_at': computed_at}},
+        upsert=True)
+    # 计算期间发生的写入晚于 computed_at，dirty_at/daily_dirty_at 保留，下一次刷新继续处理
+    previous = previous or {}
+    return {'key': SNAPSHOT_KEY, 'data': data, 'daily_key': daily_key, 'computed_at': computed_at,
+            'dirty_at': previous.get('dirty_at'), 'daily_dirty_at': previous.get('daily_dirty_at')}
+
+
+def refresh_dashboard_snapshot(force: bool = False) -> bool:
+    """刷新仪表盘快照（调度器每分钟调用）；快照刚计算过且无待刷新标记时跳过，返回是否重新计算。"""
+    with _refresh_lock:
+        previous = _load_snapshot()
+        if not force and previous is not None and not _is_dirty(previous):
+            if get_current_utc_time() - previous['computed_at'] < timedelta(seconds=SNAPSHOT_REFRESH_INTERVAL_SECONDS):
+                return False
+        _refresh(previous)
+    return True
+
+
+def get_dashboard_snapshot() -> Dict[str, Any]:
+    """读取仪表盘快照（原始文档，含 data 与 computed_at）；待刷新期间返回现有快照，缺失或过期时即时重算。"""
+    raw = _load_snapshot()
+    if _is_fresh(raw, get_current_utc_time()):
+        return raw  # type: ignore[return-value]
+    with _refresh_lock:
+        # 等待锁期间可能已由其他请求或调度器刷新
+        raw = _load_snapshot()
+        if _is_fresh(raw, get_current_utc_time()):
+            return raw  # type: ignore[return-value]
+        logger.debug('仪表盘快照缺失或已过期，即时重算')
+        return _refresh(raw)
+
+
+def mark_dashboard_snapshot_dirty(past_day: bool = False) -> None:
+    """标记仪表盘快照待刷新；past_day 表示写入涉及昨日及以前的数据（失败仅记录日志，不影响业务写入）。"""
+    marked_at = get_current_utc_time()
+    fields = {'dirty_at': marked_at, 'daily_dirty_at': marked_at} if past_day else {'dirty_at': marked_at}
+    try:
+        DashboardSnapshot._get_collection().update_one({'key': SNAPSHOT_KEY}, {'$set': fields})  # type: ignore[attr-defined]
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('标记仪表盘快照待刷新失败：%s', exc, exc_info=True)
+
+
+def _today_start_utc() -> datetime:
+    now_local = utc_to_local(get_current_utc_time())
+    return local_to_utc(now_local.replace(hour=0, minute=0, second=0, microsecond=0))
+
+
+def _before_today(*start_times: Optional[datetime]) -> bool:
+    today_start = _today_start_utc()
+    return any(start_time is not None and start_time < today_start for start_time in start_times)
+
+
+def _on_data_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    mark_dashboard_snapshot_dirty()
+
+
+def _on_bulk_inserted(sender, documents, **kwargs):  # pylint: disable=unused-argument
+    """QuerySet.insert 只触发批量信号（如重复通告实例批量插入）。"""
+    mark_dashboard_snapshot_dirty()
+
+
+def _on_battle_record_pre_save(sender, document, **kwargs):  # pylint: disable=unused-argument
+    """记录变更前的开始时间，改期到今日的记录同样使旧日期的数据失效。"""
+    document._dashboard_previous_start = None
+    if document._created or not document.pk or 'start_time' not in document._get_changed_fields():
+        return
+    previous = BattleRecord.objects(pk=document.pk).only('start_time').first()
+    document._dashboard_previous_start = previous.start_time if previous else None
+
+
+def _on_battle_record_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    mark_dashboard_snapshot_dirty(_before_today(document.start_time, getattr(document, '_dashboard_previous_start', None)))
+
+
+def _on_base_salary_application_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    record_id = document._data.get('battle_record_id')
+    record = BattleRecord.objects(pk=getattr(record_id, 'id', record_id)).only('start_time').first() if record_id else None
+    mark_dashboard_snapshot_dirty(record is None or _before_today(record.start_time))
+
+
+def _on_pilot_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    # 主播昵称、所属运营会出现在昨日排名与转化率口径中
+    mark_dashboard_snapshot_dirty(past_day=True)
+
+
+def register_dashboard_snapshot_handlers():
+    """注册仪表盘相关数据写入后的快照待刷新标记（重复调用安全）。"""
+    global _registered  # pylint: disable=global-statement
+    if _registered:
+        return
+    for sender in _LIVE_DIRTY_SENDERS:
+        signals.post_save.connect(_on_data_changed, sender=sender)
+        signals.post_delete.connect(_on_data_changed, sender=sender)
+    signals.post_bulk_insert.connect(_on_bulk_inserted, sender=Announcement)
+    signals.pre_save.connect(_on_battle_record_pre_save, sender=BattleRecord)
+    signals.post_save.connect(_on_battle_record_changed, sender=BattleRecord)
+    signals.post_delete.connect(_on_battle_record_changed, sender=BattleRecord)
+    signals.post_save.connect(_on_base_salary_application_changed, sender=BaseSalaryApplication)
+    signals.post_delete.connect(_on_base_salary_application_changed, sender=BaseSalaryApplication)
+    signals.post_save.connect(_on_pilot_changed, sender=Pilot)
+    signals.post_delete.connect(_on_pilot_changed, sender=Pilot)
+    _registered = True
+    logger.info('仪表盘快照待刷新监听已注册')
@@ -0,0 +1,154 @@
+# pylint: disable=no-member,protected-access
+"""JWT 身份缓存
+
+REST API 每次请求都要由 JWT identity（fs_uniquifier）确认用户存在、已激活并具备所需角色，
+原先 JWT 用户加载器、角色装饰器与 get_jwt_user 各自查询一次用户，并各自解引用 roles。
+
+- 进程缓存：fs_uniquifier -> (用户ID, 是否激活, 角色名集合)，短 TTL（环境变量 IDENTITY_CACHE_TTL，默认30秒），
+  命中时鉴权不读数据库；
+- 请求内身份映射：同一请求内按 fs_uniquifier 加载的用户对象只查询一次（存放在 flask.g），
+  JWT 用户加载器、get_jwt_user 与 Flask-Login 的会话用户共用同一个对象；
+- 角色名由角色ID映射得到（角色集合很小，整表缓存），不再逐个用户解引用 roles；
+- 失效：用户保存/删除（用户管理接口的增删改、启停用、重置密码，以及修改密码）后淘汰该用户的缓存条目，
+  角色变更时清空全部条目；其他 worker 的条目最迟在 TTL 到期后刷新。
+"""
+
+import os
+import threading
+from typing import Dict, FrozenSet, List, NamedTuple, Optional
+
+from cachetools import TTLCache
+from flask import g, has_request_context
+from mongoengine import signals
+
+from models.user import Role, User
+from utils.logging_setup import get_logger
+
+logger = get_logger('identity_cache')
+
+IDENTITY_CACHE_MAXSIZE = 2048
+DEFAULT_IDENTITY_CACHE_TTL = 30  # 秒
+
+_lock = threading.Lock()
+_identities: Optional[TTLCache] = None
+_role_names: Dict[str, str] = {}  # 角色ID -> 角色名
+_registered = False
+
+_MISSING = object()
+
+
+class CachedIdentity(NamedTuple):
+    """缓存的用户身份"""
+    user_id: str
+    active: bool
+    role_names: FrozenSet[str]
+
+
+def _get_identities() -> TTLCache:
+    # 延迟创建：环境变量在 create_app 中加载，模块导入时尚不可用
+    global _identities  # pylint: disable=global-statement
+    if _identities is None:
+        ttl = int(os.getenv('IDENTITY_CACHE_TTL', str(DEFAULT_IDENTITY_CACHE_TTL)))
+        _identities = TTLCache(maxsize=IDENTITY_CACHE_MAXSIZE, ttl=max(ttl, 1))
+    return _identities
+
+
+def _request_users() -> Optional[Dict[str, Optional[User]]]:
+    if not has_request_context():
+        return None
+    if not hasattr(g, '_identity_users'):
+        g._identity_users = {}
+    return g._identity_users
+
+
+def user_role_names(user: User) -> List[str]:
+    """用户的角色名列表（按角色ID映射，不解引用 roles；遇到未知角色ID时整表重载角色）。"""
+    role_ids = [str(getattr(ref, 'id', ref)) for ref in (user._data.get('roles') or [])]
+    with _lock:
+        known = all(role_id in _role_names for role_id in role_ids)
+    if not known:
+        names = {str(raw['_id']): raw.get('name') for raw in Role.objects.only('name').as_pymongo()}
+        with _lock:
+            _role_names.clear()
+            _role_names.update(names)
+    with _lock:
+        return [_role_names[role_id] for role_id in role_ids if role_id in _role_names]
+
+
+def _remember(identity: str, user: User) -> CachedIdentity:
+    cached = CachedIdentity(user_id=str(user.pk), active=bool(user.active), role_names=frozenset(user_role_names(user)))
+    with _lock:
+        _get_identities()[identity] = cached
+    return cached
+
+
+def load_user(identity: Optional[str]) -> Optional[User]:
+    """按 fs_uniquifier 加载用户（同一请求内只查询一次），不存在时返回 None。"""
+    if not identity:
+        return None
+    users = _request_users()
+    if users is not None:
+        user = users.get(identity, _MISSING)
+        if user is not _MISSING:
+            return user
+    user = User.objects(fs_uniquifier=identity).first()
+    if users is not None:
+        users[identity] = user
+    return user
+
+
+def get_identity(identity: Optional[str]) -> Optional[CachedIdentity]:
+    """获取用户身份（命中进程缓存时不读数据库），用户不存在时返回 None。"""
+    if not identity:
+        return None
+    with _lock:
+        cached = _get_identities().get(identity)
+    if cached is not None:
+        return cached
+    user = load_user(identity)
+    return _remember(identity, user) if user is not None else None
+
+
+def invalidate_identity(user_id: Optional[str] = None) -> None:
+    """淘汰指定用户的身份缓存（按用户ID匹配，覆盖 fs_uniquifier 变更的情况）；不传时清空全部。"""
+    with _lock:
+        identities = _get_identities()
+        if user_id is None:
+            identities.clear()
+            return
+        for identity in [key for key, cached in identities.items() if cached.user_id == str(user_id)]:
+            identities.pop(identity, None)
+
+
+def _forget_user(document: User, current: Optional[User]) -> None:
+    invalidate_identity(str(document.pk))
+    users = _request_users()
+    if users is not None and document.fs_uniquifier in users:
+        users[document.fs_uniquifier] = current
+
+
+def _on_user_saved(sender, document, **kwargs):  # pylint: disable=unused-argument
+    _forget_user(document, document)
+
+
+def _on_user_deleted(sender, document, **kwargs):  # pylint: disable=unused-argument
+    _forget_user(document, None)
+
+
+def _on_role_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    with _lock:
+        _role_names.clear()
+    invalidate_identity()
+
+
+def register_identity_cache_handlers():
+    """注册用户/角色写入后的身份缓存失效（重复调用安全）。"""
+    global _registered  # pylint: disable=global-statement
+    if _registered:
+        return
+    signals.post_save.connect(_on_user_saved, sender=User)
+    signals.post_delete.connect(_on_user_deleted, sender=User)
+    signals.post_save.connect(_on_role_changed, sender=Role)
+    signals.post_delete.connect(_on_role_changed, sender=Role)
+    _registered = True
+    logger.info('身份缓存失效监听已注册')
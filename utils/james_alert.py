@@ -5,25 +5,37 @@
 
 当底薪申请被确认发放时，自动检查主播业绩情况，
 如果满足特定条件则发送警告邮件。
+
+满足触发条件的主播先进入批量评估队列：最后一次入队后等待 JAMES_ALERT_BATCH_DELAY_SECONDS 秒
+（持续入队时最多等待 JAMES_ALERT_BATCH_MAX_DELAY_SECONDS 秒）合并为一批，共享一次业绩数据加载完成运算条件检查，
+命中的主播合并为一封汇总邮件发送。
 """
 # pylint: disable=no-member,too-many-return-statements
 
+import atexit
+import os
 import threading
+import time
 from datetime import datetime
 from decimal import Decimal
+from typing import Callable, Dict, List, Optional
 
 # pylint: disable=no-member
 from models.battle_record import (BaseSalaryApplication, BaseSalaryApplicationStatus)
-from models.pilot import Gender
+from models.pilot import Gender, Pilot
 from models.recruit import Recruit
 from models.user import User
 from utils.commission_helper import get_pilot_commission_rate_for_date
+from utils.job_executor import get_side_effect_executor, submit_side_effect
 from utils.logging_setup import get_logger
-from utils.mail_utils import send_email_md
+from utils.mail_outbox import enqueue_email_md
 from utils.timezone_helper import get_current_local_time, utc_to_local
 
 logger = get_logger('james_alert')
 
+JAMES_ALERT_BATCH_DELAY_SECONDS = float(os.getenv('JAMES_ALERT_BATCH_DELAY_SECONDS', '30'))
+JAMES_ALERT_BATCH_MAX_DELAY_SECONDS = float(os.getenv('JAMES_ALERT_BATCH_MAX_DELAY_SECONDS', '120'))
+
 
 def check_james_alert_trigger_conditions(application):
     """
@@ -383,7 +395,7 @@ def send_james_alert_email(pilot_info, pilot_stats):
         pilot_stats: 主播业绩统计数据
         
     Returns:
-        bool: 发送成功返回True，失败返回False
+        bool: 加入发件箱成功返回True，失败返回False
     """
     try:
         recipients = get_alert_recipients()
@@ -394,12 +406,12 @@ def send_james_alert_email(pilot_info, pilot_stats):
         email_content = build_james_alert_email_content(pilot_info, pilot_stats)
 
         subject = "拉科斯警告 詹姆斯正在关注这个主播"
-        success = send_email_md(recipients, subject, email_content)
+        success = enqueue_email_md(recipients, subject, email_content, source='james_alert')
 
         if success:
-            logger.info(f"詹姆斯关注警告邮件发送成功: 主播{pilot_info['nickname']}，收件人{len(recipients)}个")
+            logger.info(f"詹姆斯关注警告邮件已加入发件箱: 主播{pilot_info['nickname']}，收件人{len(recipients)}个")
         else:
-            logger.error(f"詹姆斯关注警告邮件发送失败: 主播{pilot_info['nickname']}")
+            logger.error(f"詹姆斯关注警告邮件入队失败: 主播{pilot_info['nickname']}")
 
         return success
 
@@ -408,6 +420,54 @@ def send_james_alert_email(pilot_info, pilot_stats):
         return False
 
 
+def build_james_alert_digest_content(alerts):
+    """
+    构建詹姆斯关注汇总邮件内容
+
+    Args:
+        alerts: [(主播基本信息, 主播业绩统计数据)] 列表
+
+    Returns:
+        str: Markdown格式的邮件内容，各主播段落之间以分隔线隔开
+    """
+    return "\n\n---\n\n".join(build_james_alert_email_content(pilot_info, pilot_stats) for pilot_info, pilot_stats in alerts)
+
+
+def send_james_alert_digest_email(alerts):
+    """
+    发送詹姆斯关注汇总邮件（同一批命中的主播合并为一封，只有一个主播时与单封邮件相同）
+
+    Args:
+        alerts: [(主播基本信息, 主播业绩统计数据)] 列表
+
+    Returns:
+        bool: 加入发件箱成功返回True，失败返回False
+    """
+    if len(alerts) == 1:
+        return send_james_alert_email(*alerts[0])
+
+    try:
+        recipients = get_alert_recipients()
+        if not recipients:
+            logger.warning("没有找到告警邮件收件人，跳过发送")
+            return False
+
+        nicknames = '、'.join(pilot_info['nickname'] for pilot_info, _ in alerts)
+        subject = f"拉科斯警告 詹姆斯正在关注{len(alerts)}个主播"
+        success = enqueue_email_md(recipients, subject, build_james_alert_digest_content(alerts), source='james_alert')
+
+        if success:
+            logger.info("詹姆斯关注汇总邮件已加入发件箱: 主播%s，收件人%d个", nicknames, len(recipients))
+        else:
+            logger.error("詹姆斯关注汇总邮件入队失败: 主播%s", nicknames)
+
+        return success
+
+    except Exception as e:
+        logger.error("发送詹姆斯关注汇总邮件时发生异常: %s", e)
+        return False
+
+
 def send_new_pilot_warning_email(pilot_info, pilot_stats, milestone):
     """发送新主播生存警告邮件"""
     try:
@@ -418,12 +478,12 @@ def send_new_pilot_warning_email(pilot_info, pilot_stats, milestone):
 
         email_content = build_new_pilot_warning_email_content(pilot_info, pilot_stats, milestone)
         subject = f"拉科斯警告 这是一个活到了第{milestone}天的新主播"
-        success = send_email_md(recipients, subject, email_content)
+        success = enqueue_email_md(recipients, subject, email_content, source='james_alert')
 
         if success:
-            logger.info("新主播生存警告邮件发送成功：主播%s，第%s笔底薪，收件人数=%s", pilot_info['nickname'], milestone, len(recipients))
+            logger.info("新主播生存警告邮件已加入发件箱：主播%s，第%s笔底薪，收件人数=%s", pilot_info['nickname'], milestone, len(recipients))
         else:
-            logger.error("新主播生存警告邮件发送失败：主播%s，第%s笔底薪", pilot_info['nickname'], milestone)
+            logger.error("新主播生存警告邮件入队失败：主播%s，第%s笔底薪", pilot_info['nickname'], milestone)
 
         return success
 
@@ -449,6 +509,148 @@ def get_new_pilot_warning_milestone(pilot):
         return None
 
 
+def evaluate_james_alert_batch(pilot_ids: List[str]) -> int:
+    """
+    批量评估詹姆斯关注运算条件并发送汇总邮件
+
+    Args:
+        pilot_ids: 已满足触发条件的主播ID列表（按入队顺序）
+
+    Returns:
+        int: 命中运算条件的主播数量
+    """
+    from utils.pilot_performance import calculate_pilots_performance_stats
+
+    order = {pilot_id: index for index, pilot_id in enumerate(pilot_ids)}
+    pilots = sorted(Pilot.objects(id__in=pilot_ids), key=lambda pilot: order.get(str(pilot.id), len(order)))
+    stats_by_pilot = calculate_pilots_performance_stats(pilots, get_current_local_time())
+
+    alerts = []
+    for pilot in pilots:
+        performance_data = stats_by_pilot[str(pilot.id)]
+        calc_ok, calc_reason = check_james_alert_calculation_conditions(performance_data)
+        if not calc_ok:
+            logger.info("主播%s不触发詹姆斯关注告警邮件：%s", pilot.nickname, calc_reason)
+            continue
+
+        pilot_stats = {
+            'month_stats': performance_data['month_stats'],
+            'week_stats': performance_data['week_stats'],
+            'three_day_stats': performance_data['three_day_stats'],
+            'recent_records': performance_data['recent_records'],
+        }
+        alerts.append((get_pilot_basic_info(pilot), pilot_stats))
+
+    logger.info("詹姆斯关注批量评估完成：评估%d个主播，命中%d个", len(pilots), len(alerts))
+    if alerts and not send_james_alert_digest_email(alerts):
+        logger.error("詹姆斯关注汇总邮件发送失败：%d个主播", len(alerts))
+    return len(alerts)
+
+
+class JamesAlertBatcher:
+    """詹姆斯关注批量评估队列
+
+    入队的主播ID按防抖窗口合并：最后一次入队后等待 delay_seconds，持续入队时最多等待 max_delay_seconds，
+    到期后整批提交到副作用执行器评估；同一主播在一个窗口内多次入队只评估一次。
+    到期等待由单个常驻守护线程完成（首次入队时启动），入队只更新截止时间并唤醒该线程，不另起线程。
+    """
+
+    def __init__(self, evaluate: Callable[[List[str]], int], delay_seconds: float = JAMES_ALERT_BATCH_DELAY_SECONDS,
+                 max_delay_seconds: float = JAMES_ALERT_BATCH_MAX_DELAY_SECONDS):
+        self._evaluate = evaluate
+        self.delay_seconds = delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._pending: Dict[str, None] = {}  # 保持入队顺序的去重集合
+        self._first_enqueued_at: Optional[float] = None
+        self._deadline: Optional[float] = None
+        self._worker: Optional[threading.Thread] = None
+
+    def enqueue(self, pilot_id) -> None:
+        with self._condition:
+            self._pending[str(pilot_id)] = None
+            now = time.monotonic()
+            if self._first_enqueued_at is None:
+                self._first_enqueued_at = now
+            self._deadline = min(now + self.delay_seconds, self._first_enqueued_at + self.max_delay_seconds)
+            self._ensure_worker()
+            self._condition.notify()
+
+    def _ensure_worker(self) -> None:
+        """启动常驻的到期等待线程（调用方持有锁）；进程退出阶段无法启动时由退出时的同步评估处理。"""
+        if self._worker is not None and self._worker.is_alive():
+            return
+        worker = threading.Thread(target=self._run, name='james-alert-batch', daemon=True)
+        try:
+            worker.start()
+        except RuntimeError as exc:
+            logger.warning("詹姆斯关注批量评估线程启动失败：%s", exc)
+            return
+        self._worker = worker
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if self._deadline is None:
+                        self._condition.wait()
+                        continue
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+            try:
+                self.flush()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error("詹姆斯关注批量评估提交失败：%s", exc, exc_info=True)
+
+    def flush(self, synchronous: bool = False) -> bool:
+        """立即处理当前批次；队列为空、提交被拒绝或同步评估失败时返回 False。
+
+        Args:
+            synchronous: 是否在当前线程直接评估（进程退出时执行器已停止接收作业）
+        """
+        with self._lock:
+            pilot_ids = list(self._pending)
+            self._pending.clear()
+            self._first_enqueued_at = None
+            self._deadline = None
+
+        if not pilot_ids:
+            return False
+        if not synchronous:
+            return submit_side_effect(f"詹姆斯关注批量评估:{len(pilot_ids)}个主播", self._evaluate, pilot_ids)
+        try:
+            self._evaluate(pilot_ids)
+            return True
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.error("詹姆斯关注批量评估失败：%d个主播：%s", len(pilot_ids), exc, exc_info=True)
+            return False
+
+
+_batcher: Optional[JamesAlertBatcher] = None
+_batcher_lock = threading.Lock()
+
+
+def _flush_james_alert_batch_at_exit() -> None:
+    """进程退出时：先在时限内排空副作用执行器（其中的触发检查可能继续入队），再在当前线程同步评估未到期的批次。"""
+    if _batcher is None:
+        return
+    get_side_effect_executor().shutdown()
+    _batcher.flush(synchronous=True)
+
+
+def get_james_alert_batcher() -> JamesAlertBatcher:
+    """进程内唯一的詹姆斯关注批量评估队列（进程退出时同步评估未到期的批次）。"""
+    global _batcher  # pylint: disable=global-statement
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = JamesAlertBatcher(evaluate_james_alert_batch)
+            atexit.register(_flush_james_alert_batch_at_exit)
+        return _batcher
+
+
 def process_james_alert_async(application):
     """
     异步处理詹姆斯关注警告逻辑
@@ -479,37 +681,13 @@ def process_james_alert_async(application):
                 logger.info("主播%s不触发詹姆斯关注警告：%s", pilot.nickname if pilot else '未知', trigger_reason)
                 return
 
-            from utils.pilot_performance import calculate_pilot_performance_stats
-
-            now_local = get_current_local_time()
-            performance_data = calculate_pilot_performance_stats(pilot, now_local)
-
-            calc_ok, calc_reason = check_james_alert_calculation_conditions(performance_data)
-            if not calc_ok:
-                logger.info("主播%s不触发詹姆斯关注告警邮件：%s", pilot.nickname if pilot else '未知', calc_reason)
-                return
-
-            pilot_info = get_pilot_basic_info(pilot)
-            pilot_stats = {
-                'month_stats': performance_data['month_stats'],
-                'week_stats': performance_data['week_stats'],
-                'three_day_stats': performance_data['three_day_stats'],
-                'recent_records': performance_data['recent_records'],
-            }
-
-            success = send_james_alert_email(pilot_info, pilot_stats)
-            application_id = getattr(application, 'id', '未知')
-            if success:
-                logger.info("底薪申请%s触发的詹姆斯关注警告邮件已发送", application_id)
-            else:
-                logger.error("底薪申请%s触发的詹姆斯关注警告邮件发送失败", application_id)
+            get_james_alert_batcher().enqueue(pilot.id)
+            logger.info("底薪申请%s满足詹姆斯关注触发条件，主播%s已加入批量评估队列", getattr(application, 'id', '未知'), pilot.nickname)
 
         except Exception as e:
             logger.error("处理詹姆斯关注警告时发生异常: %s", e, exc_info=True)
 
-    thread = threading.Thread(target=_process)
-    thread.daemon = True
-    thread.start()
+    submit_side_effect(f"詹姆斯关注检查:{getattr(application, 'id', '未知')}", _process)
 
 
 def process_new_pilot_warning_async(application):
@@ -546,16 +724,14 @@ def process_new_pilot_warning_async(application):
             success = send_new_pilot_warning_email(pilot_info, pilot_stats, milestone)
             application_id = getattr(application, 'id', '未知')
             if success:
-                logger.info("底薪申请%s触发的新主播生存警告邮件已发送", application_id)
+                logger.info("底薪申请%s触发的新主播生存警告邮件已加入发件箱", application_id)
             else:
                 logger.error("底薪申请%s触发的新主播生存警告邮件发送失败", application_id)
 
         except Exception as exc:
             logger.error("处理新主播生存警告邮件时发生异常: %s", exc, exc_info=True)
 
-    thread = threading.Thread(target=_process)
-    thread.daemon = True
-    thread.start()
+    submit_side_effect(f"新主播生存警告检查:{getattr(application, 'id', '未知')}", _process)
 
 
 def trigger_james_alert_for_application(application, old_status=None):
@@ -0,0 +1,175 @@
+"""后台副作用作业执行器
+
+告警检查、BBS 提醒等由请求触发的副作用统一提交到进程内共享的有界线程池，
+避免批量操作时每条记录各起一个线程：
+- 并发上限：JOB_EXECUTOR_WORKERS 个工作线程
+- 队列上限：排队 + 执行中的作业超过 workers + JOB_EXECUTOR_QUEUE_LIMIT 时拒绝提交并记录告警
+- 超时：执行超过 JOB_EXECUTOR_TIMEOUT 秒的作业记为超时并告警（Python 线程无法被强制终止，作业仍会执行完毕）
+- 指标：metrics() 返回提交/完成/失败/拒绝/超时计数与当前排队、执行数
+- 退出：进程退出时停止接收新作业，并在限定时间内等待已提交作业完成；工作线程为守护线程，
+  解释器退出时不等待它们（ThreadPoolExecutor 的工作线程会在 atexit 回调之前被无限期等待），超时未完成的作业随进程结束丢弃
+"""
+
+import atexit
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.logging_setup import get_logger
+
+logger = get_logger('job_executor')
+
+JOB_EXECUTOR_WORKERS = int(os.getenv('JOB_EXECUTOR_WORKERS', '4'))
+JOB_EXECUTOR_QUEUE_LIMIT = int(os.getenv('JOB_EXECUTOR_QUEUE_LIMIT', '200'))
+JOB_EXECUTOR_TIMEOUT = float(os.getenv('JOB_EXECUTOR_TIMEOUT', '60'))
+JOB_EXECUTOR_DRAIN_SECONDS = float(os.getenv('JOB_EXECUTOR_DRAIN_SECONDS', '15'))
+
+_STOP = object()  # 工作线程退出标记
+
+
+class BoundedJobExecutor:
+    """有界作业执行器（守护工作线程 + 作业队列 + 队列深度限制 + 指标）"""
+
+    def __init__(self, name: str, max_workers: int, queue_limit: int, job_timeout: float):
+        self.name = name
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.job_timeout = job_timeout
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._workers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self._pending = 0
+        self._running: Dict[int, tuple] = {}
+        self._next_token = 0
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'timed_out': 0}
+        self._max_wait = 0.0
+        self._max_duration = 0.0
+
+    def submit(self, label: str, func: Callable[..., Any], *args, **kwargs) -> bool:
+        """提交作业；队列已满或执行器已关闭时返回 False（作业被丢弃）。"""
+        with self._lock:
+            if self._closed:
+                self._counters['rejected'] += 1
+                logger.warning('作业执行器 %s 已关闭，拒绝作业：%s', self.name, label)
+                return False
+            if self._pending >= self.max_workers + self.queue_limit:
+                self._counters['rejected'] += 1
+                rejected = self._counters['rejected']
+                logger.warning('作业执行器 %s 队列已满（上限 %d），拒绝作业：%s（累计拒绝 %d）', self.name, self.max_workers + self.queue_limit, label, rejected)
+                return False
+            self._counters['submitted'] += 1
+            self._pending += 1
+            self._next_token += 1
+            token = self._next_token
+            if len(self._workers) < min(self._pending, self.max_workers):
+                try:
+                    self._start_worker()
+                except RuntimeError as exc:  # 解释器退出阶段无法再创建线程
+                    logger.warning('作业执行器 %s 无法创建工作线程：%s', self.name, exc)
+                    if not self._workers:
+                        self._counters['submitted'] -= 1
+                        self._counters['rejected'] += 1
+                        self._pending -= 1
+                        return False
+            self._queue.put((token, label, func, args, kwargs, time.monotonic()))
+        return True
+
+    def _start_worker(self) -> None:
+        worker = threading.Thread(target=self._work, name=f'{self.name}_{len(self._workers)}', daemon=True)
+        worker.start()
+        self._workers.append(worker)
+
+    def _work(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            self._run(*item)
+
+    def _run(self, token: int, label: str, func: Callable[..., Any], args: tuple, kwargs: dict, submitted_at: float) -> None:
+        started_at = time.monotonic()
+        with self._lock:
+            self._running[token] = (label, started_at)
+            self._max_wait = max(self._max_wait, started_at - submitted_at)
+
+        outcome = 'completed'
+        try:
+            func(*args, **kwargs)
+        except Exception as exc:  # pylint: disable=broad-except
+            outcome = 'failed'
+            logger.error('作业 %s 执行失败：%s', label, exc, exc_info=True)
+        finally:
+            duration = time.monotonic() - started_at
+            with self._lock:
+                self._running.pop(token, None)
+                self._counters[outcome] += 1
+                self._max_duration = max(self._max_duration, duration)
+                if duration > self.job_timeout:
+                    self._counters['timed_out'] += 1
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.notify_all()
+            if duration > self.job_timeout:
+                logger.warning('作业 %s 执行 %.1f 秒，超过超时阈值 %.0f 秒', label, duration, self.job_timeout)
+
+    def metrics(self) -> Dict[str, Any]:
+        """执行器指标快照。"""
+        now = time.monotonic()
+        with self._lock:
+            running = len(self._running)
+            overdue = [label for label, started_at in self._running.values() if now - started_at > self.job_timeout]
+            return {
+                'name': self.name,
+                'max_workers': self.max_workers,
+                'queue_limit': self.queue_limit,
+                **self._counters,
+                'running': running,
+                'queued': self._pending - running,
+                'overdue': overdue,
+                'max_wait_seconds': round(self._max_wait, 3),
+                'max_duration_seconds': round(self._max_duration, 3),
+            }
+
+    def shutdown(self, timeout: float = JOB_EXECUTOR_DRAIN_SECONDS) -> bool:
+        """停止接收新作业并在 timeout 秒内等待已提交作业完成；超时返回 False（不再等待，剩余作业由工作线程继续执行）。"""
+        deadline = time.monotonic() + timeout
+        with self._lock:
+            self._closed = True
+            while self._pending > 0:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._idle.wait(remaining)
+            drained = self._pending == 0
+            pending = self._pending
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self._queue.put(_STOP)
+        if drained:
+            logger.info('作业执行器 %s 已排空并关闭：%s', self.name, self.metrics())
+        else:
+            logger.warning('作业执行器 %s 关闭时仍有 %d 个作业未完成：%s', self.name, pending, self.metrics())
+        return drained
+
+
+_side_effect_executor: Optional[BoundedJobExecutor] = None
+_side_effect_lock = threading.Lock()
+
+
+def get_side_effect_executor() -> BoundedJobExecutor:
+    """告警、提醒等副作用共用的执行器（进程内唯一，首次使用时创建）。"""
+    global _side_effect_executor  # pylint: disable=global-statement
+    with _side_effect_lock:
+        if _side_effect_executor is None:
+            _side_effect_executor = BoundedJobExecutor('side-effects', JOB_EXECUTOR_WORKERS, JOB_EXECUTOR_QUEUE_LIMIT, JOB_EXECUTOR_TIMEOUT)
+            atexit.register(_side_effect_executor.shutdown)
+        return _side_effect_executor
+
+
+def submit_side_effect(label: str, func: Callable[..., Any], *args, **kwargs) -> bool:
+    """提交一个副作用作业到共享执行器。"""
+    return get_side_effect_executor().submit(label, func, *args, **kwargs)
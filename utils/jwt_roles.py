@@ -13,6 +13,7 @@ from flask import jsonify
 from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
 
 from models.user import User
+from utils.identity_cache import get_identity, load_user
 
 
 def jwt_roles_required(*roles: str):
@@ -45,19 +46,20 @@ def jwt_roles_required(*roles: str):
             except Exception:  # pylint: disable=broad-except
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'UNAUTHORIZED', 'message': '未认证'}, 'meta': {}}), 401
 
-            # 获取用户身份并从数据库加载
-            identity = get_jwt_identity()
+            # 获取用户身份（命中身份缓存时不读数据库）
             try:
-                user = User.objects.get(fs_uniquifier=identity)  # pylint: disable=no-member
+                user_identity = get_identity(get_jwt_identity())
             except Exception:  # pylint: disable=broad-except
+                user_identity = None
+            if user_identity is None:
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'USER_NOT_FOUND', 'message': '用户不存在'}, 'meta': {}}), 404
 
             # 检查用户是否激活
-            if not user.active:
+            if not user_identity.active:
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'ACCOUNT_DISABLED', 'message': '账户已停用'}, 'meta': {}}), 403
 
             # 检查角色权限
-            user_roles = {role.name for role in user.roles}
+            user_roles = user_identity.role_names
             required_roles = set(roles)
             if not required_roles.issubset(user_roles):
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'FORBIDDEN', 'message': '权限不足'}, 'meta': {}}), 403
@@ -100,19 +102,20 @@ def jwt_roles_accepted(*roles: str):
             except Exception:  # pylint: disable=broad-except
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'UNAUTHORIZED', 'message': '未认证'}, 'meta': {}}), 401
 
-            # 获取用户身份并从数据库加载
-            identity = get_jwt_identity()
+            # 获取用户身份（命中身份缓存时不读数据库）
             try:
-                user = User.objects.get(fs_uniquifier=identity)  # pylint: disable=no-member
+                user_identity = get_identity(get_jwt_identity())
             except Exception:  # pylint: disable=broad-except
+                user_identity = None
+            if user_identity is None:
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'USER_NOT_FOUND', 'message': '用户不存在'}, 'meta': {}}), 404
 
             # 检查用户是否激活
-            if not user.active:
+            if not user_identity.active:
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'ACCOUNT_DISABLED', 'message': '账户已停用'}, 'meta': {}}), 403
 
             # 检查角色权限（满足其中之一即可）
-            user_roles = {role.name for role in user.roles}
+            user_roles = user_identity.role_names
             allowed_roles = set(roles)
             if not user_roles.intersection(allowed_roles):
                 return jsonify({'success': False, 'data': None, 'error': {'code': 'FORBIDDEN', 'message': '权限不足'}, 'meta': {}}), 403
@@ -128,15 +131,12 @@ def jwt_roles_accepted(*roles: str):
 def get_jwt_user() -> User | None:
     """获取当前JWT认证的用户对象
     
-    注意：必须在@jwt_required()或jwt_roles_*装饰的函数中调用
+    注意：必须在@jwt_required()或jwt_roles_*装饰的函数中调用；同一请求内多次调用只查询一次数据库
     
     Returns:
         User对象，如果无法获取则返回None
     """
     try:
-        identity = get_jwt_identity()
-        if not identity:
-            return None
-        return User.objects.get(fs_uniquifier=identity)  # pylint: disable=no-member
+        return load_user(get_jwt_identity())
     except Exception:  # pylint: disable=broad-except
         return None
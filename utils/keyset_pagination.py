@@ -0,0 +1,139 @@
+"""游标（keyset）分页工具
+
+列表接口传入 `cursor` 参数即切换为游标分页（首页传空值）：
+- 排序键固定为与索引对齐的若干字段并以 `id` 兜底，保证顺序稳定、翻页不重不漏；
+- 游标编码上一页最后一条记录的排序键，下一页以范围条件直接定位，不使用 skip，深翻页开销恒定；
+- 总数支持 exact（精确计数）、estimated（估算：无筛选时读取集合元数据，有筛选时计数至上限为止）与 none（不计数）。
+"""
+
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from mongoengine import Q
+
+COUNT_MODES = ('exact', 'estimated', 'none')
+ESTIMATED_COUNT_CAP = 10000  # 估算模式下有筛选条件时最多计数到该值
+
+SortSpec = Sequence[Tuple[str, int]]  # (字段名, 1 升序 / -1 降序)
+
+
+class CursorError(ValueError):
+    """游标无效（格式错误或与当前排序不匹配）"""
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat()}
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if isinstance(value, Decimal):
+        return {'$dec': str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if '$dt' in value:
+            return datetime.fromisoformat(value['$dt'])
+        if '$oid' in value:
+            return ObjectId(value['$oid'])
+        if '$dec' in value:
+            return Decimal(value['$dec'])
+        raise CursorError('游标格式错误')
+    return value
+
+
+def encode_cursor(document, sort_spec: SortSpec) -> str:
+    """将文档的排序键编码为游标字符串。"""
+    payload = {'k': [field for field, _ in sort_spec], 'v': [_encode_value(getattr(document, field)) for field, _ in sort_spec]}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, sort_spec: SortSpec) -> List[Any]:
+    """解码游标，返回排序键取值列表；游标无效时抛出 CursorError。"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        fields, values = payload['k'], payload['v']
+    except (ValueError, KeyError, TypeError) as exc:
+        raise CursorError('游标格式错误') from exc
+    if fields != [field for field, _ in sort_spec] or len(values) != len(fields):
+        raise CursorError('游标与当前排序不匹配')
+    try:
+        return [_decode_value(value) for value in values]
+    except (ValueError, ArithmeticError, InvalidId) as exc:
+        raise CursorError('游标格式错误') from exc
+
+
+def _after(field: str, direction: int, value: Any) -> Q:
+    """排序方向上严格位于 value 之后的条件（MongoDB 中空值排在最小端）。"""
+    if direction < 0:
+        if value is None:
+            return Q(pk__in=[])  # 降序时空值已是最末，之后没有更多同字段取值
+        if field == 'id':
+            return Q(id__lt=value)
+        return Q(**{f'{field}__lt': value}) | Q(**{field: None})
+    if value is None:
+        return Q(**{f'{field}__ne': None})
+    return Q(**{f'{field}__gt': value})
+
+
+def build_keyset_filter(sort_spec: SortSpec, values: Sequence[Any]) -> Q:
+    """构造"排序键字典序大于游标"的查询条件：(a>x) 或 (a=x 且 b>y) 或 ……"""
+    condition = None
+    for index, (field, direction) in enumerate(sort_spec):
+        branch = _after(field, direction, values[index])
+        for prev_index in range(index):
+            prev_field = sort_spec[prev_index][0]
+            branch = Q(**{prev_field: values[prev_index]}) & branch
+        condition = branch if condition is None else condition | branch
+    return condition
+
+
+def order_by_args(sort_spec: SortSpec) -> List[str]:
+    return [field if direction > 0 else f'-{field}' for field, direction in sort_spec]
+
+
+def parse_count_mode(value: Optional[str], default: str) -> str:
+    mode = (value or '').strip().lower()
+    return mode if mode in COUNT_MODES else default
+
+
+def count_queryset(queryset, mode: str) -> Dict[str, Any]:
+    """按计数模式统计总数，返回 {'total': int|None, 'total_is_estimate': bool}。"""
+    if mode == 'none':
+        return {'total': None, 'total_is_estimate': False}
+    if mode == 'estimated':
+        if not queryset._query:  # pylint: disable=protected-access
+            return {'total': queryset._collection.estimated_document_count(), 'total_is_estimate': True}  # pylint: disable=protected-access
+        capped = queryset.clone().order_by().limit(ESTIMATED_COUNT_CAP).count(with_limit_and_skip=True)
+        return {'total': capped, 'total_is_estimate': capped >= ESTIMATED_COUNT_CAP}
+    return {'total': queryset.count(), 'total_is_estimate': False}
+
+
+def apply_keyset_cursor(queryset, sort_spec: SortSpec, cursor: Optional[str]):
+    """按排序键排序，并在给定游标时追加"位于游标之后"的条件。"""
+    query = queryset.order_by(*order_by_args(sort_spec))
+    if cursor:
+        query = query.filter(build_keyset_filter(sort_spec, decode_cursor(cursor, sort_spec)))
+    return query
+
+
+def split_page(documents: List[Any], sort_spec: SortSpec, limit: int) -> Tuple[List[Any], Optional[str]]:
+    """从多取一条的结果中切出本页，返回 (本页文档, 下一页游标)。"""
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    next_cursor = encode_cursor(documents[-1], sort_spec) if has_more and documents else None
+    return documents, next_cursor
+
+
+def paginate_keyset(queryset, sort_spec: SortSpec, cursor: Optional[str], limit: int) -> Tuple[List[Any], Optional[str]]:
+    """按游标读取一页数据，返回 (本页文档, 下一页游标)；没有更多数据时下一页游标为 None。"""
+    documents = list(apply_keyset_cursor(queryset, sort_spec, cursor).limit(limit + 1))
+    return split_page(documents, sort_spec, limit)
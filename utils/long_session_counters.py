@@ -0,0 +1,137 @@
+# pylint: disable=no-member
+"""主播长时开播计数器维护工具。
+
+实现要点：
+- 在主播文档上维护 `long_session_count`（播时≥6小时的开播记录数）与 `full_7_days_at`（第7条长时开播的开始时间）；
+- 开播记录创建/更新/删除后按受影响的主播重算（仅读取该主播记录的起止时间，走 pilot 索引）；
+- 提供全量回填入口（scripts/rebuild_long_session_counters.py）；尚未回填的主播在首次读取时补算；
+- 播时口径与 BattleRecord.duration_hours 一致（保留1位小数后比较）。
+"""
+
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from models.battle_record import BattleRecord
+from models.pilot import Pilot
+from utils.logging_setup import get_logger
+from utils.timezone_helper import get_current_utc_time
+
+logger = get_logger('long_session_counters')
+
+LONG_SESSION_HOURS = 6  # 长时开播阈值（小时，含）
+FULL_DAYS_THRESHOLD = 7  # 满7天所需的长时开播条数
+
+CounterValue = Tuple[int, Optional[datetime]]
+
+
+def _ref_id(reference) -> Optional[str]:
+    """读取引用字段的ID（兼容 Document / DBRef / ObjectId），不触发解引用。"""
+    if reference is None:
+        return None
+    ref_id = getattr(reference, 'id', reference)
+    return str(ref_id) if ref_id else None
+
+
+def is_long_session(start_time: Optional[datetime], end_time: Optional[datetime]) -> bool:
+    """是否为长时开播（与 BattleRecord.duration_hours 的取整口径一致）。"""
+    if not start_time or not end_time:
+        return False
+    return round((end_time - start_time).total_seconds() / 3600, 1) >= LONG_SESSION_HOURS
+
+
+def count_long_sessions(session_times: Iterable[Tuple[datetime, Optional[datetime]]]) -> CounterValue:
+    """按开始时间升序统计长时开播条数，并返回第7条长时开播的开始时间。"""
+    long_starts = sorted(start for start, end in session_times if is_long_session(start, end))
+    full_7_days_at = long_starts[FULL_DAYS_THRESHOLD - 1] if len(long_starts) >= FULL_DAYS_THRESHOLD else None
+    return len(long_starts), full_7_days_at
+
+
+def _counter_update(pilot_id: str, value: CounterValue, counted_at: datetime) -> UpdateOne:
+    count, full_7_days_at = value
+    return UpdateOne({'_id': ObjectId(pilot_id)},
+                     {'$set': {
+                         'long_session_count': count,
+                         'full_7_days_at': full_7_days_at,
+                         'long_session_counted_at': counted_at
+                     }})
+
+
+def refresh_long_session_counter(pilot_id) -> CounterValue:
+    """重算单个主播的长时开播计数器并写回主播文档。"""
+    pilot_key = _ref_id(pilot_id)
+    if not pilot_key:
+        return 0, None
+
+    raw_records = BattleRecord.objects(pilot=ObjectId(pilot_key)).only('start_time', 'end_time').as_pymongo()
+    value = count_long_sessions((raw.get('start_time'), raw.get('end_time')) for raw in raw_records)
+    # 直接更新集合，不触发主播保存信号，也不改动 updated_at
+    Pilot._get_collection().bulk_write([_counter_update(pilot_key, value, get_current_utc_time())])  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    logger.debug('主播 %s 长时开播计数已重算：%d 条，满7天时间=%s', pilot_key, value[0], value[1])
+    return value
+
+
+def refresh_counters_for_battle_record(record: BattleRecord, previous_pilot=None) -> None:
+    """开播记录创建/更新/删除后，重算受影响主播（含改挂前的主播）的计数器。"""
+    affected = {_ref_id(record.pilot) if record is not None else None, _ref_id(previous_pilot)}
+    for pilot_key in affected:
+        if pilot_key:
+            refresh_long_session_counter(pilot_key)
+
+
+def load_long_session_counters(pilot_ids: Iterable) -> Dict[str, CounterValue]:
+    """批量读取主播计数器（单次按 _id 查询）；尚未回填的主播即时补算。"""
+    object_ids = list({ObjectId(pilot_key) for pilot_key in (_ref_id(pilot_id) for pilot_id in pilot_ids) if pilot_key})
+    if not object_ids:
+        return {}
+
+    counters: Dict[str, CounterValue] = {}
+    pending: List[str] = []
+    for raw in Pilot.objects(id__in=object_ids).only('long_session_count', 'full_7_days_at', 'long_session_counted_at').as_pymongo():
+        pilot_key = str(raw['_id'])
+        if raw.get('long_session_counted_at') is None:
+            pending.append(pilot_key)
+            continue
+        counters[pilot_key] = (int(raw.get('long_session_count') or 0), raw.get('full_7_days_at'))
+
+    if pending:
+        logger.info('发现 %d 个主播尚未回填长时开播计数器，即时补算', len(pending))
+        for pilot_key in pending:
+            counters[pilot_key] = refresh_long_session_counter(pilot_key)
+    return counters
+
+
+def rebuild_long_session_counters(batch_size: int = 1000) -> Dict[str, int]:
+    """按全部开播记录回填所有主播的计数器，返回统计信息。"""
+    logger.info('开始回填主播长时开播计数器')
+    counted_at = get_current_utc_time()
+
+    sessions: Dict[str, List[Tuple[datetime, Optional[datetime]]]] = {}
+    record_count = 0
+    for raw in BattleRecord.objects.only('pilot', 'start_time', 'end_time').as_pymongo():
+        pilot_key = _ref_id(raw.get('pilot'))
+        if not pilot_key or not raw.get('start_time'):
+            continue
+        sessions.setdefault(pilot_key, []).append((raw['start_time'], raw.get('end_time')))
+        record_count += 1
+
+    collection = Pilot._get_collection()  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    operations = []
+    pilot_count = 0
+    full_count = 0
+    for raw in Pilot.objects.only('id').as_pymongo():
+        pilot_key = str(raw['_id'])
+        value = count_long_sessions(sessions.get(pilot_key, []))
+        full_count += 1 if value[0] >= FULL_DAYS_THRESHOLD else 0
+        operations.append(_counter_update(pilot_key, value, counted_at))
+        pilot_count += 1
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+    logger.info('主播长时开播计数器回填完成：主播 %d 个，开播记录 %d 条，满7天 %d 个', pilot_count, record_count, full_count)
+    return {'pilot_count': pilot_count, 'record_count': record_count, 'full_7_days_count': full_count}
@@ -0,0 +1,248 @@
+# pylint: disable=no-member
+"""邮件发件箱
+
+请求处理等不希望等待SMTP的场景通过 enqueue_email / enqueue_email_md 写入 mail_outbox 集合后立即返回，
+由后台发送线程批量领取待发送邮件，复用同一个已认证的SMTP会话逐封投递：
+- 领取：按 next_attempt_at 原子领取（状态置为发送中并设置租约），多进程部署不会重复发送
+- 重试：投递失败按指数退避重新排队，超过最大次数标记为已放弃（死信）
+- 会话：空闲超过 MAIL_SMTP_IDLE_SECONDS 后关闭，断线时自动重连一次
+"""
+
+import os
+import smtplib
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from mongoengine import Q
+
+from models.mail_outbox import MailOutbox, MailOutboxStatus
+from utils import mail_utils
+from utils.logging_setup import get_logger
+from utils.timezone_helper import get_current_utc_time
+
+logger = get_logger('mail_outbox')
+
+BATCH_SIZE = int(os.getenv('MAIL_OUTBOX_BATCH_SIZE', '20'))
+MAX_ATTEMPTS = int(os.getenv('MAIL_OUTBOX_MAX_ATTEMPTS', '5'))
+POLL_SECONDS = float(os.getenv('MAIL_OUTBOX_POLL_SECONDS', '15'))
+SESSION_IDLE_SECONDS = float(os.getenv('MAIL_SMTP_IDLE_SECONDS', '60'))
+LEASE_SECONDS = 300  # 单批发送租约，超时未完成的邮件可被重新领取
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+
+
+def _backoff_seconds(attempts: int) -> int:
+    """第N次失败后的等待时间：30s、60s、120s……最长1小时。"""
+    return min(BACKOFF_BASE_SECONDS * 2**max(attempts - 1, 0), BACKOFF_MAX_SECONDS)
+
+
+class PooledSmtpSession:
+    """复用的已认证SMTP会话
+
+    同一批次乃至相邻批次的邮件共用一个连接；空闲超时后关闭，服务端断开时重连一次。
+    """
+
+    def __init__(self, connection_factory: Optional[Callable[[], smtplib.SMTP]] = None, idle_seconds: float = SESSION_IDLE_SECONDS):
+        self._connection_factory = connection_factory or mail_utils.open_smtp_connection
+        self._idle_seconds = idle_seconds
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self.connect_count = 0
+
+    def _ensure(self) -> smtplib.SMTP:
+        self.close_if_idle()
+        if self._server is None:
+            self._server = self._connection_factory()
+            self.connect_count += 1
+        return self._server
+
+    def send(self, from_addr: str, recipients: List[str], message: str) -> None:
+        server = self._ensure()
+        try:
+            server.sendmail(from_addr, recipients, message)
+        except smtplib.SMTPServerDisconnected:
+            self.close()
+            self._ensure().sendmail(from_addr, recipients, message)
+        self._last_used = time.monotonic()
+
+    def close_if_idle(self) -> None:
+        if self._server is not None and time.monotonic() - self._last_used > self._idle_seconds:
+            self.close()
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:  # pylint: disable=broad-except
+            try:
+                self._server.close()
+            except Exception:  # pylint: disable=broad-except
+                pass
+        self._server = None
+
+
+class MailOutboxSender:
+    """发件箱后台发送器"""
+
+    def __init__(self, session: Optional[PooledSmtpSession] = None, batch_size: int = BATCH_SIZE, max_attempts: int = MAX_ATTEMPTS,
+                 poll_seconds: float = POLL_SECONDS):
+        self.session = session or PooledSmtpSession()
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+    def claim_batch(self) -> List[MailOutbox]:
+        """原子领取一批到期的待发送邮件（含租约过期的发送中邮件）。"""
+        now = get_current_utc_time()
+        lease_until = now + timedelta(seconds=LEASE_SECONDS)
+        due = (Q(status=MailOutboxStatus.PENDING) & Q(next_attempt_at__lte=now)) | (Q(status=MailOutboxStatus.SENDING) & Q(locked_until__lte=now))
+
+        batch: List[MailOutbox] = []
+        for _ in range(self.batch_size):
+            item = MailOutbox.objects(due).order_by('next_attempt_at').modify(new=True,
+                                                                                set__status=MailOutboxStatus.SENDING,
+                                                                                set__locked_until=lease_until)
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def process_batch(self) -> Dict[str, int]:
+        """领取并发送一批邮件，返回 {'sent', 'retried', 'dead'} 计数。"""
+        stats = {'sent': 0, 'retried': 0, 'dead': 0}
+        batch = self.claim_batch()
+        if not batch:
+            self.session.close_if_idle()
+            return stats
+
+        for item in batch:
+            stats[self._deliver(item)] += 1
+
+        logger.info('发件箱批次完成：发送 %d，重试 %d，放弃 %d', stats['sent'], stats['retried'], stats['dead'])
+        return stats
+
+    def _deliver(self, item: MailOutbox) -> str:
+        try:
+            msg, html_body = mail_utils.build_email_message(item.recipients, item.subject, item.content or '', item.html_content)
+            if mail_utils.MAIL_DEBUG:
+                if not mail_utils.write_debug_mail(item.recipients, item.subject, html_body):
+                    raise OSError('邮件落盘失败')
+            else:
+                if not mail_utils.SMTP_USER or not mail_utils.SMTP_PASSWORD:
+                    raise smtplib.SMTPException('SMTP_USER/SMTP_PASSWORD环境变量未配置')
+                self.session.send(mail_utils.SENDER_EMAIL, item.recipients, msg.as_string())
+        except Exception as exc:  # pylint: disable=broad-except
+            if isinstance(exc, (smtplib.SMTPAuthenticationError, smtplib.SMTPServerDisconnected)):
+                self.session.close()
+            return self._mark_failed(item, exc)
+
+        item.update(set__status=MailOutboxStatus.SENT, set__sent_at=get_current_utc_time(), unset__locked_until=True, inc__attempts=1)
+        logger.info('邮件发送成功！收件人: %s, 主题: %s', ', '.join(item.recipients), item.subject)
+        return 'sent'
+
+    def _mark_failed(self, item: MailOutbox, exc: Exception) -> str:
+        attempts = (item.attempts or 0) + 1
+        error = f'{type(exc).__name__}: {exc}'[:1000]
+        if attempts >= self.max_attempts:
+            item.update(set__status=MailOutboxStatus.DEAD, set__attempts=attempts, set__last_error=error, unset__locked_until=True)
+            logger.error('邮件发送失败且已达最大重试次数，放弃：主题=%s 收件人=%s 错误=%s', item.subject, ', '.join(item.recipients), error)
+            return 'dead'
+
+        next_attempt_at = get_current_utc_time() + timedelta(seconds=_backoff_seconds(attempts))
+        item.update(set__status=MailOutboxStatus.PENDING,
+                    set__attempts=attempts,
+                    set__last_error=error,
+                    set__next_attempt_at=next_attempt_at,
+                    unset__locked_until=True)
+        logger.warning('邮件发送失败，第%d次，将于 %s 重试：主题=%s 错误=%s', attempts, next_attempt_at, item.subject, error)
+        return 'retried'
+
+    def _run(self) -> None:
+        while not self._stop_event.is_set():
+            self._wake_event.clear()
+            try:
+                while sum(self.process_batch().values()) >= self.batch_size:  # 满批说明仍有积压，继续发送
+                    pass
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error('发件箱发送循环异常：%s', exc, exc_info=True)
+            self._wake_event.wait(self.poll_seconds)
+        self.session.close()
+
+    def start(self) -> None:
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='mail-outbox-sender', daemon=True)
+            self._thread.start()
+            logger.info('发件箱发送线程已启动')
+
+    def wake(self) -> None:
+        self.start()
+        self._wake_event.set()
+
+    def stop(self, timeout: float = 10) -> None:
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+
+_sender: Optional[MailOutboxSender] = None
+_sender_lock = threading.Lock()
+
+
+def get_mail_outbox_sender() -> MailOutboxSender:
+    """进程内唯一的发件箱发送器。"""
+    global _sender  # pylint: disable=global-statement
+    with _sender_lock:
+        if _sender is None:
+            _sender = MailOutboxSender()
+        return _sender
+
+
+def start_mail_outbox_worker() -> None:
+    """启动发件箱发送线程（应用启动时调用，用于接续上次未发送完的邮件）。"""
+    try:
+        get_mail_outbox_sender().start()
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('启动发件箱发送线程失败：%s', exc)
+
+
+def enqueue_email(recipients: Iterable[str], subject: str, content: str, html_content: Optional[str] = None, source: Optional[str] = None) -> bool:
+    """
+    将邮件写入发件箱并唤醒后台发送线程，不等待SMTP。
+
+    Returns:
+        写入成功返回True（不代表已送达），失败返回False
+    """
+    unique_recipients = sorted({email for email in recipients if email})
+    if not unique_recipients:
+        logger.warning('邮件未入队：收件人为空，主题=%s', subject)
+        return False
+
+    try:
+        MailOutbox(recipients=unique_recipients, subject=subject, content=content, html_content=html_content, source=source).save()
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('邮件入队失败：主题=%s 错误=%s', subject, exc, exc_info=True)
+        return False
+
+    get_mail_outbox_sender().wake()
+    return True
+
+
+def enqueue_email_md(recipients: Iterable[str], subject: str, md_content: str, source: Optional[str] = None) -> bool:
+    """enqueue_email 的 Markdown 版本，渲染规则同 send_email_md。"""
+    try:
+        plain_text_body, rendered_html_body = mail_utils.render_markdown_email(md_content)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('Markdown邮件处理失败: %s', exc)
+        return False
+    return enqueue_email(recipients, subject, plain_text_body, rendered_html_body, source=source)
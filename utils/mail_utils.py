@@ -11,7 +11,7 @@ import smtplib
 import ssl
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
 import html2text
 import markdown
@@ -29,6 +29,7 @@ SMTP_PORT = int(os.getenv('SES_SMTP_PORT', '587'))
 SMTP_USER = os.getenv('SES_SMTP_USER')  # SMTP服务器登录用户名
 SMTP_PASSWORD = os.getenv('SES_SMTP_PASSWORD')  # SMTP服务器登录密码
 SENDER_EMAIL = os.getenv('SENDER_EMAIL')  # 发件人邮箱（From字段）
+SMTP_STARTTLS = os.getenv('SES_SMTP_STARTTLS', 'true').lower() == 'true'  # 本地调试SMTP（如 aiosmtpd）可关闭
 MAIL_DEBUG = os.getenv('MAIL_DEBUG', 'false').lower() == 'true'
 
 
@@ -151,6 +152,83 @@ Lacus-Log主播管理系统
     """
 
 
+def build_email_message(recipients: List[str], subject: str, content: str, html_content: Optional[str] = None) -> Tuple[MIMEMultipart, str]:
+    """
+    组装邮件（纯文本+HTML两部分，均套用邮件模板）
+
+    Args:
+        recipients: 收件人邮箱列表
+        subject: 邮件主题
+        content: 纯文本邮件正文内容
+        html_content: HTML邮件正文内容（可选，如果不提供则使用content）
+
+    Returns:
+        (邮件对象, HTML正文)
+    """
+    msg = MIMEMultipart('alternative')
+    msg['From'] = SENDER_EMAIL
+    msg['To'] = ', '.join(recipients)
+    msg['Subject'] = subject
+
+    text_body = _create_text_template(content)
+    text_part = MIMEText(text_body, 'plain', 'utf-8')
+    msg.attach(text_part)
+
+    html_body = _create_html_template(html_content if html_content else content)
+    html_part = MIMEText(html_body, 'html', 'utf-8')
+    msg.attach(html_part)
+
+    return msg, html_body
+
+
+def write_debug_mail(recipients: List[str], subject: str, html_body: str) -> bool:
+    """MAIL_DEBUG模式下将邮件落盘到 log/mail 而不实际发送"""
+    try:
+        os.makedirs('log/mail', exist_ok=True)
+        ts = get_current_local_time().strftime('%Y%m%d_%H%M%S')
+        safe_subject = ''.join(ch if ch.isalnum() else '_' for ch in subject)[:60]
+        filename = os.path.join('log', 'mail', f"{safe_subject}_{ts}.html")
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(html_body)
+        logger.info("[DEBUG] 邮件未发送（MAIL_DEBUG=true），已落盘: %s; 收件人: %s", filename, ', '.join(recipients))
+        return True
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error("[DEBUG] 邮件落盘失败: %s", str(exc))
+        return False
+
+
+def open_smtp_connection(timeout: float = 30) -> smtplib.SMTP:
+    """
+    建立已认证的SMTP连接（按配置启用STARTTLS）
+
+    Raises:
+        smtplib.SMTPException / OSError: 连接、加密或认证失败
+    """
+    server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT, timeout=timeout)
+    try:
+        if SMTP_STARTTLS:
+            server.starttls(context=ssl.create_default_context())  # 启用TLS加密
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def render_markdown_email(md_content: str) -> Tuple[str, str]:
+    """将Markdown正文渲染为（纯文本, HTML）"""
+    rendered_html_body = markdown.markdown(
+        md_content or "",
+        extensions=[
+            'extra',  # 支持表格、定义列表等
+            'sane_lists',
+            'smarty'
+        ])
+
+    plain_text_body = html2text.html2text(rendered_html_body)
+    return plain_text_body, rendered_html_body
+
+
 def send_email(recipients: List[str], subject: str, content: str, html_content: Optional[str] = None) -> bool:
     """
     发送邮件
@@ -173,44 +251,12 @@ def send_email(recipients: List[str], subject: str, content: str, html_content:
             logger.error("SMTP_PASSWORD环境变量未配置")
             return False
 
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SENDER_EMAIL
-        msg['To'] = ', '.join(recipients)
-        msg['Subject'] = subject
-
-        text_body = _create_text_template(content)
-        text_part = MIMEText(text_body, 'plain', 'utf-8')
-        msg.attach(text_part)
-
-        if html_content:
-            html_body = _create_html_template(html_content)
-            html_part = MIMEText(html_body, 'html', 'utf-8')
-            msg.attach(html_part)
-        else:
-            html_body = _create_html_template(content)
-            html_part = MIMEText(html_body, 'html', 'utf-8')
-            msg.attach(html_part)
+        msg, html_body = build_email_message(recipients, subject, content, html_content)
 
         if MAIL_DEBUG:
-            try:
-                os.makedirs('log/mail', exist_ok=True)
-                ts = get_current_local_time().strftime('%Y%m%d_%H%M%S')
-                safe_subject = ''.join(ch if ch.isalnum() else '_' for ch in subject)[:60]
-                filename = os.path.join('log', 'mail', f"{safe_subject}_{ts}.html")
-                with open(filename, 'w', encoding='utf-8') as f:
-                    f.write(html_body)
-                logger.info("[DEBUG] 邮件未发送（MAIL_DEBUG=true），已落盘: %s; 收件人: %s", filename, ', '.join(recipients))
-                return True
-            except Exception as exc:  # pylint: disable=broad-except
-                logger.error("[DEBUG] 邮件落盘失败: %s", str(exc))
-                return False
-
-        context = ssl.create_default_context()
-
-        with smtplib.SMTP(SMTP_SERVER, SMTP_PORT) as server:
-            server.starttls(context=context)  # 启用TLS加密
-            server.login(SMTP_USER, SMTP_PASSWORD)
+            return write_debug_mail(recipients, subject, html_body)
 
+        with open_smtp_connection() as server:
             text = msg.as_string()
             server.sendmail(SENDER_EMAIL, recipients, text)
 
@@ -239,6 +285,7 @@ def send_email_md(recipients: List[str], subject: str, md_content: str) -> bool:
     使用Markdown内容发送邮件。
 
     会将Markdown渲染为HTML，并同时生成纯文本内容，随后复用现有的send_email进行发送。
+    请求处理等不希望等待SMTP的场景请使用 utils.mail_outbox.enqueue_email_md。
 
     Args:
         recipients: 收件人邮箱列表
@@ -249,15 +296,7 @@ def send_email_md(recipients: List[str], subject: str, md_content: str) -> bool:
         发送成功返回True，失败返回False
     """
     try:
-        rendered_html_body = markdown.markdown(
-            md_content or "",
-            extensions=[
-                'extra',  # 支持表格、定义列表等
-                'sane_lists',
-                'smarty'
-            ])
-
-        plain_text_body = html2text.html2text(rendered_html_body)
+        plain_text_body, rendered_html_body = render_markdown_email(md_content)
 
         return send_email(recipients=recipients, subject=subject, content=plain_text_body, html_content=rendered_html_body)
     except Exception as e:
@@ -6,14 +6,14 @@ from __future__ import annotations
 from collections import defaultdict
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Optional, Sequence, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from mongoengine import QuerySet
 
 from models.battle_record import (BaseSalaryApplication, BaseSalaryApplicationStatus, BattleRecord)
 from models.pilot import Pilot, WorkMode
 from utils.cache_helper import cached_monthly_report
-from utils.commission_helper import (calculate_commission_amounts, get_pilot_commission_rate_for_date)
+from utils.commission_helper import CommissionTimeline, calculate_commission_amounts
 from utils.logging_setup import get_logger
 from utils.timezone_helper import (get_current_utc_time, local_to_utc, utc_to_local)
 
@@ -88,16 +88,29 @@ def get_battle_records_for_date_range(start_local: datetime, end_local: datetime
     if owner_normalized is None and mode_normalized is None:
         return list(records)
 
+    found, owner_user = _load_owner_user(owner_normalized)
+    if not found:
+        return []
+
+    return filter_records_by_last_record(records, owner_user, mode_normalized)
+
+
+def _load_owner_user(owner_normalized: Optional[str]) -> Tuple[bool, Any]:
+    """加载直属运营用户；返回（是否有效，用户对象）。未指定直属运营时返回（True，None）。"""
+    if owner_normalized is None:
+        return True, None
+
     from models.user import User  # 避免循环导入
 
-    owner_user = None
-    if owner_normalized is not None:
-        try:
-            owner_user = User.objects.get(id=owner_normalized)
-        except User.DoesNotExist:
-            logger.warning('直属运营不存在：%s，返回空结果集', owner_normalized)
-            return []
+    try:
+        return True, User.objects.get(id=owner_normalized)
+    except User.DoesNotExist:
+        logger.warning('直属运营不存在：%s，返回空结果集', owner_normalized)
+        return False, None
+
 
+def filter_records_by_last_record(records: Iterable[BattleRecord], owner_user: Any, mode_normalized: Optional[str]) -> List[BattleRecord]:
+    """按主播分组，以组内最后一条开播记录的直属运营与开播方式决定整组记录是否保留。"""
     pilot_to_records: Dict[str, List[BattleRecord]] = {}
     for record in records:
         pilot_to_records.setdefault(str(record.pilot.id), []).append(record)
@@ -172,19 +185,13 @@ def _get_record_base_salary(record: BattleRecord, base_salary_map: Dict[str, Dec
 # —— 指标计算辅助函数 ——
 
 
-def calculate_pilot_three_day_avg_revenue(pilot: Pilot, report_date: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Optional[Decimal]:
-    """计算主播近三个有记录自然日的平均流水。"""
+def calculate_three_day_avg_from_daily_revenue(daily_revenue: Dict[Any, Decimal], report_day, lookback_days: int = 7) -> Optional[Decimal]:
+    """根据（自然日 -> 流水）映射，计算截至报表日近三个有记录自然日的平均流水。"""
     days_with_revenue: List[Decimal] = []
-
-    for offset in range(7):
-        check_date = report_date - timedelta(days=offset)
-        check_start = check_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        check_end = check_start + timedelta(days=1)
-        daily_records = get_battle_records_for_date_range(check_start, check_end, owner_id, mode)
-        pilot_records = [item for item in daily_records if item.pilot.id == pilot.id]
-        if pilot_records:
-            daily_revenue = sum(record.revenue_amount for record in pilot_records)
-            days_with_revenue.append(daily_revenue)
+    for offset in range(lookback_days):
+        day = report_day - timedelta(days=offset)
+        if day in daily_revenue:
+            days_with_revenue.append(daily_revenue[day])
             if len(days_with_revenue) >= 3:
                 break
 
@@ -195,6 +202,35 @@ def calculate_pilot_three_day_avg_revenue(pilot: Pilot, report_date: datetime, o
     return total / 3
 
 
+def calculate_pilot_three_day_avg_revenue(pilot: Pilot, report_date: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Optional[Decimal]:
+    """计算主播近三个有记录自然日的平均流水。
+
+    一次查询取出该主播近7个自然日的记录，再逐日套用与按日查询一致的筛选规则。
+    """
+    owner_normalized, mode_normalized = _normalize_owner_and_mode(owner_id, mode)
+    found, owner_user = _load_owner_user(owner_normalized)
+    if not found:
+        return None
+
+    report_day_start = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    window_start_utc = local_to_utc(report_day_start - timedelta(days=6))
+    window_end_utc = local_to_utc(report_day_start + timedelta(days=1))
+    records = BattleRecord.objects.filter(pilot=pilot.id, start_time__gte=window_start_utc, start_time__lt=window_end_utc)
+
+    records_by_day: Dict[Any, List[BattleRecord]] = defaultdict(list)
+    for record in records:
+        records_by_day[utc_to_local(record.start_time).date()].append(record)
+
+    daily_revenue: Dict[Any, Decimal] = {}
+    for day, day_records in records_by_day.items():
+        if owner_normalized is not None or mode_normalized is not None:
+            day_records = filter_records_by_last_record(day_records, owner_user, mode_normalized)
+        if day_records:
+            daily_revenue[day] = sum(record.revenue_amount for record in day_records)
+
+    return calculate_three_day_avg_from_daily_revenue(daily_revenue, report_day_start.date())
+
+
 def calculate_pilot_rebate(pilot: Pilot, report_date: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Dict[str, Any]:
     """计算主播月度返点信息。"""
     month_start = report_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
@@ -314,6 +350,7 @@ def calculate_pilot_monthly_commission_stats(pilot: Pilot, year: int, month: int
     month_records = get_battle_records_for_month(year, month, owner_id, mode)
     base_salary_map = _fetch_approved_base_salary_map(month_records)
     pilot_records = [record for record in month_records if record.pilot.id == pilot.id]
+    timeline = CommissionTimeline.prefetch([pilot.id])
 
     total_pilot_share = Decimal('0')
     total_company_share = Decimal('0')
@@ -321,7 +358,7 @@ def calculate_pilot_monthly_commission_stats(pilot: Pilot, year: int, month: int
 
     for record in pilot_records:
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(pilot.id, record_date)
+        commission_rate = timeline.rate_for(pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
         total_pilot_share += commission_amounts['pilot_amount']
         total_company_share += commission_amounts['company_amount']
@@ -362,6 +399,7 @@ def calculate_daily_summary(report_date: datetime, owner_id: Optional[str] = Non
     day_end = report_date.replace(hour=23, minute=59, second=59, microsecond=999999)
     day_records = get_battle_records_for_date_range(day_start, day_end + timedelta(microseconds=1), owner_id, mode)
     base_salary_map = _fetch_approved_base_salary_map(day_records)
+    timeline = CommissionTimeline.prefetch(record.pilot.id for record in day_records)
 
     pilot_ids = set()
     effective_pilot_ids = set()
@@ -384,7 +422,7 @@ def calculate_daily_summary(report_date: datetime, owner_id: Optional[str] = Non
         total_base_salary += base_salary
 
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(record.pilot.id, record_date)
+        commission_rate = timeline.rate_for(record.pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
         total_pilot_share += commission_amounts['pilot_amount']
         total_company_share += commission_amounts['company_amount']
@@ -420,6 +458,7 @@ def calculate_daily_details(report_date: datetime, owner_id: Optional[str] = Non
     month_end = report_date.replace(hour=23, minute=59, second=59, microsecond=999999)
     month_records = get_battle_records_for_date_range(month_start, month_end + timedelta(microseconds=1), owner_id, mode)
     month_base_salary_map = _fetch_approved_base_salary_map(month_records)
+    timeline = CommissionTimeline.prefetch(record.pilot.id for record in day_records)
 
     monthly_stats_cache: Dict[str, Dict[str, Any]] = {}
     pilot_month_records_cache: Dict[str, List[BattleRecord]] = {}
@@ -448,7 +487,7 @@ def calculate_daily_details(report_date: datetime, owner_id: Optional[str] = Non
         duration = record.duration_hours or 0.0
 
         record_date = local_start.date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(pilot.id, record_date)
+        commission_rate = timeline.rate_for(pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
 
         record_base_salary = _get_record_base_salary(record, base_salary_map)
@@ -472,7 +511,7 @@ def calculate_daily_details(report_date: datetime, owner_id: Optional[str] = Non
                 month_total_revenue += month_record.revenue_amount
 
                 month_record_date = local_month_start.date()
-                commission_rate_month, _, _ = get_pilot_commission_rate_for_date(pilot.id, month_record_date)
+                commission_rate_month = timeline.rate_for(pilot.id, month_record_date)
                 commission_amounts_month = calculate_commission_amounts(month_record.revenue_amount, commission_rate_month)
                 month_total_pilot_share += commission_amounts_month['pilot_amount']
                 month_total_company_share += commission_amounts_month['company_amount']
@@ -544,6 +583,7 @@ def calculate_weekly_summary(week_start_local: datetime, owner_id: Optional[str]
     week_end_local = week_start_local + timedelta(days=7) - timedelta(microseconds=1)
     week_records = get_battle_records_for_date_range(week_start_local, week_end_local + timedelta(microseconds=1), owner_id, mode)
     base_salary_map = _fetch_approved_base_salary_map(week_records)
+    timeline = CommissionTimeline.prefetch(record.pilot.id for record in week_records)
 
     pilot_ids = set()
     total_revenue = Decimal('0')
@@ -558,7 +598,7 @@ def calculate_weekly_summary(week_start_local: datetime, owner_id: Optional[str]
         total_revenue += record.revenue_amount
 
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(record.pilot.id, record_date)
+        commission_rate = timeline.rate_for(record.pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
         total_pilot_share += commission_amounts['pilot_amount']
         total_company_share += commission_amounts['company_amount']
@@ -584,6 +624,7 @@ def calculate_weekly_details(week_start_local: datetime, owner_id: Optional[str]
     week_end_local = week_start_local + timedelta(days=7) - timedelta(microseconds=1)
     week_records = get_battle_records_for_date_range(week_start_local, week_end_local + timedelta(microseconds=1), owner_id, mode)
     base_salary_map = _fetch_approved_base_salary_map(week_records)
+    timeline = CommissionTimeline.prefetch(record.pilot.id for record in week_records)
 
     pilot_stats: Dict[str, Dict[str, Any]] = {}
 
@@ -608,7 +649,7 @@ def calculate_weekly_details(week_start_local: datetime, owner_id: Optional[str]
         stats['total_base_salary'] += base_salary
 
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(record.pilot.id, record_date)
+        commission_rate = timeline.rate_for(record.pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
         stats['total_pilot_share'] += commission_amounts['pilot_amount']
         stats['total_company_share'] += commission_amounts['company_amount']
@@ -3,8 +3,11 @@
 
 实现要点：
 - 单次扫描完成汇总与明细统计；
-- 预取分成比例，避免每条记录重复查询；
-- 在数据库层面尽量精准过滤直属运营与开播方式。
+- 通过分成时间线批量预取分成比例，避免每条记录重复查询；
+- 在数据库层面尽量精准过滤直属运营与开播方式；
+- 主播日级事实表完成回填后，直接读取日级聚合行，不再扫描原始开播记录；
+- 可选 aggregate 引擎：由 MongoDB 聚合管道按（主播，自然日，开播方式）分组求和，
+  Python 侧只套用分成时间线与返点阶梯。
 """
 
 from __future__ import annotations
@@ -14,21 +17,25 @@ from datetime import date, datetime, timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
 
-from bson import ObjectId
+from bson import Decimal128, ObjectId
 from mongoengine import DoesNotExist, QuerySet
 
-from models.battle_record import BattleRecord
-from models.pilot import Pilot, PilotCommission, WorkMode, Status
+from models.battle_record import BaseSalaryApplication, BaseSalaryApplicationStatus, BattleRecord
+from models.pilot import Pilot, WorkMode, Status
 from models.user import User
-from utils.cache_helper import cached_monthly_report
-from utils.commission_helper import calculate_commission_amounts
+from utils.cache_helper import build_cache_scope, cached_monthly_report
+from utils.commission_helper import CommissionTimeline, calculate_commission_amounts
 from utils.logging_setup import get_logger
 from utils.new_report_calculations import _fetch_approved_base_salary_map  # pylint: disable=protected-access
+from utils.pilot_daily_facts import build_daily_fact_rows, facts_ready, load_pilot_daily_fact_rows
 from utils.timezone_helper import get_current_utc_time, local_to_utc, utc_to_local
 from utils.rebate_calculator import calculate_pilot_rebate
 
 logger = get_logger('new_report_fast_calculations')
 
+# 月报计算引擎：default 读取事实表（未回填时扫描原始记录），aggregate 由数据库聚合管道分组求和
+MONTHLY_ENGINES = ('default', 'aggregate')
+
 
 def _create_daily_metric_bucket() -> Dict[str, Decimal]:
     return {
@@ -153,37 +160,31 @@ def _load_owner_pilots(owner_user: User) -> List[ObjectId]:
     return ids
 
 
-def _fetch_commission_cache(pilot_ids: List[str]) -> Dict[str, List[Tuple[datetime, float]]]:
-    """预取所有相关主播的分成调整记录。"""
-    if not pilot_ids:
-        return {}
-    object_ids = [ObjectId(pid) for pid in pilot_ids]
-    commissions: QuerySet[PilotCommission] = PilotCommission.objects(pilot_id__in=object_ids,
-                                                                     is_active=True).order_by('pilot_id', 'adjustment_date')  # type: ignore[attr-defined]
-    cache: Dict[str, List[Tuple[datetime, float]]] = defaultdict(list)
-    for commission in commissions:
-        pilot_id = str(commission.pilot_id.id)
-        cache[pilot_id].append((commission.adjustment_date, float(commission.commission_rate)))
-    return cache
-
-
-def _resolve_commission_rate(cache: Dict[str, List[Tuple[datetime, float]]], pilot_id: str, record_date_local: date) -> float:
-    """从缓存中查找指定日期的分成比例，默认为20%。"""
-    entries = cache.get(pilot_id)
-    if not entries:
-        return 20.0
-    target_local = datetime.combine(record_date_local, datetime.min.time())
-    target_utc = local_to_utc(target_local)
-    for adjustment_date, rate in reversed(entries):
-        if adjustment_date <= target_utc:
-            return rate
-    return 20.0
-
-
 # 使用统一的返点计算工具，移除重复的 _evaluate_rebate 函数
 # _evaluate_rebate 函数已被 utils.rebate_calculator.calculate_pilot_rebate 替代
 
 
+def _resolve_pilot_scope(owner_id: Optional[str], status: Optional[Status]) -> Optional[List[ObjectId]]:
+    """按直属运营与主播当前状态确定主播范围；None 表示不限制。"""
+    scope: Optional[List[ObjectId]] = None
+    if owner_id:
+        try:
+            owner_user = User.objects.get(id=owner_id)  # type: ignore[attr-defined]
+        except DoesNotExist:
+            logger.warning('指定直属运营不存在：%s', owner_id)
+            return []
+        scope = _load_owner_pilots(owner_user)
+        if not scope:
+            logger.info('直属运营 %s 无关联主播，直接返回空结果', owner_user.username)
+            return []
+    if status:
+        status_query = Pilot.objects(status=status)  # type: ignore[attr-defined]
+        if scope is not None:
+            status_query = status_query.filter(id__in=scope)
+        scope = [pilot.id for pilot in status_query.only('id')]
+    return scope
+
+
 def _fetch_month_records(year: int,
                          month: int,
                          owner_id: Optional[str],
@@ -230,37 +231,250 @@ def _fetch_month_records(year: int,
     return records, records, report_date
 
 
-@cached_monthly_report()
+def _to_decimal(value) -> Decimal:
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    return Decimal(str(value or 0)).quantize(Decimal('0.01'))
+
+
+def _build_month_aggregation_pipeline(start_utc: datetime, end_utc: datetime, scope: Optional[List[ObjectId]], mode: Optional[WorkMode]) -> List[Dict[str, object]]:
+    """按（主播，GMT+8自然日，开播方式）分组的聚合管道。
+
+    金额按 DecimalField 口径（保留2位小数）转为 Decimal128 后求和；
+    播时沿用单条记录保留1位小数后求和的口径，因此返回各记录时长（毫秒）由 Python 侧取整。
+    """
+    match: Dict[str, object] = {'start_time': {'$gte': start_utc, '$lt': end_utc}}
+    if scope is not None:
+        match['pilot'] = {'$in': scope}
+    if mode is not None:
+        match['work_mode'] = mode.value
+
+    approved_amounts = {
+        '$map': {
+            'input': {
+                '$filter': {
+                    'input': '$applications',
+                    'cond': {
+                        '$eq': ['$$this.status', BaseSalaryApplicationStatus.APPROVED.value]
+                    }
+                }
+            },
+            'in': {
+                '$round': [{
+                    '$toDecimal': '$$this.base_salary_amount'
+                }, 2]
+            }
+        }
+    }
+
+    return [
+        {
+            '$match': match
+        },
+        {
+            '$sort': {
+                'start_time': 1,
+                '_id': 1
+            }
+        },
+        {
+            '$lookup': {
+                'from': BaseSalaryApplication._get_collection_name(),  # type: ignore[attr-defined]  # pylint: disable=protected-access
+                'localField': '_id',
+                'foreignField': 'battle_record_id',
+                'as': 'applications'
+            }
+        },
+        {
+            '$project': {
+                'pilot': 1,
+                'work_mode': 1,
+                'start_time': 1,
+                'local_date': {
+                    '$dateToString': {
+                        'format': '%Y-%m-%d',
+                        'date': '$start_time',
+                        'timezone': '+08:00'
+                    }
+                },
+                'revenue': {
+                    '$round': [{
+                        '$toDecimal': {
+                            '$ifNull': ['$revenue_amount', 0]
+                        }
+                    }, 2]
+                },
+                'duration_ms': {
+                    '$subtract': ['$end_time', '$start_time']
+                },
+                'base_salary': {
+                    '$sum': approved_amounts
+                },
+            }
+        },
+        {
+            '$group': {
+                '_id': {
+                    'pilot': '$pilot',
+                    'local_date': '$local_date',
+                    'work_mode': '$work_mode'
+                },
+                'first_start': {
+                    '$min': '$start_time'
+                },
+                'record_count': {
+                    '$sum': 1
+                },
+                'revenue': {
+                    '$sum': '$revenue'
+                },
+                'base_salary': {
+                    '$sum': '$base_salary'
+                },
+                'durations_ms': {
+                    '$push': '$duration_ms'
+                },
+            }
+        },
+        {
+            '$sort': {
+                'first_start': 1
+            }
+        },
+    ]
+
+
+def _aggregate_month_rows(year: int, month: int, owner_id: Optional[str], mode: Optional[WorkMode],
+                          status: Optional[Status]) -> Tuple[List[Dict[str, object]], Dict[str, Pilot]]:
+    """aggregate 引擎：单次聚合得到日级聚合行，Python 侧只套用分成时间线。"""
+    month_start_local, month_end_local, _ = _calc_month_range(year, month)
+    scope = _resolve_pilot_scope(owner_id, status)
+    if scope is not None and not scope:
+        return [], {}
+
+    pipeline = _build_month_aggregation_pipeline(local_to_utc(month_start_local), local_to_utc(month_end_local + timedelta(microseconds=1)), scope, mode)
+    groups = list(BattleRecord._get_collection().aggregate(pipeline, allowDiskUse=True))  # type: ignore[attr-defined]  # pylint: disable=protected-access
+
+    pilot_ids = list({group['_id']['pilot'] for group in groups})
+    timeline = CommissionTimeline.prefetch(pilot_ids)
+
+    rows: List[Dict[str, object]] = []
+    for group in groups:
+        pilot_id = str(group['_id']['pilot'])
+        local_day = datetime.strptime(group['_id']['local_date'], '%Y-%m-%d').date()
+        revenue = _to_decimal(group['revenue'])
+        commission_rate = timeline.rate_for(pilot_id, local_day)
+        commission_amounts = calculate_commission_amounts(revenue, commission_rate)
+        rows.append({
+            'pilot_id': pilot_id,
+            'local_date': local_day,
+            'work_mode': WorkMode(group['_id']['work_mode']) if group['_id'].get('work_mode') else WorkMode.UNKNOWN,
+            'record_count': group['record_count'],
+            # 与 BattleRecord.duration_hours 一致：单条记录按小时保留1位小数后再求和
+            'duration_hours': sum(round((duration_ms / 1000) / 3600, 1) for duration_ms in group['durations_ms'] if duration_ms is not None),
+            'revenue': revenue,
+            'base_salary': _to_decimal(group['base_salary']),
+            'commission_rate': commission_rate,
+            'pilot_share': commission_amounts['pilot_amount'],
+            'company_share': commission_amounts['company_amount'],
+        })
+
+    pilots = {str(pilot.id): pilot for pilot in Pilot.objects(id__in=pilot_ids).select_related()}  # type: ignore[attr-defined]
+    logger.debug('加速版月报（aggregate 引擎）聚合行数量：%d', len(rows))
+    return rows, pilots
+
+
+def _load_month_rows(year: int, month: int, owner_id: Optional[str], mode: Optional[WorkMode],
+                     status: Optional[Status]) -> Tuple[List[Dict[str, object]], Dict[str, Pilot]]:
+    """获取当月（主播，自然日，开播方式）聚合行与主播映射。
+
+    事实表完成回填时直接读取 pilot_daily_facts，否则回退为扫描原始开播记录。
+    """
+    month_start_local, month_end_local, _ = _calc_month_range(year, month)
+
+    if facts_ready():
+        scope = _resolve_pilot_scope(owner_id, status)
+        rows = load_pilot_daily_fact_rows(month_start_local.date(), month_end_local.date(), scope, mode)
+        pilot_ids = list({row['pilot_id'] for row in rows})
+        pilots = {str(pilot.id): pilot for pilot in Pilot.objects(id__in=pilot_ids).select_related()}  # type: ignore[attr-defined]
+        logger.debug('加速版月报读取事实行数量：%d', len(rows))
+        return rows, pilots
+
+    _, monthly_records, _ = _fetch_month_records(year, month, owner_id, mode, status)
+    pilots = {str(record.pilot.id): record.pilot for record in monthly_records if record.pilot}
+    timeline = CommissionTimeline.prefetch(pilots.keys())
+    base_salary_map = _fetch_approved_base_salary_map(monthly_records)
+    rows = build_daily_fact_rows(monthly_records, base_salary_map, timeline.rate_for)
+    return list(rows.values()), pilots
+
+
+def _empty_monthly_summary() -> Dict[str, object]:
+    return {
+        'pilot_count': 0,
+        'revenue_sum': Decimal('0'),
+        'basepay_sum': Decimal('0'),
+        'rebate_sum': Decimal('0'),
+        'pilot_share_sum': Decimal('0'),
+        'company_share_sum': Decimal('0'),
+        'operating_profit': Decimal('0'),
+        'conversion_rate': None,
+    }
+
+
+def _monthly_cache_scope(result,
+                         year: int,
+                         month: int,
+                         owner_id: Optional[str] = None,
+                         mode: str = 'all',
+                         status: str = 'all',
+                         engine: str = 'default') -> Dict[str, object]:  # pylint: disable=unused-argument
+    """月报缓存依赖范围：当月日期区间、直属运营、结果涉及的主播；当月报表在本地次日零点强制过期。"""
+    month_start = date(year, month, 1)
+    next_month_start = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+    expires_at = None
+    now_local = utc_to_local(get_current_utc_time())
+    if month_start <= now_local.date() < next_month_start:
+        expires_at = local_to_utc(now_local.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1))
+
+    _, details, _ = result
+    return build_cache_scope(start=month_start,
+                             end=next_month_start,
+                             owner_id=_normalize_owner(owner_id),
+                             pilot_ids=[item['pilot_id'] for item in details],
+                             pilot_filtered=_normalize_status(status) is not None,
+                             expires_at=expires_at)
+
+
+@cached_monthly_report(scope_builder=_monthly_cache_scope)
 def _calculate_monthly_data(year: int,
                             month: int,
                             owner_id: Optional[str] = None,
                             mode: str = 'all',
-                            status: str = 'all') -> Tuple[Dict[str, object], List[Dict[str, object]], List[Dict[str, object]]]:
+                            status: str = 'all',
+                            engine: str = 'default') -> Tuple[Dict[str, object], List[Dict[str, object]], List[Dict[str, object]]]:
     """核心计算：返回（汇总，明细，日级序列）。"""
     owner_normalized = _normalize_owner(owner_id)
     mode_normalized = _normalize_mode(mode)
     status_normalized = _normalize_status(status)
 
-    window_records, monthly_records, _ = _fetch_month_records(year, month, owner_normalized, mode_normalized, status_normalized)
-    if not monthly_records:
-        summary = {
-            'pilot_count': 0,
-            'revenue_sum': Decimal('0'),
-            'basepay_sum': Decimal('0'),
-            'rebate_sum': Decimal('0'),
-            'pilot_share_sum': Decimal('0'),
-            'company_share_sum': Decimal('0'),
-            'operating_profit': Decimal('0'),
-            'conversion_rate': None,
-        }
-        return summary, [], []
+    if engine == 'aggregate':
+        rows, pilots = _aggregate_month_rows(year, month, owner_normalized, mode_normalized, status_normalized)
+    else:
+        rows, pilots = _load_month_rows(year, month, owner_normalized, mode_normalized, status_normalized)
+    return _summarize_month_rows(year, month, rows, pilots)
+
+
+def _summarize_month_rows(year: int, month: int, rows: List[Dict[str, object]],
+                          pilots: Dict[str, Pilot]) -> Tuple[Dict[str, object], List[Dict[str, object]], List[Dict[str, object]]]:
+    """由日级聚合行计算（汇总，明细，日级序列）。"""
+    if not rows:
+        return _empty_monthly_summary(), [], []
 
     month_start_local, month_end_local, _ = _calc_month_range(year, month)
     month_start_date = month_start_local.date()
     month_end_date = month_end_local.date()
 
-    base_salary_map = _fetch_approved_base_salary_map(monthly_records)
-
     pilot_stats: Dict[str, Dict[str, object]] = {}
     daily_duration: Dict[str, Dict[date, float]] = defaultdict(lambda: defaultdict(float))
     daily_totals: Dict[date, Dict[str, Decimal]] = defaultdict(_create_daily_metric_bucket)
@@ -271,29 +485,21 @@ def _calculate_monthly_data(year: int,
     total_pilot_share_sum = Decimal('0')
     total_company_share_sum = Decimal('0')
 
-    # 预取分成比例
-    pilot_ids = list({str(record.pilot.id) for record in monthly_records if record.pilot})
-    commission_cache = _fetch_commission_cache(pilot_ids)
-
-    month_start_utc = local_to_utc(month_start_local)
-    month_end_exclusive_local = month_end_local + timedelta(microseconds=1)
-    month_end_exclusive_utc = local_to_utc(month_end_exclusive_local)
-
-    for record in window_records:
-        pilot = record.pilot
+    for row in rows:
+        pilot_id = row['pilot_id']
+        pilot = pilots.get(pilot_id)
         if not pilot:
             continue
-        pilot_id = str(pilot.id)
-
-        local_start = utc_to_local(record.start_time)
-        record_date = local_start.date()
-        revenue_amount = Decimal(record.revenue_amount or Decimal('0'))
-        duration = float(record.duration_hours or 0.0)
+        record_date = row['local_date']
+        if record_date < month_start_date or record_date > month_end_date:
+            continue
 
-        daily_duration[pilot_id][record_date] += duration
+        revenue_amount = row['revenue']
+        record_base_salary = row['base_salary']
+        pilot_share = row['pilot_share']
+        company_share = row['company_share']
 
-        if record.start_time < month_start_utc or record.start_time >= month_end_exclusive_utc:
-            continue
+        daily_duration[pilot_id][record_date] += row['duration_hours']
 
         stats = pilot_stats.setdefault(
             pilot_id, {
@@ -306,42 +512,27 @@ def _calculate_monthly_data(year: int,
                 'total_company_share': Decimal('0'),
             })
 
-        commission_rate = _resolve_commission_rate(commission_cache, pilot_id, record_date)
-        commission_amounts = calculate_commission_amounts(revenue_amount, commission_rate)
-
-        record_base_salary = base_salary_map.get(str(record.id), Decimal('0'))
-
-        stats['records_count'] += 1
-        stats['total_duration'] += duration
+        stats['records_count'] += row['record_count']
+        stats['total_duration'] += row['duration_hours']
         stats['total_revenue'] += revenue_amount
         stats['total_base_salary'] += record_base_salary
-        stats['total_pilot_share'] += commission_amounts['pilot_amount']
-        stats['total_company_share'] += commission_amounts['company_amount']
+        stats['total_pilot_share'] += pilot_share
+        stats['total_company_share'] += company_share
 
         total_revenue_sum += revenue_amount
         total_base_salary_sum += record_base_salary
-        total_pilot_share_sum += commission_amounts['pilot_amount']
-        total_company_share_sum += commission_amounts['company_amount']
+        total_pilot_share_sum += pilot_share
+        total_company_share_sum += company_share
 
         daily_bucket = daily_totals[record_date]
         daily_bucket['revenue'] += revenue_amount
         daily_bucket['basepay'] += record_base_salary
-        daily_bucket['pilot_share'] += commission_amounts['pilot_amount']
-        daily_bucket['company_share'] += commission_amounts['company_amount']
+        daily_bucket['pilot_share'] += pilot_share
+        daily_bucket['company_share'] += company_share
         pilot_daily_revenue[pilot_id][record_date] += revenue_amount
 
     if not pilot_stats:
-        summary = {
-            'pilot_count': 0,
-            'revenue_sum': Decimal('0'),
-            'basepay_sum': Decimal('0'),
-            'rebate_sum': Decimal('0'),
-            'pilot_share_sum': Decimal('0'),
-            'company_share_sum': Decimal('0'),
-            'operating_profit': Decimal('0'),
-            'conversion_rate': None,
-        }
-        return summary, [], []
+        return _empty_monthly_summary(), [], []
 
     total_rebate_sum = Decimal('0')
     details: List[Dict[str, object]] = []
@@ -423,15 +614,25 @@ def _calculate_monthly_data(year: int,
     return summary, details, daily_series
 
 
-def calculate_monthly_summary_fast(year: int, month: int, owner_id: Optional[str] = None, mode: str = 'all', status: str = 'all') -> Dict[str, object]:
+def calculate_monthly_summary_fast(year: int,
+                                   month: int,
+                                   owner_id: Optional[str] = None,
+                                   mode: str = 'all',
+                                   status: str = 'all',
+                                   engine: str = 'default') -> Dict[str, object]:
     """加速版月报汇总。"""
-    summary, _, _ = _calculate_monthly_data(year, month, owner_id, mode, status)
+    summary, _, _ = _calculate_monthly_data(year, month, owner_id, mode, status, engine)
     return summary
 
 
-def calculate_monthly_details_fast(year: int, month: int, owner_id: Optional[str] = None, mode: str = 'all', status: str = 'all') -> List[Dict[str, object]]:
+def calculate_monthly_details_fast(year: int,
+                                   month: int,
+                                   owner_id: Optional[str] = None,
+                                   mode: str = 'all',
+                                   status: str = 'all',
+                                   engine: str = 'default') -> List[Dict[str, object]]:
     """加速版月报明细。"""
-    _, details, _ = _calculate_monthly_data(year, month, owner_id, mode, status)
+    _, details, _ = _calculate_monthly_data(year, month, owner_id, mode, status, engine)
     return details
 
 
@@ -439,6 +640,7 @@ def calculate_monthly_report_fast(year: int,
                                   month: int,
                                   owner_id: Optional[str] = None,
                                   mode: str = 'all',
-                                  status: str = 'all') -> Tuple[Dict[str, object], List[Dict[str, object]], List[Dict[str, object]]]:
+                                  status: str = 'all',
+                                  engine: str = 'default') -> Tuple[Dict[str, object], List[Dict[str, object]], List[Dict[str, object]]]:
     """返回加速版月报的汇总、明细与日级序列。"""
-    return _calculate_monthly_data(year, month, owner_id, mode, status)
+    return _calculate_monthly_data(year, month, owner_id, mode, status, engine)
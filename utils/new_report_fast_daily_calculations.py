@@ -0,0 +1,241 @@
+# pylint: disable=too-many-locals,too-many-statements,no-member
+"""开播新日报（加速版）计算工具。
+
+实现要点：
+- 单次窗口查询 [min(月初, 报表日-6天), 报表日结束) 的开播记录，批量关联主播与直属运营；
+- 构建（主播，自然日）流水矩阵，三日均流水、月度统计与分成统计均由同一批记录推导；
+- 当日、当月与近三日各范围分别套用“以范围内最后一条记录为准”的筛选规则，结果与原日报一致。
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from models.battle_record import BattleRecord
+from utils.cache_helper import build_cache_scope, cached_daily_report
+from utils.commission_helper import CommissionTimeline, calculate_commission_amounts
+from utils.logging_setup import get_logger
+from utils.new_report_calculations import (_fetch_approved_base_salary_map, _get_record_base_salary, _load_owner_user,  # pylint: disable=protected-access
+                                           _normalize_owner_and_mode, calculate_three_day_avg_from_daily_revenue, filter_records_by_last_record)
+from utils.timezone_helper import local_to_utc, utc_to_local
+
+logger = get_logger('new_report_fast_daily_calculations')
+
+
+def _fetch_window_records(window_start_local: datetime, window_end_local: datetime) -> List[BattleRecord]:
+    """一次性获取窗口内全部开播记录，并批量解引用主播与直属运营。"""
+    records = BattleRecord.objects(start_time__gte=local_to_utc(window_start_local),
+                                   start_time__lt=local_to_utc(window_end_local)).select_related(max_depth=2)  # type: ignore[attr-defined]
+    logger.debug('加速版日报窗口记录数量：%d', len(records))
+    return list(records)
+
+
+def _apply_filter(records: List[BattleRecord], filter_enabled: bool, owner_user: Any, mode_normalized: Optional[str]) -> List[BattleRecord]:
+    if not filter_enabled:
+        return records
+    return filter_records_by_last_record(records, owner_user, mode_normalized)
+
+
+def _build_three_day_avg_map(records_by_day: Dict[date, List[BattleRecord]], report_day: date, filter_enabled: bool, owner_user: Any,
+                             mode_normalized: Optional[str]) -> Dict[str, Optional[Decimal]]:
+    """按自然日逐日筛选后构建（主播，自然日）流水矩阵，并计算各主播三日均流水。"""
+    revenue_matrix: Dict[str, Dict[date, Decimal]] = defaultdict(dict)
+    for offset in range(7):
+        day = report_day - timedelta(days=offset)
+        for record in _apply_filter(records_by_day.get(day, []), filter_enabled, owner_user, mode_normalized):
+            pilot_revenue = revenue_matrix[str(record.pilot.id)]
+            pilot_revenue[day] = pilot_revenue.get(day, Decimal('0')) + record.revenue_amount
+
+    return {pilot_id: calculate_three_day_avg_from_daily_revenue(daily_revenue, report_day) for pilot_id, daily_revenue in revenue_matrix.items()}
+
+
+def _build_month_snapshots(month_records: List[BattleRecord], base_salary_map: Dict[str, Decimal],
+                           timeline: CommissionTimeline) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Decimal]]]:
+    """单次遍历当月记录，得到各主播月度统计与月度分成统计。"""
+    buckets: Dict[str, Dict[str, Any]] = {}
+    for record in month_records:
+        pilot_id = str(record.pilot.id)
+        bucket = buckets.setdefault(
+            pilot_id, {
+                'dates': set(),
+                'duration': 0.0,
+                'revenue': Decimal('0'),
+                'base_salary': Decimal('0'),
+                'pilot_share': Decimal('0'),
+                'company_share': Decimal('0'),
+            })
+        record_date = utc_to_local(record.start_time).date()
+        bucket['dates'].add(record_date)
+        if record.duration_hours:
+            bucket['duration'] += record.duration_hours
+        bucket['revenue'] += record.revenue_amount
+        bucket['base_salary'] += _get_record_base_salary(record, base_salary_map)
+
+        commission_amounts = calculate_commission_amounts(record.revenue_amount, timeline.rate_for(pilot_id, record_date))
+        bucket['pilot_share'] += commission_amounts['pilot_amount']
+        bucket['company_share'] += commission_amounts['company_amount']
+
+    monthly_stats: Dict[str, Dict[str, Any]] = {}
+    monthly_commission: Dict[str, Dict[str, Decimal]] = {}
+    for pilot_id, bucket in buckets.items():
+        days_count = len(bucket['dates'])
+        monthly_stats[pilot_id] = {
+            'month_days_count': days_count,
+            'month_avg_duration': round((bucket['duration'] / days_count) if days_count > 0 else 0.0, 1),
+            'month_total_revenue': bucket['revenue'],
+            'month_total_base_salary': bucket['base_salary'],
+        }
+        monthly_commission[pilot_id] = {
+            'month_total_pilot_share': bucket['pilot_share'],
+            'month_total_company_share': bucket['company_share'],
+            'month_total_profit': bucket['company_share'] - bucket['base_salary'],
+        }
+    return monthly_stats, monthly_commission
+
+
+def _empty_month_snapshots() -> Tuple[Dict[str, Any], Dict[str, Decimal]]:
+    return ({
+        'month_days_count': 0,
+        'month_avg_duration': 0.0,
+        'month_total_revenue': Decimal('0'),
+        'month_total_base_salary': Decimal('0'),
+    }, {
+        'month_total_pilot_share': Decimal('0'),
+        'month_total_company_share': Decimal('0'),
+        'month_total_profit': Decimal('0'),
+    })
+
+
+def _build_detail(record: BattleRecord, commission_rate: float, commission_amounts: Dict[str, Any], base_salary: Decimal, three_day_avg: Optional[Decimal],
+                  monthly_stats: Dict[str, Any], monthly_commission_stats: Dict[str, Decimal]) -> Dict[str, Any]:
+    pilot = record.pilot
+
+    pilot_display = pilot.nickname or ''
+    if pilot.real_name:
+        pilot_display += f"（{pilot.real_name}）"
+
+    gender_icon = "♂" if pilot.gender.value == 0 else "♀" if pilot.gender.value == 1 else "?"
+    current_year = datetime.now().year
+    age = current_year - pilot.birth_year if pilot.birth_year else "未知"
+
+    owner_name = record.owner_snapshot.nickname if record.owner_snapshot else (pilot.owner.nickname if pilot.owner else "未知")
+
+    return {
+        'pilot_id': str(pilot.id),
+        'pilot_display': pilot_display,
+        'gender_age': f"{age}-{gender_icon}",
+        'owner': owner_name,
+        'rank': pilot.rank.value,
+        'battle_area': f"{record.work_mode.value}@{record.x_coord}-{record.y_coord}-{record.z_coord}",
+        'duration': record.duration_hours or 0.0,
+        'revenue': record.revenue_amount,
+        'commission_rate': commission_rate,
+        'pilot_share': commission_amounts['pilot_amount'],
+        'company_share': commission_amounts['company_amount'],
+        'base_salary': base_salary,
+        'daily_profit': commission_amounts['company_amount'] - base_salary,
+        'three_day_avg_revenue': three_day_avg,
+        'monthly_stats': monthly_stats,
+        'monthly_commission_stats': monthly_commission_stats,
+        'status': record.current_status.value,
+        'status_display': record.get_status_display() or '',
+        'pilot_status': pilot.status.value,
+        'pilot_status_display': pilot.status_display
+    }
+
+
+def _daily_cache_scope(result, report_date: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Dict[str, Any]:  # pylint: disable=unused-argument
+    """日报缓存依赖范围：窗口起点至报表日、直属运营、结果涉及的主播（汇总只来自明细中的主播）。"""
+    _, details = result
+    day_start = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    window_start = min(day_start.replace(day=1), day_start - timedelta(days=6))
+    owner_normalized, _ = _normalize_owner_and_mode(owner_id, mode)
+    return build_cache_scope(start=window_start.date(),
+                             end=(day_start + timedelta(days=1)).date(),
+                             owner_id=owner_normalized,
+                             pilot_ids=[item['pilot_id'] for item in details])
+
+
+@cached_daily_report(scope_builder=_daily_cache_scope)
+def calculate_daily_report_fast(report_date: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """计算开播新日报（加速版）的汇总与明细。
+
+    返回结构与 calculate_daily_summary / calculate_daily_details 一致。
+    """
+    owner_normalized, mode_normalized = _normalize_owner_and_mode(owner_id, mode)
+    filter_enabled = owner_normalized is not None or mode_normalized is not None
+
+    summary: Dict[str, Any] = {
+        'pilot_count': 0,
+        'effective_pilot_count': 0,
+        'revenue_sum': Decimal('0'),
+        'basepay_sum': Decimal('0'),
+        'pilot_share_sum': Decimal('0'),
+        'company_share_sum': Decimal('0'),
+        'conversion_rate': None,
+    }
+
+    found, owner_user = _load_owner_user(owner_normalized)
+    if not found:
+        return summary, []
+
+    day_start = report_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end_exclusive = day_start + timedelta(days=1)
+    month_start = day_start.replace(day=1)
+    window_start = min(month_start, day_start - timedelta(days=6))
+
+    window_records = _fetch_window_records(window_start, day_end_exclusive)
+
+    records_by_day: Dict[date, List[BattleRecord]] = defaultdict(list)
+    month_window_records: List[BattleRecord] = []
+    for record in window_records:
+        local_day = utc_to_local(record.start_time).date()
+        records_by_day[local_day].append(record)
+        if local_day >= month_start.date():
+            month_window_records.append(record)
+
+    report_day = day_start.date()
+    day_records = _apply_filter(list(records_by_day.get(report_day, [])), filter_enabled, owner_user, mode_normalized)
+    month_records = _apply_filter(month_window_records, filter_enabled, owner_user, mode_normalized)
+
+    base_salary_map = _fetch_approved_base_salary_map(month_window_records)
+    timeline = CommissionTimeline.prefetch(record.pilot.id for record in month_window_records)
+
+    monthly_stats_map, monthly_commission_map = _build_month_snapshots(month_records, base_salary_map, timeline)
+    three_day_avg_map = _build_three_day_avg_map(records_by_day, report_day, filter_enabled, owner_user, mode_normalized)
+
+    pilot_duration: defaultdict[str, float] = defaultdict(float)
+    details: List[Dict[str, Any]] = []
+
+    for record in day_records:
+        pilot_id = str(record.pilot.id)
+        if record.duration_hours:
+            pilot_duration[pilot_id] += record.duration_hours
+        else:
+            pilot_duration.setdefault(pilot_id, 0.0)
+
+        commission_rate = timeline.rate_for(pilot_id, report_day)
+        commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
+        base_salary = _get_record_base_salary(record, base_salary_map)
+
+        summary['revenue_sum'] += record.revenue_amount
+        summary['basepay_sum'] += base_salary
+        summary['pilot_share_sum'] += commission_amounts['pilot_amount']
+        summary['company_share_sum'] += commission_amounts['company_amount']
+
+        empty_stats, empty_commission = _empty_month_snapshots()
+        details.append(
+            _build_detail(record, commission_rate, commission_amounts, base_salary, three_day_avg_map.get(pilot_id), monthly_stats_map.get(pilot_id, empty_stats),
+                          monthly_commission_map.get(pilot_id, empty_commission)))
+
+    summary['pilot_count'] = len(pilot_duration)
+    summary['effective_pilot_count'] = sum(1 for duration in pilot_duration.values() if duration >= 6.0)
+    if summary['basepay_sum'] > 0:
+        summary['conversion_rate'] = int((summary['revenue_sum'] / summary['basepay_sum']) * 100)
+
+    details.sort(key=lambda item: item['daily_profit'])
+    logger.debug('加速版日报计算完成：记录 %d 条，主播 %d 名', len(day_records), summary['pilot_count'])
+    return summary, details
@@ -3,14 +3,14 @@
 
 实现要点：
 - 单次扫描完成汇总与明细统计；
-- 预取分成比例，避免每条记录重复查询；
+- 通过分成时间线批量预取分成比例，避免每条记录重复查询；
 - 在数据库层面尽量精准过滤直属运营与开播方式；
-- 完全复现原周报计算逻辑，确保结果一致性。
+- 完全复现原周报计算逻辑，确保结果一致性；
+- 主播日级事实表完成回填后，直接读取日级聚合行，不再扫描原始开播记录。
 """
 
 from __future__ import annotations
 
-from collections import defaultdict
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Dict, List, Optional, Tuple
@@ -21,11 +21,12 @@ from mongoengine import DoesNotExist, QuerySet
 from models.battle_record import BattleRecord
 from models.pilot import Pilot, WorkMode
 from models.user import User
-from utils.cache_helper import cached_weekly_report
-from utils.commission_helper import calculate_commission_amounts
+from utils.cache_helper import build_cache_scope, cached_weekly_report
+from utils.commission_helper import CommissionTimeline
 from utils.logging_setup import get_logger
-from utils.new_report_calculations import (_fetch_approved_base_salary_map, get_battle_records_for_date_range, get_pilot_commission_rate_for_date)
-from utils.timezone_helper import get_current_utc_time, local_to_utc, utc_to_local
+from utils.new_report_calculations import _fetch_approved_base_salary_map  # pylint: disable=protected-access
+from utils.pilot_daily_facts import build_daily_fact_rows, facts_ready, load_pilot_daily_fact_rows
+from utils.timezone_helper import local_to_utc
 
 logger = get_logger('new_report_fast_weekly_calculations')
 
@@ -63,34 +64,6 @@ def _load_owner_pilots(owner_user: User) -> List[ObjectId]:
     return ids
 
 
-def _fetch_commission_cache(pilot_ids: List[str]) -> Dict[str, List[Tuple[datetime, float]]]:
-    """预取所有相关主播的分成调整记录。"""
-    if not pilot_ids:
-        return {}
-    object_ids = [ObjectId(pid) for pid in pilot_ids]
-    from models.pilot import PilotCommission
-    commissions: QuerySet[PilotCommission] = PilotCommission.objects(pilot_id__in=object_ids,
-                                                                     is_active=True).order_by('pilot_id', 'adjustment_date')  # type: ignore[attr-defined]
-    cache: Dict[str, List[Tuple[datetime, float]]] = defaultdict(list)
-    for commission in commissions:
-        pilot_id = str(commission.pilot_id.id)
-        cache[pilot_id].append((commission.adjustment_date, float(commission.commission_rate)))
-    return cache
-
-
-def _resolve_commission_rate(cache: Dict[str, List[Tuple[datetime, float]]], pilot_id: str, record_date_local: datetime.date) -> float:
-    """从缓存中查找指定日期的分成比例，默认为20%。"""
-    entries = cache.get(pilot_id)
-    if not entries:
-        return 20.0
-    target_local = datetime.combine(record_date_local, datetime.min.time())
-    target_utc = local_to_utc(target_local)
-    for adjustment_date, rate in reversed(entries):
-        if adjustment_date <= target_utc:
-            return rate
-    return 20.0
-
-
 def _fetch_two_weeks_records(week_start_local: datetime, owner_id: Optional[str], mode: Optional[WorkMode]) -> List[BattleRecord]:
     """获取两周记录（前一周+当前周），使用优化查询。"""
     # 计算前一周的开始和结束时间
@@ -127,6 +100,36 @@ def _fetch_two_weeks_records(week_start_local: datetime, owner_id: Optional[str]
     return records
 
 
+def _load_two_weeks_rows(week_start_local: datetime, owner_id: Optional[str], mode: Optional[WorkMode]) -> Tuple[List[Dict[str, object]], Dict[str, Pilot]]:
+    """获取两周（前一周+当前周）的（主播，自然日，开播方式）聚合行与主播映射。
+
+    事实表完成回填时直接读取 pilot_daily_facts，否则回退为扫描原始开播记录。
+    """
+    if facts_ready():
+        scope: Optional[List[ObjectId]] = None
+        if owner_id:
+            try:
+                owner_user = User.objects.get(id=owner_id)  # type: ignore[attr-defined]
+            except DoesNotExist:
+                logger.warning('指定直属运营不存在：%s', owner_id)
+                return [], {}
+            scope = _load_owner_pilots(owner_user)
+        prev_week_start_local = week_start_local - timedelta(days=7)
+        week_end_date = (week_start_local + timedelta(days=6)).date()
+        rows = load_pilot_daily_fact_rows(prev_week_start_local.date(), week_end_date, scope, mode)
+        pilot_ids = list({row['pilot_id'] for row in rows})
+        pilots = {str(pilot.id): pilot for pilot in Pilot.objects(id__in=pilot_ids).select_related()}  # type: ignore[attr-defined]
+        logger.debug('加速版周报读取两周事实行数量：%d', len(rows))
+        return rows, pilots
+
+    records = _fetch_two_weeks_records(week_start_local, owner_id, mode)
+    pilots = {str(record.pilot.id): record.pilot for record in records if record.pilot}
+    timeline = CommissionTimeline.prefetch(pilots.keys())
+    base_salary_map = _fetch_approved_base_salary_map(records)
+    rows = build_daily_fact_rows(records, base_salary_map, timeline.rate_for)
+    return list(rows.values()), pilots
+
+
 def _create_week_stats() -> Dict[str, object]:
     """创建周统计数据结构。"""
     return {
@@ -140,26 +143,36 @@ def _create_week_stats() -> Dict[str, object]:
     }
 
 
-@cached_weekly_report()
+def _empty_weekly_summary() -> Dict[str, object]:
+    return {
+        'pilot_count': 0,
+        'revenue_sum': Decimal('0'),
+        'basepay_sum': Decimal('0'),
+        'pilot_share_sum': Decimal('0'),
+        'company_share_sum': Decimal('0'),
+        'profit_7d': Decimal('0'),
+        'conversion_rate': None,
+    }
+
+
+def _weekly_cache_scope(result, week_start_local: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Dict[str, object]:  # pylint: disable=unused-argument
+    """周报缓存依赖范围：前一周至当前周的日期区间、直属运营、结果涉及的主播。"""
+    _, details = result
+    return build_cache_scope(start=(week_start_local - timedelta(days=7)).date(),
+                             end=(week_start_local + timedelta(days=7)).date(),
+                             owner_id=_normalize_owner(owner_id),
+                             pilot_ids=[item['pilot_id'] for item in details])
+
+
+@cached_weekly_report(scope_builder=_weekly_cache_scope)
 def _calculate_weekly_data(week_start_local: datetime, owner_id: Optional[str] = None, mode: str = 'all') -> Tuple[Dict[str, object], List[Dict[str, object]]]:
     """核心计算：返回（汇总，明细），包含当前周和前一周数据。"""
     owner_normalized = _normalize_owner(owner_id)
     mode_normalized = _normalize_mode(mode)
 
-    two_weeks_records = _fetch_two_weeks_records(week_start_local, owner_normalized, mode_normalized)
-    if not two_weeks_records:
-        summary = {
-            'pilot_count': 0,
-            'revenue_sum': Decimal('0'),
-            'basepay_sum': Decimal('0'),
-            'pilot_share_sum': Decimal('0'),
-            'company_share_sum': Decimal('0'),
-            'profit_7d': Decimal('0'),
-            'conversion_rate': None,
-        }
-        return summary, []
-
-    base_salary_map = _fetch_approved_base_salary_map(two_weeks_records)
+    rows, pilots = _load_two_weeks_rows(week_start_local, owner_normalized, mode_normalized)
+    if not rows:
+        return _empty_weekly_summary(), []
 
     # 分别存储当前周和前一周的统计数据
     current_week_stats: Dict[str, Dict[str, object]] = {}
@@ -170,65 +183,47 @@ def _calculate_weekly_data(week_start_local: datetime, owner_id: Optional[str] =
     total_pilot_share_sum = Decimal('0')
     total_company_share_sum = Decimal('0')
 
-    # 预取分成比例
-    pilot_ids = list({str(record.pilot.id) for record in two_weeks_records if record.pilot})
-    commission_cache = _fetch_commission_cache(pilot_ids)
-
     # 计算时间范围
     week_end_local = week_start_local + timedelta(days=7) - timedelta(microseconds=1)
     prev_week_start_local = week_start_local - timedelta(days=7)
 
-    for record in two_weeks_records:
-        pilot = record.pilot
+    for row in rows:
+        pilot_id = row['pilot_id']
+        pilot = pilots.get(pilot_id)
         if not pilot:
             continue
-        pilot_id = str(pilot.id)
 
         # 判断记录属于哪一周
-        record_date = utc_to_local(record.start_time).date()
+        record_date = row['local_date']
+        is_current_week = False
         if prev_week_start_local.date() <= record_date <= (prev_week_start_local + timedelta(days=6)).date():
             # 前一周
             stats = prev_week_stats.setdefault(pilot_id, _create_week_stats())
-            stats['pilot'] = pilot
         elif week_start_local.date() <= record_date <= week_end_local.date():
             # 当前周
             stats = current_week_stats.setdefault(pilot_id, _create_week_stats())
-            stats['pilot'] = pilot
+            is_current_week = True
         else:
             # 超出两周范围，跳过
             continue
+        stats['pilot'] = pilot
 
-        commission_rate = _resolve_commission_rate(commission_cache, pilot_id, record_date)
-        commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
-
-        record_base_salary = base_salary_map.get(str(record.id), Decimal('0'))
-
-        stats['records_count'] += 1
-        if record.duration_hours:
-            stats['total_duration'] += record.duration_hours
-        stats['total_revenue'] += record.revenue_amount
-        stats['total_base_salary'] += record_base_salary
-        stats['total_pilot_share'] += commission_amounts['pilot_amount']
-        stats['total_company_share'] += commission_amounts['company_amount']
+        stats['records_count'] += row['record_count']
+        stats['total_duration'] += row['duration_hours']
+        stats['total_revenue'] += row['revenue']
+        stats['total_base_salary'] += row['base_salary']
+        stats['total_pilot_share'] += row['pilot_share']
+        stats['total_company_share'] += row['company_share']
 
         # 只将当前周的数据计入汇总
-        if stats in current_week_stats.values():
-            total_revenue_sum += record.revenue_amount
-            total_base_salary_sum += record_base_salary
-            total_pilot_share_sum += commission_amounts['pilot_amount']
-            total_company_share_sum += commission_amounts['company_amount']
+        if is_current_week:
+            total_revenue_sum += row['revenue']
+            total_base_salary_sum += row['base_salary']
+            total_pilot_share_sum += row['pilot_share']
+            total_company_share_sum += row['company_share']
 
     if not current_week_stats:
-        summary = {
-            'pilot_count': 0,
-            'revenue_sum': Decimal('0'),
-            'basepay_sum': Decimal('0'),
-            'pilot_share_sum': Decimal('0'),
-            'company_share_sum': Decimal('0'),
-            'profit_7d': Decimal('0'),
-            'conversion_rate': None,
-        }
-        return summary, []
+        return _empty_weekly_summary(), []
 
     details: List[Dict[str, object]] = []
     current_year = datetime.now().year
@@ -0,0 +1,321 @@
+# pylint: disable=no-member,too-many-locals
+"""主播日级事实表（pilot_daily_facts）维护与读取工具。
+
+实现要点：
+- 以（主播，GMT+8自然日，开播方式）聚合开播记录，物化流水、播时、记录数、已发放底薪与分成；
+- 开播记录、底薪申请、分成调整写入后按受影响的（主播，自然日）增量重算（由 utils/report_cache_events.py 在报表缓存失效前调用）；
+- 提供全量重建入口（scripts/rebuild_pilot_daily_facts.py），完成后报表才切换为读取事实表；
+  重建按键 upsert 并清理过期行，不清空集合，重建期间读取方与增量刷新不受影响；
+- 原始记录与事实表共用同一套行聚合逻辑，保证两条路径的计算结果一致。
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from models.battle_record import (BaseSalaryApplication, BaseSalaryApplicationStatus, BattleRecord)
+from models.pilot import WorkMode
+from models.pilot_daily_fact import PilotDailyFact, PilotDailyFactRebuild
+from utils.commission_helper import CommissionTimeline, calculate_commission_amounts
+from utils.logging_setup import get_logger
+from utils.timezone_helper import get_current_utc_time, local_to_utc, utc_to_local
+
+logger = get_logger('pilot_daily_facts')
+
+FactKey = Tuple[str, date, WorkMode]
+RateResolver = Callable[[str, date], float]
+
+FACTS_READY_RECHECK_SECONDS = 60  # 回填状态的进程内缓存时长（重建记录被清理后各进程在该时长内恢复读取原始记录）
+DUPLICATE_KEY_ERROR = 11000
+
+_facts_ready = False
+_facts_ready_checked_at: Optional[datetime] = None
+
+
+def _ref_id(reference) -> Optional[str]:
+    """读取引用字段的ID（兼容 Document / DBRef / ObjectId），不触发解引用。"""
+    if reference is None:
+        return None
+    ref_id = getattr(reference, 'id', reference)
+    return str(ref_id) if ref_id else None
+
+
+def _to_date_key(local_day: date) -> str:
+    return local_day.strftime('%Y-%m-%d')
+
+
+def _local_day_window(local_days: Iterable[date]) -> Tuple[datetime, datetime]:
+    """返回覆盖给定自然日的 UTC 查询窗口 [start, end)。"""
+    days = sorted(local_days)
+    start_local = datetime.combine(days[0], datetime.min.time())
+    end_local = datetime.combine(days[-1], datetime.min.time()) + timedelta(days=1)
+    return local_to_utc(start_local), local_to_utc(end_local)
+
+
+def _create_fact_row(pilot_id: str, local_day: date, work_mode: WorkMode) -> Dict[str, object]:
+    return {
+        'pilot_id': pilot_id,
+        'local_date': local_day,
+        'work_mode': work_mode,
+        'record_count': 0,
+        'duration_hours': 0.0,
+        'revenue': Decimal('0'),
+        'base_salary': Decimal('0'),
+        'commission_rate': 20.0,
+        'pilot_share': Decimal('0'),
+        'company_share': Decimal('0'),
+    }
+
+
+def build_daily_fact_rows(records: Iterable[BattleRecord], base_salary_map: Dict[str, Decimal], rate_resolver: RateResolver) -> Dict[FactKey, Dict[str, object]]:
+    """按（主播，自然日，开播方式）聚合开播记录。
+
+    Args:
+        records: 开播记录（可为未解引用的记录）
+        base_salary_map: battle_record_id -> 已发放底薪金额
+        rate_resolver: (pilot_id, 本地日期) -> 分成比例
+
+    Returns:
+        dict: 事实键 -> 聚合行
+    """
+    rows: Dict[FactKey, Dict[str, object]] = {}
+    for record in records:
+        pilot_id = _ref_id(record.pilot)
+        if not pilot_id or not record.start_time:
+            continue
+        local_day = utc_to_local(record.start_time).date()
+        work_mode = record.work_mode or WorkMode.UNKNOWN
+        key = (pilot_id, local_day, work_mode)
+        row = rows.get(key)
+        if row is None:
+            row = _create_fact_row(pilot_id, local_day, work_mode)
+            row['commission_rate'] = rate_resolver(pilot_id, local_day)
+            rows[key] = row
+
+        revenue_amount = Decimal(record.revenue_amount or Decimal('0'))
+        commission_amounts = calculate_commission_amounts(revenue_amount, row['commission_rate'])
+
+        row['record_count'] += 1
+        row['duration_hours'] += float(record.duration_hours or 0.0)
+        row['revenue'] += revenue_amount
+        row['base_salary'] += base_salary_map.get(str(record.id), Decimal('0'))
+        row['pilot_share'] += commission_amounts['pilot_amount']
+        row['company_share'] += commission_amounts['company_amount']
+    return rows
+
+
+def _row_to_document(row: Dict[str, object], updated_at: Optional[datetime] = None) -> PilotDailyFact:
+    duration = float(row['duration_hours'])
+    return PilotDailyFact(
+        pilot=ObjectId(row['pilot_id']),
+        local_date=_to_date_key(row['local_date']),
+        work_mode=row['work_mode'],
+        record_count=row['record_count'],
+        duration_hours=duration,
+        revenue_amount=row['revenue'],
+        base_salary_amount=row['base_salary'],
+        commission_rate=float(row['commission_rate']),
+        pilot_share=row['pilot_share'],
+        company_share=row['company_share'],
+        is_valid_day=duration >= 1.0,
+        updated_at=updated_at or get_current_utc_time(),
+    )
+
+
+def _row_from_mongo(raw: Dict[str, object]) -> Dict[str, object]:
+    return {
+        'pilot_id': str(raw['pilot']),
+        'local_date': datetime.strptime(raw['local_date'], '%Y-%m-%d').date(),
+        'work_mode': WorkMode(raw['work_mode']),
+        'record_count': int(raw.get('record_count') or 0),
+        'duration_hours': float(raw.get('duration_hours') or 0.0),
+        'revenue': Decimal(str(raw.get('revenue_amount') or 0)),
+        'base_salary': Decimal(str(raw.get('base_salary_amount') or 0)),
+        'commission_rate': float(raw.get('commission_rate') or 20.0),
+        'pilot_share': Decimal(str(raw.get('pilot_share') or 0)),
+        'company_share': Decimal(str(raw.get('company_share') or 0)),
+    }
+
+
+def _fetch_approved_base_salary(record_ids: Optional[Sequence[ObjectId]] = None) -> Dict[str, Decimal]:
+    query = BaseSalaryApplication.objects(status=BaseSalaryApplicationStatus.APPROVED)
+    if record_ids is not None:
+        if not record_ids:
+            return {}
+        query = query.filter(battle_record_id__in=list(record_ids))
+    amounts: defaultdict[str, Decimal] = defaultdict(lambda: Decimal('0'))
+    for application in query.no_dereference().only('battle_record_id', 'base_salary_amount'):
+        record_id = _ref_id(application.battle_record_id)
+        if record_id:
+            amounts[record_id] += Decimal(application.base_salary_amount or Decimal('0'))
+    return dict(amounts)
+
+
+def refresh_pilot_daily_facts(pilot_id, local_days: Iterable[date]) -> int:
+    """重算指定主播若干自然日的事实行，返回写入的行数。"""
+    pilot_key = _ref_id(pilot_id)
+    days = {day for day in local_days if day}
+    if not pilot_key or not days:
+        return 0
+
+    start_utc, end_utc = _local_day_window(days)
+    records = [
+        record for record in BattleRecord.objects(pilot=ObjectId(pilot_key), start_time__gte=start_utc, start_time__lt=end_utc).no_dereference()
+        if utc_to_local(record.start_time).date() in days
+    ]
+    base_salary_map = _fetch_approved_base_salary([record.id for record in records])
+    rows = build_daily_fact_rows(records, base_salary_map, CommissionTimeline.prefetch([pilot_key]).rate_for)
+
+    collection = PilotDailyFact._get_collection()  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    operations = []
+    for row in rows.values():
+        document = _row_to_document(row).to_mongo().to_dict()
+        document.pop('_id', None)
+        operations.append(
+            UpdateOne({
+                'pilot': document['pilot'],
+                'local_date': document['local_date'],
+                'work_mode': document['work_mode']
+            }, {'$set': document}, upsert=True))
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+    for day in days:
+        kept_modes = [key[2].value for key in rows if key[1] == day]
+        collection.delete_many({'pilot': ObjectId(pilot_key), 'local_date': _to_date_key(day), 'work_mode': {'$nin': kept_modes}})
+
+    logger.debug('主播 %s 事实行已重算：日期=%s，写入=%d', pilot_key, sorted(_to_date_key(day) for day in days), len(rows))
+    return len(rows)
+
+
+def refresh_facts_for_battle_record(record: BattleRecord, previous_pilot=None, previous_start_time: Optional[datetime] = None) -> None:
+    """开播记录创建/更新/删除后，重算受影响的（主播，自然日）。"""
+    affected: Dict[str, set] = defaultdict(set)
+    if record is not None and record.start_time:
+        affected[_ref_id(record.pilot)].add(utc_to_local(record.start_time).date())
+    if previous_pilot is not None and previous_start_time is not None:
+        affected[_ref_id(previous_pilot)].add(utc_to_local(previous_start_time).date())
+
+    for pilot_key, days in affected.items():
+        if pilot_key:
+            refresh_pilot_daily_facts(pilot_key, days)
+
+
+def refresh_facts_for_application(application: BaseSalaryApplication) -> None:
+    """底薪申请写入后，重算其开播记录所在自然日。"""
+    record = application.battle_record_id
+    if record is None:
+        return
+    refresh_facts_for_battle_record(record)
+
+
+def refresh_facts_for_commission(pilot_id, since_utc: Optional[datetime] = None) -> None:
+    """分成调整写入后，重算该主播自生效日起的全部事实行。"""
+    pilot_key = _ref_id(pilot_id)
+    if not pilot_key:
+        return
+    query = PilotDailyFact.objects(pilot=ObjectId(pilot_key))
+    if since_utc is not None:
+        query = query.filter(local_date__gte=_to_date_key(utc_to_local(since_utc).date()))
+    days = {datetime.strptime(key, '%Y-%m-%d').date() for key in query.distinct('local_date')}
+    refresh_pilot_daily_facts(pilot_key, days)
+
+
+def safe_refresh(refresh_func: Callable, *args, **kwargs) -> None:
+    """执行派生数据增量刷新（日级事实表、长时开播计数器等），失败仅记录日志，不影响主业务写入。"""
+    try:
+        refresh_func(*args, **kwargs)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('派生数据增量刷新失败（%s）：%s', getattr(refresh_func, '__name__', refresh_func), exc, exc_info=True)
+
+
+def _write_rebuild_rows(collection, operations: List[UpdateOne]) -> int:
+    """写入一批重建行，返回因增量刷新已写入更新的行而跳过的行数。"""
+    try:
+        collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as exc:
+        errors = exc.details.get('writeErrors', [])
+        if any(error.get('code') != DUPLICATE_KEY_ERROR for error in errors):
+            raise
+        return len(errors)
+    return 0
+
+
+def rebuild_pilot_daily_facts(batch_size: int = 1000) -> Dict[str, int]:
+    """全量重建事实表，完成后写入重建记录。
+
+    不清空集合：按事实键 upsert（只覆盖重建开始前写入的行），再删除本次未写入的过期行。
+    重建期间读取方始终看到完整的事实表；增量刷新在重建开始后写入的行更新，
+    以其为准（重建写入该键时命中唯一索引冲突，跳过）。
+    """
+    started_at = get_current_utc_time()
+    started_at = started_at.replace(microsecond=started_at.microsecond // 1000 * 1000)  # 与 MongoDB 毫秒精度对齐
+    rebuild = PilotDailyFactRebuild(started_at=started_at)
+    logger.info('开始全量重建主播日级事实表')
+
+    records = BattleRecord.objects.no_dereference().only('id', 'pilot', 'start_time', 'end_time', 'revenue_amount', 'work_mode')
+    rows = build_daily_fact_rows(records, _fetch_approved_base_salary(), CommissionTimeline.prefetch().rate_for)
+    record_count = sum(row['record_count'] for row in rows.values())
+
+    collection = PilotDailyFact._get_collection()  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    operations: List[UpdateOne] = []
+    skipped = 0
+    for row in rows.values():
+        document = _row_to_document(row, updated_at=started_at).to_mongo().to_dict()
+        document.pop('_id', None)
+        key = {'pilot': document['pilot'], 'local_date': document['local_date'], 'work_mode': document['work_mode']}
+        operations.append(UpdateOne({**key, 'updated_at': {'$lte': started_at}}, {'$set': document}, upsert=True))
+        if len(operations) >= batch_size:
+            skipped += _write_rebuild_rows(collection, operations)
+            operations = []
+    if operations:
+        skipped += _write_rebuild_rows(collection, operations)
+
+    removed = collection.delete_many({'updated_at': {'$lt': started_at}}).deleted_count
+
+    rebuild.finished_at = get_current_utc_time()
+    rebuild.record_count = record_count
+    rebuild.fact_count = len(rows)
+    rebuild.save()
+    _mark_facts_ready(True)
+
+    logger.info('主播日级事实表重建完成：开播记录 %d 条，事实行 %d 行，以增量刷新为准跳过 %d 行，清理过期行 %d 行', record_count, len(rows), skipped, removed)
+    return {'record_count': record_count, 'fact_count': len(rows), 'skipped_count': skipped, 'removed_count': removed}
+
+
+def _mark_facts_ready(ready: bool) -> None:
+    global _facts_ready, _facts_ready_checked_at  # noqa: PLW0603 - 进程内缓存
+    _facts_ready = ready
+    _facts_ready_checked_at = get_current_utc_time()
+
+
+def facts_ready() -> bool:
+    """事实表是否已完成全量回填（进程内缓存 FACTS_READY_RECHECK_SECONDS 秒）。"""
+    checked_at = _facts_ready_checked_at
+    if checked_at is None or get_current_utc_time() - checked_at >= timedelta(seconds=FACTS_READY_RECHECK_SECONDS):
+        _mark_facts_ready(PilotDailyFactRebuild.objects(finished_at__ne=None).first() is not None)
+    return _facts_ready
+
+
+def load_pilot_daily_fact_rows(start_day: date,
+                               end_day: date,
+                               pilot_ids: Optional[Sequence[ObjectId]] = None,
+                               mode: Optional[WorkMode] = None) -> List[Dict[str, object]]:
+    """读取 [start_day, end_day] 自然日范围内的事实行。"""
+    query = PilotDailyFact.objects(local_date__gte=_to_date_key(start_day), local_date__lte=_to_date_key(end_day))
+    if pilot_ids is not None:
+        if not pilot_ids:
+            return []
+        query = query.filter(pilot__in=list(pilot_ids))
+    if mode is not None:
+        query = query.filter(work_mode=mode)
+    rows = [_row_from_mongo(raw) for raw in query.as_pymongo()]
+    logger.debug('读取事实行：%s ~ %s，共 %d 行', _to_date_key(start_day), _to_date_key(end_day), len(rows))
+    return rows
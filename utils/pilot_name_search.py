@@ -0,0 +1,210 @@
+# pylint: disable=no-member,protected-access
+"""主播/招募名称检索
+
+主播与招募记录各对应 pilot_name_index 中的一条条目，`grams` 多键索引即 n-gram 倒排表：
+- 规范化：昵称与姓名做 NFKC 规范化、casefold 并去除空白，拼接为 `search_key`；
+- 建索引：每个名称切为单字与相邻二元组；
+- 查询：查询串同样规范化，取二元组（单字查询取单字），要求条目包含全部 n-gram（`$all` 走 grams 索引），
+  再以 `search_key` 校验完整子串，结果与原先的昵称/姓名 icontains 一致，但不再扫描主播集合；
+- 联想：活跃主播优先、再按昵称排序（与 sort_pilots_with_active_priority 一致），只加载前 N 个候选；
+- 维护：监听主播/招募保存信号增量更新条目（主播改名同步其招募条目），
+  `scripts/rebuild_pilot_name_index.py` 全量重建。
+"""
+
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from mongoengine import signals
+from pymongo import UpdateOne
+
+from models.pilot import Pilot, Status
+from models.pilot_name_index import PilotNameIndexEntry
+from models.recruit import Recruit
+from utils.logging_setup import get_logger
+from utils.pilot_activity import get_active_pilot_ids, sort_pilots_with_active_priority
+from utils.timezone_helper import get_current_utc_time
+
+logger = get_logger('pilot_name_search')
+
+MAX_QUERY_GRAMS = 16  # 查询串最多取前16个 n-gram（名称最长20字符）
+TYPEAHEAD_DEFAULT_LIMIT = 10
+TYPEAHEAD_MAX_LIMIT = 50
+
+_PILOT_FIELDS = ('nickname', 'real_name', 'status')
+
+_registered = False
+
+
+def normalize_name(text: Optional[str]) -> str:
+    """名称规范化：NFKC、casefold 并去除全部空白。"""
+    return ''.join(unicodedata.normalize('NFKC', text or '').casefold().split())
+
+
+def name_grams(*names: Optional[str]) -> List[str]:
+    """名称的索引 n-gram（单字与相邻二元组，去重、排序）。"""
+    grams = set()
+    for name in names:
+        normalized = normalize_name(name)
+        grams.update(normalized)
+        grams.update(normalized[index:index + 2] for index in range(len(normalized) - 1))
+    return sorted(grams)
+
+
+def query_grams(query: Optional[str]) -> List[str]:
+    """查询串的检索 n-gram（保持出现顺序去重）。"""
+    normalized = normalize_name(query)
+    if len(normalized) <= 1:
+        return [normalized] if normalized else []
+    grams = dict.fromkeys(normalized[index:index + 2] for index in range(len(normalized) - 1))
+    return list(grams)[:MAX_QUERY_GRAMS]
+
+
+def _ref_id(reference) -> Optional[ObjectId]:
+    if reference is None:
+        return None
+    ref_id = getattr(reference, 'id', reference)
+    return ref_id if isinstance(ref_id, ObjectId) else ObjectId(str(ref_id))
+
+
+def _entry_fields(raw_pilot: Dict[str, Any], now) -> Dict[str, Any]:
+    return {
+        'search_key': f"{normalize_name(raw_pilot.get('nickname'))}\n{normalize_name(raw_pilot.get('real_name'))}",
+        'grams': name_grams(raw_pilot.get('nickname'), raw_pilot.get('real_name')),
+        'nickname': raw_pilot.get('nickname') or '',
+        'pilot_status': raw_pilot.get('status'),
+        'updated_at': now,
+    }
+
+
+def _entry_update(raw_pilot: Dict[str, Any], recruit_id: Optional[ObjectId], now) -> UpdateOne:
+    return UpdateOne({'pilot': raw_pilot['_id'], 'recruit': recruit_id}, {'$set': _entry_fields(raw_pilot, now)}, upsert=True)
+
+
+def index_pilot(pilot_id) -> None:
+    """重建主播条目，并把名称与状态同步到该主播的招募条目。"""
+    raw_pilot = Pilot.objects(id=_ref_id(pilot_id)).only(*_PILOT_FIELDS).as_pymongo().first()
+    if not raw_pilot:
+        return
+    now = get_current_utc_time()
+    collection = PilotNameIndexEntry._get_collection()  # type: ignore[attr-defined]
+    collection.bulk_write([_entry_update(raw_pilot, None, now)])
+    collection.update_many({'pilot': raw_pilot['_id'], 'recruit': {'$ne': None}}, {'$set': _entry_fields(raw_pilot, now)})
+
+
+def index_recruit(recruit_id) -> None:
+    """重建单条招募记录的条目。"""
+    raw_recruit = Recruit.objects(id=_ref_id(recruit_id)).only('pilot').as_pymongo().first()
+    if not raw_recruit:
+        return
+    raw_pilot = Pilot.objects(id=raw_recruit['pilot']).only(*_PILOT_FIELDS).as_pymongo().first()
+    if not raw_pilot:
+        return
+    PilotNameIndexEntry._get_collection().bulk_write([_entry_update(raw_pilot, raw_recruit['_id'], get_current_utc_time())])  # type: ignore[attr-defined]
+
+
+def safe_index(index_func, *args) -> None:
+    """执行名称条目更新，失败仅记录日志，不影响主播/招募写入。"""
+    try:
+        index_func(*args)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('名称检索条目更新失败：%s %s', getattr(index_func, '__name__', index_func), exc, exc_info=True)
+
+
+def _on_pilot_saved(sender, document, **kwargs):  # pylint: disable=unused-argument
+    safe_index(index_pilot, document.pk)
+
+
+def _on_recruit_saved(sender, document, **kwargs):  # pylint: disable=unused-argument
+    safe_index(index_recruit, document.pk)
+
+
+def register_pilot_name_search_handlers():
+    """注册主播/招募保存后的名称条目更新（重复调用安全）。"""
+    global _registered  # pylint: disable=global-statement
+    if _registered:
+        return
+    signals.post_save.connect(_on_pilot_saved, sender=Pilot)
+    signals.post_save.connect(_on_recruit_saved, sender=Recruit)
+    _registered = True
+    logger.info('名称检索条目维护监听已注册')
+
+
+def rebuild_pilot_name_index(batch_size: int = 500) -> Dict[str, int]:
+    """按全部主播与招募记录重建名称条目，并删除失效条目，返回统计信息。"""
+    logger.info('开始重建名称检索索引')
+    now = get_current_utc_time()
+    now = now.replace(microsecond=now.microsecond // 1000 * 1000)  # 与 MongoDB 毫秒精度对齐，避免误删本次写入的条目
+    collection = PilotNameIndexEntry._get_collection()  # type: ignore[attr-defined]
+
+    pilots = {raw['_id']: raw for raw in Pilot.objects.only(*_PILOT_FIELDS).as_pymongo()}
+    operations = []
+    recruit_count = 0
+
+    def flush():
+        if operations:
+            collection.bulk_write(operations, ordered=False)
+            operations.clear()
+
+    for raw_pilot in pilots.values():
+        operations.append(_entry_update(raw_pilot, None, now))
+        if len(operations) >= batch_size:
+            flush()
+    for raw_recruit in Recruit.objects.only('pilot').as_pymongo():
+        raw_pilot = pilots.get(raw_recruit.get('pilot'))
+        if raw_pilot is None:
+            continue
+        operations.append(_entry_update(raw_pilot, raw_recruit['_id'], now))
+        recruit_count += 1
+        if len(operations) >= batch_size:
+            flush()
+    flush()
+
+    removed = collection.delete_many({'updated_at': {'$lt': now}}).deleted_count
+    logger.info('名称检索索引重建完成：主播 %d 个，招募 %d 条，清理失效条目 %d 条', len(pilots), recruit_count, removed)
+    return {'pilot_count': len(pilots), 'recruit_count': recruit_count, 'removed_count': removed}
+
+
+def _matching_entries(query: str, recruits: bool):
+    """名称包含查询串的条目：n-gram 走索引定位候选，再校验完整子串。"""
+    grams = query_grams(query)
+    entries = PilotNameIndexEntry.objects(grams__all=grams)
+    entries = entries.filter(recruit__ne=None) if recruits else entries.filter(recruit=None)
+    if len(grams) > 1:
+        entries = entries.filter(search_key__contains=normalize_name(query))
+    return entries
+
+
+def lookup_pilot_ids(query: Optional[str]) -> Optional[List[ObjectId]]:
+    """昵称或姓名包含查询串的主播ID；查询串规范化后为空时返回 None（不筛选）。"""
+    if not query_grams(query):
+        return None
+    return [raw['pilot'] for raw in _matching_entries(query or '', recruits=False).only('pilot').as_pymongo()]
+
+
+def lookup_recruit_ids(query: Optional[str]) -> Optional[List[ObjectId]]:
+    """主播昵称或姓名包含查询串的招募记录ID；查询串规范化后为空时返回 None（不筛选）。"""
+    if not query_grams(query):
+        return None
+    return [raw['recruit'] for raw in _matching_entries(query or '', recruits=True).only('recruit').as_pymongo()]
+
+
+def typeahead_pilots(query: Optional[str], limit: int = TYPEAHEAD_DEFAULT_LIMIT, statuses: Optional[Iterable[Status]] = None) -> List[Pilot]:
+    """名称联想：返回前 limit 个匹配主播，活跃主播优先、再按昵称排序。
+
+    活跃主播中的前 limit 个与全部匹配中的前 limit 个（均按规范化昵称排序）的并集必然覆盖最终结果，
+    因此只需两次条目查询与一次主播加载，与匹配总数无关。
+    """
+    if not query_grams(query):
+        return []
+    entries = _matching_entries(query or '', recruits=False)
+    if statuses is not None:
+        entries = entries.filter(pilot_status__in=list(statuses))
+
+    active_ids = [ObjectId(pilot_id) for pilot_id in get_active_pilot_ids() if ObjectId.is_valid(pilot_id)]
+    candidate_ids = []
+    for candidates in (entries.filter(pilot__in=active_ids), entries):
+        candidate_ids.extend(raw['pilot'] for raw in candidates.order_by('search_key').limit(limit).only('pilot').as_pymongo())
+
+    pilots = Pilot.objects(id__in=list(dict.fromkeys(candidate_ids)))
+    return sort_pilots_with_active_priority(pilots)[:limit]
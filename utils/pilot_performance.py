@@ -1,28 +1,48 @@
 # -*- coding: utf-8 -*-
 """
 主播业绩计算工具
+
+一次查询加载主播的最近30条开播记录（本月记录多于此时补齐本月剩余记录），
+底薪申请与分成时间线各批量加载一次；每条记录的本地日期、流水、底薪、公司分成、播时只计算一次，
+本月、近7条、近3条统计与最近记录列表都从同一份按开始时间倒序排列的数组中切片得到。
+多个主播（如詹姆斯的关注批量评估）可通过 calculate_pilots_performance_stats 共享一次数据加载。
 """
 # pylint: disable=no-member,too-many-locals
 
 from collections import defaultdict
-from datetime import date, datetime, timedelta
+from datetime import date, datetime, time, timedelta
 from decimal import Decimal
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+from mongoengine import Q
 
 from models.battle_record import (BaseSalaryApplication, BaseSalaryApplicationStatus, BattleRecord)
 from models.pilot import Pilot
-from utils.commission_helper import calculate_commission_amounts, get_pilot_commission_rate_for_date
+from utils.cache_helper import build_cache_scope, cached_pilot_performance
+from utils.commission_helper import CommissionTimeline, calculate_commission_amounts
 from utils.logging_setup import get_logger
 from utils.rebate_calculator import calculate_pilot_rebate
 from utils.timezone_helper import get_current_local_time, local_to_utc, utc_to_local
 
 logger = get_logger('pilot_performance')
 
+RECENT_RECORD_LIMIT = 30
+WEEK_RECORD_LIMIT = 7
+THREE_DAY_RECORD_LIMIT = 3
+
 
 def _create_daily_bucket() -> Dict[str, Decimal]:
     return {'revenue': Decimal('0'), 'basepay': Decimal('0'), 'company_share': Decimal('0'), 'hours': Decimal('0')}
 
 
+def _month_range(report_date: datetime) -> Tuple[datetime, datetime]:
+    """本月范围（本地时间）：1号零点至报表日期当天结束"""
+    month_start = report_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    month_end = report_date.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return month_start, month_end
+
+
 def calculate_pilot_performance_stats(pilot: Pilot, report_date: datetime = None) -> Dict[str, Any]:
     """计算主播业绩统计数据
     
@@ -36,185 +56,176 @@ def calculate_pilot_performance_stats(pilot: Pilot, report_date: datetime = None
     if report_date is None:
         report_date = get_current_local_time()
 
-    # 计算本月统计
-    month_stats, month_daily_series = _calculate_month_stats(pilot, report_date)
+    month_start, _ = _month_range(report_date)
+    records = _load_records(pilot, local_to_utc(month_start))
+    approved_map, application_map = _build_base_salary_maps(records)
+    timeline = CommissionTimeline.prefetch([pilot.id])
+    return _build_performance_stats(pilot.id, records, approved_map, application_map, timeline, report_date)
+
 
-    # 计算近7日统计
-    week_stats = _calculate_week_stats(pilot)
+def calculate_pilots_performance_stats(pilots: List[Pilot], report_date: datetime = None) -> Dict[str, Dict[str, Any]]:
+    """批量计算多个主播的业绩统计数据
 
-    # 计算近3日统计
-    three_day_stats = _calculate_three_day_stats(pilot)
+    开播记录、底薪申请与分成时间线对全部主播各加载一次，查询次数与主播数量无关。
+
+    Args:
+        pilots: 主播对象列表
+        report_date: 报表日期（本地时间），默认为当前日期
+
+    Returns:
+        dict: 主播ID字符串 -> 与 calculate_pilot_performance_stats 相同结构的统计数据
+    """
+    if report_date is None:
+        report_date = get_current_local_time()
 
-    # 获取最近开播记录并附带底薪申请信息
-    recent_records = _get_recent_records_with_applications(pilot, limit=30)
+    pilot_ids = list(dict.fromkeys(str(pilot.id) for pilot in pilots))
+    if not pilot_ids:
+        return {}
 
+    month_start, _ = _month_range(report_date)
+    records_by_pilot = _load_records_for_pilots(pilot_ids, local_to_utc(month_start))
+    approved_map, application_map = _build_base_salary_maps([record for records in records_by_pilot.values() for record in records])
+    timeline = CommissionTimeline.prefetch(pilot_ids)
     return {
-        'month_stats': month_stats,
-        'month_daily_series': month_daily_series,
-        'week_stats': week_stats,
-        'three_day_stats': three_day_stats,
-        'recent_records': recent_records
+        pilot_id: _build_performance_stats(pilot_id, records_by_pilot.get(pilot_id, []), approved_map, application_map, timeline, report_date)
+        for pilot_id in pilot_ids
     }
 
 
-def _calculate_month_stats(pilot: Pilot, report_date: datetime) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
-    """计算本月统计并返回日级序列"""
-    # 本月开始时间（本地时间）
-    month_start = report_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    # 本月结束时间（本地时间）
-    month_end = report_date.replace(hour=23, minute=59, second=59, microsecond=999999)
-
+def _build_performance_stats(pilot_id, records: List[BattleRecord], approved_map: Dict[str, Decimal], application_map: Dict[str, BaseSalaryApplication],
+                             timeline: CommissionTimeline, report_date: datetime) -> Dict[str, Any]:
+    """从按开始时间倒序排列的开播记录计算各统计窗口"""
+    month_start, month_end = _month_range(report_date)
     month_start_utc = local_to_utc(month_start)
     month_end_utc = local_to_utc(month_end)
 
-    # 获取本月开播记录
-    records = list(BattleRecord.objects(pilot=pilot, start_time__gte=month_start_utc, start_time__lte=month_end_utc).order_by('start_time'))
-
-    approved_map, _ = _build_base_salary_maps(records)
-    daily_totals: Dict[date, Dict[str, Decimal]] = defaultdict(_create_daily_bucket)
-
-    # 计算统计数据
-    record_count = len(records)
-    total_hours = round(sum(record.duration_hours for record in records if record.duration_hours), 1)
-    avg_hours = round(total_hours / record_count, 1) if record_count > 0 else 0
-
-    total_revenue = Decimal('0')
-    total_basepay = Decimal('0')
-    total_company_share = Decimal('0')
-
-    for record in records:
-        revenue_amount = Decimal(record.revenue_amount or Decimal('0'))
-        basepay_amount = approved_map.get(str(record.id), Decimal('0'))
-
-        # 使用正确的分成计算
-        record_date = utc_to_local(record.start_time).date() if record.start_time else None
-        commission_rate = get_pilot_commission_rate_for_date(str(pilot.id), record_date)[0] if record_date else 20.0
-        commission_amounts = calculate_commission_amounts(revenue_amount, commission_rate)
-        company_share_amount = commission_amounts['company_amount']
-
-        duration_hours = Decimal(str(record.duration_hours or 0))
+    rows = _build_record_rows(pilot_id, records, approved_map, timeline)
 
-        total_revenue += revenue_amount
-        total_basepay += basepay_amount
-        total_company_share += company_share_amount
-
-        if record.start_time:
-            local_day = utc_to_local(record.start_time).date()
-            bucket = daily_totals[local_day]
-            bucket['revenue'] += revenue_amount
-            bucket['basepay'] += basepay_amount
-            bucket['company_share'] += company_share_amount
-            bucket['hours'] += duration_hours
-
-    # 计算日均数据（分母为开播记录数）
-    daily_avg_revenue = total_revenue / record_count if record_count > 0 else Decimal('0')
-    daily_avg_basepay = total_basepay / record_count if record_count > 0 else Decimal('0')
-
-    # 计算返点
-    total_rebate = Decimal('0')
-    if records:
-        # 计算有效开播天数（播时≥1小时的天数）
-        daily_duration_map = defaultdict(float)
-        for record in records:
-            if record.start_time:
-                local_day = utc_to_local(record.start_time).date()
-                daily_duration_map[local_day] += float(record.duration_hours or 0)
+    # rows 按开始时间倒序；本月统计按时间正序累计
+    month_rows = [row for row in reversed(rows) if row['start_time'] and month_start_utc <= row['start_time'] <= month_end_utc]
+    month_stats = _summarize_rows(month_rows, pilot_id, '月度')
 
-        valid_days = sum(1 for duration in daily_duration_map.values() if duration >= 1.0)
-        total_duration_float = float(total_hours)
+    daily_totals: Dict[date, Dict[str, Decimal]] = defaultdict(_create_daily_bucket)
+    for row in month_rows:
+        bucket = daily_totals[row['local_day']]
+        bucket['revenue'] += row['revenue']
+        bucket['basepay'] += row['basepay']
+        bucket['company_share'] += row['company_share']
+        bucket['hours'] += row['hours']
+    month_daily_series = _build_month_daily_series(daily_totals, month_start.date(), month_end.date())
 
-        # 使用统一返点计算器
-        rebate_rate, total_rebate = calculate_pilot_rebate(valid_days, total_duration_float, total_revenue)
-        logger.debug('主播 %s 月度返点计算 - 有效天数: %d, 总播时: %.1f, 总流水: %s, 返点比例: %.2f%%, 返点金额: %s', pilot.id, valid_days, total_duration_float, total_revenue,
-                     rebate_rate * 100, total_rebate)
+    # 近7日/近3日统计沿用“最近的7条/3条开播记录”口径
+    week_stats = _summarize_rows(rows[:WEEK_RECORD_LIMIT], pilot_id, '近期')
+    three_day_stats = _summarize_rows(rows[:THREE_DAY_RECORD_LIMIT], pilot_id, '近期')
 
-    # 运营利润估算
-    operating_profit = total_company_share + total_rebate - total_basepay
-    daily_avg_operating_profit = operating_profit / record_count if record_count > 0 else Decimal('0')
+    # 最近开播记录附带底薪申请信息
+    recent_records = [row['record'] for row in rows[:RECENT_RECORD_LIMIT]]
+    for record in recent_records:
+        setattr(record, '_approved_base_salary', approved_map.get(str(record.id), Decimal('0')))
+        setattr(record, '_latest_base_salary_application', application_map.get(str(record.id)))
 
-    stats = {
-        'record_count': record_count,
-        'total_hours': total_hours,
-        'avg_hours': avg_hours,
-        'total_revenue': total_revenue,
-        'daily_avg_revenue': daily_avg_revenue,
-        'total_basepay': total_basepay,
-        'daily_avg_basepay': daily_avg_basepay,
-        'total_rebate': total_rebate,
-        'total_company_share': total_company_share,
-        'operating_profit': operating_profit,
-        'daily_avg_operating_profit': daily_avg_operating_profit
+    return {
+        'month_stats': month_stats,
+        'month_daily_series': month_daily_series,
+        'week_stats': week_stats,
+        'three_day_stats': three_day_stats,
+        'recent_records': recent_records
     }
 
-    month_daily_series = _build_month_daily_series(daily_totals, month_start.date(), month_end.date())
-
-    return stats, month_daily_series
-
-
-def _calculate_week_stats(pilot: Pilot) -> Dict[str, Any]:
-    """计算近7日统计（最近的7条开播记录）"""
-    # 获取最近7条开播记录
-    records = list(BattleRecord.objects(pilot=pilot).order_by('-start_time').limit(7))
-    approved_map, _ = _build_base_salary_maps(records)
 
-    return _calculate_stats_from_records(records, approved_map)
+def _load_records(pilot: Pilot, month_start_utc: datetime) -> List[BattleRecord]:
+    """加载业绩所需的全部开播记录（按开始时间倒序）
 
+    先取最近30条；若30条仍未覆盖到本月初，再补齐本月内更早的记录。
+    """
+    records = list(BattleRecord.objects(pilot=pilot.id).order_by('-start_time').limit(RECENT_RECORD_LIMIT))
+    if len(records) < RECENT_RECORD_LIMIT:
+        return records
+
+    oldest_start = records[-1].start_time
+    if oldest_start is None or oldest_start < month_start_utc:
+        return records
+
+    loaded_ids = [record.id for record in records]
+    records.extend(
+        BattleRecord.objects(pilot=pilot.id, id__nin=loaded_ids, start_time__gte=month_start_utc,
+                             start_time__lte=oldest_start).order_by('-start_time'))
+    return records
 
-def _calculate_three_day_stats(pilot: Pilot) -> Dict[str, Any]:
-    """计算近3日统计（最近的3条开播记录）"""
-    # 获取最近3条开播记录
-    records = list(BattleRecord.objects(pilot=pilot).order_by('-start_time').limit(3))
-    approved_map, _ = _build_base_salary_maps(records)
 
-    return _calculate_stats_from_records(records, approved_map)
+def _load_records_for_pilots(pilot_ids: List[str], month_start_utc: datetime) -> Dict[str, List[BattleRecord]]:
+    """批量加载多个主播业绩所需的开播记录，返回 主播ID -> 按开始时间倒序的记录列表
 
+    一次聚合取出每个主播最近30条记录的ID，再一次查询加载这些记录与本月内的全部记录。
+    """
+    object_ids = [ObjectId(pilot_id) for pilot_id in pilot_ids]
+    pipeline = [
+        {'$match': {'pilot': {'$in': object_ids}}},
+        {'$sort': {'start_time': -1}},
+        {'$group': {'_id': '$pilot', 'record_ids': {'$push': '$_id'}}},
+        {'$project': {'record_ids': {'$slice': ['$record_ids', RECENT_RECORD_LIMIT]}}},
+    ]
+    groups = BattleRecord._get_collection().aggregate(pipeline, allowDiskUse=True)  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    recent_ids = [record_id for group in groups for record_id in group['record_ids']]
+
+    query = Q(id__in=recent_ids) | Q(pilot__in=object_ids, start_time__gte=month_start_utc)
+    records_by_pilot: Dict[str, List[BattleRecord]] = defaultdict(list)
+    for record in BattleRecord.objects(query).no_dereference().order_by('-start_time'):
+        pilot_ref = record.pilot
+        records_by_pilot[str(getattr(pilot_ref, 'id', pilot_ref))].append(record)
+    return dict(records_by_pilot)
+
+
+def _build_record_rows(pilot_id, records: List[BattleRecord], approved_map: Dict[str, Decimal], timeline: CommissionTimeline) -> List[Dict[str, Any]]:
+    """逐条计算记录指标，各统计窗口复用同一份结果。"""
+    rows = []
+    for record in records:
+        revenue_amount = Decimal(record.revenue_amount or Decimal('0'))
+        local_day = utc_to_local(record.start_time).date() if record.start_time else None
+        commission_rate = timeline.rate_for(pilot_id, local_day) if local_day else 20.0
+        rows.append({
+            'record': record,
+            'start_time': record.start_time,
+            'local_day': local_day,
+            'duration_hours': record.duration_hours,
+            'revenue': revenue_amount,
+            'basepay': approved_map.get(str(record.id), Decimal('0')),
+            'company_share': calculate_commission_amounts(revenue_amount, commission_rate)['company_amount'],
+            'hours': Decimal(str(record.duration_hours or 0)),
+        })
+    return rows
 
-def _calculate_stats_from_records(records, approved_map=None) -> Dict[str, Any]:
-    """从开播记录计算统计数据"""
-    # 如果是QuerySet，转换为列表
-    if not isinstance(records, list):
-        records = list(records)
 
-    record_count = len(records)
-    total_hours = round(sum(record.duration_hours for record in records if record.duration_hours), 1)
+def _summarize_rows(rows: List[Dict[str, Any]], pilot_id, period_label: str) -> Dict[str, Any]:
+    """从记录指标汇总统计数据"""
+    record_count = len(rows)
+    total_hours = round(sum(row['duration_hours'] for row in rows if row['duration_hours']), 1)
     avg_hours = round(total_hours / record_count, 1) if record_count > 0 else 0
 
-    total_revenue = sum((record.revenue_amount or Decimal('0')) for record in records)
-    total_basepay = sum((approved_map.get(str(record.id), Decimal('0')) if approved_map else Decimal('0') for record in records), Decimal('0'))
+    total_revenue = sum((row['revenue'] for row in rows), Decimal('0'))
+    total_basepay = sum((row['basepay'] for row in rows), Decimal('0'))
+    total_company_share = sum((row['company_share'] for row in rows), Decimal('0'))
 
     # 计算日均数据（分母为开播记录数）
     daily_avg_revenue = total_revenue / record_count if record_count > 0 else Decimal('0')
     daily_avg_basepay = total_basepay / record_count if record_count > 0 else Decimal('0')
 
-    # 使用正确的公司分成计算
-    total_company_share = Decimal('0')
-    if records:
-        pilot_id = str(records[0].pilot.id) if records[0].pilot else None
-        for record in records:
-            revenue_amount = Decimal(record.revenue_amount or Decimal('0'))
-            record_date = utc_to_local(record.start_time).date() if record.start_time else None
-            commission_rate = get_pilot_commission_rate_for_date(pilot_id, record_date)[0] if record_date and pilot_id else 20.0
-            commission_amounts = calculate_commission_amounts(revenue_amount, commission_rate)
-            total_company_share += commission_amounts['company_amount']
-
     # 计算返点
     total_rebate = Decimal('0')
-    if records:
+    if rows:
         # 计算有效开播天数（播时≥1小时的天数）
         daily_duration_map = defaultdict(float)
-        for record in records:
-            if record.start_time:
-                local_day = utc_to_local(record.start_time).date()
-                daily_duration_map[local_day] += float(record.duration_hours or 0)
+        for row in rows:
+            if row['local_day']:
+                daily_duration_map[row['local_day']] += float(row['duration_hours'] or 0)
 
         valid_days = sum(1 for duration in daily_duration_map.values() if duration >= 1.0)
         total_duration_float = float(total_hours)
 
         # 使用统一返点计算器
         rebate_rate, total_rebate = calculate_pilot_rebate(valid_days, total_duration_float, total_revenue)
-        pilot_id = records[0].pilot.id if records and records[0].pilot else 'unknown'
-        logger.debug('主播 %s 近期返点计算 - 有效天数: %d, 总播时: %.1f, 总流水: %s, 返点比例: %.2f%%, 返点金额: %s', pilot_id, valid_days, total_duration_float, total_revenue,
-                     rebate_rate * 100, total_rebate)
+        logger.debug('主播 %s %s返点计算 - 有效天数: %d, 总播时: %.1f, 总流水: %s, 返点比例: %.2f%%, 返点金额: %s', pilot_id, period_label, valid_days,
+                     total_duration_float, total_revenue, rebate_rate * 100, total_rebate)
 
     # 运营利润估算
     operating_profit = total_company_share + total_rebate - total_basepay
@@ -263,29 +274,14 @@ def _build_month_daily_series(daily_totals: Dict[date, Dict[str, Decimal]], mont
     return series
 
 
-def _get_recent_records(pilot: Pilot, limit: int = 30) -> List[BattleRecord]:
-    """获取最近的开播记录"""
-    return list(BattleRecord.objects(pilot=pilot).order_by('-start_time').limit(limit))
-
-
-def _get_recent_records_with_applications(pilot: Pilot, limit: int = 30) -> List[BattleRecord]:
-    """获取最近开播记录并附带底薪申请数据"""
-    records = _get_recent_records(pilot, limit)
-    approved_map, application_map = _build_base_salary_maps(records)
-
-    for record in records:
-        setattr(record, '_approved_base_salary', approved_map.get(str(record.id), Decimal('0')))
-        setattr(record, '_latest_base_salary_application', application_map.get(str(record.id)))
-    return records
-
-
 def _build_base_salary_maps(records: List[BattleRecord]) -> Tuple[Dict[str, Decimal], Dict[str, BaseSalaryApplication]]:
     """根据开播记录批量构建底薪金额与关联申请映射"""
     record_ids = [record.id for record in records if record.id]
     if not record_ids:
         return {}, {}
 
-    applications = list(BaseSalaryApplication.objects.filter(battle_record_id__in=record_ids))
+    # 不解引用 battle_record_id，避免逐条申请回查开播记录
+    applications = list(BaseSalaryApplication.objects.filter(battle_record_id__in=record_ids).no_dereference())
 
     approved_map: defaultdict[str, Decimal] = defaultdict(lambda: Decimal('0'))
     latest_map: Dict[str, BaseSalaryApplication] = {}
@@ -294,7 +290,7 @@ def _build_base_salary_maps(records: List[BattleRecord]) -> Tuple[Dict[str, Deci
         battle_record = application.battle_record_id
         if not battle_record:
             continue
-        record_key = str(battle_record.id)
+        record_key = str(getattr(battle_record, 'id', battle_record))
         amount = Decimal(application.base_salary_amount or Decimal('0'))
         if application.status == BaseSalaryApplicationStatus.APPROVED:
             approved_map[record_key] += amount
@@ -306,3 +302,68 @@ def _build_base_salary_maps(records: List[BattleRecord]) -> Tuple[Dict[str, Deci
             latest_map[record_key] = application
 
     return dict(approved_map), latest_map
+
+
+def _convert_decimal_to_float(data):
+    if isinstance(data, dict):
+        return {k: _convert_decimal_to_float(v) for k, v in data.items()}
+    if isinstance(data, list):
+        return [_convert_decimal_to_float(item) for item in data]
+    if isinstance(data, Decimal):
+        return float(data)
+    return data
+
+
+def _serialize_recent_record(record: BattleRecord) -> Dict[str, Any]:
+    approved_base_salary = getattr(record, '_approved_base_salary', Decimal('0')) or Decimal('0')
+    application = getattr(record, '_latest_base_salary_application', None)
+    if application:
+        application_amount = application.base_salary_amount or Decimal('0')
+        application_data = {
+            'id': str(application.id),
+            'amount': float(application_amount),
+            'status': application.status.value if application.status else None,
+            'status_display': application.status_display
+        }
+    else:
+        application_data = None
+
+    return {
+        'id': str(record.id),
+        'start_time': utc_to_local(record.start_time).isoformat() if record.start_time else None,
+        'duration_hours': float(record.duration_hours) if record.duration_hours else 0,
+        'revenue_amount': float(record.revenue_amount),
+        'base_salary': float(approved_base_salary),
+        'status': record.current_status.value if record.current_status else 'ended',
+        'base_salary_application': application_data
+    }
+
+
+def _performance_cache_scope(result, pilot_id: str, owner_id: Optional[str], report_day: str) -> Dict[str, Any]:  # pylint: disable=unused-argument
+    # 只依赖该主播的数据；owner_id 仅用于缩小其他主播开播记录事件的淘汰面（无运营时任何开播记录写入都会淘汰）
+    return build_cache_scope(owner_id=owner_id, pilot_ids=[pilot_id])
+
+
+@cached_pilot_performance(scope_builder=_performance_cache_scope)
+def get_pilot_performance_payload(pilot_id: str, owner_id: Optional[str], report_day: str) -> Dict[str, Any]:
+    """主播业绩接口数据（已序列化，可缓存）
+
+    Args:
+        pilot_id: 主播ID
+        owner_id: 主播当前直属运营ID（参与缓存失效范围）
+        report_day: 报表日期（本地，YYYY-MM-DD）
+
+    Returns:
+        dict: month_stats、week_stats、three_day_stats、recent_records、daily_series
+    """
+    pilot = Pilot.objects.get(id=pilot_id)
+    report_date = datetime.combine(date.fromisoformat(report_day), time())
+    performance_data = calculate_pilot_performance_stats(pilot, report_date)
+
+    return {
+        'month_stats': _convert_decimal_to_float(performance_data['month_stats']),
+        'week_stats': _convert_decimal_to_float(performance_data['week_stats']),
+        'three_day_stats': _convert_decimal_to_float(performance_data['three_day_stats']),
+        'recent_records': [_serialize_recent_record(record) for record in performance_data['recent_records']],
+        'daily_series': _convert_decimal_to_float(performance_data.get('month_daily_series', [])),
+    }
@@ -6,11 +6,28 @@
 
 from typing import Any, Dict, List, Optional
 from models.pilot import Pilot, PilotChangeLog
+from utils.reference_prefetch import prefetch_references
 from utils.timezone_helper import utc_to_local
 
 
-def serialize_pilot(pilot: Pilot) -> Dict[str, Any]:
-    """序列化单个主播对象"""
+def _serialize_owner(pilot: Pilot, owners: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if owners is None:
+        return {'id': str(pilot.owner.id), 'nickname': pilot.owner.nickname} if pilot.owner else None
+    owner_ref = pilot._data.get('owner')  # pylint: disable=protected-access
+    if owner_ref is None:
+        return None
+    owner_id = str(getattr(owner_ref, 'id', owner_ref))
+    owner = owners.get(owner_id)
+    return {'id': owner_id, 'nickname': owner.nickname if owner else None}
+
+
+def serialize_pilot(pilot: Pilot, owners: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """序列化单个主播对象
+
+    Args:
+        pilot: 主播对象
+        owners: 可选，直属运营ID -> 用户对象的预加载映射；提供时不再逐条解引用 owner
+    """
     return {
         'id': str(pilot.id),
         'nickname': pilot.nickname,
@@ -19,10 +36,7 @@ def serialize_pilot(pilot: Pilot) -> Dict[str, Any]:
         'hometown': pilot.hometown,
         'birth_year': pilot.birth_year,
         'age': pilot.age,
-        'owner': {
-            'id': str(pilot.owner.id),
-            'nickname': pilot.owner.nickname
-        } if pilot.owner else None,
+        'owner': _serialize_owner(pilot, owners),
         'platform': pilot.platform.value if pilot.platform else None,
         'work_mode': pilot.work_mode.value if pilot.work_mode else None,
         'rank': pilot.rank.value if pilot.rank else None,
@@ -57,8 +71,8 @@ def serialize_change_log(change_log: PilotChangeLog) -> Dict[str, Any]:
 
 
 def serialize_change_log_list(change_logs: List[PilotChangeLog]) -> List[Dict[str, Any]]:
-    """序列化变更记录列表"""
-    return [serialize_change_log(log) for log in change_logs]
+    """序列化变更记录列表（先批量预加载操作人）"""
+    return [serialize_change_log(log) for log in prefetch_references(change_logs, 'user_id')]
 
 
 def create_success_response(data: Any, meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
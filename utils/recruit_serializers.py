@@ -8,8 +8,13 @@ from datetime import datetime
 from typing import Any, Dict, List, Optional
 
 from models.recruit import Recruit, RecruitChangeLog, RecruitStatus
+from utils.reference_prefetch import prefetch_references
 from utils.timezone_helper import utc_to_local
 
+# 招募序列化访问的引用字段（列表序列化前批量预加载）
+RECRUIT_REFERENCE_PATHS = ('pilot', 'recruiter', 'interview_decision_maker', 'scheduled_training_decision_maker', 'training_decision_maker',
+                           'scheduled_broadcast_decision_maker', 'broadcast_decision_maker', 'training_decision_maker_old', 'final_decision_maker')
+
 
 def _safe_get_enum_value(enum_field):
     """Safely get the value from an enum field, handling strings."""
@@ -276,8 +281,8 @@ def serialize_recruit(recruit: Recruit) -> Dict[str, Any]:
 
 
 def serialize_recruit_list(recruits: List[Recruit]) -> List[Dict[str, Any]]:
-    """序列化招募列表"""
-    return [serialize_recruit(recruit) for recruit in recruits]
+    """序列化招募列表（先批量预加载引用字段）"""
+    return [serialize_recruit(recruit) for recruit in prefetch_references(recruits, *RECRUIT_REFERENCE_PATHS)]
 
 
 def serialize_change_log(change_log: RecruitChangeLog) -> Dict[str, Any]:
@@ -303,15 +308,15 @@ def serialize_change_log(change_log: RecruitChangeLog) -> Dict[str, Any]:
 
 
 def serialize_change_log_list(change_logs: List[RecruitChangeLog]) -> List[Dict[str, Any]]:
-    """序列化变更记录列表"""
-    return [serialize_change_log(log) for log in change_logs]
+    """序列化变更记录列表（先批量预加载操作人）"""
+    return [serialize_change_log(log) for log in prefetch_references(change_logs, 'user_id')]
 
 
 def serialize_recruit_grouped(recruits: List[Recruit]) -> Dict[str, List[Dict[str, Any]]]:
     """序列化分组的招募数据"""
     from routes.recruit import _group_recruits
 
-    grouped_recruits = _group_recruits(recruits)
+    grouped_recruits = _group_recruits(prefetch_references(recruits, *RECRUIT_REFERENCE_PATHS))
     return {
         'pending_interview': serialize_recruit_list(grouped_recruits.get('pending_interview', [])),
         'pending_training_schedule': serialize_recruit_list(grouped_recruits.get('pending_training_schedule', [])),
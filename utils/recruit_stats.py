@@ -5,13 +5,15 @@
 """
 # pylint: disable=no-member
 from datetime import datetime, timedelta
-from typing import Any, Dict
+from typing import Any, Dict, List
 
+from bson import ObjectId
 from mongoengine import Q
 
 from models.battle_record import BattleRecord
 from models.recruit import BroadcastDecision, FinalDecision, Recruit
 from utils.logging_setup import get_logger
+from utils.long_session_counters import (FULL_DAYS_THRESHOLD, LONG_SESSION_HOURS, load_long_session_counters)
 from utils.timezone_helper import (get_current_utc_time, local_to_utc, utc_to_local)
 
 # 设置日志器
@@ -138,8 +140,71 @@ def calculate_recruit_stats_for_date(target_date: datetime, recruiter_id: str =
     return calculate_recruit_period_stats(date_start_utc, date_end_utc, recruiter_id)
 
 
+RECRUIT_DAILY_METRICS = ('appointments', 'interviews', 'trials', 'new_recruits')
+RECRUIT_DAILY_TREND_DAYS = 14
+
+_NEW_RECRUIT_BROADCAST_DECISIONS = [BroadcastDecision.OFFICIAL, BroadcastDecision.INTERN, BroadcastDecision.OFFICIAL_OLD, BroadcastDecision.INTERN_OLD]
+_NEW_RECRUIT_FINAL_DECISIONS = [FinalDecision.OFFICIAL, FinalDecision.INTERN]
+
+
+def _local_day_if_in_range(field: str, start_utc: datetime, end_utc: datetime, extra_condition: Dict[str, Any] = None) -> Dict[str, Any]:
+    """字段落在范围内（且满足附加条件）时返回其本地日期字符串，否则返回 null。"""
+    conditions = [{'$gte': [f'${field}', start_utc]}, {'$lt': [f'${field}', end_utc]}]
+    if extra_condition:
+        conditions.append(extra_condition)
+    return {'$cond': [{'$and': conditions}, {'$dateToString': {'format': '%Y-%m-%d', 'date': f'${field}', 'timezone': '+08:00'}}, None]}
+
+
+def _day_bucket_facet(day_expressions: List[Dict[str, Any]], member: str) -> List[Dict[str, Any]]:
+    """按本地日分桶：每条招募记录命中的日期去重后展开，桶内收集去重的成员（招募ID或主播ID）。"""
+    return [
+        {'$project': {'member': f'${member}', 'days': {'$setDifference': [day_expressions, [None]]}}},
+        {'$unwind': '$days'},
+        {'$match': {'member': {'$ne': None}}},
+        {'$group': {'_id': '$days', 'members': {'$addToSet': '$member'}}},
+    ]
+
+
+def _aggregate_recruit_daily_buckets(start_utc: datetime, end_utc: datetime, recruiter_id: str = None) -> Dict[str, Dict[str, set]]:
+    """单次聚合按本地日统计约面、到面、试播、新开播（口径同 calculate_recruit_period_stats）
+
+    Returns:
+        dict: 指标 -> {本地日期: 去重成员集合}；约面/到面/试播按招募记录去重，新开播按主播去重
+    """
+    time_fields = ['created_at', 'interview_decision_time', 'training_decision_time', 'training_decision_time_old', 'broadcast_decision_time', 'final_decision_time']
+    match: Dict[str, Any] = {'$or': [{field: {'$gte': start_utc, '$lt': end_utc}} for field in time_fields]}
+    if recruiter_id and recruiter_id != 'all':
+        match['recruiter'] = ObjectId(recruiter_id)
+
+    broadcast_ok = {'$in': ['$broadcast_decision', [decision.value for decision in _NEW_RECRUIT_BROADCAST_DECISIONS]]}
+    final_ok = {'$in': ['$final_decision', [decision.value for decision in _NEW_RECRUIT_FINAL_DECISIONS]]}
+    pipeline = [
+        {'$match': match},
+        {'$facet': {
+            'appointments': _day_bucket_facet([_local_day_if_in_range('created_at', start_utc, end_utc)], '_id'),
+            'interviews': _day_bucket_facet([
+                _local_day_if_in_range('interview_decision_time', start_utc, end_utc),
+                _local_day_if_in_range('training_decision_time_old', start_utc, end_utc),
+            ], '_id'),
+            'trials': _day_bucket_facet([
+                _local_day_if_in_range('training_decision_time', start_utc, end_utc),
+                _local_day_if_in_range('training_decision_time_old', start_utc, end_utc),
+            ], '_id'),
+            'new_recruits': _day_bucket_facet([
+                _local_day_if_in_range('broadcast_decision_time', start_utc, end_utc, broadcast_ok),
+                _local_day_if_in_range('final_decision_time', start_utc, end_utc, final_ok),
+            ], 'pilot'),
+        }},
+    ]
+    result = next(iter(Recruit._get_collection().aggregate(pipeline, allowDiskUse=True)), {})  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    return {metric: {bucket['_id']: set(bucket['members']) for bucket in result.get(metric, [])} for metric in RECRUIT_DAILY_METRICS}
+
+
 def calculate_recruit_daily_stats(report_date: datetime, recruiter_id: str = None) -> Dict[str, Any]:
     """计算指定日期的招募日报统计数据（包含多时间维度和日均数据）
+
+    近14日按本地日分桶的结果由一次聚合得到，报表日、近7日、近14日与逐日累计序列均由分桶结果推导；
+    多日合计按招募记录/主播去重，与按区间统计的口径一致。
     
     Args:
         report_date: 报表日期（本地时间）
@@ -148,47 +213,26 @@ def calculate_recruit_daily_stats(report_date: datetime, recruiter_id: str = Non
     Returns:
         dict: 包含报表日、近7日、近14日的统计数据，以及日均数据
     """
-    report_day_start = report_date
-    report_day_end = report_day_start + timedelta(days=1)
+    trend_start_date = report_date - timedelta(days=RECRUIT_DAILY_TREND_DAYS - 1)
+    report_day_end = report_date + timedelta(days=1)
+    buckets = _aggregate_recruit_daily_buckets(local_to_utc(trend_start_date), local_to_utc(report_day_end), recruiter_id)
 
-    last_7_days_start = report_date - timedelta(days=6)
-    last_14_days_start = report_date - timedelta(days=13)
+    day_keys = [(trend_start_date + timedelta(days=index)).strftime('%Y-%m-%d') for index in range(RECRUIT_DAILY_TREND_DAYS)]
 
-    report_day_start_utc = local_to_utc(report_day_start)
-    report_day_end_utc = local_to_utc(report_day_end)
-    last_7_days_start_utc = local_to_utc(last_7_days_start)
-    last_14_days_start_utc = local_to_utc(last_14_days_start)
+    def _window_stats(days: List[str]) -> Dict[str, int]:
+        return {metric: len(set().union(*(buckets[metric].get(day, set()) for day in days))) for metric in RECRUIT_DAILY_METRICS}
 
-    report_day_stats = calculate_recruit_period_stats(report_day_start_utc, report_day_end_utc, recruiter_id)
-    last_7_days_stats = calculate_recruit_period_stats(last_7_days_start_utc, report_day_end_utc, recruiter_id)
-    last_14_days_stats = calculate_recruit_period_stats(last_14_days_start_utc, report_day_end_utc, recruiter_id)
-
-    trend_start_date = report_date - timedelta(days=13)
     daily_series = []
-    cumulative_totals = {
-        'appointments': 0,
-        'interviews': 0,
-        'trials': 0,
-        'new_recruits': 0,
-    }
-    for index in range(14):
-        day_start = trend_start_date + timedelta(days=index)
-        day_end = day_start + timedelta(days=1)
-        day_stats = calculate_recruit_period_stats(local_to_utc(day_start), local_to_utc(day_end), recruiter_id)
-        for key in cumulative_totals:
-            cumulative_totals[key] += day_stats.get(key, 0)
-        daily_series.append({
-            'date': day_start.strftime('%Y-%m-%d'),
-            'appointments': cumulative_totals['appointments'],
-            'interviews': cumulative_totals['interviews'],
-            'trials': cumulative_totals['trials'],
-            'new_recruits': cumulative_totals['new_recruits'],
-        })
+    cumulative_totals = {metric: 0 for metric in RECRUIT_DAILY_METRICS}
+    for day in day_keys:
+        for metric in RECRUIT_DAILY_METRICS:
+            cumulative_totals[metric] += len(buckets[metric].get(day, ()))
+        daily_series.append({'date': day, **cumulative_totals})
 
     statistics = {
-        'report_day': report_day_stats,
-        'last_7_days': last_7_days_stats,
-        'last_14_days': last_14_days_stats,
+        'report_day': _window_stats(day_keys[-1:]),
+        'last_7_days': _window_stats(day_keys[-7:]),
+        'last_14_days': _window_stats(day_keys),
         'daily_series': daily_series,
     }
 
@@ -345,8 +389,9 @@ def calculate_recruit_monthly_stats(recruiter_id: str = None) -> Dict[str, Any]:
 
 def calculate_full_7_days_recruits(start_utc: datetime, end_utc: datetime, recruiter_id: str = None) -> int:
     """计算满7天的主播数量
-    
+
     满7天数 = 筛选时间内创建的招募记录中，对应主播有7条及以上6小时及以上的开播记录的招募记录数
+    长时开播条数读取主播文档上预先维护的计数器，不再逐个主播扫描开播记录。
 
     Args:
         start_utc: 开始时间（UTC）
@@ -360,30 +405,12 @@ def calculate_full_7_days_recruits(start_utc: datetime, end_utc: datetime, recru
     if recruiter_id and recruiter_id != 'all':
         base_query['recruiter'] = recruiter_id
 
-    # 查询窗口内创建的招募记录
+    # 查询窗口内创建的招募记录（只取主播ID，同一主播只统计一次）
     created_recruits_query = Q(**base_query) & Q(created_at__gte=start_utc, created_at__lt=end_utc)
-    recruits = Recruit.objects.filter(created_recruits_query)
+    pilot_ids = {raw['pilot'] for raw in Recruit.objects.filter(created_recruits_query).only('pilot').as_pymongo() if raw.get('pilot')}
 
-    full_7_days_count = 0
-    processed_pilots = set()  # 避免重复统计同一主播
-
-    for recruit in recruits:
-        if recruit.pilot and recruit.pilot.id not in processed_pilots:
-            processed_pilots.add(recruit.pilot.id)
-
-            # 检查该主播是否有7条或以上6小时及以上的开播记录（不限时间范围）
-            battle_records = BattleRecord.objects.filter(pilot=recruit.pilot)
-
-            # 计算超过6小时的开播记录数
-            long_sessions_count = 0
-            for record in battle_records:
-                if record.duration_hours and record.duration_hours >= 6:
-                    long_sessions_count += 1
-
-            # 如果有7条或以上超过6小时的开播记录，计入满7天数
-            if long_sessions_count >= 7:
-                full_7_days_count += 1
-    return full_7_days_count
+    counters = load_long_session_counters(pilot_ids)
+    return sum(1 for count, _ in counters.values() if count >= FULL_DAYS_THRESHOLD)
 
 
 def calculate_conversion_rates(stats: Dict[str, int]) -> Dict[str, float]:
@@ -450,6 +477,37 @@ def calculate_trends(current_stats: Dict[str, int], previous_stats: Dict[str, in
     return trends
 
 
+def _ref_id(reference) -> str:
+    """读取引用字段的ID而不触发解引用。"""
+    return str(getattr(reference, 'id', reference))
+
+
+def _aggregate_window_broadcast_summary(pilot_ids, start_utc: datetime, end_utc: datetime) -> Dict[str, Dict[str, Any]]:
+    """单次聚合窗口内各主播的开播天数、超过6小时的开播记录数与最近开播时间。"""
+    if not pilot_ids:
+        return {}
+
+    duration_hours = {'$round': [{'$divide': [{'$subtract': ['$end_time', '$start_time']}, 3600000]}, 1]}
+    pipeline = [
+        {'$match': {'pilot': {'$in': [ObjectId(pilot_id) for pilot_id in pilot_ids]}, 'start_time': {'$gte': start_utc, '$lte': end_utc}}},
+        {'$group': {
+            '_id': '$pilot',
+            'local_dates': {'$addToSet': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$start_time', 'timezone': '+08:00'}}},
+            'long_sessions_count': {'$sum': {'$cond': [{'$gt': [{'$ifNull': [duration_hours, 0]}, LONG_SESSION_HOURS]}, 1, 0]}},
+            'last_broadcast_time': {'$max': '$start_time'},
+        }},
+    ]
+    groups = BattleRecord._get_collection().aggregate(pipeline, allowDiskUse=True)  # type: ignore[attr-defined]  # pylint: disable=protected-access
+    return {
+        str(group['_id']): {
+            'broadcast_days': len(group['local_dates']),
+            'long_sessions_count': group['long_sessions_count'],
+            'last_broadcast_time': group['last_broadcast_time'],
+        }
+        for group in groups
+    }
+
+
 def get_recruit_monthly_detail_records(recruiter_id: str = None) -> list:
     """获取招募月报明细记录
 
@@ -480,9 +538,11 @@ def get_recruit_monthly_detail_records(recruiter_id: str = None) -> list:
     # 这样可以确保展示完整的招募流程，即使某些历史数据缺少中间决策时间
     base_query.update({'created_at__gte': start_utc, 'created_at__lte': end_utc})
 
-    recruits = Recruit.objects.filter(**base_query).order_by('-created_at')
+    recruits = list(Recruit.objects.filter(**base_query).order_by('-created_at'))
+    pilot_ids = {_ref_id(recruit._data.get('pilot')) for recruit in recruits if recruit._data.get('pilot')}  # pylint: disable=protected-access
+    broadcast_summary = _aggregate_window_broadcast_summary(pilot_ids, start_utc, end_utc)
 
-    # 为每个招募记录计算开播天数
+    # 为每个招募记录填充开播天数
     recruit_list = []
     processed_ids = set()  # 避免重复处理同一个招募记录
 
@@ -493,31 +553,13 @@ def get_recruit_monthly_detail_records(recruiter_id: str = None) -> list:
 
         processed_ids.add(recruit.id)
 
-        # 计算该主播在滚动窗口内的开播天数
-        battle_records = BattleRecord.objects.filter(pilot=recruit.pilot, start_time__gte=start_utc, start_time__lte=end_utc)
-
-        # 计算不重复的开播日期数
-        unique_dates = set()
-        long_sessions_count = 0
-
-        for record in battle_records:
-            if record.duration_hours and record.duration_hours > 6:
-                long_sessions_count += 1
-
-            # 获取本地日期
-            local_start = utc_to_local(record.start_time)
-            if local_start:
-                unique_dates.add(local_start.date())
-
-        recruit_dict = {'recruit': recruit, 'broadcast_days': len(unique_dates), 'long_sessions_count': long_sessions_count, 'last_broadcast_time': None}
-
-        # 获取最近一次开播时间
-        if battle_records:
-            latest_record = battle_records.order_by('-start_time').first()
-            if latest_record:
-                recruit_dict['last_broadcast_time'] = latest_record.start_time
-
-        recruit_list.append(recruit_dict)
+        summary = broadcast_summary.get(str(recruit.pilot.id), {})
+        recruit_list.append({
+            'recruit': recruit,
+            'broadcast_days': summary.get('broadcast_days', 0),
+            'long_sessions_count': summary.get('long_sessions_count', 0),
+            'last_broadcast_time': summary.get('last_broadcast_time'),
+        })
 
     # 按开播天数降序排序
     recruit_list.sort(key=lambda x: x['broadcast_days'], reverse=True)
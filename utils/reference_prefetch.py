@@ -0,0 +1,90 @@
+"""引用字段批量预加载
+
+列表与导出接口在序列化前调用 prefetch_references，按引用路径（如 'pilot'、'pilot.owner'）
+对整批文档做一次 `id__in` 批量加载，并把加载结果回填到文档的引用字段上；
+序列化函数照常访问 `record.pilot.owner` 即可读取预加载的对象，不再逐行解引用。
+
+- 身份映射：同一个 ReferenceLoader 内，同一集合的同一ID只加载一次、只对应一个对象；
+- 路径逐段加载：'pilot.owner' 先加载 pilot，再对加载出的主播批量加载 owner；
+- 引用的文档不存在时保留原始引用，访问时的行为（抛出 DoesNotExist）与未预加载时一致。
+"""
+
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from mongoengine import Document, ReferenceField
+
+from utils.logging_setup import get_logger
+
+logger = get_logger('reference_prefetch')
+
+
+def _ref_id(value) -> Optional[str]:
+    ref_id = getattr(value, 'id', value)
+    return str(ref_id) if ref_id is not None else None
+
+
+class ReferenceLoader:
+    """引用批量加载器（按集合与ID维护身份映射）"""
+
+    def __init__(self):
+        self._identity: Dict[Tuple[str, str], Document] = {}
+        self.query_count = 0
+
+    def prefetch(self, documents: Iterable[Document], *paths: str) -> List[Document]:
+        """为文档批量预加载给定引用路径，返回原文档列表。"""
+        docs = [doc for doc in documents if doc is not None]
+        for path in paths:
+            current = docs
+            for field_name in path.split('.'):
+                if not current:
+                    break
+                current = self._load_field(current, field_name)
+        return docs
+
+    def _load_field(self, documents: Sequence[Document], field_name: str) -> List[Document]:
+        """批量加载一层引用字段，返回加载到的被引用文档（去重）。"""
+        pending: Dict[type, set] = defaultdict(set)
+        for doc in documents:
+            field = doc._fields.get(field_name)  # pylint: disable=protected-access
+            if not isinstance(field, ReferenceField):
+                raise ValueError(f'{type(doc).__name__}.{field_name} 不是引用字段')
+            value = doc._data.get(field_name)  # pylint: disable=protected-access
+            if value is None or isinstance(value, Document):
+                continue
+            model = field.document_type
+            ref_id = _ref_id(value)
+            if (model._get_collection_name(), ref_id) not in self._identity:
+                pending[model].add(getattr(value, 'id', value))
+
+        for model, ids in pending.items():
+            self.query_count += 1
+            for loaded in model.objects(id__in=list(ids)):
+                self._identity[(model._get_collection_name(), str(loaded.id))] = loaded
+
+        resolved: Dict[int, Document] = {}
+        for doc in documents:
+            value = doc._data.get(field_name)  # pylint: disable=protected-access
+            if value is None:
+                continue
+            if not isinstance(value, Document):
+                model = doc._fields[field_name].document_type  # pylint: disable=protected-access
+                loaded = self._identity.get((model._get_collection_name(), _ref_id(value)))
+                if loaded is None:
+                    continue
+                doc._data[field_name] = loaded  # pylint: disable=protected-access
+                value = loaded
+            resolved[id(value)] = value
+        return list(resolved.values())
+
+
+def prefetch_references(documents: Iterable[Document], *paths: str) -> List[Document]:
+    """为一批文档预加载引用路径（每个集合每层一次查询），返回文档列表。
+
+    Example:
+        records = prefetch_references(records, 'pilot', 'pilot.owner', 'registered_by')
+    """
+    loader = ReferenceLoader()
+    docs = loader.prefetch(documents, *paths)
+    logger.debug('预加载引用：文档 %d 个，路径 %s，查询 %d 次', len(docs), list(paths), loader.query_count)
+    return docs
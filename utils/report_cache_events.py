@@ -0,0 +1,138 @@
+# pylint: disable=no-member,protected-access
+"""报表缓存失效事件
+
+监听开播记录、底薪申请、分成调整与主播资料的保存/删除，
+先增量刷新受影响的日级事实行（pilot_daily_facts），再发布按范围淘汰的报表缓存失效事件，
+只淘汰受影响的日报/月报/周报缓存条目（失效晚于事实行写入，失效前开始的报表计算结果不会写回缓存），
+并在调度器启用且报表缓存为多 worker 共享后端时，安排一次防抖的热点报表预计算（只处理受影响的报表）。
+"""
+
+from datetime import timedelta
+
+from mongoengine import signals
+
+from models.battle_record import BaseSalaryApplication, BattleRecord
+from models.pilot import Pilot, PilotCommission
+from utils.cache_helper import build_invalidation_event, invalidate_report_caches
+from utils.logging_setup import get_logger
+from utils.pilot_daily_facts import (refresh_facts_for_application, refresh_facts_for_battle_record, refresh_facts_for_commission, safe_refresh)
+from utils.scheduler import schedule_report_prewarm_after_changes
+from utils.timezone_helper import utc_to_local
+
+logger = get_logger('report_cache_events')
+
+_registered = False
+
+
+def _ref_id(reference):
+    """读取引用字段的ID而不触发解引用。"""
+    if reference is None:
+        return None
+    return str(getattr(reference, 'id', reference))
+
+
+def _local_day_range(utc_time):
+    if not utc_time:
+        return None, None
+    local_day = utc_to_local(utc_time).date()
+    return local_day, local_day + timedelta(days=1)
+
+
+def _pilot_owner_id(pilot_id):
+    pilot = Pilot.objects(id=pilot_id).no_dereference().only('owner').first() if pilot_id else None
+    return _ref_id(pilot._data.get('owner')) if pilot else None
+
+
+def _publish(event):
+    try:
+        invalidate_report_caches(event)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('报表缓存失效事件处理失败：%s', exc, exc_info=True)
+    try:
+        schedule_report_prewarm_after_changes(event)
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.warning('安排热点报表预计算失败：%s', exc)
+
+
+def _publish_battle_record(pilot_id, start_time, owner_snapshot_id):
+    start, end = _local_day_range(start_time)
+    owner_ids = {owner_snapshot_id, _pilot_owner_id(pilot_id)}
+    _publish(build_invalidation_event('record', pilot_id, start, end, owner_ids))
+
+
+def _on_battle_record_pre_save(sender, document, **kwargs):  # pylint: disable=unused-argument
+    """记录变更前的主播/开始时间/运营快照，保证旧范围同样失效。"""
+    document._report_cache_previous = None
+    if document._created or not document.pk:
+        return
+    changed = set(document._get_changed_fields())
+    if not changed & {'pilot', 'start_time', 'owner_snapshot'}:
+        return
+    document._report_cache_previous = BattleRecord.objects(pk=document.pk).no_dereference().only('pilot', 'start_time', 'owner_snapshot').first()
+
+
+def _on_battle_record_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    previous = getattr(document, '_report_cache_previous', None)
+    previous_pilot, previous_start_time = (previous._data.get('pilot'), previous.start_time) if previous is not None else (None, None)
+    safe_refresh(refresh_facts_for_battle_record, document, previous_pilot, previous_start_time)
+    _publish_battle_record(_ref_id(document._data.get('pilot')), document.start_time, _ref_id(document._data.get('owner_snapshot')))
+    if previous is not None:
+        _publish_battle_record(_ref_id(previous._data.get('pilot')), previous.start_time, _ref_id(previous._data.get('owner_snapshot')))
+
+
+def _on_base_salary_application_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    safe_refresh(refresh_facts_for_application, document)
+    record_id = _ref_id(document._data.get('battle_record_id'))
+    record = BattleRecord.objects(pk=record_id).only('start_time').first() if record_id else None
+    start, end = _local_day_range(record.start_time) if record else (None, None)
+    _publish(build_invalidation_event('data', _ref_id(document._data.get('pilot_id')), start, end))
+
+
+def _on_commission_pre_save(sender, document, **kwargs):  # pylint: disable=unused-argument
+    """记录变更前的调整日，调整日后移时从原调整日起重算事实行。"""
+    document._report_cache_previous_adjustment = None
+    if document._created or not document.pk or 'adjustment_date' not in document._get_changed_fields():
+        return
+    previous = PilotCommission.objects(pk=document.pk).only('adjustment_date').first()
+    document._report_cache_previous_adjustment = previous.adjustment_date if previous else None
+
+
+def _on_commission_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    adjustment_dates = [value for value in (document.adjustment_date, getattr(document, '_report_cache_previous_adjustment', None)) if value]
+    safe_refresh(refresh_facts_for_commission, document._data.get('pilot_id'), min(adjustment_dates) if adjustment_dates else None)
+    # 调整日可能前移或后移，且影响其后全部日期，直接按该主播的全部范围失效
+    _publish(build_invalidation_event('data', _ref_id(document._data.get('pilot_id'))))
+
+
+def _on_pilot_pre_save(sender, document, **kwargs):  # pylint: disable=unused-argument
+    document._report_cache_previous_owner = None
+    if document._created or not document.pk or 'owner' not in document._get_changed_fields():
+        return
+    document._report_cache_previous_owner = _pilot_owner_id(document.pk)
+
+
+def _on_pilot_changed(sender, document, **kwargs):  # pylint: disable=unused-argument
+    owner_ids = {_ref_id(document._data.get('owner')), getattr(document, '_report_cache_previous_owner', None)}
+    _publish(build_invalidation_event('pilot', _ref_id(document.pk), owner_ids=owner_ids))
+
+
+def register_report_cache_handlers():
+    """注册报表缓存失效事件监听（重复调用安全）。"""
+    global _registered  # pylint: disable=global-statement
+    if _registered:
+        return
+
+    signals.pre_save.connect(_on_battle_record_pre_save, sender=BattleRecord)
+    signals.post_save.connect(_on_battle_record_changed, sender=BattleRecord)
+    signals.post_delete.connect(_on_battle_record_changed, sender=BattleRecord)
+    signals.post_save.connect(_on_base_salary_application_changed, sender=BaseSalaryApplication)
+    signals.post_delete.connect(_on_base_salary_application_changed, sender=BaseSalaryApplication)
+    signals.pre_save.connect(_on_commission_pre_save, sender=PilotCommission)
+    signals.post_save.connect(_on_commission_changed, sender=PilotCommission)
+    signals.post_delete.connect(_on_commission_changed, sender=PilotCommission)
+    signals.pre_save.connect(_on_pilot_pre_save, sender=Pilot)
+    signals.post_save.connect(_on_pilot_changed, sender=Pilot)
+    signals.post_delete.connect(_on_pilot_changed, sender=Pilot)
+
+    _registered = True
+    logger.info('报表缓存失效事件监听已注册')
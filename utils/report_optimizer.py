@@ -7,8 +7,8 @@ from collections import defaultdict
 from datetime import timedelta
 from decimal import Decimal
 
-from utils.commission_helper import (calculate_commission_amounts,
-                                     get_pilot_commission_rate_for_date)
+from utils.commission_helper import (CommissionTimeline,
+                                     calculate_commission_amounts)
 from utils.logging_setup import get_logger
 from utils.timezone_helper import utc_to_local
 
@@ -136,13 +136,15 @@ def batch_calculate_pilot_stats(pilots, report_date):
         if pilot_id in [str(p.id) for p in pilots]:
             pilot_week_data[pilot_id].append(record)
 
+    timeline = CommissionTimeline.prefetch(pilot.id for pilot in pilots)
+
     for pilot in pilots:
         pilot_id = str(pilot.id)
 
         month_records_list = pilot_month_data.get(pilot_id, [])
         monthly_stats = _calculate_monthly_stats_from_records(month_records_list)
 
-        monthly_commission_stats = _calculate_monthly_commission_stats_from_records(month_records_list, pilot, report_date)
+        monthly_commission_stats = _calculate_monthly_commission_stats_from_records(month_records_list, pilot, report_date, timeline)
 
         week_records_list = pilot_week_data.get(pilot_id, [])
         three_day_avg = _calculate_three_day_avg_from_records(week_records_list, report_date)
@@ -153,7 +155,7 @@ def batch_calculate_pilot_stats(pilots, report_date):
     return pilot_stats
 
 
-def _calculate_monthly_commission_stats_from_records(records, pilot, report_date):
+def _calculate_monthly_commission_stats_from_records(records, pilot, report_date, timeline):
     """从记录列表计算月度分成统计"""
     if not records:
         return {'month_total_pilot_share': Decimal('0'), 'month_total_company_share': Decimal('0'), 'month_total_profit': Decimal('0')}
@@ -163,7 +165,7 @@ def _calculate_monthly_commission_stats_from_records(records, pilot, report_date
 
     for record in records:
         record_date = utc_to_local(record.start_time).date()
-        commission_rate, _, _ = get_pilot_commission_rate_for_date(record.pilot.id, record_date)
+        commission_rate = timeline.rate_for(record.pilot.id, record_date)
         commission_amounts = calculate_commission_amounts(record.revenue_amount, commission_rate)
 
         month_total_pilot_share += commission_amounts['pilot_amount']
@@ -0,0 +1,119 @@
+"""热点报表预计算
+
+在邮件报表发送后以及数据集中写入后，按（直属运营，开播方式）组合预先计算热点报表并写入缓存，
+使访问者直接命中缓存：
+- 加速版月报：当月、上月
+- 加速版周报：当前周、默认展示的上一周
+- 加速版日报：昨日
+数据写入后的预计算只处理失效事件涉及的报表区间与直属运营。
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from bson import ObjectId
+
+from models.pilot import Pilot
+from utils.logging_setup import get_logger
+from utils.new_report_calculations import get_default_week_start_for_now_prev_week, get_week_start_tuesday
+from utils.new_report_fast_calculations import calculate_monthly_report_fast
+from utils.new_report_fast_daily_calculations import calculate_daily_report_fast
+from utils.new_report_fast_weekly_calculations import calculate_weekly_report_fast
+from utils.timezone_helper import get_current_utc_time, utc_to_local
+
+logger = get_logger('report_prewarm')
+
+PREWARM_MODES = ('all', 'online', 'offline')
+
+
+def _owner_options() -> List[str]:
+    """全部运营 + 当前有主播的各直属运营。"""
+    owner_ids = Pilot._get_collection().distinct('owner')  # type: ignore[attr-defined]  # pylint: disable=protected-access,no-member
+    return ['all'] + sorted(str(owner_id) for owner_id in owner_ids if owner_id)
+
+
+def _affected_owner_ids(events: List[Dict[str, Any]]) -> Optional[Set[str]]:
+    """失效事件涉及的直属运营；存在无法确定主播的事件时返回 None（全部运营）。"""
+    owner_ids: Set[str] = set()
+    unresolved_pilot_ids = set()
+    for event in events:
+        if event['pilot_id'] is None:
+            return None
+        owner_ids.update(event['owner_ids'])
+        if not event['owner_ids']:
+            unresolved_pilot_ids.add(ObjectId(event['pilot_id']))
+    if unresolved_pilot_ids:
+        owners = Pilot._get_collection().distinct('owner', {'_id': {'$in': list(unresolved_pilot_ids)}})  # type: ignore[attr-defined]  # pylint: disable=protected-access,no-member
+        owner_ids.update(str(owner_id) for owner_id in owners if owner_id)
+    return owner_ids
+
+
+def _window_affected(start: date, end: date, events: List[Dict[str, Any]]) -> bool:
+    """报表依赖的本地日期区间 [start, end) 是否与任一失效事件重叠。"""
+    return any((event['end'] is None or start < event['end']) and (event['start'] is None or event['start'] < end) for event in events)
+
+
+def _run(label: str, task: Callable[[], object], stats: Dict[str, int]) -> None:
+    try:
+        task()
+        stats['warmed'] += 1
+    except Exception as exc:  # pylint: disable=broad-except
+        stats['failed'] += 1
+        logger.error('预计算 %s 失败：%s', label, exc, exc_info=True)
+
+
+def _hot_report_targets() -> List[Tuple[str, date, date, Callable[[str, str], object]]]:
+    """热点报表列表：(名称, 依赖区间起点, 终点（不含）, 计算函数(直属运营, 开播方式))。"""
+    now_local = utc_to_local(get_current_utc_time())
+    today_local = now_local.replace(hour=0, minute=0, second=0, microsecond=0)
+    current_month = today_local.replace(day=1)
+    previous_month = (current_month - timedelta(days=1)).replace(day=1)
+    week_starts = sorted({get_week_start_tuesday(today_local), get_default_week_start_for_now_prev_week()})
+    yesterday = today_local - timedelta(days=1)
+
+    def next_month(month: datetime) -> datetime:
+        return (month + timedelta(days=32)).replace(day=1)
+
+    targets: List[Tuple[str, date, date, Callable[[str, str], object]]] = []
+    for month in (current_month, previous_month):
+        targets.append((f'月报 {month:%Y-%m}', month.date(), next_month(month).date(),
+                        lambda o, md, m=month: calculate_monthly_report_fast(m.year, m.month, o, md, 'all')))
+    for week_start in week_starts:
+        # 周报包含与前一周的对比，依赖区间从前一周开始，与周报缓存范围一致
+        targets.append((f'周报 {week_start:%Y-%m-%d}', (week_start - timedelta(days=7)).date(), (week_start + timedelta(days=7)).date(),
+                        lambda o, md, w=week_start: calculate_weekly_report_fast(w, o, md)))
+    # 日报依赖月初（或报表日前6天）至报表日，与日报缓存范围一致
+    daily_start = min(yesterday.replace(day=1), yesterday - timedelta(days=6))
+    targets.append((f'日报 {yesterday:%Y-%m-%d}', daily_start.date(), today_local.date(), lambda o, md: calculate_daily_report_fast(yesterday, o, md)))
+    return targets
+
+
+def prewarm_hot_reports(owner_ids: Optional[List[str]] = None,
+                        triggered_by: str = 'manual',
+                        events: Optional[List[Dict[str, Any]]] = None) -> Dict[str, int]:
+    """预计算热点报表，返回 {'warmed': 成功数, 'failed': 失败数}。
+
+    调用参数与接口保持一致，以命中同一缓存键；已缓存且新鲜的条目直接命中，不重复计算。
+
+    Args:
+        owner_ids: 直属运营组合（'all' 表示全部运营），None 表示全部运营 + 当前有主播的各直属运营
+        triggered_by: 触发来源（写入日志）
+        events: 报表缓存失效事件；提供时只预计算与事件日期区间重叠的报表，且只处理全部运营与事件涉及的直属运营
+    """
+    targets = _hot_report_targets()
+    owners = owner_ids if owner_ids is not None else _owner_options()
+    if events is not None:
+        targets = [target for target in targets if _window_affected(target[1], target[2], events)]
+        affected_owner_ids = _affected_owner_ids(events) if targets else set()
+        owners = [owner_id for owner_id in owners if owner_id == 'all' or affected_owner_ids is None or owner_id in affected_owner_ids]
+
+    stats = {'warmed': 0, 'failed': 0}
+    logger.info('开始预计算热点报表：触发=%s，报表 %d 个，直属运营组合 %d 个', triggered_by, len(targets), len(owners))
+
+    for owner_id in owners:
+        for mode in PREWARM_MODES:
+            for label, _, _, task in targets:
+                _run(f'{label} {owner_id}/{mode}', lambda t=task, o=owner_id, md=mode: t(o, md), stats)
+
+    logger.info('热点报表预计算完成：触发=%s，成功 %d，失败 %d', triggered_by, stats['warmed'], stats['failed'])
+    return stats
@@ -4,8 +4,9 @@
 引入 MongoDB 任务计划令牌，保证同一计划仅执行一次。
 """
 
-from datetime import datetime, timezone
-from typing import Any, Optional
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
 
 from utils.job_token import JobPlan, consume_fire, plan_fire
 from utils.logging_setup import get_logger
@@ -15,6 +16,16 @@ logger = get_logger('scheduler')
 
 _scheduler: Optional[Any] = None
 
+# 数据集中写入后的报表预计算：最后一次写入后延迟执行，持续写入时最多推迟到首次写入后的上限；
+# 只预计算期间失效事件涉及的报表，且仅在报表缓存由多个 worker 共享时执行
+REPORT_PREWARM_BURST_DELAY_SECONDS = 120
+REPORT_PREWARM_BURST_MAX_DELAY_SECONDS = 600
+
+_report_prewarm_burst_job: Optional[Callable[[], None]] = None
+_report_prewarm_burst_started_at: Optional[datetime] = None
+_report_prewarm_burst_events: Dict[Tuple[Any, ...], Dict[str, Any]] = {}  # 按事件内容去重
+_report_prewarm_burst_lock = threading.Lock()
+
 
 def _ensure_scheduler():
     global _scheduler  # noqa: PLW0603 - 模块级单例
@@ -25,6 +36,38 @@ def _ensure_scheduler():
     return _scheduler
 
 
+def schedule_report_prewarm_after_changes(event: Dict[str, Any]) -> bool:
+    """数据写入后按失效事件安排一次热点报表预计算（防抖）。
+
+    调度器未启动或报表缓存为进程内后端（预计算只惠及调度器所在进程）时不安排，返回 False。
+    """
+    global _report_prewarm_burst_started_at  # noqa: PLW0603
+    if _scheduler is None or not _scheduler.running or _report_prewarm_burst_job is None:
+        return False
+
+    from apscheduler.triggers.date import DateTrigger  # type: ignore
+
+    from utils.cache_helper import is_report_cache_shared
+    if not is_report_cache_shared():
+        return False
+
+    now_utc = get_current_utc_time()
+    event_key = (event['kind'], event['pilot_id'], event['start'], event['end'], tuple(sorted(event['owner_ids'])))
+    with _report_prewarm_burst_lock:
+        _report_prewarm_burst_events[event_key] = event
+        if _report_prewarm_burst_started_at is None:
+            _report_prewarm_burst_started_at = now_utc
+        run_at = min(now_utc + timedelta(seconds=REPORT_PREWARM_BURST_DELAY_SECONDS),
+                     _report_prewarm_burst_started_at + timedelta(seconds=REPORT_PREWARM_BURST_MAX_DELAY_SECONDS))
+        run_at = max(run_at, now_utc + timedelta(seconds=1))
+        _scheduler.add_job(_report_prewarm_burst_job,
+                           DateTrigger(run_date=run_at.replace(tzinfo=timezone.utc)),
+                           id='report_prewarm_burst',
+                           replace_existing=True,
+                           max_instances=1)
+    return True
+
+
 def init_scheduled_jobs(flask_app) -> None:
     """初始化并启动系统内置的定时任务。
 
@@ -60,6 +103,11 @@ def init_scheduled_jobs(flask_app) -> None:
     # 底薪发放提醒：每日 GMT+8 18:00 触发（UTC 10:00）
     base_salary_reminder_trigger = CronTrigger(hour=10, minute=0, timezone='UTC')
 
+    # 热点报表预计算：每日 GMT+8 15:10 触发（UTC 07:10），在 15:00/15:02 邮件报表之后
+    report_prewarm_trigger = CronTrigger(hour=7, minute=10, timezone='UTC')
+    # 仪表盘快照每分钟刷新（无计划令牌：各进程均可执行，快照刚刷新过时自动跳过）
+    dashboard_snapshot_trigger = CronTrigger(minute='*', timezone='UTC')
+
     def _next_fire_utc(trigger) -> datetime:
         now_utc = get_current_utc_time()
         next_dt = trigger.get_next_fire_time(previous_fire_time=None, now=now_utc)
@@ -150,6 +198,41 @@ def init_scheduled_jobs(flask_app) -> None:
             logger.info('定时任务 run_base_salary_reminder_job 完成：%s', result)
         plan_fire('daily_base_salary_reminder', _next_fire_utc(base_salary_reminder_trigger))
 
+    def run_report_prewarm_wrapper():
+        from utils.report_prewarm import prewarm_hot_reports
+        fire_dt_utc = get_current_utc_time().replace(second=0, microsecond=0)
+        if not consume_fire('daily_report_prewarm', fire_dt_utc):
+            logger.info('跳过执行：daily_report_prewarm（计划令牌不存在）')
+            return
+        with flask_app.app_context():
+            result = prewarm_hot_reports(triggered_by='scheduler@daily-15:10+08')
+            logger.info('定时任务 prewarm_hot_reports 完成：%s', result)
+        plan_fire('daily_report_prewarm', _next_fire_utc(report_prewarm_trigger))
+
+    def run_report_prewarm_burst_wrapper():
+        global _report_prewarm_burst_started_at  # noqa: PLW0603
+        from utils.report_prewarm import prewarm_hot_reports
+        with _report_prewarm_burst_lock:
+            _report_prewarm_burst_started_at = None
+            events = list(_report_prewarm_burst_events.values())
+            _report_prewarm_burst_events.clear()
+        if not events:
+            return
+        with flask_app.app_context():
+            result = prewarm_hot_reports(triggered_by='data-change-burst', events=events)
+            logger.info('数据写入后的热点报表预计算完成：%s', result)
+
+    def run_dashboard_snapshot_wrapper():
+        from utils.dashboard_snapshot import refresh_dashboard_snapshot
+        with flask_app.app_context():
+            try:
+                refresh_dashboard_snapshot()
+            except Exception as exc:  # pylint: disable=broad-except
+                logger.error('刷新仪表盘快照失败：%s', exc, exc_info=True)
+
+    global _report_prewarm_burst_job  # noqa: PLW0603
+    _report_prewarm_burst_job = run_report_prewarm_burst_wrapper
+
     sched.add_job(run_unstarted_wrapper, unstarted_trigger, id='daily_unstarted_report', replace_existing=True, max_instances=1)
     try:
         plan_fire('daily_unstarted_report', _next_fire_utc(unstarted_trigger))
@@ -198,6 +281,16 @@ def init_scheduled_jobs(flask_app) -> None:
     except Exception as exc:  # pylint: disable=broad-except
         logger.error('写入底薪发放提醒下一次计划失败：%s', exc)
 
+    # 新增：热点报表预计算（邮件报表之后）
+    sched.add_job(run_report_prewarm_wrapper, report_prewarm_trigger, id='daily_report_prewarm', replace_existing=True, max_instances=1)
+    try:
+        plan_fire('daily_report_prewarm', _next_fire_utc(report_prewarm_trigger))
+    except Exception as exc:  # pylint: disable=broad-except
+        logger.error('写入热点报表预计算下一次计划失败：%s', exc)
+
+    # 新增：仪表盘快照刷新（每分钟）
+    sched.add_job(run_dashboard_snapshot_wrapper, dashboard_snapshot_trigger, id='dashboard_snapshot_refresh', replace_existing=True, max_instances=1)
+
     if not sched.running:
         sched.start(paused=False)
         logger.info('APScheduler 已启动，任务数：%d', len(sched.get_jobs()))
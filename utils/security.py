@@ -7,6 +7,7 @@ from flask_security.datastore import MongoEngineUserDatastore
 from flask_security.signals import user_authenticated
 
 from models.user import Role, User
+from utils.identity_cache import load_user
 
 
 def create_user_datastore(db=None) -> MongoEngineUserDatastore:
@@ -33,7 +34,7 @@ def init_security(app: Flask, user_datastore: MongoEngineUserDatastore) -> Secur
 
     @security.login_manager.user_loader
     def _load_user(user_id):  # pylint: disable=unused-argument
-        user = User.objects(fs_uniquifier=user_id).first()
+        user = load_user(user_id)  # 与 JWT 用户加载共用请求内身份映射
         if user:
             return user
         try:
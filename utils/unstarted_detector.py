@@ -0,0 +1,174 @@
+# pylint: disable=no-member,protected-access
+"""未开播检测
+
+为"未开播提醒"与"线上主播未开播提醒"邮件任务提供按集合计算的检测：
+通告、开播记录（按 主播 × 本地日 聚合）、主播与直属运营各批量加载一次，
+在内存中做反连接，查询次数与通告/主播数量无关。
+"""
+
+from datetime import datetime, timedelta
+from math import floor
+from typing import Dict, Iterable, List, Set, Tuple
+
+from bson import ObjectId
+
+from models.announcement import Announcement
+from models.battle_record import BattleRecord
+from models.pilot import Pilot, WorkMode
+from models.user import User
+from utils.logging_setup import get_logger
+from utils.timezone_helper import local_to_utc, utc_to_local
+
+logger = get_logger('unstarted_detector')
+
+UNSTARTED_WINDOW_HOURS = 48  # 检查最近48小时内开始的通告
+UNSTARTED_GRACE_HOURS = 6  # 计划开始6小时后仍无开播记录才提醒
+
+
+def _ref_id(reference) -> str:
+    """读取引用字段的ID而不触发解引用。"""
+    return str(getattr(reference, 'id', reference))
+
+
+def _local_date_expression() -> Dict:
+    return {'$dateToString': {'format': '%Y-%m-%d', 'date': '$start_time', 'timezone': '+08:00'}}
+
+
+def _load_pilot_labels(pilot_ids: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """批量加载主播昵称、真实姓名与“直属运营-主播分类”显示（主播、运营各一次查询）。"""
+    ids = list({pilot_id for pilot_id in pilot_ids if pilot_id})
+    if not ids:
+        return {}
+
+    pilots = list(Pilot.objects(id__in=ids).no_dereference().only('nickname', 'real_name', 'rank', 'owner'))
+    owner_ids = {_ref_id(pilot.owner) for pilot in pilots if pilot.owner}
+    owners = {str(user.id): user for user in User.objects(id__in=list(owner_ids)).only('nickname', 'username')} if owner_ids else {}
+
+    labels: Dict[str, Dict[str, str]] = {}
+    for pilot in pilots:
+        owner = owners.get(_ref_id(pilot.owner)) if pilot.owner else None
+        owner_display = (owner.nickname or owner.username or '') if owner else ''
+        rank_display = pilot.rank.value if pilot.rank else ''
+        labels[str(pilot.id)] = {
+            'pilot_name': pilot.nickname or '',
+            'real_name': pilot.real_name or '',
+            'owner_rank': f"{owner_display}-{rank_display}".strip('-'),
+        }
+    return labels
+
+
+def _started_pilot_days(pilot_ids: List[str], start_utc: datetime, end_utc: datetime) -> Set[Tuple[str, str]]:
+    """返回范围内有开播记录的 (主播ID, 本地日期 YYYY-MM-DD) 集合（单次聚合）。"""
+    if not pilot_ids:
+        return set()
+
+    pipeline = [
+        {'$match': {'pilot': {'$in': [ObjectId(pilot_id) for pilot_id in pilot_ids]}, 'start_time': {'$gte': start_utc, '$lt': end_utc}}},
+        {'$group': {'_id': {'pilot': '$pilot', 'local_date': _local_date_expression()}}},
+    ]
+    groups = BattleRecord._get_collection().aggregate(pipeline, allowDiskUse=True)  # type: ignore[attr-defined]
+    return {(str(group['_id']['pilot']), group['_id']['local_date']) for group in groups}
+
+
+def find_unstarted_announcements(now_utc: datetime) -> List[dict]:
+    """找出最近48小时内计划开始已超过6小时、但主播当天（GMT+8）没有任何开播记录的通告。
+
+    Returns:
+        list: 邮件行数据，按计划开始时间倒序
+    """
+    window_start_utc = now_utc - timedelta(hours=UNSTARTED_WINDOW_HOURS)
+    deadline_start_utc = now_utc - timedelta(hours=UNSTARTED_GRACE_HOURS)
+
+    announcements = list(
+        Announcement.objects(start_time__gte=window_start_utc, start_time__lte=deadline_start_utc).no_dereference().only(
+            'pilot', 'start_time', 'duration_hours', 'x_coord', 'y_coord', 'z_coord').order_by('-start_time'))
+    logger.debug('候选计划数量（48小时内且已过6小时）：%d', len(announcements))
+    if not announcements:
+        return []
+
+    pilot_ids = list({_ref_id(ann.pilot) for ann in announcements if ann.pilot})
+    day_starts_local = [utc_to_local(ann.start_time).replace(hour=0, minute=0, second=0, microsecond=0) for ann in announcements]
+    started = _started_pilot_days(pilot_ids, local_to_utc(min(day_starts_local)), local_to_utc(max(day_starts_local) + timedelta(days=1)))
+
+    pending = [(ann, day_start) for ann, day_start in zip(announcements, day_starts_local)
+               if ann.pilot and (_ref_id(ann.pilot), day_start.strftime('%Y-%m-%d')) not in started]
+    labels = _load_pilot_labels(_ref_id(ann.pilot) for ann, _ in pending)
+
+    items: List[dict] = []
+    for ann, _ in pending:
+        label = labels.get(_ref_id(ann.pilot), {})
+        deadline_utc = ann.start_time + timedelta(hours=UNSTARTED_GRACE_HOURS)
+        overdue_hours = floor(max(0, (now_utc - deadline_utc).total_seconds()) / 3600)
+        items.append({
+            'pilot_name': label.get('pilot_name', ''),
+            'owner_rank': label.get('owner_rank', ''),
+            'region': f"{ann.x_coord or ''}-{ann.y_coord or ''}-{ann.z_coord or ''}",
+            'start_local': utc_to_local(ann.start_time).strftime('%Y-%m-%d %H:%M'),
+            'plan_duration_hours': f"{ann.duration_hours or 0:.1f}",
+            'overdue_hours': overdue_hours,
+            'note': '请确认是否漏填开播记录'
+        })
+    return items
+
+
+def find_unstarted_online_pilots(check_start_utc: datetime, check_end_utc: datetime, check_day_start_utc: datetime, check_day_end_utc: datetime,
+                                 check_day_label: str) -> List[dict]:
+    """找出检查窗口内有线上开播记录、但检查日没有任何开播记录的主播。
+
+    Args:
+        check_start_utc / check_end_utc: 检查窗口（UTC，左闭右开）
+        check_day_start_utc / check_day_end_utc: 检查日（UTC，左闭右开）
+        check_day_label: 检查日显示（YYYY-MM-DD）
+
+    Returns:
+        list: 邮件行数据，按直属运营-主播分类、昵称排序
+    """
+    range_start = min(check_start_utc, check_day_start_utc)
+    range_end = max(check_end_utc, check_day_end_utc)
+
+    def _in_range(start, end):
+        return {'$and': [{'$gte': ['$start_time', start]}, {'$lt': ['$start_time', end]}]}
+
+    pipeline = [
+        {'$match': {'start_time': {'$gte': range_start, '$lt': range_end}}},
+        {'$group': {
+            '_id': '$pilot',
+            'online_count': {'$sum': {'$cond': [{'$and': [_in_range(check_start_utc, check_end_utc), {'$eq': ['$work_mode', WorkMode.ONLINE.value]}]}, 1, 0]}},
+            'check_day_count': {'$sum': {'$cond': [_in_range(check_day_start_utc, check_day_end_utc), 1, 0]}},
+        }},
+        {'$match': {'online_count': {'$gt': 0}, 'check_day_count': 0}},
+    ]
+    groups = list(BattleRecord._get_collection().aggregate(pipeline, allowDiskUse=True))  # type: ignore[attr-defined]
+    logger.debug('检查窗口内有线上开播且检查日无记录的主播数量：%d', len(groups))
+    if not groups:
+        return []
+
+    online_counts = {str(group['_id']): group['online_count'] for group in groups}
+    latest_pipeline = [
+        {'$match': {'pilot': {'$in': [group['_id'] for group in groups]}}},
+        {'$group': {'_id': '$pilot', 'latest_start': {'$max': '$start_time'}}},
+    ]
+    latest_starts = {
+        str(group['_id']): group['latest_start']
+        for group in BattleRecord._get_collection().aggregate(latest_pipeline, allowDiskUse=True)  # type: ignore[attr-defined]
+    }
+    labels = _load_pilot_labels(online_counts)
+
+    check_day = datetime.strptime(check_day_label, '%Y-%m-%d')
+    items: List[dict] = []
+    for pilot_id, online_count in online_counts.items():
+        label = labels.get(pilot_id)
+        if label is None:
+            continue
+        latest_start = latest_starts.get(pilot_id)
+        items.append({
+            'pilot_name': label['pilot_name'],
+            'real_name': label['real_name'],
+            'owner_rank': label['owner_rank'],
+            'latest_date': utc_to_local(latest_start).strftime('%Y-%m-%d') if latest_start else '无记录',
+            'recent_online_count': online_count,
+            'check_day': check_day_label,
+            'note': f'{check_day.strftime("%m月%d日")}未登记开播记录，请确认是否漏记'
+        })
+    items.sort(key=lambda item: (item['owner_rank'], item['pilot_name']))
+    return items